@@ -0,0 +1,144 @@
+# benchmark_intent_batching.py - Сравнение размеров пакета при микробатчинге определения интента
+#
+# Примеры:
+#   python benchmark_intent_batching.py --requests 600 --rate 60 --sizes 1,4,8,16
+#   python benchmark_intent_batching.py --rate 200 --latency-ms 500 --output-token-ms 5 --window-ms 30
+#
+# Запросы приходят потоком Пуассона с заданной интенсивностью, тексты уникальны (кеш не помогает).
+# Размер 1 - без микробатчинга (каждый текст - отдельный запрос к модели).
+# Бэкенд LLM - фейковый, настройки из .env (БД, токен бота) по-прежнему нужны, но API ключ - нет.
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE_TEXTS = [
+    "купить молоко",
+    "что там с отчетом для бухгалтерии",
+    "вынести мусор",
+    "список дел про ремонт",
+    "я теперь живу в Казани",
+    "забрать посылку на почте",
+    "какие у меня планы по банку",
+    "записать сына на плавание",
+]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Бенчмарк микробатчинга определения интента")
+    parser.add_argument("--requests", type=int, default=400, help="Сколько запросов на каждый размер пакета")
+    parser.add_argument("--rate", type=float, default=60.0, help="Интенсивность запросов (в секунду)")
+    parser.add_argument("--sizes", default="1,4,8,16", help="Размеры пакета через запятую (1 - без батчинга)")
+    parser.add_argument("--window-ms", type=float, default=50.0, help="Окно сбора пакета")
+    parser.add_argument("--latency-ms", type=float, default=600.0, help="Медиана задержки фейковой модели")
+    parser.add_argument("--jitter", type=float, default=0.3, help="Разброс задержки (lognormal sigma)")
+    parser.add_argument("--prompt-ms-per-1k", type=float, default=40.0,
+                        help="Добавка к задержке за 1000 токенов промпта")
+    parser.add_argument("--output-token-ms", type=float, default=4.0, help="Добавка к задержке за токен ответа")
+    parser.add_argument("--max-concurrency", type=int, default=8, help="Одновременных запросов к LLM")
+    parser.add_argument("--rpm", type=int, default=1000, help="Лимит запросов к LLM в минуту (0 - без лимита)")
+    parser.add_argument("--tpm", type=int, default=1000000, help="Лимит токенов в минуту (0 - без лимита)")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def configure_environment(args: argparse.Namespace) -> None:
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ["LLM_FAKE_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["LLM_FAKE_LATENCY_DISTRIBUTION"] = "lognormal"
+    os.environ["LLM_FAKE_LATENCY_JITTER"] = str(args.jitter)
+    os.environ["LLM_FAKE_LATENCY_PER_1K_PROMPT_TOKENS_MS"] = str(args.prompt_ms_per_1k)
+    os.environ["LLM_FAKE_LATENCY_PER_OUTPUT_TOKEN_MS"] = str(args.output_token_ms)
+    os.environ["LLM_FAKE_SEED"] = str(args.seed)
+    os.environ["LLM_MAX_CONCURRENCY"] = str(args.max_concurrency)
+    os.environ["LLM_REQUESTS_PER_MINUTE"] = str(args.rpm)
+    os.environ["LLM_TOKENS_PER_MINUTE"] = str(args.tpm)
+    os.environ["LLM_RECORD_PATH"] = ""
+    os.environ["LLM_CACHE_ENABLED"] = "false"
+    os.environ["LLM_HEDGING_ENABLED"] = "false"
+    # Предохранитель не должен размыкаться из-за искусственно медленных ответов под перегрузкой
+    os.environ["LLM_CIRCUIT_BREAKER_ENABLED"] = "false"
+    os.environ["LLM_SHED_QUEUE_DEPTH"] = "0"
+    os.environ["LLM_INTENT_BATCH_WINDOW_MS"] = str(args.window_ms)
+
+
+def percentile(sorted_values, quantile: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(len(sorted_values) * quantile), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+async def run_size(args: argparse.Namespace, batch_size: int, run_index: int) -> None:
+    from src.config import settings
+    from src.llm import gemini_client
+    from src.llm.micro_batcher import MicroBatcher
+    from src.llm.request_scheduler import LLMRequestScheduler
+
+    # Свежие лимиты провайдера на каждый прогон: квота не должна переходить от прогона к прогону
+    gemini_client.llm_scheduler = LLMRequestScheduler(
+        max_concurrency=settings.llm_max_concurrency,
+        requests_per_minute=settings.llm_requests_per_minute,
+        tokens_per_minute=settings.llm_tokens_per_minute
+    )
+    settings.llm_intent_batching_enabled = batch_size > 1
+    gemini_client.intent_batcher = MicroBatcher(
+        "intent",
+        process_batch=gemini_client._detect_intents_batch,
+        process_single=gemini_client._detect_intent_raw,
+        max_batch_size=batch_size,
+        max_wait=args.window_ms / 1000
+    )
+    calls_before = dict(gemini_client.model.calls)
+    arrivals = random.Random(args.seed)
+    latencies = []
+    failures = 0
+
+    async def handle(index: int) -> None:
+        nonlocal failures
+        # Уникальный текст: кеш не должен подменять запросы к модели
+        text = f"{SAMPLE_TEXTS[index % len(SAMPLE_TEXTS)]} #{run_index}-{index}"
+        started_at = time.perf_counter()
+        intent = await gemini_client.detect_intent_simple(text)
+        latencies.append(time.perf_counter() - started_at)
+        if intent is None:
+            failures += 1
+
+    started_at = time.perf_counter()
+    jobs = []
+    for index in range(args.requests):
+        jobs.append(asyncio.create_task(handle(index)))
+        await asyncio.sleep(arrivals.expovariate(args.rate))
+    await asyncio.gather(*jobs)
+    wall = time.perf_counter() - started_at
+
+    calls = {name: count - calls_before.get(name, 0) for name, count in gemini_client.model.calls.items()}
+    llm_calls = calls.get("intent", 0) + calls.get("intent_batch", 0)
+    stats = gemini_client.intent_batcher.get_stats()
+    latencies.sort()
+    print(f"{batch_size:>5} {args.requests / wall:>9.1f} {percentile(latencies, 0.5) * 1000:>7.0f} "
+          f"{percentile(latencies, 0.9) * 1000:>7.0f} {percentile(latencies, 0.99) * 1000:>7.0f} "
+          f"{llm_calls:>9} {stats['avg_batch_size']:>9} {stats['fallback_items']:>9} {failures:>7}")
+
+
+async def run_benchmark(args: argparse.Namespace) -> None:
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    print("=" * 78)
+    print(f"Запросов: {args.requests} на размер, поток {args.rate:.0f}/с, окно {args.window_ms:.0f}ms, "
+          f"модель {args.latency_ms:.0f}ms, LLM параллельно {args.max_concurrency}, rpm {args.rpm}, tpm {args.tpm}")
+    print("-" * 78)
+    print(f"{'batch':>5} {'req/s':>9} {'p50 ms':>7} {'p90 ms':>7} {'p99 ms':>7} "
+          f"{'LLM calls':>9} {'avg batch':>9} {'fallback':>9} {'errors':>7}")
+    for run_index, batch_size in enumerate(sizes):
+        await run_size(args, batch_size, run_index)
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    configure_environment(arguments)
+    asyncio.run(run_benchmark(arguments))
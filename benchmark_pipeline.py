@@ -0,0 +1,123 @@
+# benchmark_pipeline.py - Замер задержки и пропускной способности NLU-пайплайна без сети
+#
+# Примеры:
+#   python benchmark_pipeline.py --messages 200 --concurrency 20 --latency-ms 600
+#   python benchmark_pipeline.py --replay llm_recording.jsonl --latency-scale 0
+#
+# Бэкенд LLM выбирается через переменные окружения до импорта src, поэтому
+# настройки из .env (БД, токен бота) по-прежнему нужны, но API ключ - нет.
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE_MESSAGES = [
+    "купить молоко завтра",
+    "напомни вечером воскресенья про встречу в понедельник в 10:00",
+    "сделать презентацию к пятнице",
+    "каждый понедельник в 9 планерка",
+    "позвонить маме через 2 часа",
+    "оплатить интернет 15 числа каждого месяца",
+    "что у меня на завтра?",
+    "записаться к врачу",
+]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Бенчмарк process_user_input на офлайн-бэкенде LLM")
+    parser.add_argument("--messages", type=int, default=100, help="Сколько сообщений обработать")
+    parser.add_argument("--concurrency", type=int, default=10, help="Сколько сообщений обрабатывается одновременно")
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="Медиана задержки фейковой модели")
+    parser.add_argument("--distribution", default="lognormal",
+                        choices=["fixed", "uniform", "normal", "lognormal", "exponential"])
+    parser.add_argument("--jitter", type=float, default=0.5, help="Разброс задержки")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Доля внедренных ошибок")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--replay", help="JSONL файл записи: воспроизводить ответы вместо фейковых")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Множитель задержек при replay")
+    parser.add_argument("--no-cache", action="store_true", help="Отключить кеш ответов LLM")
+    parser.add_argument("--hedge", action="store_true", help="Включить дублирование медленных коротких запросов")
+    return parser.parse_args()
+
+
+def configure_environment(args: argparse.Namespace) -> None:
+    if args.replay:
+        os.environ["LLM_BACKEND"] = "replay"
+        os.environ["LLM_REPLAY_PATH"] = args.replay
+        os.environ["LLM_REPLAY_LATENCY_SCALE"] = str(args.latency_scale)
+    else:
+        os.environ["LLM_BACKEND"] = "fake"
+        os.environ["LLM_FAKE_LATENCY_MS"] = str(args.latency_ms)
+        os.environ["LLM_FAKE_LATENCY_DISTRIBUTION"] = args.distribution
+        os.environ["LLM_FAKE_LATENCY_JITTER"] = str(args.jitter)
+        os.environ["LLM_FAKE_ERROR_RATE"] = str(args.error_rate)
+        os.environ["LLM_FAKE_SEED"] = str(args.seed)
+    os.environ["LLM_RECORD_PATH"] = ""
+    if args.no_cache:
+        os.environ["LLM_CACHE_ENABLED"] = "false"
+    os.environ["LLM_HEDGING_ENABLED"] = "true" if args.hedge else "false"
+
+
+def percentile(sorted_values, quantile: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(len(sorted_values) * quantile), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+async def run_benchmark(args: argparse.Namespace) -> None:
+    from src.llm.gemini_client import process_user_input, llm_scheduler, llm_hedger
+    from src.llm.model_profiles import model_profiles
+    from src.llm.telemetry import llm_telemetry
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+    statuses = {}
+
+    async def handle(index: int) -> None:
+        text = SAMPLE_MESSAGES[index % len(SAMPLE_MESSAGES)]
+        async with semaphore:
+            started_at = time.perf_counter()
+            result = await process_user_input(text, user_timezone="Europe/Moscow")
+            latencies.append(time.perf_counter() - started_at)
+        status = result.get("status", "unknown")
+        statuses[status] = statuses.get(status, 0) + 1
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(handle(index) for index in range(args.messages)))
+    wall = time.perf_counter() - started_at
+
+    latencies.sort()
+    print("=" * 60)
+    print(f"Сообщений: {args.messages}, параллельно: {args.concurrency}, время: {wall:.2f}s")
+    print(f"Пропускная способность: {args.messages / wall:.1f} сообщ./с")
+    print(f"Задержка: p50={percentile(latencies, 0.5) * 1000:.0f}ms "
+          f"p90={percentile(latencies, 0.9) * 1000:.0f}ms "
+          f"p99={percentile(latencies, 0.99) * 1000:.0f}ms max={latencies[-1] * 1000:.0f}ms")
+    print(f"Статусы: {statuses}")
+    print("-" * 60)
+    for item in llm_telemetry.get_summary():
+        print(f"{item['prompt']:<24} calls={item['calls']:<5} cache={item['cache_hits']:<5} "
+              f"avg={item['avg_latency']:.3f}s decision={item['avg_decision']:.3f}s "
+              f"early_stops={item['early_stops']} errors={item['errors']}")
+    for prompt_name, stats in llm_hedger.get_stats().items():
+        print(f"hedge {prompt_name:<18} requests={stats['requests']:<5} hedge_rate={stats['hedge_rate']:<6} "
+              f"wins={stats['hedge_wins']:<4} capped={stats['capped']:<4} saved={stats['latency_saved']}s "
+              f"threshold={stats['threshold']}s")
+    for profile_name, stats in model_profiles.get_stats().items():
+        print(f"profile {profile_name:<16} calls={stats['calls']:<5} avg={stats['avg_latency']:.3f}s "
+              f"p95={stats['p95_latency']:.3f}s out_tokens={stats['avg_output_tokens']} "
+              f"timeouts={stats['timeouts']} truncated={stats['truncated']}")
+    scheduler_stats = llm_scheduler.get_stats()
+    print(f"Очередь LLM: ожидание p95 interactive={scheduler_stats['wait_p95_interactive']}s "
+          f"normal={scheduler_stats['wait_p95_normal']}s")
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    configure_environment(arguments)
+    asyncio.run(run_benchmark(arguments))
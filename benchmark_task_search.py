@@ -0,0 +1,151 @@
+# benchmark_task_search.py - Сравнение старой (JSON) и компактной кодировки задач для поиска через LLM
+#
+# Примеры:
+#   python benchmark_task_search.py                      # фейковая модель, задержка растет с длиной промпта
+#   LLM_BACKEND=gemini python benchmark_task_search.py   # реальная модель (нужен GOOGLE_API_KEY)
+#
+# Для каждого синтетического пользователя (50, 500, 5000 задач) печатает число задач в промпте,
+# оценку токенов и задержку ответа модели для старой и новой кодировки, для поиска по частям
+# и для векторного поиска по эмбеддингам (без LLM).
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+VERBS = ["купить", "позвонить", "написать", "оплатить", "записаться к", "забрать", "отправить", "проверить",
+         "подготовить", "обсудить с", "заказать", "починить", "отвезти", "встретить"]
+OBJECTS = ["молоко", "маме", "отчет в банк", "интернет", "врачу", "посылку на почте", "документы бухгалтеру",
+           "презентацию для клиента", "командой план релиза", "подарок Ане", "кран на кухне", "машину на ТО",
+           "договор аренды", "страховку на квартиру", "билеты в театр"]
+DETAILS = ["", "", " до обеда", " не забыть взять паспорт", " и уточнить сроки по второму этапу проекта",
+           " (номер заказа 48213)", " после работы", " обязательно до конца недели, иначе штраф"]
+
+LEGACY_MAX_TASKS = 100
+
+
+def make_synthetic_tasks(count: int, seed: int = 0):
+    import pendulum
+
+    generator = random.Random(seed)
+    now = pendulum.now("UTC")
+    tasks = []
+    for index in range(count):
+        description = f"{generator.choice(VERBS)} {generator.choice(OBJECTS)}{generator.choice(DETAILS)}"
+        reminder = None
+        if generator.random() < 0.7:
+            reminder = now.add(days=generator.randint(-5, 30), hours=generator.randint(0, 23)).start_of("hour")
+        tasks.append({
+            "id": 100000 + index,
+            "title": description.split(" (")[0][:40].capitalize(),
+            "description": description,
+            "status": "pending",
+            "next_reminder_at": reminder,
+            "is_repeating": generator.random() < 0.15,
+        })
+    return tasks
+
+
+def legacy_encoding(tasks):
+    """Кодировка до оптимизации: JSON с отступами, первые 100 задач, due_date_utc_iso всегда null."""
+    legacy = [{"id": task["id"], "description": task["description"], "title": task["title"],
+               "status": task["status"], "due_date_utc_iso": None} for task in tasks[:LEGACY_MAX_TASKS]]
+    return json.dumps(legacy, ensure_ascii=False, indent=2), len(legacy)
+
+
+async def run_benchmark(args: argparse.Namespace) -> None:
+    import pendulum
+    from src.config import settings
+    from src.llm.gemini_client import model
+    from src.llm.prompts import TASK_SEARCH_WITH_CONTEXT_PROMPT_TEMPLATE
+    from src.llm.task_encoding import (
+        encode_tasks_compact, shard_tasks_compact, estimate_text_tokens, WEEKDAY_ABBREVIATIONS
+    )
+    from src.llm.embeddings import task_embedder, task_embedding_text
+    from src.utils.task_vector_index import TaskVectorIndex
+
+    if not model:
+        print("LLM backend is not available")
+        return
+
+    now_local = pendulum.now("Europe/Moscow")
+    query = "что мне надо оплатить на этой неделе?"
+
+    def build_prompt(table: str) -> str:
+        return TASK_SEARCH_WITH_CONTEXT_PROMPT_TEMPLATE.format(
+            USER_QUERY=query, TASK_TABLE=table,
+            CURRENT_TIME_LOCAL=now_local.to_iso8601_string(),
+            CURRENT_WEEKDAY=WEEKDAY_ABBREVIATIONS[now_local.weekday()]
+        )
+
+    async def measure(prompt: str) -> float:
+        latencies = []
+        for _ in range(args.repeats):
+            started_at = time.perf_counter()
+            await model.generate(prompt, "task_search")
+            latencies.append(time.perf_counter() - started_at)
+        return sorted(latencies)[len(latencies) // 2]
+
+    print(f"Бэкенд: {model.name}, бюджет: {settings.llm_task_search_token_budget} токенов, "
+          f"повторов: {args.repeats}")
+    print(f"{'задач':>6} | {'кодировка':<9} | {'в промпте':>9} | {'токенов':>8} | {'медиана':>8}")
+    print("-" * 52)
+    for count in args.sizes:
+        tasks = make_synthetic_tasks(count)
+        legacy_table, legacy_included = legacy_encoding(tasks)
+        compact_table, compact_included = encode_tasks_compact(
+            tasks, now_local, token_budget=settings.llm_task_search_token_budget,
+            description_chars=settings.llm_task_search_description_chars
+        )
+        for name, table, included in (("json", legacy_table, legacy_included),
+                                      ("compact", compact_table, compact_included)):
+            prompt = build_prompt(table)
+            latency = await measure(prompt)
+            print(f"{count:>6} | {name:<9} | {included:>9} | {estimate_text_tokens(prompt):>8} | "
+                  f"{latency * 1000:>6.0f}ms")
+
+        # Map-reduce: все задачи (до LLM_TASK_SEARCH_MAX_SHARDS частей), части запрашиваются параллельно
+        shards = shard_tasks_compact(
+            tasks, now_local, token_budget=settings.llm_task_search_token_budget,
+            description_chars=settings.llm_task_search_description_chars,
+            max_shards=settings.llm_task_search_max_shards
+        )
+        prompts = [build_prompt(table) for table, _ in shards]
+        started_at = time.perf_counter()
+        await asyncio.gather(*(model.generate(prompt, "task_search") for prompt in prompts))
+        latency = time.perf_counter() - started_at
+        included = sum(len(shard_ids) for _, shard_ids in shards)
+        total_tokens = sum(estimate_text_tokens(prompt) for prompt in prompts)
+        print(f"{count:>6} | {f'{len(shards)} shards':<9} | {included:>9} | {total_tokens:>8} | "
+              f"{latency * 1000:>6.0f}ms")
+
+        # Векторный поиск: векторы считаются при создании задач, здесь меряем только запрос
+        vectors = await task_embedder.embed([task_embedding_text(task["title"], task["description"]) for task in tasks])
+        index = TaskVectorIndex()
+        entry = index.put(0, task_embedder.name, [task["id"] for task in tasks], vectors, task_embedder.dim)
+        latencies = []
+        for _ in range(args.repeats):
+            started_at = time.perf_counter()
+            query_vector = (await task_embedder.embed([query], is_query=True))[0]
+            index.search(entry, query_vector, limit=settings.task_search_llm_candidates)
+            latencies.append(time.perf_counter() - started_at)
+        latency = sorted(latencies)[len(latencies) // 2]
+        print(f"{count:>6} | {'vector':<9} | {len(tasks):>9} | {0:>8} | {latency * 1000:>6.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк кодировки задач для поиска через LLM")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 5000])
+    parser.add_argument("--repeats", type=int, default=3)
+    arguments = parser.parse_args()
+
+    # По умолчанию - офлайн: 800ms базовой задержки плюс 150ms на каждую 1000 токенов промпта
+    os.environ.setdefault("LLM_BACKEND", "fake")
+    os.environ.setdefault("LLM_FAKE_LATENCY_DISTRIBUTION", "fixed")
+    os.environ.setdefault("LLM_FAKE_LATENCY_PER_1K_PROMPT_TOKENS_MS", "150")
+    asyncio.run(run_benchmark(arguments))
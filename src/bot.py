@@ -25,14 +25,19 @@ from src.tgbot.handlers.task_manage import task_manage_router
 
 from src.tgbot.handlers.reminder_callbacks import reminder_callbacks_router
 
+from src.tgbot.handlers.admin_commands import admin_router
+
 from src.scheduler.scheduler_setup import setup_scheduler, shutdown_scheduler, scheduler # Импортируем сам объект scheduler
 from src.scheduler.jobs import register_jobs
+from src.scheduler.enrichment import enrichment_queue
+from src.metrics_server import start_metrics_server, stop_metrics_server
 
 # Импортируем функции жизненного цикла SQLAlchemy и менеджер сессий
 from src.database.db_session import lifespan_startup, lifespan_shutdown, sessionmanager
 
 # Импортируем Middleware для сессий БД
 from src.tgbot.middlewares.db_middleware import DbSessionMiddleware
+from src.tgbot.middlewares.llm_context_middleware import LLMContextMiddleware
 
 logger = logging.getLogger(__name__)
 
@@ -75,6 +80,16 @@ async def on_startup(bot: Bot, dispatcher: Dispatcher):
          # Решить, критично ли это для старта бота? Пока нет.
 
 
+    # Фоновое уточнение оптимистично созданных задач
+    if settings.optimistic_task_creation or settings.llm_title_upgrade:
+        enrichment_queue.start(bot, sessionmanager.session_factory)
+
+    # Эндпоинт метрик для Prometheus
+    try:
+        await start_metrics_server()
+    except Exception as e:
+        logger.error(f"Failed to start metrics endpoint: {e}", exc_info=True)
+
     # Установка команд в меню Telegram
     await set_bot_commands(bot)
     logger.warning("--- Bot has been started successfully ---")
@@ -82,6 +97,9 @@ async def on_startup(bot: Bot, dispatcher: Dispatcher):
 async def on_shutdown(dispatcher: Dispatcher):
     """Действия при остановке бота: закрытие соединений."""
     logger.warning("--- Shutting down Bot ---")
+    await enrichment_queue.stop()
+    await stop_metrics_server()
+
     # Закрытие соединений с БД
     await lifespan_shutdown()
 
@@ -123,12 +141,15 @@ async def main():
     session_middleware = DbSessionMiddleware(session_pool=sessionmanager.session_factory)
     dp.update.middleware(session_middleware)
     logger.info("DbSessionMiddleware registered.")
+    # LLMContextMiddleware привязывает запросы к LLM к пользователю (справедливая очередь)
+    dp.update.middleware(LLMContextMiddleware())
 
     # Регистрируем обработчики жизненного цикла
     dp.startup.register(on_startup)
     dp.shutdown.register(on_shutdown)
 
     # Подключаем роутеры для обработки команд и сообщений
+    dp.include_router(admin_router)
     dp.include_router(find_commands_router)
     dp.include_router(reminder_callbacks_router)  # Добавляем обработчик callback'ов напоминаний
     dp.include_router(nlp_router)
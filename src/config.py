@@ -3,6 +3,8 @@
 import logging
 import sys
 
+from typing import Dict, List, Literal, Union
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import computed_field
 
@@ -28,6 +30,137 @@ class Settings(BaseSettings):
     google_api_key: str
     log_level: str
 
+    # --- Настройки LLM-пайплайна ---
+    # single_call - одним запросом извлекаем описание, заголовок, время и RRULE (цепочка - fallback)
+    # chain - старая цепочка коротких промптов
+    add_task_extraction_mode: Literal["single_call", "chain"] = "single_call"
+    # Ответ на сообщение бота о задаче: single_call - интент и поля (время переноса/откладывания,
+    # новое описание) одним запросом, chain - определение интента и отдельные промпты полей
+    contextual_reply_mode: Literal["single_call", "chain"] = "single_call"
+    # Минимальная уверенность локального парсера времени, при которой LLM не вызывается
+    local_time_parser_min_confidence: float = 0.9
+    # Минимальная уверенность локального классификатора интентов, при которой LLM не вызывается
+    local_intent_min_confidence: float = 0.85
+    # Доля уверенных локальных решений, которые дополнительно перепроверяются LLM (для оценки точности)
+    local_intent_shadow_rate: float = 0.0
+    # Запускать разбор задачи параллельно с определением интента (лишний запрос, если интент не add_task)
+    speculative_add_task_parsing: bool = False
+    # Оптимистичное создание задач: задача сохраняется сразу с исходным текстом,
+    # заголовок, время и RRULE дописываются фоновым воркером
+    optimistic_task_creation: bool = False
+    enrichment_max_concurrency: int = 4
+    enrichment_max_retries: int = 3
+    # Заголовок задачи строится локально (без LLM); при включении заголовок от LLM запрашивается
+    # в фоне и заменяет локальный в задаче и подтверждении, если пользователь не переименовал задачу
+    llm_title_upgrade: bool = False
+    # Склейка серий сообщений: сообщения чата с паузой меньше message_burst_window_ms разбираются
+    # одним запросом к LLM (0 - выключено); серия ждет не дольше message_burst_max_wait_ms
+    message_burst_window_ms: int = 0
+    message_burst_max_wait_ms: int = 4000
+    message_burst_max_messages: int = 10
+    # Планировщик запросов к LLM: максимум одновременных запросов и лимиты провайдера (0 - без лимита)
+    llm_max_concurrency: int = 8
+    llm_requests_per_minute: int = 1000
+    llm_tokens_per_minute: int = 1000000
+    # Hedging: если короткий запрос не ответил за квантиль llm_hedge_quantile последних задержек промпта,
+    # отправляется дубль, побеждает первый ответ. Доля дублей - не больше llm_hedge_max_rate запросов за минуту
+    llm_hedging_enabled: bool = False
+    llm_hedge_prompts: List[str] = ["intent", "reminder_time", "reschedule_time", "recurring_detection", "contextual_reply"]
+    llm_hedge_quantile: float = 0.9
+    # Нижняя граница порога и порог, пока по промпту мало замеров
+    llm_hedge_min_delay_ms: float = 300.0
+    llm_hedge_initial_delay_ms: float = 2000.0
+    llm_hedge_max_rate: float = 0.1
+    # Микробатчинг определения интента: запросы разных пользователей, пришедшие за llm_intent_batch_window_ms,
+    # отправляются одним пакетным промптом (не больше llm_intent_batch_max_size текстов)
+    llm_intent_batching_enabled: bool = False
+    llm_intent_batch_window_ms: float = 50.0
+    llm_intent_batch_max_size: int = 8
+    # Предохранитель: размыкается, если среди последних llm_breaker_window запросов доля ошибок
+    # или ответов дольше llm_breaker_slow_call_seconds выше порога; пока разомкнут - деградированный режим
+    llm_circuit_breaker_enabled: bool = True
+    llm_breaker_window: int = 50
+    llm_breaker_min_calls: int = 10
+    llm_breaker_failure_rate: float = 0.5
+    llm_breaker_slow_call_seconds: float = 10.0
+    llm_breaker_slow_call_rate: float = 0.5
+    llm_breaker_open_seconds: float = 30.0
+    # Если в очереди к LLM ждут столько запросов - новые сообщения обрабатываются без LLM (0 - не ограничивать)
+    llm_shed_queue_depth: int = 100
+    # Кеш ответов LLM (LRU + TTL в памяти процесса)
+    llm_cache_enabled: bool = True
+    llm_cache_max_entries: int = 2048
+    # Дублировать кеш в Postgres (таблица llm_cache), чтобы он переживал рестарты
+    llm_cache_persistent: bool = False
+
+    # Поиск задач через LLM: бюджет токенов на одну таблицу задач в промпте и длина описания в строке
+    llm_task_search_token_budget: int = 6000
+    llm_task_search_description_chars: int = 80
+    # Если задачи не помещаются в бюджет - поиск по частям параллельно, не больше стольких частей
+    llm_task_search_max_shards: int = 8
+    # Сколько кандидатов (сначала совпадения из индекса tasks) отправлять в LLM при поиске (0 - все активные)
+    task_search_llm_candidates: int = 200
+    # Минимальный score ранжированного поиска, при котором запрос-ключевое слово решается без LLM
+    task_search_keyword_min_score: float = 0.6
+    # Векторный поиск задач: эмбеддер (hashing - локальные символьные n-граммы, gemini - семантические
+    # эмбеддинги Google), размерность локального эмбеддера и pgvector вместо поиска в памяти через NumPy
+    task_embedder: Literal["hashing", "gemini"] = "hashing"
+    task_embedding_dim: int = 512
+    task_embedding_use_pgvector: bool = False
+    # Сколько пользователей держать в памяти с матрицами векторов задач (LRU)
+    task_vector_index_max_users: int = 1000
+    # Минимальная косинусная близость найденной задачи и близость, при которой ответ дается без LLM
+    # (только для семантического эмбеддера gemini; hashing всегда переранжируется через LLM)
+    task_search_vector_min_score: float = 0.25
+    task_search_vector_confident_score: float = 0.5
+    # Переранжировать неуверенные результаты векторного поиска через LLM (False - только векторный поиск)
+    task_search_llm_rerank: bool = True
+
+    # --- Профили модели по промптам ---
+    # Профиль: модель, лимит токенов ответа, температура и таймаут запроса. Тривиальные шаги - в быструю
+    # дешевую модель (без "размышлений", поэтому маленький лимит ответа не обрезает JSON), поиск и RRULE - в сильную.
+    # В .env задается JSON: LLM_PROMPT_PROFILES='{"title": "fast", "task_search": "strong"}'
+    llm_model_profiles: Dict[str, Dict[str, Union[str, int, float]]] = {
+        "fast": {"model": "gemini-2.5-flash-lite", "max_output_tokens": 256, "temperature": 0.1, "timeout_seconds": 10},
+        "default": {"model": "gemini-2.5-flash", "max_output_tokens": 2048, "temperature": 0.5, "timeout_seconds": 30},
+        "strong": {"model": "gemini-2.5-flash", "max_output_tokens": 4096, "temperature": 0.2, "timeout_seconds": 45},
+    }
+    llm_prompt_profiles: Dict[str, str] = {
+        "intent": "fast",
+        "intent_batch": "fast",
+        "title": "fast",
+        "timezone": "fast",
+        "task_search": "strong",
+        "rrule": "strong",
+    }
+    # Профиль промптов, не указанных в llm_prompt_profiles
+    llm_default_model_profile: str = "default"
+
+    # --- Бэкенд LLM ---
+    # gemini - Google Gemini; fake - офлайн-заглушка с задержками и ошибками; replay - ответы из записи
+    llm_backend: Literal["gemini", "fake", "replay"] = "gemini"
+    # Если задан - все промпты и ответы дописываются в этот JSONL файл (содержит тексты пользователей!)
+    llm_record_path: str = ""
+    # Файл записи для llm_backend=replay и множитель записанных задержек (0 - без задержек)
+    llm_replay_path: str = "llm_recording.jsonl"
+    llm_replay_latency_scale: float = 1.0
+    # Параметры фейкового бэкенда: медиана задержки, распределение, разброс, доля ошибок, seed
+    llm_fake_latency_ms: float = 800.0
+    llm_fake_latency_distribution: Literal["fixed", "uniform", "normal", "lognormal", "exponential"] = "lognormal"
+    llm_fake_latency_jitter: float = 0.5
+    llm_fake_error_rate: float = 0.0
+    # Добавка к задержке фейкового бэкенда за каждую 1000 токенов промпта
+    llm_fake_latency_per_1k_prompt_tokens_ms: float = 0.0
+    # Добавка к задержке фейкового бэкенда за каждый токен ответа
+    llm_fake_latency_per_output_token_ms: float = 0.0
+    llm_fake_seed: int = 0
+
+    # --- Мониторинг ---
+    # Telegram ID администраторов (доступ к /llmstats), в .env: ADMIN_IDS=[123456789]
+    admin_ids: List[int] = []
+    # Порт HTTP-эндпоинта /metrics в формате Prometheus (0 - не запускать)
+    metrics_port: int = 0
+
     @computed_field
     @property
     def database_url_asyncpg(self) -> str: # Для асинхронных операций
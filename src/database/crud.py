@@ -5,13 +5,18 @@ import datetime
 from typing import Optional, List, Dict, Any 
 import pendulum
 
-from sqlalchemy import select, update
-from sqlalchemy import or_, and_, case, func, TIMESTAMP, text
+from sqlalchemy import select, insert, update, delete
+from sqlalchemy import or_, and_, case, func, TIMESTAMP, text, literal
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
-# Импортируем обе модели
-from src.database.models import User, Task
+# Импортируем модели
+from src.database.models import User, Task, LLMCacheEntry, LLMUsageDaily
+from src.config import settings
+from src.llm.embeddings import task_embedder, embed_task_text, embed_task_texts, task_embedding_text
+from src.utils.search_query import search_terms
+from src.utils.task_vector_index import task_vector_index
 
 logger = logging.getLogger(__name__)
 
@@ -147,6 +152,9 @@ async def add_task(
          # TODO: Решить, как обрабатывать - создавать юзера или нет? Пока выбрасываем ошибку.
          raise ValueError(f"User with telegram_id {user_telegram_id} not found.")
 
+    # Вектор для семантического поиска считаем до вставки (локальный эмбеддер - доли миллисекунды)
+    embedding = await embed_task_text(title, description)
+
     new_task = Task(
         user_telegram_id=user_telegram_id,
         description=description,
@@ -159,12 +167,15 @@ async def add_task(
         is_repeating=is_repeating,
         recurrence_rule=recurrence_rule,
         next_reminder_at=next_reminder_at,  # Только время напоминания важно
-        raw_input=raw_input
+        raw_input=raw_input,
+        embedding=embedding,
+        embedding_model=task_embedder.name if embedding is not None else None
     )
     session.add(new_task)
     try:
         await session.commit()
         await session.refresh(new_task)
+        task_vector_index.invalidate(user_telegram_id)
         logger.info(f"Task added: ID={new_task.task_id} for user TG_ID={user_telegram_id}")
         logger.debug(
             f"Saved Task Details: "
@@ -185,6 +196,52 @@ async def add_task(
         logger.error(f"Database error during task creation for user {user_telegram_id}: {e}", exc_info=True)
         raise
 
+async def add_tasks_bulk(
+    session: AsyncSession,
+    user_telegram_id: int,
+    tasks: List[Dict[str, Any]],
+    raw_input: Optional[str] = None
+) -> List[Task]:
+    """
+    Добавляет несколько задач одним INSERT ... RETURNING (список задач из одного сообщения).
+    Элементы tasks - словари с полями add_task: description, title, original_due_text,
+    is_repeating, recurrence_rule, next_reminder_at. Возвращает задачи в порядке tasks.
+    """
+    if not tasks:
+        return []
+    # Пользователь уже загружен обработчиком, несуществующего отсечет внешний ключ
+    embeddings = await embed_task_texts([(task.get("title"), task["description"]) for task in tasks])
+    rows = [
+        {
+            "user_telegram_id": user_telegram_id,
+            "description": task["description"],
+            "title": task.get("title"),
+            "due_date": None,
+            "due_datetime": None,
+            "has_time": False,
+            "original_due_text": task.get("original_due_text"),
+            "is_repeating": task.get("is_repeating", False),
+            "recurrence_rule": task.get("recurrence_rule"),
+            "next_reminder_at": task.get("next_reminder_at"),
+            "raw_input": raw_input,
+            "embedding": embedding,
+            "embedding_model": task_embedder.name if embedding is not None else None,
+        }
+        for task, embedding in zip(tasks, embeddings)
+    ]
+    try:
+        result = await session.scalars(insert(Task).values(rows).returning(Task))
+        # Порядок строк RETURNING для многострочного VALUES не гарантирован, task_id растет по порядку вставки
+        new_tasks = sorted(result.all(), key=lambda task: task.task_id)
+        await session.commit()
+        task_vector_index.invalidate(user_telegram_id)
+        logger.info(f"Tasks added in bulk: IDs={[task.task_id for task in new_tasks]} for user TG_ID={user_telegram_id}")
+        return new_tasks
+    except SQLAlchemyError as e:
+        await session.rollback()
+        logger.error(f"Database error during bulk task creation for user {user_telegram_id}: {e}", exc_info=True)
+        raise
+
 async def get_tasks_by_user(session: AsyncSession, user_telegram_id: int, status: Optional[str] = 'pending') -> List[Task]:
     """Получает список задач пользователя, опционально фильтруя по статусу."""
     stmt = select(Task).where(Task.user_telegram_id == user_telegram_id)
@@ -198,9 +255,12 @@ async def get_tasks_by_user(session: AsyncSession, user_telegram_id: int, status
     return tasks
 
 async def get_task_by_id(session: AsyncSession, task_id: int) -> Optional[Task]:
-    """Получает задачу по её ID."""
-    result = await session.execute(select(Task).where(Task.task_id == task_id))
-    return result.scalar_one_or_none()
+    """
+    Получает задачу по её ID.
+    session.get сначала смотрит в identity map сессии, поэтому задача, заранее загруженная
+    в той же сессии (см. prefetch в nlp_handler), повторно из БД не читается.
+    """
+    return await session.get(Task, task_id)
 
 async def update_task_status(session: AsyncSession, task_id: int, new_status: str) -> Optional[Task]:
     """Обновляет статус задачи (pending/done) и completed_at."""
@@ -226,6 +286,7 @@ async def update_task_status(session: AsyncSession, task_id: int, new_status: st
         session.add(task)
         await session.commit()
         await session.refresh(task)
+        task_vector_index.invalidate(task.user_telegram_id)
         logger.info(f"Status updated for task {task_id} to '{new_status}'")
         return task
     except SQLAlchemyError as e:
@@ -238,13 +299,19 @@ async def update_task_status(session: AsyncSession, task_id: int, new_status: st
 async def get_all_user_tasks(
     session: AsyncSession,
     user_telegram_id: int,
-    only_pending: bool = True # По умолчанию берем только активные для поиска
+    only_pending: bool = True, # По умолчанию берем только активные для поиска
+    limit: Optional[int] = None,
+    exclude_ids: Optional[List[int]] = None
     ) -> List[Task]:
-    """Получает все (или только активные) задачи пользователя."""
+    """Получает все (или только активные) задачи пользователя, новые первыми."""
     stmt = select(Task).where(Task.user_telegram_id == user_telegram_id)
     if only_pending:
         stmt = stmt.where(Task.status == 'pending')
+    if exclude_ids:
+        stmt = stmt.where(Task.task_id.not_in(exclude_ids))
     stmt = stmt.order_by(Task.created_at.desc()) # Сортируем
+    if limit:
+        stmt = stmt.limit(limit)
 
     result = await session.execute(stmt)
     tasks = result.scalars().all()
@@ -323,10 +390,13 @@ async def update_task_description(
         ).returning(Task)
 
         result = await session.execute(stmt)
-        await session.commit()
         updated_task = result.scalar_one_or_none()
+        if updated_task:
+            await _refresh_task_embedding(updated_task)
+        await session.commit()
 
         if updated_task:
+            task_vector_index.invalidate(updated_task.user_telegram_id)
             logger.info(f"Updated description for task {task_id}.")
         else:
             logger.warning(f"Task {task_id} not found for description update.")
@@ -359,6 +429,67 @@ async def update_task_reminder_time(session: AsyncSession, task_id: int, new_rem
         raise
 
 
+async def _refresh_task_embedding(task: Task) -> None:
+    """Пересчитывает вектор задачи после изменения заголовка или описания (сохранится при commit)."""
+    embedding = await embed_task_text(task.title, task.description)
+    task.embedding = embedding
+    task.embedding_model = task_embedder.name if embedding is not None else None
+
+
+async def apply_task_enrichment(
+    session: AsyncSession,
+    task_id: int,
+    expected_description: str,
+    description: Optional[str] = None,
+    title: Optional[str] = None,
+    original_due_text: Optional[str] = None,
+    is_repeating: bool = False,
+    recurrence_rule: Optional[str] = None,
+    next_reminder_at: Optional[datetime.datetime] = None,
+    expected_title: Optional[str] = None
+) -> Optional[Task]:
+    """
+    Дополняет оптимистично созданную задачу результатами фонового разбора LLM.
+    Не перезаписывает то, что пользователь успел изменить сам: описание обновляется только
+    если оно не менялось, напоминание - только если оно еще не установлено, заголовок - только если
+    описание не менялось и заголовок (если передан expected_title) все еще равен expected_title.
+    Возвращает обновленную задачу или None, если задача удалена/уже не активна.
+    """
+    task = await get_task_by_id(session, task_id)
+    if not task or task.status != 'pending':
+        logger.info(f"Task {task_id} is missing or not pending, skipping enrichment.")
+        return None
+
+    text_changed = False
+    # Пользователь успел изменить описание - ни описание, ни заголовок по старому тексту не трогаем
+    description_unchanged = task.description == expected_description
+    if description and description_unchanged:
+        task.description = description
+        text_changed = True
+    if title and description_unchanged and (expected_title is None or task.title == expected_title):
+        task.title = title
+        text_changed = True
+    if text_changed:
+        await _refresh_task_embedding(task)
+    if is_repeating and recurrence_rule and not task.recurrence_rule:
+        task.is_repeating = True
+        task.recurrence_rule = recurrence_rule
+    if next_reminder_at and task.next_reminder_at is None:
+        task.next_reminder_at = next_reminder_at
+        task.original_due_text = original_due_text
+
+    try:
+        await session.commit()
+        task_vector_index.invalidate(task.user_telegram_id)
+        logger.info(f"Task {task_id} enriched: title={task.title!r}, reminder={task.next_reminder_at}, "
+                    f"rrule={task.recurrence_rule}")
+        return task
+    except SQLAlchemyError as e:
+        await session.rollback()
+        logger.error(f"Database error during enrichment of task {task_id}: {e}", exc_info=True)
+        raise
+
+
 async def find_tasks_by_criteria(
     session: AsyncSession,
     db_user: User,
@@ -445,4 +576,280 @@ async def find_tasks_by_criteria(
     result = await session.execute(stmt)
     tasks = result.scalars().all()
     logger.info(f"Found {len(tasks)} tasks matching criteria for user {user_telegram_id}.")
-    return tasks
\ No newline at end of file
+    return tasks
+
+
+async def search_tasks_ranked(
+    session: AsyncSession,
+    user_telegram_id: int,
+    query: str,
+    limit: int = 50,
+    only_pending: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    Ранжированный поиск задач пользователя: полнотекстовый (русская морфология, любое из слов запроса)
+    плюс триграммная похожесть (опечатки, части слов). Использует GIN индексы tasks.
+
+    Returns:
+        Список словарей {'task', 'rank', 'similarity', 'fts_match', 'score'} по убыванию score,
+        где score = ts_rank_cd (0..1) + word_similarity (0..1).
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+    search_text = " ".join(terms)
+    # Слова уже очищены от спецсимволов, поэтому операторы tsquery в них не попадут
+    ts_query = func.to_tsquery('russian', " | ".join(terms))
+
+    fts_match = Task.search_vector.op('@@')(ts_query)
+    rank = func.ts_rank_cd(Task.search_vector, ts_query, 32)
+    similarity = func.greatest(
+        func.word_similarity(search_text, Task.title),
+        func.word_similarity(search_text, Task.description)
+    )
+    trigram_match = or_(
+        literal(search_text).op('<%')(Task.title),
+        literal(search_text).op('<%')(Task.description)
+    )
+    score = (func.coalesce(rank, 0) + func.coalesce(similarity, 0)).label("score")
+
+    stmt = (
+        select(Task, rank.label("rank"), similarity.label("similarity"), fts_match.label("fts_match"), score)
+        .where(Task.user_telegram_id == user_telegram_id)
+        .where(or_(fts_match, trigram_match))
+    )
+    if only_pending:
+        stmt = stmt.where(Task.status == 'pending')
+    stmt = stmt.order_by(score.desc(), Task.created_at.desc()).limit(limit)
+
+    try:
+        result = await session.execute(stmt)
+    except SQLAlchemyError as e:
+        # Без rollback: транзакция принадлежит вызывающему коду, он и решает, как восстановиться
+        logger.error(f"Database error during ranked task search for user {user_telegram_id}: {e}", exc_info=True)
+        raise
+
+    ranked = [
+        {
+            "task": row.Task,
+            "rank": float(row.rank or 0),
+            "similarity": float(row.similarity or 0),
+            "fts_match": bool(row.fts_match),
+            "score": float(row.score or 0),
+        }
+        for row in result.all()
+    ]
+    logger.debug(f"Ranked search '{search_text}' for user {user_telegram_id}: {len(ranked)} hits")
+    return ranked
+
+
+# --- Семантический поиск (эмбеддинги задач) ---
+
+EMBEDDING_BACKFILL_BATCH = 256
+
+
+async def backfill_task_embeddings(session: AsyncSession, user_telegram_id: int) -> int:
+    """
+    Считает векторы активных задач пользователя, у которых их нет или они посчитаны другим эмбеддером
+    (задачи до миграции, смена TASK_EMBEDDER). Возвращает число обновленных задач.
+    """
+    if not task_embedder:
+        return 0
+    stmt = select(Task).where(
+        Task.user_telegram_id == user_telegram_id,
+        Task.status == 'pending',
+        or_(Task.embedding_model == None, Task.embedding_model != task_embedder.name)
+    )
+    result = await session.execute(stmt)
+    tasks = result.scalars().all()
+    if not tasks:
+        return 0
+
+    try:
+        for start in range(0, len(tasks), EMBEDDING_BACKFILL_BATCH):
+            batch = tasks[start:start + EMBEDDING_BACKFILL_BATCH]
+            matrix = await task_embedder.embed([task_embedding_text(task.title, task.description) for task in batch])
+            for task, vector in zip(batch, matrix):
+                task.embedding = vector.tolist()
+                task.embedding_model = task_embedder.name
+        await session.commit()
+        logger.info(f"Backfilled {len(tasks)} task embeddings ({task_embedder.name}) for user {user_telegram_id}.")
+        return len(tasks)
+    except Exception as e:
+        await session.rollback()
+        logger.error(f"Error backfilling task embeddings for user {user_telegram_id}: {e}", exc_info=True)
+        return 0
+
+
+async def _load_task_vectors(session: AsyncSession, user_telegram_id: int) -> Dict[str, Any]:
+    """Загружает векторы активных задач пользователя в task_vector_index (матрица float32)."""
+    await backfill_task_embeddings(session, user_telegram_id)
+    stmt = select(Task.task_id, Task.embedding).where(
+        Task.user_telegram_id == user_telegram_id,
+        Task.status == 'pending',
+        Task.embedding_model == task_embedder.name
+    )
+    rows = (await session.execute(stmt)).all()
+    logger.debug(f"Loaded {len(rows)} task vectors for user {user_telegram_id}.")
+    return task_vector_index.put(
+        user_telegram_id, task_embedder.name,
+        [row.task_id for row in rows], [row.embedding for row in rows], task_embedder.dim
+    )
+
+
+async def _search_task_vectors_pgvector(
+    session: AsyncSession,
+    user_telegram_id: int,
+    query_vector: List[float],
+    limit: int,
+    min_score: float
+) -> List[tuple]:
+    """Тот же поиск силами pgvector: косинусное расстояние (<=>) по tasks.embedding::vector."""
+    await backfill_task_embeddings(session, user_telegram_id)
+    stmt = text("""
+        SELECT task_id, 1 - (embedding::vector <=> CAST(:query AS vector)) AS score
+        FROM tasks
+        WHERE user_telegram_id = :user_id AND status = 'pending' AND embedding_model = :embedder
+        ORDER BY embedding::vector <=> CAST(:query AS vector)
+        LIMIT :limit
+    """)
+    result = await session.execute(stmt, {
+        "query": "[" + ",".join(f"{value:.6f}" for value in query_vector) + "]",
+        "user_id": user_telegram_id,
+        "embedder": task_embedder.name,
+        "limit": limit,
+    })
+    return [(row.task_id, float(row.score)) for row in result if row.score >= min_score]
+
+
+async def semantic_search_tasks(
+    session: AsyncSession,
+    user_telegram_id: int,
+    query: str,
+    limit: int = 50,
+    min_score: float = 0.0
+) -> List[Dict[str, Any]]:
+    """
+    Поиск активных задач по близости эмбеддингов запроса и задачи: косинусная близость
+    в памяти через NumPy (матрица пользователя кешируется) или pgvector (TASK_EMBEDDING_USE_PGVECTOR).
+
+    Returns:
+        Список словарей {'task', 'score'} по убыванию score (косинусная близость, -1..1).
+    """
+    if not task_embedder:
+        return []
+    query_text = " ".join(search_terms(query)) or query
+    query_vector = (await task_embedder.embed([query_text], is_query=True))[0]
+
+    if settings.task_embedding_use_pgvector:
+        scored = await _search_task_vectors_pgvector(
+            session, user_telegram_id, query_vector.tolist(), limit, min_score
+        )
+    else:
+        entry = task_vector_index.get(user_telegram_id, task_embedder.name)
+        if entry is None:
+            entry = await _load_task_vectors(session, user_telegram_id)
+        scored = task_vector_index.search(entry, query_vector, limit, min_score)
+
+    if not scored:
+        return []
+    tasks = await get_tasks_by_ids(session, user_telegram_id, [task_id for task_id, _ in scored])
+    tasks_by_id = {task.task_id: task for task in tasks}
+    return [
+        {"task": tasks_by_id[task_id], "score": score}
+        for task_id, score in scored if task_id in tasks_by_id
+    ]
+
+
+# --- LLM Cache CRUD ---
+
+async def get_llm_cache_entry(session: AsyncSession, cache_key: str) -> Optional[LLMCacheEntry]:
+    """Получает непросроченную запись кеша LLM по ключу."""
+    result = await session.execute(
+        select(LLMCacheEntry).where(
+            LLMCacheEntry.cache_key == cache_key,
+            LLMCacheEntry.expires_at > func.now()
+        )
+    )
+    return result.scalar_one_or_none()
+
+async def upsert_llm_cache_entry(
+    session: AsyncSession,
+    cache_key: str,
+    prompt_name: str,
+    response_text: str,
+    expires_at: datetime.datetime
+) -> None:
+    """Создает или обновляет запись кеша LLM."""
+    stmt = pg_insert(LLMCacheEntry).values(
+        cache_key=cache_key,
+        prompt_name=prompt_name,
+        response_text=response_text,
+        expires_at=expires_at
+    ).on_conflict_do_update(
+        index_elements=[LLMCacheEntry.cache_key],
+        set_={"response_text": response_text, "expires_at": expires_at}
+    )
+    try:
+        await session.execute(stmt)
+        await session.commit()
+    except SQLAlchemyError as e:
+        await session.rollback()
+        logger.error(f"Database error during LLM cache upsert for key {cache_key[:12]}: {e}", exc_info=True)
+        raise
+
+async def delete_expired_llm_cache_entries(session: AsyncSession) -> int:
+    """Удаляет просроченные записи кеша LLM. Возвращает количество удаленных записей."""
+    try:
+        result = await session.execute(
+            delete(LLMCacheEntry).where(LLMCacheEntry.expires_at <= func.now())
+        )
+        await session.commit()
+        return result.rowcount or 0
+    except SQLAlchemyError as e:
+        await session.rollback()
+        logger.error(f"Database error during LLM cache cleanup: {e}", exc_info=True)
+        raise
+
+
+# --- LLM Usage CRUD ---
+
+USAGE_COUNTER_FIELDS = ("calls", "prompt_tokens", "output_tokens", "latency_ms", "errors", "blocked", "json_failures")
+
+async def add_llm_usage_daily(
+    session: AsyncSession,
+    rows: List[Dict[str, Any]]
+) -> None:
+    """
+    Прибавляет счетчики использования LLM к суточным итогам пользователей.
+    Каждая строка: user_telegram_id, usage_date и поля из USAGE_COUNTER_FIELDS.
+    """
+    if not rows:
+        return
+    stmt = pg_insert(LLMUsageDaily).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[LLMUsageDaily.user_telegram_id, LLMUsageDaily.usage_date],
+        set_={field: getattr(LLMUsageDaily, field) + getattr(stmt.excluded, field) for field in USAGE_COUNTER_FIELDS}
+    )
+    try:
+        await session.execute(stmt)
+        await session.commit()
+    except SQLAlchemyError as e:
+        await session.rollback()
+        logger.error(f"Database error during LLM usage upsert ({len(rows)} rows): {e}", exc_info=True)
+        raise
+
+async def get_top_llm_users(
+    session: AsyncSession,
+    usage_date: datetime.date,
+    limit: int = 10
+) -> List[LLMUsageDaily]:
+    """Возвращает пользователей с наибольшим расходом токенов за день."""
+    stmt = (
+        select(LLMUsageDaily)
+        .where(LLMUsageDaily.usage_date == usage_date)
+        .order_by((LLMUsageDaily.prompt_tokens + LLMUsageDaily.output_tokens).desc())
+        .limit(limit)
+    )
+    result = await session.execute(stmt)
+    return result.scalars().all()
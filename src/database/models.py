@@ -6,8 +6,9 @@ from typing import Optional, List
 from sqlalchemy import (
     MetaData, BigInteger, Integer, String, Text,
     TIMESTAMP, Boolean, CheckConstraint, ForeignKey,
-    DATE
+    DATE, Computed, Index
 )
+from sqlalchemy.dialects.postgresql import TSVECTOR, ARRAY, REAL
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 from sqlalchemy.sql import func # Для server_default=func.now()
 
@@ -92,6 +93,16 @@ class Task(Base):
     # Дополнительная информация
     raw_input: Mapped[Optional[str]] = mapped_column(Text)
 
+    # Полнотекстовый индекс (русская морфология), вычисляется самой БД
+    search_vector: Mapped[Optional[str]] = mapped_column(
+        TSVECTOR,
+        Computed("to_tsvector('russian', coalesce(title, '') || ' ' || description)", persisted=True)
+    )
+
+    # Вектор задачи для семантического поиска (float32, L2-нормирован) и имя эмбеддера, которым он посчитан
+    embedding: Mapped[Optional[List[float]]] = mapped_column(ARRAY(REAL))
+    embedding_model: Mapped[Optional[str]] = mapped_column(String(64))
+
     # Используем telegram_id пользователя как внешний ключ
     user_telegram_id: Mapped[int] = mapped_column(ForeignKey("users.telegram_id", ondelete="CASCADE"), index=True)
 
@@ -102,9 +113,54 @@ class Task(Base):
     # Ограничение на допустимые значения статуса
     __table_args__ = (
          CheckConstraint(status.in_(['pending', 'done']), name='ck_tasks_status_values'),
-         # Можно добавить другие __table_args__ при необходимости
+         # GIN индексы для поиска: полнотекстовый и триграммный (pg_trgm, ускоряет ilike и word_similarity)
+         Index('ix_tasks_search_vector', 'search_vector', postgresql_using='gin'),
+         Index('ix_tasks_description_trgm', 'description', postgresql_using='gin',
+               postgresql_ops={'description': 'gin_trgm_ops'}),
+         Index('ix_tasks_title_trgm', 'title', postgresql_using='gin',
+               postgresql_ops={'title': 'gin_trgm_ops'}),
+         # Составные индексы для фильтров по периоду (планировщик запросов, /today, /tomorrow)
+         Index('ix_tasks_user_status_next_reminder', 'user_telegram_id', 'status', 'next_reminder_at'),
+         Index('ix_tasks_user_completed_at', 'user_telegram_id', 'completed_at'),
     )
 
     def __repr__(self):
         # Для удобного вывода при отладке
-        return f"<Task(task_id={self.task_id}, user_id={self.user_id}, description='{self.description[:30]}...', status='{self.status}')>"
\ No newline at end of file
+        return f"<Task(task_id={self.task_id}, user_id={self.user_id}, description='{self.description[:30]}...', status='{self.status}')>"
+
+
+# Кеш ответов LLM (персистентный слой для src/llm/cache.py)
+class LLMCacheEntry(Base):
+    __tablename__ = "llm_cache"
+
+    # sha256 от имени шаблона промпта и нормализованных входных данных
+    cache_key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    prompt_name: Mapped[str] = mapped_column(String(64), nullable=False)
+    response_text: Mapped[str] = mapped_column(Text, nullable=False)
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        TIMESTAMP(timezone=True), server_default=func.now(), nullable=False
+    )
+    expires_at: Mapped[datetime.datetime] = mapped_column(TIMESTAMP(timezone=True), nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<LLMCacheEntry(key='{self.cache_key[:12]}...', prompt='{self.prompt_name}', expires_at={self.expires_at})>"
+
+
+# Суточная статистика использования LLM по пользователям (см. src/llm/telemetry.py)
+class LLMUsageDaily(Base):
+    __tablename__ = "llm_usage_daily"
+
+    # 0 - запросы без привязки к пользователю (фоновые джобы)
+    user_telegram_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    usage_date: Mapped[datetime.date] = mapped_column(DATE, primary_key=True)
+    calls: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    prompt_tokens: Mapped[int] = mapped_column(BigInteger, nullable=False, server_default="0")
+    output_tokens: Mapped[int] = mapped_column(BigInteger, nullable=False, server_default="0")
+    latency_ms: Mapped[int] = mapped_column(BigInteger, nullable=False, server_default="0")
+    errors: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    blocked: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    json_failures: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+
+    def __repr__(self):
+        return (f"<LLMUsageDaily(user={self.user_telegram_id}, date={self.usage_date}, calls={self.calls}, "
+                f"tokens={self.prompt_tokens}+{self.output_tokens})>")
@@ -0,0 +1,565 @@
+# src/llm/backends.py
+
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import random
+import re
+import time
+import datetime
+from typing import Optional, Dict, Any, List, Callable, Union, AsyncIterator
+
+logger = logging.getLogger(__name__)
+
+
+class LLMResponse:
+    """Ответ бэкенда LLM в едином формате (не зависит от SDK провайдера)."""
+
+    def __init__(
+        self,
+        text: Optional[str],
+        finish_reason: Optional[str] = "STOP",
+        prompt_tokens: int = 0,
+        output_tokens: int = 0,
+        block_reason: Optional[str] = None
+    ):
+        self.text = text
+        self.finish_reason = finish_reason
+        self.prompt_tokens = prompt_tokens
+        self.output_tokens = output_tokens
+        self.block_reason = block_reason
+
+    @property
+    def blocked(self) -> bool:
+        return self.block_reason is not None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "text": self.text,
+            "finish_reason": self.finish_reason,
+            "prompt_tokens": self.prompt_tokens,
+            "output_tokens": self.output_tokens,
+            "block_reason": self.block_reason,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LLMResponse":
+        return cls(
+            text=data.get("text"),
+            finish_reason=data.get("finish_reason"),
+            prompt_tokens=data.get("prompt_tokens", 0),
+            output_tokens=data.get("output_tokens", 0),
+            block_reason=data.get("block_reason")
+        )
+
+
+class LLMBackendError(Exception):
+    """Ошибка бэкенда (в т.ч. внедренная фейковым бэкендом или записанная при record)."""
+
+
+class ResourceExhausted(LLMBackendError):
+    """Имитация ошибки квоты (HTTP 429). Имя совпадает с google.api_core.exceptions.ResourceExhausted."""
+
+
+class LLMBackend:
+    """Базовый интерфейс бэкенда LLM."""
+
+    name = "base"
+
+    async def generate(self, prompt: str, prompt_name: str = "") -> LLMResponse:
+        raise NotImplementedError
+
+    async def stream(self, prompt: str, prompt_name: str = "") -> AsyncIterator[LLMResponse]:
+        """
+        Потоковая генерация: отдает ответ кусками (text - приращение текста).
+        Вызывающий код может прекратить чтение в любой момент (aclose).
+        По умолчанию - один кусок с полным ответом.
+        """
+        yield await self.generate(prompt, prompt_name)
+
+
+# --- Gemini ---
+
+# Настройки генерации по умолчанию (температура и лимит ответа переопределяются профилем промпта)
+GEMINI_GENERATION_CONFIG = {
+    "temperature": 0.5, # Низкая температура для более предсказуемого извлечения
+    "top_p": 1,
+    "top_k": 1,
+    "max_output_tokens": 2048, # Увеличили лимит для избежания обрезания
+    # "response_mime_type": "application/json", # Если модель/API поддерживает
+}
+
+GEMINI_SAFETY_SETTINGS = [
+    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
+]
+
+
+class GeminiBackend(LLMBackend):
+    """Google Gemini через google-generativeai."""
+
+    name = "gemini"
+
+    def __init__(self, api_key: str, model_name: str = "gemini-2.5-flash", profiles: Optional[Any] = None):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self._genai = genai
+        self._models: Dict[str, Any] = {}
+        # Профили по промптам (ModelProfileRegistry): модель, лимит ответа, температура; без них - model_name
+        self.profiles = profiles
+        self.model = self._get_model(model_name)
+
+    def _get_model(self, model_name: str) -> Any:
+        """GenerativeModel на каждое имя модели (создается один раз)."""
+        if model_name not in self._models:
+            self._models[model_name] = self._genai.GenerativeModel(
+                model_name=model_name,
+                generation_config=GEMINI_GENERATION_CONFIG,
+                safety_settings=GEMINI_SAFETY_SETTINGS
+            )
+        return self._models[model_name]
+
+    def _model_for(self, prompt_name: str):
+        """Модель и настройки генерации для промпта по его профилю."""
+        if not self.profiles:
+            return self.model, None
+        profile = self.profiles.for_prompt(prompt_name)
+        generation_config = {
+            **GEMINI_GENERATION_CONFIG,
+            "temperature": profile["temperature"],
+            "max_output_tokens": profile["max_output_tokens"],
+        }
+        return self._get_model(profile["model"]), generation_config
+
+    async def generate(self, prompt: str, prompt_name: str = "") -> LLMResponse:
+        model, generation_config = self._model_for(prompt_name)
+        response = await model.generate_content_async(prompt, generation_config=generation_config)
+
+        usage_metadata = getattr(response, "usage_metadata", None)
+        prompt_tokens = (getattr(usage_metadata, "prompt_token_count", 0) or 0) if usage_metadata else 0
+        output_tokens = (getattr(usage_metadata, "candidates_token_count", 0) or 0) if usage_metadata else 0
+
+        if not response.candidates:
+            block_reason = "Unknown"
+            if response.prompt_feedback:
+                block_reason = getattr(response.prompt_feedback, 'block_reason', 'Unknown')
+            return LLMResponse(None, finish_reason="BLOCKED", prompt_tokens=prompt_tokens,
+                               block_reason=str(getattr(block_reason, "name", block_reason)))
+
+        finish_reason = getattr(response.candidates[0], "finish_reason", None)
+        finish_reason = getattr(finish_reason, "name", None if finish_reason is None else str(finish_reason))
+        try:
+            text = response.text
+        except Exception as e:
+            # response.text бросает исключение, если у кандидата нет частей (MAX_TOKENS, SAFETY и т.п.)
+            logger.debug(f"Gemini response without text for prompt '{prompt_name}': {e}")
+            text = None
+        return LLMResponse(text, finish_reason=finish_reason,
+                           prompt_tokens=prompt_tokens, output_tokens=output_tokens)
+
+    async def stream(self, prompt: str, prompt_name: str = "") -> AsyncIterator[LLMResponse]:
+        model, generation_config = self._model_for(prompt_name)
+        response = await model.generate_content_async(prompt, generation_config=generation_config, stream=True)
+        # Прекращение чтения (aclose) закрывает генератор; оставшиеся куски ответа не запрашиваются
+        async for chunk in response:
+            yield _gemini_chunk_to_response(chunk, prompt_name)
+
+
+def _gemini_chunk_to_response(chunk: Any, prompt_name: str) -> LLMResponse:
+    usage_metadata = getattr(chunk, "usage_metadata", None)
+    prompt_tokens = (getattr(usage_metadata, "prompt_token_count", 0) or 0) if usage_metadata else 0
+    output_tokens = (getattr(usage_metadata, "candidates_token_count", 0) or 0) if usage_metadata else 0
+    if not chunk.candidates:
+        block_reason = getattr(chunk.prompt_feedback, "block_reason", "Unknown") if chunk.prompt_feedback else "Unknown"
+        return LLMResponse(None, finish_reason="BLOCKED", prompt_tokens=prompt_tokens,
+                           block_reason=str(getattr(block_reason, "name", block_reason)))
+    finish_reason = getattr(chunk.candidates[0], "finish_reason", None)
+    finish_reason = getattr(finish_reason, "name", None if finish_reason is None else str(finish_reason))
+    try:
+        text = chunk.text
+    except Exception:
+        logger.debug(f"Gemini stream chunk without text for prompt '{prompt_name}' (finish_reason {finish_reason})")
+        text = ""
+    return LLMResponse(text, finish_reason=finish_reason, prompt_tokens=prompt_tokens, output_tokens=output_tokens)
+
+
+# --- Фейковый бэкенд ---
+
+_NUMBERED_INPUT_RE = re.compile(r"^\d+\. \[reply=", re.MULTILINE)
+
+
+def _fake_intent_batch_response(prompt: str) -> str:
+    """Ответ пакетного промпта интентов: по add_task на каждый пронумерованный текст."""
+    count = len(_NUMBERED_INPUT_RE.findall(prompt))
+    return json.dumps({"intents": ["add_task"] * count})
+
+
+# Ответы по умолчанию: валидные для парсеров gemini_client, чтобы пайплайн проходил целиком
+DEFAULT_FAKE_RESPONSES: Dict[str, Union[str, Callable[[str], str]]] = {
+    "intent": '{"intent": "add_task"}',
+    "intent_batch": _fake_intent_batch_response,
+    "task_parsing": '{"description": "тестовая задача", "reminder_time": "завтра в 10:00"}',
+    "reminder_time": '{"reminder_datetime_utc": "2030-01-01T07:00:00Z"}',
+    "reschedule_time": '{"new_reminder_time": "завтра в 10:00"}',
+    "edit_description": '{"new_description": "тестовая задача"}',
+    "contextual_reply": (
+        '{"intent": "reschedule_task", "time_text": "завтра в 10:00", '
+        '"reminder_datetime_utc": "2030-01-01T07:00:00Z", "new_description": null}'
+    ),
+    "single_call_extraction": (
+        '{"description": "тестовая задача", "title": "Тестовая задача", "reminder_text": "завтра в 10:00", '
+        '"reminder_datetime_utc": "2030-01-01T07:00:00Z", "is_recurring": false, "recurrence_rule": null}'
+    ),
+    "multi_task_extraction": (
+        '{"tasks": [{"description": "тестовая задача", "title": "Тестовая задача", "reminder_text": null, '
+        '"reminder_datetime_utc": null, "is_recurring": false, "recurrence_rule": null}]}'
+    ),
+    "title": "Тестовая задача",
+    "timezone": '{"iana_timezone": "Europe/Moscow"}',
+    "task_search": '{"matching_task_ids": []}',
+    "recurring_detection": '{"is_recurring": false, "pattern": null}',
+    "rrule": "FREQ=DAILY",
+}
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal", "exponential")
+
+
+class FakeBackend(LLMBackend):
+    """
+    Детерминированный офлайн-бэкенд для бенчмарков и отладки без сети.
+
+    Задержка берется из распределения (при одинаковом seed последовательность одинакова),
+    ошибки внедряются с заданными вероятностями.
+
+    Args:
+        responses: Ответы по имени промпта (строка или функция prompt -> строка).
+        latency_ms: Медиана задержки (для uniform/normal - среднее).
+        latency_distribution: fixed, uniform, normal, lognormal или exponential.
+        latency_jitter: Разброс: sigma для lognormal, доля от latency_ms для uniform/normal.
+        latency_by_prompt: Медиана задержки по отдельным промптам (перекрывает latency_ms).
+        latency_per_1k_prompt_tokens_ms: Добавка к задержке за каждую 1000 токенов промпта
+                                         (prefill длинных промптов заметно медленнее).
+        latency_per_output_token_ms: Добавка к задержке за каждый токен ответа (генерация).
+        error_rate: Доля запросов, завершающихся LLMBackendError.
+        quota_error_rate: Доля запросов, завершающихся ResourceExhausted (429).
+        block_rate: Доля ответов, заблокированных фильтрами.
+        truncation_rate: Доля ответов без текста (finish_reason MAX_TOKENS).
+        malformed_rate: Доля ответов с невалидным JSON.
+        trailing_text: "Болтовня" модели после ответа (для проверки раннего завершения потока).
+        first_chunk_share: Доля задержки до первого куска при потоковой генерации.
+        stream_chunk_chars: Размер куска текста при потоковой генерации.
+        seed: Seed генератора случайных чисел.
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        responses: Optional[Dict[str, Union[str, Callable[[str], str]]]] = None,
+        latency_ms: float = 800.0,
+        latency_distribution: str = "lognormal",
+        latency_jitter: float = 0.5,
+        latency_by_prompt: Optional[Dict[str, float]] = None,
+        latency_per_1k_prompt_tokens_ms: float = 0.0,
+        latency_per_output_token_ms: float = 0.0,
+        error_rate: float = 0.0,
+        quota_error_rate: float = 0.0,
+        block_rate: float = 0.0,
+        truncation_rate: float = 0.0,
+        malformed_rate: float = 0.0,
+        trailing_text: str = "",
+        first_chunk_share: float = 0.3,
+        stream_chunk_chars: int = 16,
+        seed: int = 0
+    ):
+        if latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution '{latency_distribution}', "
+                             f"expected one of {LATENCY_DISTRIBUTIONS}")
+        self.responses = {**DEFAULT_FAKE_RESPONSES, **(responses or {})}
+        self.latency_ms = latency_ms
+        self.latency_distribution = latency_distribution
+        self.latency_jitter = latency_jitter
+        self.latency_by_prompt = latency_by_prompt or {}
+        self.latency_per_1k_prompt_tokens_ms = latency_per_1k_prompt_tokens_ms
+        self.latency_per_output_token_ms = latency_per_output_token_ms
+        self.error_rate = error_rate
+        self.quota_error_rate = quota_error_rate
+        self.block_rate = block_rate
+        self.truncation_rate = truncation_rate
+        self.malformed_rate = malformed_rate
+        self.trailing_text = trailing_text
+        self.first_chunk_share = first_chunk_share
+        self.stream_chunk_chars = stream_chunk_chars
+        self._random = random.Random(seed)
+        self.calls: Dict[str, int] = {}
+
+    def sample_latency(self, prompt_name: str = "") -> float:
+        """Задержка очередного запроса в секундах."""
+        median = self.latency_by_prompt.get(prompt_name, self.latency_ms) / 1000
+        if self.latency_distribution == "fixed":
+            latency = median
+        elif self.latency_distribution == "uniform":
+            latency = self._random.uniform(median * (1 - self.latency_jitter), median * (1 + self.latency_jitter))
+        elif self.latency_distribution == "normal":
+            latency = self._random.gauss(median, median * self.latency_jitter)
+        elif self.latency_distribution == "lognormal":
+            latency = self._random.lognormvariate(math.log(median), self.latency_jitter) if median > 0 else 0.0
+        else:
+            latency = self._random.expovariate(1 / median) if median > 0 else 0.0
+        return max(latency, 0.0)
+
+    def _draw(self, prompt: str, prompt_name: str):
+        self.calls[prompt_name] = self.calls.get(prompt_name, 0) + 1
+        # Все случайные величины выбираются до await, чтобы последовательность
+        # не зависела от порядка завершения конкурентных запросов
+        latency = self.sample_latency(prompt_name)
+        latency += len(prompt) / 4 / 1000 * self.latency_per_1k_prompt_tokens_ms / 1000
+        return latency, self._random.random()
+
+    def _build_response(self, prompt: str, prompt_name: str, roll: float) -> LLMResponse:
+        prompt_tokens = len(prompt) // 4
+        threshold = self.quota_error_rate
+        if roll < threshold:
+            raise ResourceExhausted(f"429 Fake quota exceeded for prompt '{prompt_name}'")
+        threshold += self.error_rate
+        if roll < threshold:
+            raise LLMBackendError(f"Fake backend error for prompt '{prompt_name}'")
+        threshold += self.block_rate
+        if roll < threshold:
+            return LLMResponse(None, finish_reason="BLOCKED", prompt_tokens=prompt_tokens, block_reason="SAFETY")
+        threshold += self.truncation_rate
+        if roll < threshold:
+            return LLMResponse(None, finish_reason="MAX_TOKENS", prompt_tokens=prompt_tokens)
+        threshold += self.malformed_rate
+        if roll < threshold:
+            return LLMResponse("Извините, не могу ответить.", prompt_tokens=prompt_tokens, output_tokens=8)
+
+        response = self.responses.get(prompt_name, "{}")
+        text = (response(prompt) if callable(response) else response) + self.trailing_text
+        return LLMResponse(text, prompt_tokens=prompt_tokens, output_tokens=len(text) // 4)
+
+    def _output_latency(self, prompt: str, prompt_name: str, roll: float) -> float:
+        """Время генерации ответа (для длинных ответов, например пакетных промптов)."""
+        if not self.latency_per_output_token_ms:
+            return 0.0
+        try:
+            response = self._build_response(prompt, prompt_name, roll)
+        except Exception:
+            return 0.0
+        return response.output_tokens * self.latency_per_output_token_ms / 1000
+
+    async def generate(self, prompt: str, prompt_name: str = "") -> LLMResponse:
+        latency, roll = self._draw(prompt, prompt_name)
+        await asyncio.sleep(latency + self._output_latency(prompt, prompt_name, roll))
+        return self._build_response(prompt, prompt_name, roll)
+
+    async def stream(self, prompt: str, prompt_name: str = "") -> AsyncIterator[LLMResponse]:
+        latency, roll = self._draw(prompt, prompt_name)
+        await asyncio.sleep(latency * self.first_chunk_share)
+        response = self._build_response(prompt, prompt_name, roll)
+        latency += self._output_latency(prompt, prompt_name, roll)
+        if not response.text:
+            yield response
+            return
+        # Оставшаяся часть задержки равномерно распределяется по кускам текста
+        text = response.text
+        pieces = [text[i:i + self.stream_chunk_chars] for i in range(0, len(text), self.stream_chunk_chars)]
+        piece_delay = latency * (1 - self.first_chunk_share) / len(pieces)
+        for index, piece in enumerate(pieces):
+            if index:
+                await asyncio.sleep(piece_delay)
+            is_last = index == len(pieces) - 1
+            yield LLMResponse(
+                piece,
+                finish_reason="STOP" if is_last else None,
+                prompt_tokens=response.prompt_tokens,
+                output_tokens=len(text[:(index + 1) * self.stream_chunk_chars]) // 4
+            )
+
+
+# --- Запись и воспроизведение ---
+
+# Время в промптах (CURRENT_TIME и т.п.) меняется от запуска к запуску - при сопоставлении его игнорируем
+_TIMESTAMP_RE = re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?")
+
+
+def prompt_fingerprint(prompt: str) -> str:
+    """Ключ промпта для record/replay: sha256 текста с вырезанными метками времени."""
+    normalized = _TIMESTAMP_RE.sub("<time>", prompt)
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class RecordingBackend(LLMBackend):
+    """
+    Обертка над другим бэкендом, которая дописывает пары промпт -> ответ в JSONL файл.
+    Файл содержит тексты пользователей - хранить его нужно соответственно.
+    """
+
+    name = "recording"
+
+    def __init__(self, inner: LLMBackend, path: str):
+        self.inner = inner
+        self.path = path
+        self._file = None
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        try:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._file.flush()
+        except OSError as e:
+            logger.error(f"Failed to write LLM recording to {self.path}: {e}")
+
+    async def generate(self, prompt: str, prompt_name: str = "") -> LLMResponse:
+        record: Dict[str, Any] = {
+            "recorded_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "prompt_name": prompt_name,
+            "fingerprint": prompt_fingerprint(prompt),
+            "prompt": prompt,
+        }
+        started_at = time.perf_counter()
+        try:
+            response = await self.inner.generate(prompt, prompt_name)
+        except Exception as e:
+            record["latency_ms"] = int((time.perf_counter() - started_at) * 1000)
+            record["error"] = {"type": type(e).__name__, "message": str(e)}
+            self._write(record)
+            raise
+        record["latency_ms"] = int((time.perf_counter() - started_at) * 1000)
+        record["response"] = response.to_dict()
+        self._write(record)
+        return response
+
+    async def stream(self, prompt: str, prompt_name: str = "") -> AsyncIterator[LLMResponse]:
+        record: Dict[str, Any] = {
+            "recorded_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "prompt_name": prompt_name,
+            "fingerprint": prompt_fingerprint(prompt),
+            "prompt": prompt,
+        }
+        started_at = time.perf_counter()
+        collected = LLMResponse("", finish_reason=None)
+        try:
+            async for chunk in self.inner.stream(prompt, prompt_name):
+                if chunk.text:
+                    collected.text += chunk.text
+                collected.finish_reason = chunk.finish_reason or collected.finish_reason
+                collected.prompt_tokens = max(collected.prompt_tokens, chunk.prompt_tokens)
+                collected.output_tokens = max(collected.output_tokens, chunk.output_tokens)
+                collected.block_reason = chunk.block_reason or collected.block_reason
+                yield chunk
+        except Exception as e:
+            record["error"] = {"type": type(e).__name__, "message": str(e)}
+            raise
+        finally:
+            # Записываем и при досрочном прекращении чтения: для replay важен прочитанный префикс
+            record["latency_ms"] = int((time.perf_counter() - started_at) * 1000)
+            if "error" not in record:
+                if not collected.text:
+                    collected.text = None
+                record["response"] = collected.to_dict()
+            self._write(record)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class ReplayBackend(LLMBackend):
+    """
+    Воспроизводит ответы, записанные RecordingBackend.
+
+    Одинаковые промпты воспроизводятся в порядке записи (по кругу).
+
+    Args:
+        path: JSONL файл с записями.
+        latency_scale: Множитель записанной задержки (0 - отвечать мгновенно).
+        fallback: Бэкенд для промптов, которых нет в записи (None - LLMBackendError).
+    """
+
+    name = "replay"
+
+    def __init__(self, path: str, latency_scale: float = 1.0, fallback: Optional[LLMBackend] = None):
+        self.path = path
+        self.latency_scale = latency_scale
+        self.fallback = fallback
+        self._records: Dict[str, List[Dict[str, Any]]] = {}
+        self._positions: Dict[str, int] = {}
+        self.stats = {"hits": 0, "misses": 0}
+        self._load()
+
+    def _load(self) -> None:
+        loaded = 0
+        with open(self.path, encoding="utf-8") as file:
+            for line_number, line in enumerate(file, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping malformed line {line_number} in {self.path}")
+                    continue
+                fingerprint = record.get("fingerprint") or prompt_fingerprint(record.get("prompt", ""))
+                self._records.setdefault(fingerprint, []).append(record)
+                loaded += 1
+        logger.info(f"Replay backend loaded {loaded} records ({len(self._records)} unique prompts) from {self.path}")
+
+    async def generate(self, prompt: str, prompt_name: str = "") -> LLMResponse:
+        fingerprint = prompt_fingerprint(prompt)
+        records = self._records.get(fingerprint)
+        if not records:
+            self.stats["misses"] += 1
+            if self.fallback is not None:
+                return await self.fallback.generate(prompt, prompt_name)
+            raise LLMBackendError(f"No recorded response for prompt '{prompt_name}' ({fingerprint[:12]})")
+
+        self.stats["hits"] += 1
+        position = self._positions.get(fingerprint, 0)
+        self._positions[fingerprint] = position + 1
+        record = records[position % len(records)]
+
+        if self.latency_scale > 0:
+            await asyncio.sleep(record.get("latency_ms", 0) / 1000 * self.latency_scale)
+        if "error" in record:
+            error_class = ResourceExhausted if record["error"].get("type") == "ResourceExhausted" else LLMBackendError
+            raise error_class(record["error"].get("message", "recorded error"))
+        return LLMResponse.from_dict(record.get("response", {}))
+
+
+def create_llm_backend(settings) -> Optional[LLMBackend]:
+    """
+    Создает бэкенд по настройкам (settings.llm_backend).
+    Если задан settings.llm_record_path, ответы дополнительно пишутся в JSONL.
+    """
+    backend: Optional[LLMBackend]
+    if settings.llm_backend == "fake":
+        backend = FakeBackend(
+            latency_ms=settings.llm_fake_latency_ms,
+            latency_distribution=settings.llm_fake_latency_distribution,
+            latency_jitter=settings.llm_fake_latency_jitter,
+            latency_per_1k_prompt_tokens_ms=settings.llm_fake_latency_per_1k_prompt_tokens_ms,
+            latency_per_output_token_ms=settings.llm_fake_latency_per_output_token_ms,
+            error_rate=settings.llm_fake_error_rate,
+            seed=settings.llm_fake_seed
+        )
+    elif settings.llm_backend == "replay":
+        backend = ReplayBackend(settings.llm_replay_path, latency_scale=settings.llm_replay_latency_scale)
+    else:
+        if not settings.google_api_key:
+            logger.warning("GOOGLE_API_KEY is not set in config. LLM features will be disabled.")
+            return None
+        from src.llm.model_profiles import model_profiles
+        backend = GeminiBackend(api_key=settings.google_api_key, profiles=model_profiles)
+
+    if settings.llm_record_path:
+        backend = RecordingBackend(backend, settings.llm_record_path)
+        logger.info(f"Recording LLM prompts and responses to {settings.llm_record_path}")
+    return backend
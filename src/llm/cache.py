@@ -0,0 +1,129 @@
+# src/llm/cache.py
+
+import asyncio
+import datetime
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_cache_input(value: Any, casefold: bool = True) -> Any:
+    """Приводит входные данные промпта к каноничному виду (пробелы, регистр)."""
+    if isinstance(value, str):
+        value = re.sub(r"\s+", " ", value).strip()
+        return value.casefold() if casefold else value
+    if isinstance(value, dict):
+        return {key: normalize_cache_input(item, casefold) for key, item in sorted(value.items())}
+    if isinstance(value, (list, tuple)):
+        return [normalize_cache_input(item, casefold) for item in value]
+    return value
+
+
+def make_cache_key(prompt_name: str, inputs: Dict[str, Any], casefold: bool = True) -> str:
+    """
+    Ключ кеша: sha256 от имени шаблона промпта и нормализованных входных данных.
+    Текущее время должно передаваться уже округленным (см. bucket_time), иначе ключ будет уникальным.
+    """
+    payload = json.dumps(
+        {"prompt": prompt_name, "inputs": normalize_cache_input(inputs, casefold)},
+        ensure_ascii=False, sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    In-process LRU-кеш ответов LLM с TTL.
+    Опционально дублирует записи в Postgres (таблица llm_cache), чтобы кеш переживал рестарты.
+    """
+
+    def __init__(self, max_entries: int = 2048, persistent: bool = False):
+        self.max_entries = max_entries
+        self.persistent = persistent
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._pending_writes: set = set()
+        self.stats = {"hits": 0, "persistent_hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+    def get(self, key: str) -> Optional[str]:
+        """Возвращает закешированный ответ из памяти или None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.stats["expired"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str, ttl_seconds: int) -> None:
+        """Сохраняет ответ в памяти, вытесняя самые старые записи при переполнении."""
+        self._entries[key] = (time.monotonic() + ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    async def aget(self, key: str) -> Optional[str]:
+        """Ищет ответ в памяти, затем (если включено) в Postgres."""
+        value = self.get(key)
+        if value is not None:
+            self.stats["hits"] += 1
+            return value
+
+        if self.persistent:
+            value, ttl_left = await self._load_persistent(key)
+            if value is not None:
+                self.stats["persistent_hits"] += 1
+                self.set(key, value, ttl_left)
+                return value
+
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, key: str, prompt_name: str, value: str, ttl_seconds: int) -> None:
+        """Сохраняет ответ в памяти и в фоне пишет его в Postgres (если включено)."""
+        self.set(key, value, ttl_seconds)
+        if self.persistent:
+            write = asyncio.create_task(self._store_persistent(key, prompt_name, value, ttl_seconds))
+            self._pending_writes.add(write)
+            write.add_done_callback(self._pending_writes.discard)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = dict(self.stats)
+        stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["persistent_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["persistent_hits"]) / lookups, 3) if lookups else 0.0
+        return stats
+
+    async def _load_persistent(self, key: str) -> Tuple[Optional[str], int]:
+        # Импорт внутри метода: БД нужна только при включенном persistent-режиме
+        from src.database.db_session import sessionmanager
+        from src.database.crud import get_llm_cache_entry
+        try:
+            async with sessionmanager.session_factory() as session:
+                entry = await get_llm_cache_entry(session, key)
+            if not entry:
+                return None, 0
+            ttl_left = (entry.expires_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds()
+            return entry.response_text, max(int(ttl_left), 1)
+        except Exception as e:
+            logger.error(f"Failed to read LLM cache entry from DB: {e}")
+            return None, 0
+
+    async def _store_persistent(self, key: str, prompt_name: str, value: str, ttl_seconds: int) -> None:
+        from src.database.db_session import sessionmanager
+        from src.database.crud import upsert_llm_cache_entry
+        try:
+            expires_at = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=ttl_seconds)
+            async with sessionmanager.session_factory() as session:
+                await upsert_llm_cache_entry(session, key, prompt_name, value, expires_at)
+        except Exception as e:
+            logger.error(f"Failed to write LLM cache entry to DB: {e}")
@@ -0,0 +1,122 @@
+# src/llm/circuit_breaker.py
+
+import logging
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+STATE_CODES = {STATE_CLOSED: 0, STATE_HALF_OPEN: 1, STATE_OPEN: 2}
+
+
+class LLMUnavailableError(Exception):
+    """Запрос к LLM не отправлен: предохранитель разомкнут (провайдер сбоит или тормозит)."""
+
+
+class CircuitBreaker:
+    """
+    Предохранитель вокруг клиента LLM.
+
+    - closed: запросы идут, результаты копятся в скользящем окне;
+    - open: при доле ошибок или медленных ответов выше порога запросы не отправляются open_seconds;
+    - half_open: пропускается несколько пробных запросов; успех замыкает цепь, ошибка снова размыкает.
+    """
+
+    def __init__(
+        self,
+        window_size: int = 50,
+        min_calls: int = 10,
+        failure_rate_threshold: float = 0.5,
+        slow_call_seconds: float = 10.0,
+        slow_call_rate_threshold: float = 0.5,
+        open_seconds: float = 30.0,
+        half_open_max_calls: int = 2
+    ):
+        self.window_size = window_size
+        self.min_calls = min_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self.state = STATE_CLOSED
+        # (успех, медленный) последних запросов
+        self._window: Deque[Tuple[bool, bool]] = deque(maxlen=window_size)
+        self._opened_at = 0.0
+        self._half_open_in_flight = 0
+        self.stats = {"opened": 0, "rejected": 0, "successes": 0, "failures": 0, "slow_calls": 0}
+
+    @property
+    def is_open(self) -> bool:
+        """Разомкнут ли предохранитель сейчас (с учетом истечения open_seconds)."""
+        self._maybe_half_open()
+        return self.state == STATE_OPEN
+
+    def _maybe_half_open(self) -> None:
+        if self.state == STATE_OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self.state = STATE_HALF_OPEN
+            self._half_open_in_flight = 0
+            logger.info("LLM circuit breaker half-open: sending probe requests.")
+
+    def allow_request(self) -> bool:
+        """Можно ли отправить запрос. В half_open пропускает не больше half_open_max_calls пробных."""
+        self._maybe_half_open()
+        if self.state == STATE_CLOSED:
+            return True
+        if self.state == STATE_HALF_OPEN and self._half_open_in_flight < self.half_open_max_calls:
+            self._half_open_in_flight += 1
+            return True
+        self.stats["rejected"] += 1
+        return False
+
+    def abandon(self) -> None:
+        """Разрешенный запрос отменен, не дойдя до результата (освобождает место пробного запроса)."""
+        if self.state == STATE_HALF_OPEN:
+            self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+
+    def _open(self, reason: str) -> None:
+        self.state = STATE_OPEN
+        self._opened_at = time.monotonic()
+        self._window.clear()
+        self.stats["opened"] += 1
+        logger.warning(f"LLM circuit breaker opened for {self.open_seconds:.0f}s: {reason}")
+
+    def record(self, success: bool, latency: float) -> None:
+        """Учитывает результат запроса (успех - провайдер ответил, пусть даже пустым текстом)."""
+        slow = latency >= self.slow_call_seconds
+        self.stats["successes" if success else "failures"] += 1
+        self.stats["slow_calls"] += int(slow)
+
+        if self.state == STATE_HALF_OPEN:
+            self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+            if success and not slow:
+                self.state = STATE_CLOSED
+                logger.info("LLM circuit breaker closed: probe request succeeded.")
+            else:
+                self._open("probe request failed" if not success else f"probe request took {latency:.1f}s")
+            return
+        if self.state == STATE_OPEN:
+            return
+
+        self._window.append((success, slow))
+        if len(self._window) < self.min_calls:
+            return
+        failure_rate = sum(1 for ok, _ in self._window if not ok) / len(self._window)
+        slow_rate = sum(1 for _, is_slow in self._window if is_slow) / len(self._window)
+        if failure_rate >= self.failure_rate_threshold:
+            self._open(f"failure rate {failure_rate:.0%} over last {len(self._window)} calls")
+        elif slow_rate >= self.slow_call_rate_threshold:
+            self._open(f"{slow_rate:.0%} of last {len(self._window)} calls slower than {self.slow_call_seconds}s")
+
+    def get_stats(self) -> Dict[str, Any]:
+        self._maybe_half_open()
+        stats: Dict[str, Any] = dict(self.stats)
+        stats["state"] = self.state
+        stats["state_code"] = STATE_CODES[self.state]
+        stats["window_failure_rate"] = (round(sum(1 for ok, _ in self._window if not ok) / len(self._window), 3)
+                                        if self._window else 0.0)
+        return stats
@@ -0,0 +1,148 @@
+# src/llm/embeddings.py
+
+import logging
+import math
+import re
+import zlib
+from typing import Optional, List, Dict, Tuple
+
+import numpy as np
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+WORD_RE = re.compile(r"[0-9a-zа-яё]+")
+
+
+class TextEmbedder:
+    """Базовый класс: тексты -> L2-нормированные векторы float32 (matrix shape = (len(texts), dim))."""
+
+    name = "base"
+    dim = 0
+    # Понимает ли смысл (синонимы), а не только совпадение словоформ
+    semantic = False
+
+    async def embed(self, texts: List[str], is_query: bool = False) -> np.ndarray:
+        raise NotImplementedError
+
+
+class HashingEmbedder(TextEmbedder):
+    """
+    Локальный эмбеддер без сети: символьные n-граммы слов и сами слова, разложенные
+    хешированием в вектор фиксированной размерности (feature hashing со знаком).
+    Устойчив к словоформам и опечаткам ("страховку" ~ "страховка"), синонимы не понимает.
+    """
+
+    def __init__(self, dim: int = 512, ngram_min: int = 3, ngram_max: int = 5):
+        self.dim = dim
+        self.ngram_min = ngram_min
+        self.ngram_max = ngram_max
+        self.name = f"hashing-{dim}-{ngram_min}{ngram_max}"
+
+    def _features(self, text: str) -> Dict[str, float]:
+        features: Dict[str, float] = {}
+        for word in WORD_RE.findall(text.lower().replace("ё", "е")):
+            features[f"w:{word}"] = features.get(f"w:{word}", 0.0) + 1.0
+            padded = f"<{word}>"
+            for size in range(self.ngram_min, self.ngram_max + 1):
+                for start in range(0, max(len(padded) - size, 0) + 1):
+                    gram = padded[start:start + size]
+                    features[gram] = features.get(gram, 0.0) + 1.0
+        return features
+
+    def embed_sync(self, texts: List[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, count in self._features(text or "").items():
+                hashed = zlib.crc32(feature.encode("utf-8"))
+                sign = 1.0 if hashed & 0x80000000 else -1.0
+                # Сублинейный вес: повторы n-граммы не доминируют
+                matrix[row, hashed % self.dim] += sign * (1.0 + math.log(count))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    async def embed(self, texts: List[str], is_query: bool = False) -> np.ndarray:
+        return self.embed_sync(texts)
+
+
+class GeminiEmbedder(TextEmbedder):
+    """Семантические эмбеддинги Google (понимают синонимы: "страховка" ~ "оформить полис")."""
+
+    semantic = True
+
+    def __init__(self, api_key: str, model_name: str = "models/text-embedding-004", dim: int = 768):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self._genai = genai
+        self.model_name = model_name
+        self.dim = dim
+        self.name = f"gemini-{model_name.rsplit('/', 1)[-1]}"
+
+    async def embed(self, texts: List[str], is_query: bool = False) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        result = await self._genai.embed_content_async(
+            model=self.model_name,
+            content=texts,
+            task_type="retrieval_query" if is_query else "retrieval_document"
+        )
+        matrix = np.asarray(result["embedding"], dtype=np.float32).reshape(len(texts), -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+
+def create_embedder(settings) -> TextEmbedder:
+    """Создает эмбеддер задач по настройкам (settings.task_embedder); без API ключа - локальный."""
+    if settings.task_embedder == "gemini":
+        if settings.google_api_key:
+            return GeminiEmbedder(api_key=settings.google_api_key)
+        logger.warning("GOOGLE_API_KEY is not set, falling back to local hashing embedder for tasks.")
+    return HashingEmbedder(dim=settings.task_embedding_dim)
+
+
+def task_embedding_text(title: Optional[str], description: Optional[str]) -> str:
+    """Текст задачи для эмбеддинга: заголовок и описание (без дубля, если совпадают)."""
+    title = (title or "").strip()
+    description = (description or "").strip()
+    if title and description.casefold() != title.casefold():
+        return f"{title}. {description}"
+    return title or description
+
+
+async def embed_task_text(title: Optional[str], description: Optional[str]) -> Optional[List[float]]:
+    """
+    Эмбеддинг одной задачи для сохранения в tasks.embedding.
+    Ошибки не пробрасываются: задача без вектора будет доиндексирована при следующем поиске.
+    """
+    if not task_embedder:
+        return None
+    try:
+        matrix = await task_embedder.embed([task_embedding_text(title, description)])
+        return matrix[0].tolist()
+    except Exception as e:
+        logger.warning(f"Failed to embed task text with {task_embedder.name}: {e}")
+        return None
+
+
+async def embed_task_texts(items: List[Tuple[Optional[str], Optional[str]]]) -> List[Optional[List[float]]]:
+    """Эмбеддинги нескольких задач (заголовок, описание) одним вызовом эмбеддера."""
+    if not task_embedder or not items:
+        return [None] * len(items)
+    try:
+        matrix = await task_embedder.embed([task_embedding_text(title, description) for title, description in items])
+        return [row.tolist() for row in matrix]
+    except Exception as e:
+        logger.warning(f"Failed to embed {len(items)} task texts with {task_embedder.name}: {e}")
+        return [None] * len(items)
+
+
+try:
+    task_embedder: Optional[TextEmbedder] = create_embedder(settings)
+    logger.info(f"Task embedder: {task_embedder.name} ({task_embedder.dim} dims)")
+except Exception as e:
+    logger.error(f"Failed to initialize task embedder: {e}")
+    task_embedder = None
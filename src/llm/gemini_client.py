@@ -1,8 +1,10 @@
 # src/llm/gemini_client.py
 
-import google.generativeai as genai
+import asyncio
 import json
 import logging
+import random
+import time
 # import traceback # Больше не используется
 
 # Импортируем настройки и шаблон промпта
@@ -18,54 +20,325 @@ from src.llm.prompts import GENERATE_TITLE_PROMPT_TEMPLATE
 
 from src.llm.prompts import (
     SIMPLE_INTENT_DETECTION_PROMPT,
+    BATCH_INTENT_DETECTION_PROMPT,
     TASK_PARSING_PROMPT, 
     REMINDER_TIME_PARSING_PROMPT,
     RESCHEDULE_TIME_EXTRACTION_PROMPT,
     EDIT_DESCRIPTION_EXTRACTION_PROMPT,
     RECURRING_DETECTION_PROMPT,
-    RRULE_GENERATION_PROMPT
+    RRULE_GENERATION_PROMPT,
+    TASK_EXTRACTION_SINGLE_CALL_PROMPT,
+    MULTI_TASK_EXTRACTION_PROMPT,
+    CONTEXTUAL_REPLY_PROMPT
+)
+from src.llm.cache import LLMResponseCache, make_cache_key
+from src.llm.telemetry import llm_telemetry
+from src.llm.backends import create_llm_backend, LLMResponse
+from src.llm.json_stream import JSONObjectScanner
+from src.llm.hedging import RequestHedger
+from src.llm.circuit_breaker import CircuitBreaker, LLMUnavailableError
+from src.llm.micro_batcher import MicroBatcher
+from src.llm.model_profiles import model_profiles
+from src.llm.task_encoding import shard_tasks_compact, estimate_text_tokens, WEEKDAY_ABBREVIATIONS
+from src.llm.request_scheduler import (
+    LLMRequestScheduler,
+    llm_request_context,
+    current_llm_user,
+    estimate_tokens,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_NORMAL,
+    PRIORITY_BACKGROUND
+)
+from src.utils.rrule_helper import validate_rrule
+from src.utils.recurrence import detect_recurrence_locally, compile_rrule
+from src.utils.date_parser import try_parse_time_locally, parse_time_expression_locally
+from src.utils.timezone_index import resolve_timezone_locally, learn_timezone
+from src.utils.stage_timer import StageTimer
+from src.utils.title_generator import generate_title_locally, truncate_title
+from src.utils.query_planner import plan_task_query
+from src.utils.intent_classifier import (
+    classify_intent_locally,
+    looks_like_task_list,
+    record_local_decision,
+    record_intent_feedback
 )
 
 import pendulum # Нужен для получения текущего времени
 
-from typing import Optional, Dict, Any, List, Union
+from typing import Optional, Dict, Any, List, Tuple, Union
 
 logger = logging.getLogger(__name__)
 
-# --- Настройка клиента Gemini ---
+# --- Бэкенд LLM (gemini, fake или replay, см. settings.llm_backend) ---
 try:
-    if not settings.google_api_key:
-        logger.warning("GOOGLE_API_KEY is not set in config. LLM features will be disabled.")
-        model = None
-    else:
-        genai.configure(api_key=settings.google_api_key)
-        # Настройки генерации (можно вынести в config.py при желании)
-        generation_config = {
-            "temperature": 0.5, # Низкая температура для более предсказуемого извлечения
-            "top_p": 1,
-            "top_k": 1,
-            "max_output_tokens": 2048, # Увеличили лимит для избежания обрезания
-            # "response_mime_type": "application/json", # Если модель/API поддерживает
-        }
-        safety_settings = [
-            {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
-            {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},  
-            {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
-            {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
-        ]
-        # Выбор модели (убедись, что выбрана подходящая и доступная)
-        model = genai.GenerativeModel(
-            model_name="gemini-2.5-flash", # Или gemini-pro, или другая
-            generation_config=generation_config,
-            safety_settings=safety_settings
-        )
-        logger.info("Google Gemini client initialized successfully.")
-
+    model = create_llm_backend(settings)
+    if model:
+        logger.info(f"LLM backend '{model.name}' initialized successfully.")
 except Exception as e:
-    logger.error(f"Failed to initialize Google Gemini client: {e}", exc_info=True)
+    logger.error(f"Failed to initialize LLM backend '{settings.llm_backend}': {e}", exc_info=True)
     model = None
 
+# --- Кеш ответов LLM ---
+llm_cache = LLMResponseCache(
+    max_entries=settings.llm_cache_max_entries,
+    persistent=settings.llm_cache_persistent
+)
+
+# TTL кеша по шаблонам промптов (в секундах).
+# Промпты с текущим временем кешируются коротко: их ключ включает время, округленное до минуты.
+LLM_CACHE_TTL_SECONDS = {
+    "intent": 3600,
+    "task_parsing": 3600,
+    "reschedule_time": 3600,
+    "edit_description": 3600,
+    "recurring_detection": 86400,
+    "rrule": 86400,
+    "title": 86400,
+    "timezone": 7 * 86400,
+    "reminder_time": 60,
+    "single_call_extraction": 60,
+    "multi_task_extraction": 60,
+    "contextual_reply": 60,
+    "task_search": 60,
+}
+
+
+# --- Планировщик запросов к LLM ---
+llm_scheduler = LLMRequestScheduler(
+    max_concurrency=settings.llm_max_concurrency,
+    requests_per_minute=settings.llm_requests_per_minute,
+    tokens_per_minute=settings.llm_tokens_per_minute
+)
+
+# --- Предохранитель и деградированный режим (без LLM) ---
+llm_breaker = CircuitBreaker(
+    window_size=settings.llm_breaker_window,
+    min_calls=settings.llm_breaker_min_calls,
+    failure_rate_threshold=settings.llm_breaker_failure_rate,
+    slow_call_seconds=settings.llm_breaker_slow_call_seconds,
+    slow_call_rate_threshold=settings.llm_breaker_slow_call_rate,
+    open_seconds=settings.llm_breaker_open_seconds
+)
+
+# Сколько сообщений обработано без LLM и почему
+degraded_mode_stats = {"circuit_open": 0, "backlog": 0, "unavailable": 0}
+
+# --- Дублирование (hedging) коротких идемпотентных запросов ---
+llm_hedger = RequestHedger(
+    quantile=settings.llm_hedge_quantile,
+    min_delay=settings.llm_hedge_min_delay_ms / 1000,
+    initial_delay=settings.llm_hedge_initial_delay_ms / 1000,
+    max_rate=settings.llm_hedge_max_rate
+)
+
+# Приоритет запросов по шаблонам промптов (по умолчанию PRIORITY_NORMAL)
+PROMPT_PRIORITIES = {
+    "intent": PRIORITY_INTERACTIVE,
+    "intent_batch": PRIORITY_INTERACTIVE,
+    "single_call_extraction": PRIORITY_INTERACTIVE,
+    "multi_task_extraction": PRIORITY_INTERACTIVE,
+    "contextual_reply": PRIORITY_INTERACTIVE,
+    "reschedule_time": PRIORITY_INTERACTIVE,
+    "edit_description": PRIORITY_INTERACTIVE,
+    "title": PRIORITY_BACKGROUND,
+}
+
+
+class LLMNoTextError(Exception):
+    """Ответ LLM не содержит текста (например, обрезан по лимиту токенов)."""
+
+    def __init__(self, message: str, finish_reason: Any = "unknown"):
+        super().__init__(message)
+        self.finish_reason = finish_reason
+
+
+def bucket_time(user_timezone: str = "UTC", unit: str = "minute") -> str:
+    """
+    Текущее время, округленное вниз до минуты (или дня), в ISO формате.
+    Используется в промптах, чтобы одинаковые запросы в пределах минуты попадали в кеш.
+    """
+    return pendulum.now(user_timezone).start_of(unit).to_iso8601_string()
+
+
+def _is_cacheable_json(raw_text: str) -> bool:
+    """Проверяет, что ответ содержит разбираемый JSON (мусор в кеш не кладем)."""
+    json_start_index = raw_text.find('{')
+    json_end_index = raw_text.rfind('}')
+    if json_start_index == -1 or json_end_index <= json_start_index:
+        return False
+    try:
+        json.loads(raw_text[json_start_index : json_end_index + 1])
+        return True
+    except json.JSONDecodeError:
+        return False
+
+
+async def _generate_text(
+    prompt_name: str,
+    prompt: str,
+    cache_inputs: Optional[Dict[str, Any]] = None,
+    casefold_key: bool = True,
+    expect_json: bool = True,
+    stream: bool = False
+) -> Optional[str]:
+    """
+    Единая точка вызова LLM: кеш -> модель -> текст ответа.
+
+    Args:
+        prompt_name: Имя шаблона промпта (ключ в LLM_CACHE_TTL_SECONDS).
+        prompt: Готовый текст промпта.
+        cache_inputs: Входные данные для ключа кеша (None - не кешировать).
+        casefold_key: Приводить ли входные данные к нижнему регистру при построении ключа.
+                      Отключается для промптов, которые копируют текст пользователя в ответ.
+        expect_json: Кешировать ответ только если в нем есть валидный JSON.
+        stream: Читать ответ потоком и прекратить чтение, как только JSON-объект закрыт
+                (для коротких ответов; возвращается только текст объекта).
+
+    Returns:
+        Текст ответа или None, если ответ заблокирован фильтрами.
+
+    Raises:
+        LLMNoTextError: Ответ не содержит текста.
+    """
+    cache_key = None
+    if settings.llm_cache_enabled and cache_inputs is not None and prompt_name in LLM_CACHE_TTL_SECONDS:
+        cache_key = make_cache_key(prompt_name, cache_inputs, casefold=casefold_key)
+        cached_text = await llm_cache.aget(cache_key)
+        if cached_text is not None:
+            logger.debug(f"LLM cache hit for prompt '{prompt_name}'")
+            llm_telemetry.record_cache_hit(prompt_name)
+            return cached_text
+
+    timing: Dict[str, float] = {}
+    hedged = settings.llm_hedging_enabled and prompt_name in settings.llm_hedge_prompts
+    timeout = model_profiles.for_prompt(prompt_name)["timeout_seconds"]
+
+    async def _request(request_started_at: float):
+        if not stream:
+            return await model.generate(prompt, prompt_name)
+        if not hedged:
+            return await _read_json_stream(prompt_name, prompt, request_started_at, timing)
+        # У каждой попытки свои замеры потока, в timing попадают замеры победителя
+        attempt_timing: Dict[str, float] = {}
+        response = await _read_json_stream(prompt_name, prompt, request_started_at, attempt_timing)
+        timing.update(attempt_timing)
+        return response
+
+    async def _attempt(request_started_at: float):
+        # Таймаут профиля - на каждую попытку (дубль при hedging получает свой)
+        return await asyncio.wait_for(_request(request_started_at), timeout=timeout)
+
+    async def _timed_request():
+        # Замеряем только сам запрос к модели, без ожидания в очереди планировщика
+        request_started_at = time.perf_counter()
+        try:
+            if hedged:
+                return await llm_hedger.run(
+                    prompt_name,
+                    lambda: _attempt(request_started_at),
+                    reserve_quota=lambda: llm_scheduler.try_reserve_quota(estimate_tokens(prompt))
+                )
+            return await _attempt(request_started_at)
+        finally:
+            timing["latency"] = time.perf_counter() - request_started_at
+
+    if settings.llm_circuit_breaker_enabled and not llm_breaker.allow_request():
+        raise LLMUnavailableError(f"LLM circuit breaker is open, prompt '{prompt_name}' was not sent")
+
+    try:
+        response = await llm_scheduler.run(
+            _timed_request,
+            priority=PROMPT_PRIORITIES.get(prompt_name, PRIORITY_NORMAL),
+            estimated_tokens=estimate_tokens(prompt)
+        )
+    except asyncio.CancelledError:
+        llm_breaker.abandon()
+        raise
+    except Exception as e:
+        if "latency" in timing:
+            timed_out = isinstance(e, asyncio.TimeoutError)
+            if timed_out:
+                logger.warning(f"LLM request '{prompt_name}' timed out after {timeout:g}s")
+            llm_telemetry.record_call(prompt_name, timing["latency"], user_id=current_llm_user.get(), error=True)
+            model_profiles.record(prompt_name, timing["latency"], error=True, timeout=timed_out)
+            llm_breaker.record(False, timing["latency"])
+        else:
+            llm_breaker.abandon()
+        raise
+    llm_breaker.record(True, timing["latency"])
+    model_profiles.record(prompt_name, timing["latency"], error=response.text is None and not response.blocked,
+                          output_tokens=response.output_tokens, finish_reason=response.finish_reason)
+
+    if response.blocked:
+        logger.warning(f"LLM response blocked for prompt '{prompt_name}'. Reason: {response.block_reason}")
+        llm_telemetry.record_call(prompt_name, timing["latency"], user_id=current_llm_user.get(),
+                                  prompt_tokens=response.prompt_tokens, finish_reason="BLOCKED", blocked=True)
+        return None
+
+    llm_telemetry.record_call(prompt_name, timing["latency"], user_id=current_llm_user.get(),
+                              prompt_tokens=response.prompt_tokens, output_tokens=response.output_tokens,
+                              finish_reason=response.finish_reason, error=response.text is None,
+                              time_to_decision=timing.get("decision"))
+    if stream:
+        logger.debug(
+            f"LLM stream '{prompt_name}': first chunk {timing.get('first_chunk', 0) * 1000:.0f}ms, "
+            f"decision {timing.get('decision', timing['latency']) * 1000:.0f}ms, "
+            f"total {timing['latency'] * 1000:.0f}ms, finish {response.finish_reason}"
+        )
+    if response.text is None:
+        raise LLMNoTextError(f"Failed to get response text for prompt '{prompt_name}'", response.finish_reason)
+    raw_text = response.text.strip()
+
+    if cache_key and raw_text and (not expect_json or _is_cacheable_json(raw_text)):
+        llm_cache.put(cache_key, prompt_name, raw_text, LLM_CACHE_TTL_SECONDS[prompt_name])
+
+    return raw_text
+
+async def _read_json_stream(
+    prompt_name: str,
+    prompt: str,
+    started_at: float,
+    timing: Dict[str, float]
+) -> LLMResponse:
+    """
+    Читает потоковый ответ, пока JSONObjectScanner не найдет завершенный объект,
+    после чего закрывает поток (хвост ответа модели не дочитывается).
+    В timing записываются first_chunk и decision (секунды от started_at).
+    """
+    scanner = JSONObjectScanner()
+    collected = LLMResponse("", finish_reason=None)
+    chunks = model.stream(prompt, prompt_name)
+    try:
+        async for chunk in chunks:
+            timing.setdefault("first_chunk", time.perf_counter() - started_at)
+            if chunk.blocked:
+                return chunk
+            collected.prompt_tokens = max(collected.prompt_tokens, chunk.prompt_tokens)
+            collected.output_tokens = max(collected.output_tokens, chunk.output_tokens)
+            collected.finish_reason = chunk.finish_reason or collected.finish_reason
+            if chunk.text and scanner.feed(chunk.text):
+                timing["decision"] = time.perf_counter() - started_at
+                if not chunk.finish_reason:
+                    collected.finish_reason = "EARLY_STOP"
+                    llm_telemetry.record_early_stop(prompt_name)
+                collected.text = scanner.result
+                return collected
+    finally:
+        await chunks.aclose()
+
+    # Поток закончился без завершенного объекта - отдаем весь текст, разбор решит парсер
+    collected.text = scanner.buffer or None
+    return collected
+
+
 # --- НОВЫЕ ФУНКЦИИ С КОРОТКИМИ ПРОМПТАМИ ---
+# Интенты, которые может вернуть промпт определения интента
+INTENT_NAMES = {
+    "add_task", "find_tasks", "complete_task", "reschedule_task",
+    "edit_task_description", "update_timezone", "unknown",
+}
+
+
 async def detect_intent_simple(user_text: str, is_reply: bool = False) -> Optional[str]:
     """
     Функция для простого определения интента с помощью короткого промпта.
@@ -74,22 +347,14 @@ async def detect_intent_simple(user_text: str, is_reply: bool = False) -> Option
     if not model:
         logger.error("LLM model not available")
         return None
-        
-    prompt = SIMPLE_INTENT_DETECTION_PROMPT.format(
-        USER_TEXT=user_text,
-        IS_REPLY=is_reply
-    )
-    
-    logger.debug(f"Testing simple intent detection with prompt: {prompt[:100]}...")
-    
+
     try:
-        response = await model.generate_content_async(prompt)
-        
-        if not response.candidates:
-            logger.warning("LLM response blocked by safety filters")
+        if settings.llm_intent_batching_enabled:
+            raw_text = await _detect_intent_batched(user_text, is_reply)
+        else:
+            raw_text = await _detect_intent_raw((user_text, is_reply))
+        if raw_text is None:
             return None
-            
-        raw_text = response.text.strip()
         logger.debug(f"Raw LLM response: {raw_text}")
 
         # Очистка от markdown блоков если есть
@@ -109,12 +374,93 @@ async def detect_intent_simple(user_text: str, is_reply: bool = False) -> Option
         
     except json.JSONDecodeError as e:
         logger.error(f"Failed to parse JSON from intent detection: {e}. Raw: {raw_text}")
+        llm_telemetry.record_json_failure("intent", current_llm_user.get())
         return None
+    except LLMUnavailableError:
+        raise
     except Exception as e:
         logger.error(f"Error in intent detection: {e}")
         return None
 
 
+async def _detect_intent_raw(item: Tuple[str, bool]) -> Optional[str]:
+    """Одиночный запрос определения интента; возвращает сырой JSON ответа."""
+    user_text, is_reply = item
+    prompt = SIMPLE_INTENT_DETECTION_PROMPT.format(
+        USER_TEXT=user_text,
+        IS_REPLY=is_reply
+    )
+    logger.debug(f"Testing simple intent detection with prompt: {prompt[:100]}...")
+    return await _generate_text(
+        "intent", prompt, cache_inputs={"text": user_text, "is_reply": is_reply}, stream=True
+    )
+
+
+async def _detect_intent_batched(user_text: str, is_reply: bool) -> Optional[str]:
+    """
+    Определение интента через микробатчер: сначала кеш одиночного промпта,
+    затем общий пакет с запросами других пользователей.
+    """
+    cache_key = None
+    if settings.llm_cache_enabled:
+        cache_key = make_cache_key("intent", {"text": user_text, "is_reply": is_reply})
+        cached_text = await llm_cache.aget(cache_key)
+        if cached_text is not None:
+            llm_telemetry.record_cache_hit("intent")
+            return cached_text
+
+    raw_text = await intent_batcher.submit((user_text, is_reply))
+    if cache_key and raw_text and _is_cacheable_json(raw_text):
+        llm_cache.put(cache_key, "intent", raw_text, LLM_CACHE_TTL_SECONDS["intent"])
+    return raw_text
+
+
+async def _detect_intents_batch(items: List[Tuple[str, bool]]) -> Optional[List[Optional[str]]]:
+    """
+    Пакетное определение интента для текстов разных пользователей одним запросом.
+
+    Returns:
+        Для каждого текста сырой JSON в формате одиночного промпта ({"intent": ...})
+        или None на месте нераспознанного интента; None целиком, если ответ некорректен.
+    """
+    numbered = "\n".join(
+        f"{index}. [reply={is_reply}] {json.dumps(text, ensure_ascii=False)}"
+        for index, (text, is_reply) in enumerate(items, start=1)
+    )
+    prompt = BATCH_INTENT_DETECTION_PROMPT.format(USER_TEXTS=numbered)
+    raw_text = await _generate_text("intent_batch", prompt, stream=True)
+    if not raw_text:
+        return None
+
+    if raw_text.startswith("```json"):
+        raw_text = raw_text[7:]
+    if raw_text.endswith("```"):
+        raw_text = raw_text[:-3]
+    try:
+        result = json.loads(raw_text.strip())
+    except json.JSONDecodeError as e:
+        logger.warning(f"Failed to parse batch intent JSON: {e}. Raw: {raw_text[:200]}")
+        llm_telemetry.record_json_failure("intent_batch", None)
+        return None
+
+    intents = result.get("intents") if isinstance(result, dict) else None
+    if not isinstance(intents, list) or len(intents) != len(items):
+        logger.warning(f"Batch intent response has {len(intents) if isinstance(intents, list) else 'no'} "
+                       f"intents for {len(items)} texts")
+        return None
+    return [json.dumps({"intent": intent}) if intent in INTENT_NAMES else None for intent in intents]
+
+
+# --- Микробатчинг определения интента (см. settings.llm_intent_batching_enabled) ---
+intent_batcher: MicroBatcher = MicroBatcher(
+    "intent",
+    process_batch=_detect_intents_batch,
+    process_single=_detect_intent_raw,
+    max_batch_size=settings.llm_intent_batch_max_size,
+    max_wait=settings.llm_intent_batch_window_ms / 1000
+)
+
+
 async def parse_task_simple(user_text: str) -> Optional[Dict]:
     """
     Функция для парсинга задачи с помощью короткого промпта.
@@ -129,23 +475,16 @@ async def parse_task_simple(user_text: str) -> Optional[Dict]:
     logger.debug(f"Testing task parsing for: '{user_text}'")
     
     try:
-        response = await model.generate_content_async(prompt)
-        
-        if not response.candidates:
-            block_reason = "Unknown"
-            if response.prompt_feedback:
-                block_reason = getattr(response.prompt_feedback, 'block_reason', 'Unknown')
-            logger.warning(f"LLM response blocked by safety filters. Reason: {block_reason}")
-            return None
-
-        # Проверяем что есть валидный контент
+        # Описание копируется в ответ, поэтому регистр входа важен для ключа кеша
         try:
-            raw_text = response.text.strip()
-        except Exception as e:
+            raw_text = await _generate_text(
+                "task_parsing", prompt, cache_inputs={"text": user_text}, casefold_key=False
+            )
+            if raw_text is None:
+                return None
+        except LLMNoTextError as e:
             # Проверяем причину завершения
-            finish_reason = "unknown"
-            if hasattr(response, 'candidates') and response.candidates:
-                finish_reason = getattr(response.candidates[0], 'finish_reason', 'unknown')
+            finish_reason = e.finish_reason
             
             if finish_reason == 2:  # MAX_TOKENS
                 logger.error(f"Task parsing hit token limit (finish_reason=2) for text: '{user_text}'")
@@ -173,7 +512,10 @@ async def parse_task_simple(user_text: str) -> Optional[Dict]:
         
     except json.JSONDecodeError as e:
         logger.error(f"Failed to parse task JSON: {e}. Raw: {raw_text}")
+        llm_telemetry.record_json_failure("task_parsing", current_llm_user.get())
         return None
+    except LLMUnavailableError:
+        raise
     except Exception as e:
         logger.error(f"Error in task parsing: {e}")
         return None
@@ -187,11 +529,21 @@ async def parse_reminder_time_simple(
     Функция для парсинга времени напоминания с помощью короткого промпта.
     Возвращает ISO строку UTC времени или None.
     """
-    if not model or not reminder_text:
+    if not reminder_text:
+        return None
+
+    # Быстрый путь: типовые выражения ("завтра в 15:00", "через 3 часа") разбираем локально
+    local_time = try_parse_time_locally(
+        reminder_text, user_timezone, min_confidence=settings.local_time_parser_min_confidence
+    )
+    if local_time:
+        return local_time.to_iso8601_string()
+
+    if not model:
         return None
         
-    # Текущее время в пользовательской зоне
-    current_time = pendulum.now(user_timezone).to_iso8601_string()
+    # Текущее время в пользовательской зоне (округлено до минуты для кеша)
+    current_time = bucket_time(user_timezone)
     
     prompt = REMINDER_TIME_PARSING_PROMPT.format(
         CURRENT_DATETIME_ISO=current_time,
@@ -202,13 +554,13 @@ async def parse_reminder_time_simple(
     logger.debug(f"Testing reminder time parsing for: '{reminder_text}' in {user_timezone}")
     
     try:
-        response = await model.generate_content_async(prompt)
-        
-        if not response.candidates:
-            logger.warning("LLM response blocked")
+        raw_text = await _generate_text(
+            "reminder_time", prompt,
+            cache_inputs={"text": reminder_text, "timezone": user_timezone, "now": current_time},
+            stream=True
+        )
+        if raw_text is None:
             return None
-            
-        raw_text = response.text.strip()
         logger.debug(f"Raw reminder time response: {raw_text}")
         
         # Очистка от markdown
@@ -232,7 +584,10 @@ async def parse_reminder_time_simple(
             
     except (json.JSONDecodeError, ValueError) as e:
         logger.error(f"Failed to parse reminder time JSON: {e}. Raw: {raw_text}")
+        llm_telemetry.record_json_failure("reminder_time", current_llm_user.get())
         return None
+    except LLMUnavailableError:
+        raise
     except Exception as e:
         logger.error(f"Error in reminder time parsing: {e}")
         return None
@@ -248,13 +603,11 @@ async def _extract_reschedule_time(user_text: str) -> Optional[Dict]:
     prompt = RESCHEDULE_TIME_EXTRACTION_PROMPT.format(USER_TEXT=user_text)
     
     try:
-        response = await model.generate_content_async(prompt)
-        
-        if not response.candidates:
-            logger.warning("LLM response blocked for reschedule time extraction")
+        raw_text = await _generate_text(
+            "reschedule_time", prompt, cache_inputs={"text": user_text}, casefold_key=False, stream=True
+        )
+        if raw_text is None:
             return None
-            
-        raw_text = response.text.strip()
         
         # Очистка от markdown
         if raw_text.startswith("```json"):
@@ -269,7 +622,10 @@ async def _extract_reschedule_time(user_text: str) -> Optional[Dict]:
         
     except json.JSONDecodeError as e:
         logger.error(f"Failed to parse reschedule time JSON: {e}")
+        llm_telemetry.record_json_failure("reschedule_time", current_llm_user.get())
         return None
+    except LLMUnavailableError:
+        raise
     except Exception as e:
         logger.error(f"Error in reschedule time extraction: {e}")
         return None
@@ -285,13 +641,11 @@ async def _extract_edit_description(user_text: str) -> Optional[Dict]:
     prompt = EDIT_DESCRIPTION_EXTRACTION_PROMPT.format(USER_TEXT=user_text)
     
     try:
-        response = await model.generate_content_async(prompt)
-        
-        if not response.candidates:
-            logger.warning("LLM response blocked for edit description extraction")
+        raw_text = await _generate_text(
+            "edit_description", prompt, cache_inputs={"text": user_text}, casefold_key=False
+        )
+        if raw_text is None:
             return None
-            
-        raw_text = response.text.strip()
         
         # Очистка от markdown
         if raw_text.startswith("```json"):
@@ -306,11 +660,317 @@ async def _extract_edit_description(user_text: str) -> Optional[Dict]:
         
     except json.JSONDecodeError as e:
         logger.error(f"Failed to parse edit description JSON: {e}")
+        llm_telemetry.record_json_failure("edit_description", current_llm_user.get())
         return None
+    except LLMUnavailableError:
+        raise
     except Exception as e:
         logger.error(f"Error in edit description extraction: {e}")
         return None
 
+async def extract_task_single_call(user_text: str, user_timezone: str = "Europe/Moscow") -> Optional[Dict[str, Any]]:
+    """
+    Извлекает описание, заголовок, время напоминания (UTC) и RRULE одним запросом к LLM.
+
+    Returns:
+        Словарь params в формате _process_add_task_chain (плюс 'title')
+        или None, если ответ не прошел валидацию.
+    """
+    if not model or not user_text:
+        return None
+
+    current_time = bucket_time(user_timezone)
+    prompt = TASK_EXTRACTION_SINGLE_CALL_PROMPT.format(
+        CURRENT_DATETIME_ISO=current_time,
+        USER_TIMEZONE=user_timezone,
+        MAX_TITLE_LENGTH=21,
+        USER_TEXT=user_text
+    )
+
+    raw_text = ""
+    try:
+        raw_text = await _generate_text(
+            "single_call_extraction", prompt,
+            cache_inputs={"text": user_text, "timezone": user_timezone, "now": current_time},
+            casefold_key=False
+        )
+        if raw_text is None:
+            return None
+        logger.debug(f"Raw single-call extraction response: {raw_text}")
+
+        # Очистка от markdown
+        if raw_text.startswith("```json"):
+            raw_text = raw_text[7:]
+        if raw_text.endswith("```"):
+            raw_text = raw_text[:-3]
+        raw_text = raw_text.strip()
+
+        result = json.loads(raw_text)
+        params = _validate_single_call_task(result)
+        if params is None:
+            logger.warning(f"Single-call extraction result failed validation: {result}")
+            return None
+
+        logger.info(f"Single-call extraction - Description: '{params.get('description')}', "
+                    f"Reminder: '{params.get('parsed_reminder_utc')}', RRULE: '{params.get('recurrence_rule')}'")
+        return params
+
+    except json.JSONDecodeError as e:
+        logger.error(f"Failed to parse single-call extraction JSON: {e}. Raw: {raw_text}")
+        llm_telemetry.record_json_failure("single_call_extraction", current_llm_user.get())
+        return None
+    except LLMUnavailableError:
+        raise
+    except Exception as e:
+        logger.error(f"Error in single-call task extraction: {e}")
+        return None
+
+
+def _validate_single_call_task(result: Any) -> Optional[Dict[str, Any]]:
+    """
+    Проверяет JSON одного запроса и приводит его к формату params для handle_add_task.
+    Возвращает None, если хотя бы одно поле некорректно.
+    """
+    if not isinstance(result, dict):
+        return None
+
+    description = result.get("description")
+    if description is not None and not isinstance(description, str):
+        return None
+    description = (description or "").strip()
+
+    title = result.get("title")
+    if title is not None and not isinstance(title, str):
+        return None
+
+    is_recurring = result.get("is_recurring", False)
+    if not isinstance(is_recurring, bool):
+        return None
+
+    recurrence_rule = result.get("recurrence_rule")
+    if is_recurring:
+        if not isinstance(recurrence_rule, str) or "FREQ=" not in recurrence_rule:
+            return None
+        recurrence_rule = recurrence_rule.strip()
+        if recurrence_rule.upper().startswith("RRULE:"):
+            recurrence_rule = recurrence_rule[6:]
+        if not validate_rrule(recurrence_rule):
+            return None
+    else:
+        recurrence_rule = None
+
+    reminder_text = result.get("reminder_text")
+    if reminder_text is not None and not isinstance(reminder_text, str):
+        return None
+
+    reminder_utc = result.get("reminder_datetime_utc")
+    if reminder_utc is not None:
+        if not isinstance(reminder_utc, str):
+            return None
+        try:
+            pendulum.parse(reminder_utc)
+        except Exception:
+            return None
+
+    params: Dict[str, Any] = {
+        "description": description,
+        "is_repeating": is_recurring,
+        "recurrence_rule": recurrence_rule,
+    }
+    # Модель не всегда соблюдает лимит длины - обрезаем по границе слова
+    title = truncate_title((title or "").strip().strip('"'))
+    if title:
+        params["title"] = title
+    if reminder_utc:
+        params["due_date_time_text"] = reminder_text or None
+        params["parsed_reminder_utc"] = reminder_utc
+    return params
+
+async def extract_tasks_multi(user_texts: List[str], user_timezone: str = "Europe/Moscow") -> Optional[List[Dict[str, Any]]]:
+    """
+    Извлекает список задач из нескольких сообщений одним запросом к LLM
+    ("купить хлеб", "и молоко", "и позвонить маме завтра" -> три задачи).
+
+    Returns:
+        Список params в формате extract_task_single_call (задачи без описания отброшены)
+        или None, если ответ не прошел валидацию.
+    """
+    if not model or not user_texts:
+        return None
+
+    current_time = bucket_time(user_timezone)
+    numbered = "\n".join(f"{index}. {text.strip()}" for index, text in enumerate(user_texts, start=1))
+    prompt = MULTI_TASK_EXTRACTION_PROMPT.format(
+        CURRENT_DATETIME_ISO=current_time,
+        USER_TIMEZONE=user_timezone,
+        MAX_TITLE_LENGTH=21,
+        USER_MESSAGES=numbered
+    )
+
+    raw_text = ""
+    try:
+        raw_text = await _generate_text(
+            "multi_task_extraction", prompt,
+            cache_inputs={"texts": user_texts, "timezone": user_timezone, "now": current_time},
+            casefold_key=False
+        )
+        if raw_text is None:
+            return None
+
+        # Очистка от markdown
+        if raw_text.startswith("```json"):
+            raw_text = raw_text[7:]
+        if raw_text.endswith("```"):
+            raw_text = raw_text[:-3]
+        raw_text = raw_text.strip()
+
+        result = json.loads(raw_text)
+        items = result.get("tasks") if isinstance(result, dict) else None
+        if not isinstance(items, list):
+            logger.warning(f"Multi-task extraction returned no task list: {result}")
+            return None
+
+        tasks: List[Dict[str, Any]] = []
+        for item in items:
+            params = _validate_single_call_task(item)
+            if params is None:
+                # Одна кривая задача - повод не доверять всему ответу
+                logger.warning(f"Multi-task extraction item failed validation: {item}")
+                return None
+            if params.get("description"):
+                tasks.append(params)
+
+        logger.info(f"Multi-task extraction: {len(user_texts)} messages -> {len(tasks)} tasks")
+        return tasks
+
+    except json.JSONDecodeError as e:
+        logger.error(f"Failed to parse multi-task extraction JSON: {e}. Raw: {raw_text}")
+        llm_telemetry.record_json_failure("multi_task_extraction", current_llm_user.get())
+        return None
+    except LLMUnavailableError:
+        raise
+    except Exception as e:
+        logger.error(f"Error in multi-task extraction: {e}")
+        return None
+
+
+# Интенты ответа на сообщение бота, которые относятся к задаче из реплая
+CONTEXTUAL_REPLY_INTENTS = {"complete_task", "reschedule_task", "snooze_task", "edit_task_description"}
+
+
+async def extract_contextual_reply(user_text: str, user_timezone: str = "Europe/Moscow") -> Optional[Dict[str, Any]]:
+    """
+    Определяет интент ответа на сообщение бота вместе с его полями одним запросом к LLM.
+
+    Returns:
+        {'intent', 'time_text', 'parsed_reminder_utc', 'new_description'}
+        или None, если ответ не прошел валидацию.
+    """
+    if not model or not user_text:
+        return None
+
+    current_time = bucket_time(user_timezone)
+    prompt = CONTEXTUAL_REPLY_PROMPT.format(
+        CURRENT_DATETIME_ISO=current_time,
+        USER_TIMEZONE=user_timezone,
+        USER_TEXT=user_text
+    )
+
+    raw_text = ""
+    try:
+        raw_text = await _generate_text(
+            "contextual_reply", prompt,
+            cache_inputs={"text": user_text, "timezone": user_timezone, "now": current_time},
+            casefold_key=False
+        )
+        if raw_text is None:
+            return None
+
+        # Очистка от markdown
+        if raw_text.startswith("```json"):
+            raw_text = raw_text[7:]
+        if raw_text.endswith("```"):
+            raw_text = raw_text[:-3]
+        raw_text = raw_text.strip()
+
+        result = json.loads(raw_text)
+        if not isinstance(result, dict) or result.get("intent") not in INTENT_NAMES | {"snooze_task"}:
+            logger.warning(f"Contextual reply extraction returned unknown intent: {result}")
+            return None
+
+        fields: Dict[str, Any] = {"intent": result["intent"]}
+        for key in ("time_text", "new_description"):
+            value = result.get(key)
+            if value is not None and not isinstance(value, str):
+                logger.warning(f"Contextual reply extraction returned invalid '{key}': {result}")
+                return None
+            fields[key] = value.strip() if value and value.strip() else None
+
+        reminder_utc = result.get("reminder_datetime_utc")
+        fields["parsed_reminder_utc"] = None
+        if reminder_utc is not None:
+            if not isinstance(reminder_utc, str):
+                return None
+            try:
+                pendulum.parse(reminder_utc)
+            except Exception:
+                logger.warning(f"Contextual reply extraction returned invalid time: {reminder_utc}")
+                return None
+            fields["parsed_reminder_utc"] = reminder_utc
+
+        logger.info(f"Contextual reply extraction: {fields}")
+        return fields
+
+    except json.JSONDecodeError as e:
+        logger.error(f"Failed to parse contextual reply JSON: {e}. Raw: {raw_text}")
+        llm_telemetry.record_json_failure("contextual_reply", current_llm_user.get())
+        return None
+    except LLMUnavailableError:
+        raise
+    except Exception as e:
+        logger.error(f"Error in contextual reply extraction: {e}")
+        return None
+
+# Ссылки на фоновые теневые проверки, чтобы задачи не были собраны сборщиком мусора
+_shadow_checks: set = set()
+
+
+async def _detect_intent(user_text: str, is_reply: bool = False) -> Optional[str]:
+    """
+    Определяет интент: уверенные случаи решает локальный классификатор,
+    остальные передаются в detect_intent_simple.
+    """
+    local = classify_intent_locally(user_text, is_reply)
+
+    if local and local["confidence"] >= settings.local_intent_min_confidence:
+        local_intent = local["intent"]
+        record_local_decision(local_intent)
+        logger.info(f"Local intent classifier: '{local_intent}' (confidence {local['confidence']}) "
+                    f"for text: '{user_text[:50]}...'")
+
+        # Теневая перепроверка части уверенных решений для оценки точности
+        if model and settings.local_intent_shadow_rate > 0 and random.random() < settings.local_intent_shadow_rate:
+            check = asyncio.create_task(_shadow_check_intent(user_text, is_reply, local_intent))
+            _shadow_checks.add(check)
+            check.add_done_callback(_shadow_checks.discard)
+        return local_intent
+
+    llm_intent = await detect_intent_simple(user_text, is_reply)
+    if local:
+        record_intent_feedback(local["intent"], llm_intent, shadow=False)
+    return llm_intent
+
+
+async def _shadow_check_intent(user_text: str, is_reply: bool, local_intent: str) -> None:
+    """Сравнивает локальное решение с ответом LLM (результат LLM не используется)."""
+    try:
+        with llm_request_context(priority=PRIORITY_BACKGROUND):
+            llm_intent = await detect_intent_simple(user_text, is_reply)
+        record_intent_feedback(local_intent, llm_intent, shadow=True)
+    except Exception as e:
+        logger.error(f"Error in shadow intent check: {e}")
+
+
 # --- Основная функция обработки ввода (НОВАЯ ВЕРСИЯ с цепочкой коротких промптов) ---
 async def process_user_input(user_text: str, is_reply: bool = False, user_timezone: str = "Europe/Moscow", progress_tracker=None) -> dict:
     """
@@ -324,19 +984,43 @@ async def process_user_input(user_text: str, is_reply: bool = False, user_timezo
     Returns:
         Словарь со структурированным результатом для каждого интента.
     """
-    if not model:
-        logger.error("LLM client is not available.")
-        return {"status": "error", "message": "LLM сервис недоступен."}
-
     if not user_text or user_text.isspace():
         logger.warning("Received empty or whitespace-only user text.")
         return {"status": "unknown_intent", "original_text": user_text}
 
+    # Провайдер сбоит или очередь запросов переполнена - отвечаем локально, не копя корутины
+    degraded_reason = _degraded_mode_reason()
+    if degraded_reason:
+        return _process_user_input_degraded(user_text, is_reply, user_timezone, degraded_reason)
+
     logger.debug(f"Processing user input with new chain approach: '{user_text[:100]}...'")
 
+    timer = StageTimer("process_user_input")
+    # Спекулятивно начинаем разбор задачи, пока определяется интент (большинство сообщений - новые задачи)
+    speculative_task = None
+    # Список задач в одном сообщении разбирается отдельным промптом (см. _process_task_list)
+    task_list = not is_reply and looks_like_task_list(user_text)
+    if settings.speculative_add_task_parsing and not settings.optimistic_task_creation and not is_reply \
+            and not task_list:
+        speculative_task = _start_speculative_add_task(user_text, user_timezone)
+
     try:
-        # Шаг 1: Определяем интент
-        intent = await detect_intent_simple(user_text, is_reply)
+        # Ответ на сообщение бота: интент и поля (новое время, описание) - одним запросом
+        intent = None
+        if is_reply and settings.contextual_reply_mode == "single_call":
+            reply = await timer.measure("contextual_reply", _process_contextual_reply(user_text, user_timezone))
+            if reply and reply["intent"] in CONTEXTUAL_REPLY_INTENTS:
+                return _contextual_reply_result(reply, user_text)
+            if reply:
+                # Ответ не про задачу из реплая (новая задача, поиск) - интент уже известен
+                intent = reply["intent"]
+
+        # Шаг 1: Определяем интент (сначала локальный классификатор, затем LLM)
+        if intent is None:
+            intent = await timer.measure("intent", _detect_intent(user_text, is_reply))
+        if speculative_task and intent != "add_task":
+            speculative_task.cancel()
+            speculative_task = None
         if not intent or intent == "unknown":
             return {"status": "unknown_intent", "original_text": user_text}
 
@@ -355,33 +1039,256 @@ async def process_user_input(user_text: str, is_reply: bool = False, user_timezo
 
         # Шаг 2: Обработка в зависимости от интента
         if intent == "add_task":
-            return await _process_add_task(user_text, user_timezone, progress_tracker)
+            if task_list:
+                result = await _process_task_list(user_text, user_timezone, timer)
+                if result:
+                    return result
+            if settings.optimistic_task_creation:
+                # Задача будет создана сразу, а поля уточнит фоновый воркер (см. process_add_task_fields)
+                return {"status": "success", "intent": "add_task",
+                        "params": {"description": user_text.strip(), "optimistic": True}}
+            return await _process_add_task(user_text, user_timezone, progress_tracker, timer, speculative_task)
         elif intent == "find_tasks":
             return {"status": "success", "intent": "find_tasks", "params": {"query_text": user_text}}
         elif intent == "complete_task":
             return {"status": "success", "intent": "complete_task", "params": {}}
         elif intent == "reschedule_task":
             # Извлекаем новое время из текста через короткий промпт
-            return await _process_reschedule_task(user_text, user_timezone)
+            return await timer.measure("reschedule_time", _process_reschedule_task(user_text, user_timezone))
         elif intent == "edit_task_description":
             # Извлекаем новое описание из текста через короткий промпт
-            return await _process_edit_description(user_text)
+            return await timer.measure("edit_description", _process_edit_description(user_text))
         elif intent == "update_timezone":
             return {"status": "success", "intent": "update_timezone", "params": {"location_text": user_text}}
         else:
             return {"status": "unknown_intent", "original_text": user_text}
 
+    except LLMUnavailableError as e:
+        # Предохранитель разомкнулся посреди цепочки
+        logger.warning(f"{e}; finishing '{user_text[:50]}...' in degraded mode")
+        return _process_user_input_degraded(user_text, is_reply, user_timezone, "circuit_open")
     except Exception as e:
         error_type = type(e).__name__
         logger.error(f"Error during new chain processing ({error_type}): {e}", exc_info=True)
         return {"status": "error", "message": f"Ошибка при обработке запроса ({error_type}).", "details": str(e)}
+    finally:
+        if speculative_task and not speculative_task.done():
+            speculative_task.cancel()
+        timer.log_summary()
 
 
-async def _process_add_task(user_text: str, user_timezone: str, progress_tracker=None) -> dict:
-    """Обрабатывает интент добавления задачи через цепочку промптов."""
+async def _process_task_list(user_text: str, user_timezone: str, timer: StageTimer) -> Optional[dict]:
+    """
+    Разбирает сообщение со списком задач одним запросом (extract_tasks_multi).
+    Возвращает результат add_tasks (или add_task, если задача оказалась одна) либо None,
+    если сообщение нужно разобрать как одну задачу.
+    """
+    tasks = await timer.measure("multi_task_extraction", extract_tasks_multi([user_text], user_timezone))
+    if not tasks:
+        return None
+    logger.info(f"Task list message: {len(tasks)} tasks from '{user_text[:50]}...'")
+    if len(tasks) == 1:
+        return {"status": "success", "intent": "add_task", "params": tasks[0]}
+    return {"status": "success", "intent": "add_tasks", "params": {"tasks": tasks}}
+
+
+async def process_message_burst(user_texts: List[str], user_timezone: str = "Europe/Moscow", progress_tracker=None) -> Optional[dict]:
+    """
+    Обрабатывает серию сообщений, присланных подряд, как один запрос на создание задач.
+
+    Returns:
+        {"status": "success", "intent": "add_tasks", "params": {"tasks": [...]}} или None,
+        если сообщения нужно обработать по одному (в серии есть не-задачи, LLM недоступен
+        или ответ не прошел валидацию).
+    """
+    texts = [text for text in user_texts if text and not text.isspace()]
+    if len(texts) < 2 or _degraded_mode_reason():
+        return None
+
+    # Поиск, перенос, смена часового пояса и т.п. обрабатываются обычной цепочкой
+    for text in texts:
+        local = classify_intent_locally(text)
+        if (local and local["intent"] != "add_task") or plan_task_query(text, user_timezone):
+            logger.info(f"Message burst contains non-task message '{text[:50]}...', processing one by one")
+            return None
+
+    if progress_tracker:
+        await progress_tracker.update("✨ Разбираю сообщения одним запросом...", 1, 2)
+
+    timer = StageTimer("message_burst")
+    try:
+        tasks = await timer.measure("multi_task_extraction", extract_tasks_multi(texts, user_timezone))
+    except LLMUnavailableError as e:
+        logger.warning(f"{e}; processing message burst one by one")
+        return None
+    finally:
+        timer.log_summary()
+    if not tasks:
+        return None
+    return {"status": "success", "intent": "add_tasks", "params": {"tasks": tasks}}
+
+
+def _degraded_mode_reason() -> Optional[str]:
+    """Причина обработки сообщения без LLM или None, если LLM можно использовать."""
+    if not model:
+        return "unavailable"
+    if settings.llm_circuit_breaker_enabled and llm_breaker.is_open:
+        return "circuit_open"
+    if settings.llm_shed_queue_depth and llm_scheduler.queue_depth() >= settings.llm_shed_queue_depth:
+        return "backlog"
+    return None
+
+
+def _process_user_input_degraded(user_text: str, is_reply: bool, user_timezone: str, reason: str) -> dict:
+    """
+    Деградированный режим: интент - по правилам локального классификатора (без порога уверенности),
+    новая задача сохраняется как есть с локально разобранным временем и повторением.
+    """
+    degraded_mode_stats[reason] += 1
+    local = classify_intent_locally(user_text, is_reply)
+    if local:
+        intent = local["intent"]
+    elif not is_reply and plan_task_query(user_text, user_timezone):
+        # "что у меня на завтра?" - структурный поиск, его выполнит планировщик запросов
+        intent = "find_tasks"
+    else:
+        intent = "unknown" if is_reply else "add_task"
+    logger.info(f"Degraded mode ({reason}): intent '{intent}' for text: '{user_text[:50]}...'")
+
+    if intent == "add_task":
+        description = user_text.strip()
+        params: Dict[str, Any] = {
+            "description": description,
+            "title": generate_title_locally(description),
+            "degraded": True,
+        }
+        # Остаток текста после выражения времени - это описание задачи, поэтому уверенность не важна;
+        # для повторяющейся задачи это время первого напоминания
+        parsed_time = parse_time_expression_locally(user_text, user_timezone, allow_recurring=True)
+        if parsed_time:
+            params["parsed_reminder_utc"] = parsed_time["datetime"].to_iso8601_string()
+        recurrence = detect_recurrence_locally(user_text)
+        if recurrence and recurrence["is_recurring"]:
+            params["is_repeating"] = True
+            params["recurrence_rule"] = recurrence["rrule"]
+        return {"status": "success", "intent": "add_task", "params": params}
+    if intent == "find_tasks":
+        return {"status": "success", "intent": "find_tasks", "params": {"query_text": user_text}}
+    if intent == "complete_task":
+        return {"status": "success", "intent": "complete_task", "params": {}}
+    if intent == "update_timezone":
+        return {"status": "success", "intent": "update_timezone", "params": {"location_text": user_text}}
+    if intent == "reschedule_task":
+        parsed_time = parse_time_expression_locally(user_text, user_timezone)
+        if parsed_time:
+            params = {"new_due_date_text": user_text, "parsed_reminder_utc": parsed_time["datetime"].to_iso8601_string()}
+            return {"status": "success", "intent": "reschedule_task", "params": params}
+        return {"status": "error", "message": "Сервис ИИ сейчас перегружен. Попробуйте через пару минут "
+                                              "или укажите время проще, например «завтра в 10:00»."}
+    if intent == "edit_task_description":
+        return {"status": "error", "message": "Сервис ИИ сейчас перегружен, изменить описание не получится. "
+                                              "Попробуйте через пару минут."}
+    return {"status": "unknown_intent", "original_text": user_text}
+
+
+def _start_speculative_add_task(user_text: str, user_timezone: str) -> asyncio.Task:
+    """
+    Запускает первую стадию add_task (в зависимости от режима) до того, как интент определен.
+    Если интент окажется другим, задача отменяется.
+    """
+    if settings.add_task_extraction_mode == "single_call":
+        return asyncio.create_task(extract_task_single_call(user_text, user_timezone))
+    return asyncio.create_task(parse_task_simple(user_text))
+
+
+async def _process_add_task(
+    user_text: str,
+    user_timezone: str,
+    progress_tracker=None,
+    timer: Optional[StageTimer] = None,
+    speculative_task: Optional[asyncio.Task] = None
+) -> dict:
+    """
+    Обрабатывает интент добавления задачи.
+    Режим выбирается настройкой add_task_extraction_mode: один запрос или цепочка промптов.
+    Если ответ одного запроса не прошел валидацию, используется цепочка.
+
+    speculative_task - уже запущенная первая стадия (см. _start_speculative_add_task).
+    """
+    timer = timer or StageTimer("add_task")
+    if settings.add_task_extraction_mode == "single_call":
+        if speculative_task:
+            params = await timer.measure("single_call_extraction:speculative", speculative_task)
+        else:
+            params = await timer.measure("single_call_extraction", extract_task_single_call(user_text, user_timezone))
+        if params:
+            if not params.get("description"):
+                return {"status": "clarification_needed", "intent": "add_task",
+                       "question": "Уточните, что нужно сделать?", "partial_params": {}}
+            return {"status": "success", "intent": "add_task", "params": params}
+        logger.warning(f"Single-call extraction failed for '{user_text[:50]}...', falling back to prompt chain")
+        speculative_task = None
+
+    return await _process_add_task_chain(user_text, user_timezone, progress_tracker, timer, speculative_task)
+
+
+async def process_add_task_fields(user_text: str, user_timezone: str) -> dict:
+    """
+    Полный разбор полей новой задачи без определения интента.
+    Используется фоновым уточнением оптимистично созданных задач.
+    """
+    timer = StageTimer("add_task enrichment")
+    try:
+        # Фоновая работа не должна задерживать интерактивные запросы
+        with llm_request_context(priority=PRIORITY_BACKGROUND):
+            return await _process_add_task(user_text, user_timezone, timer=timer)
+    finally:
+        timer.log_summary()
+
+
+async def _resolve_recurrence(user_text: str) -> Dict[str, Any]:
+    """
+    Определяет повторяемость задачи по исходному тексту.
+    Разовые задачи и типовые паттерны определяются локально, LLM - только для нетиповых.
+    """
+    recurring_info = detect_recurrence_locally(user_text)
+    if recurring_info is None:
+        recurring_info = await detect_recurring_pattern(user_text)
+    if not recurring_info or not recurring_info.get("is_recurring"):
+        return {"is_recurring": False, "pattern": None, "rrule": None}
+
+    pattern = recurring_info.get("pattern")
+    # Локальный распознаватель уже вернул RRULE вместе с паттерном
+    rrule = recurring_info.get("rrule")
+    if not rrule and pattern:
+        rrule = await generate_rrule(pattern)
+    return {"is_recurring": True, "pattern": pattern, "rrule": rrule}
+
+
+async def _process_add_task_chain(
+    user_text: str,
+    user_timezone: str,
+    progress_tracker=None,
+    timer: Optional[StageTimer] = None,
+    task_details_task: Optional[asyncio.Task] = None
+) -> dict:
+    """
+    Обрабатывает интент добавления задачи через цепочку промптов.
+
+    Независимые стадии выполняются параллельно:
+        parse_task ──── reminder_time ──┐
+                                        ├── (reminder из паттерна, если время не указано)
+        recurrence ─────────────────────┘
+    """
+    timer = timer or StageTimer("add_task chain")
+    # Повторяемость определяется по исходному тексту, поэтому стартует сразу
+    recurrence_job = asyncio.create_task(timer.measure("recurrence", _resolve_recurrence(user_text)))
     try:
-        # Парсим задачу
-        task_details = await parse_task_simple(user_text)
+        # Парсим задачу (возможно, уже запущено спекулятивно во время определения интента)
+        if task_details_task:
+            task_details = await timer.measure("parse_task:speculative", task_details_task)
+        else:
+            task_details = await timer.measure("parse_task", parse_task_simple(user_text))
         if not task_details:
             return {"status": "error", "message": "Не удалось разобрать задачу."}
 
@@ -394,27 +1301,24 @@ async def _process_add_task(user_text: str, user_timezone: str, progress_tracker
 
         params = {"description": description}
 
-        # Обновляем прогресс перед проверкой рекуррентности
         if progress_tracker:
             await progress_tracker.update("⏰ Определяю время напоминания...", 2, 3)
 
-        # НОВОЕ: Проверяем на рекуррентность (используем оригинальный текст)
-        recurring_info = await detect_recurring_pattern(user_text)
-        if recurring_info and recurring_info.get("is_recurring"):
-            pattern = recurring_info.get("pattern")
-            logger.info(f"Detected recurring task: '{pattern}'")
-            
-            # Обновляем прогресс для рекуррентных задач
-            if progress_tracker:
-                await progress_tracker.update("🔄 Проверяю повторяемость...", 3, 3)
-            
-            # Генерируем RRULE
-            rrule = await generate_rrule(pattern) if pattern else None
-            
+        reminder_job = (parse_reminder_time_simple(reminder_time_text, user_timezone)
+                        if reminder_time_text else asyncio.sleep(0, result=None))
+        # Заголовок здесь не запрашивается: его строит локально handle_add_task
+        # (и при llm_title_upgrade уточняет LLM в фоне)
+        reminder_utc, recurring_info = await asyncio.gather(
+            timer.measure("reminder_time", reminder_job),
+            recurrence_job
+        )
+
+        if recurring_info.get("is_recurring"):
+            logger.info(f"Detected recurring task: '{recurring_info.get('pattern')}'")
             # Добавляем информацию о повторении в параметры
             params["is_repeating"] = True
-            params["recurrence_pattern"] = pattern
-            params["recurrence_rule"] = rrule
+            params["recurrence_pattern"] = recurring_info.get("pattern")
+            params["recurrence_rule"] = recurring_info.get("rrule")
         else:
             params["is_repeating"] = False
             params["recurrence_rule"] = None
@@ -422,7 +1326,6 @@ async def _process_add_task(user_text: str, user_timezone: str, progress_tracker
         # Обрабатываем время напоминания
         if reminder_time_text:
             # Обычный случай - время напоминания извлечено из описания
-            reminder_utc = await parse_reminder_time_simple(reminder_time_text, user_timezone)
             if reminder_utc:
                 params["due_date_time_text"] = reminder_time_text
                 params["parsed_reminder_utc"] = reminder_utc
@@ -433,7 +1336,9 @@ async def _process_add_task(user_text: str, user_timezone: str, progress_tracker
             pattern = params.get("recurrence_pattern")
             logger.info(f"Recurring task without reminder_time, using pattern for reminder: '{pattern}'")
             
-            reminder_utc = await parse_reminder_time_simple(pattern, user_timezone)
+            reminder_utc = await timer.measure(
+                "reminder_from_pattern", parse_reminder_time_simple(pattern, user_timezone)
+            )
             if reminder_utc:
                 params["due_date_time_text"] = pattern
                 params["parsed_reminder_utc"] = reminder_utc
@@ -443,14 +1348,57 @@ async def _process_add_task(user_text: str, user_timezone: str, progress_tracker
 
         return {"status": "success", "intent": "add_task", "params": params}
 
+    except LLMUnavailableError:
+        raise
     except Exception as e:
         logger.error(f"Error processing add_task: {e}", exc_info=True)
         return {"status": "error", "message": "Ошибка при обработке создания задачи."}
+    finally:
+        if not recurrence_job.done():
+            recurrence_job.cancel()
+
+
+async def _process_contextual_reply(user_text: str, user_timezone: str) -> Optional[Dict[str, Any]]:
+    """
+    Разбирает ответ на сообщение бота одним запросом (extract_contextual_reply).
+    Возвращает None, если сообщение дешевле разобрать обычной цепочкой: локальный классификатор
+    уверен, а для переноса время разбирается локально ("сделал", "перенеси на завтра в 15:00").
+    """
+    local = classify_intent_locally(user_text, is_reply=True)
+    if local and local["confidence"] >= settings.local_intent_min_confidence:
+        if local["intent"] not in ("reschedule_task", "snooze_task"):
+            return None
+        if try_parse_time_locally(user_text, user_timezone, min_confidence=settings.local_time_parser_min_confidence):
+            return None
+    return await extract_contextual_reply(user_text, user_timezone)
+
+
+def _contextual_reply_result(reply: Dict[str, Any], user_text: str) -> dict:
+    """Результат process_user_input для интента задачи из реплая в формате обработчиков интентов."""
+    intent = reply["intent"]
+    params: Dict[str, Any] = {}
+    if intent in ("reschedule_task", "snooze_task"):
+        # "позже" - время посчитано, но отдельного выражения времени в тексте нет
+        time_text = reply["time_text"] or (user_text if reply["parsed_reminder_utc"] else None)
+        params["new_due_date_text" if intent == "reschedule_task" else "snooze_details"] = time_text
+        if reply["parsed_reminder_utc"]:
+            params["parsed_reminder_utc"] = reply["parsed_reminder_utc"]
+    elif intent == "edit_task_description":
+        params["new_description"] = reply["new_description"]
+    return {"status": "success", "intent": intent, "params": params}
 
 
 async def _process_reschedule_task(user_text: str, user_timezone: str) -> dict:
     """Обрабатывает интент переноса задачи через короткие промпты."""
     try:
+        # Быстрый путь: "перенеси на завтра в 15:00" разбирается локально целиком, без двух вызовов LLM
+        local_time = try_parse_time_locally(
+            user_text, user_timezone, min_confidence=settings.local_time_parser_min_confidence
+        )
+        if local_time:
+            params = {"new_due_date_text": user_text, "parsed_reminder_utc": local_time.to_iso8601_string()}
+            return {"status": "success", "intent": "reschedule_task", "params": params}
+
         # Извлекаем новое время из текста
         time_result = await _extract_reschedule_time(user_text)
         if not time_result:
@@ -469,6 +1417,8 @@ async def _process_reschedule_task(user_text: str, user_timezone: str) -> dict:
 
         return {"status": "success", "intent": "reschedule_task", "params": params}
 
+    except LLMUnavailableError:
+        raise
     except Exception as e:
         logger.error(f"Error processing reschedule_task: {e}", exc_info=True)
         return {"status": "error", "message": "Ошибка при обработке переноса задачи."}
@@ -488,6 +1438,8 @@ async def _process_edit_description(user_text: str) -> dict:
 
         return {"status": "success", "intent": "edit_task_description", "params": {"new_description": new_description}}
 
+    except LLMUnavailableError:
+        raise
     except Exception as e:
         logger.error(f"Error processing edit_task_description: {e}", exc_info=True)
         return {"status": "error", "message": "Ошибка при обработке редактирования описания."}
@@ -506,12 +1458,12 @@ async def process_date_text_with_llm(
     Returns:
         Словарь с ключами 'date_utc_iso', 'has_time' и 'recurrence_rule' или None в случае ошибки.
     """
-    if not model or not date_text:
-        logger.error("LLM client is not available or date_text is empty.")
+    if not date_text:
+        logger.error("date_text is empty.")
         return None
 
     try:
-        # Используем новую функцию парсинга времени
+        # Используем новую функцию парсинга времени (сначала локальный парсер, затем LLM)
         reminder_utc = await parse_reminder_time_simple(date_text, user_timezone)
         
         if reminder_utc:
@@ -549,10 +1501,13 @@ async def generate_title_with_llm(
 
         logger.debug(f"LLM prompt: '{prompt}'")
 
-        response = await model.generate_content_async(prompt)
-        
-        return response.text.strip()
+        return await _generate_text(
+            "title", prompt, cache_inputs={"description": description},
+            casefold_key=False, expect_json=False
+        )
 
+    except LLMUnavailableError:
+        raise
     except Exception as e:
         error_type = type(e).__name__
         logger.error(f"Error during LLM date parsing API call ({error_type}): {e}", exc_info=True)
@@ -561,7 +1516,8 @@ async def generate_title_with_llm(
 
 async def parse_timezone_from_text(text: str) -> Optional[str]:
     """
-    Использует LLM для определения IANA таймзоны по тексту.
+    Определяет IANA таймзону по тексту: сначала по локальному индексу,
+    затем (если индекс не справился) с помощью LLM.
 
     Args:
         text: Текст для парсинга (город, страна, смещение и т.д.).
@@ -569,16 +1525,24 @@ async def parse_timezone_from_text(text: str) -> Optional[str]:
     Returns:
         Строку с валидным именем таймзоны IANA или None в случае ошибки/неудачи.
     """
-    if not model: # Проверяем, инициализирована ли модель
-        logger.error("LLM client is not available for timezone parsing.")
-        return None
     if not text or text.isspace():
         logger.warning("Received empty or whitespace text for timezone parsing.")
         return None
 
+    # Быстрый путь: города, страны, имена зон и смещения UTC разрешаются без LLM
+    local_timezone = resolve_timezone_locally(text)
+    if local_timezone:
+        logger.info(f"Timezone index resolved '{text}' as '{local_timezone}'")
+        return local_timezone
+
+    if not model: # Проверяем, инициализирована ли модель
+        logger.error("LLM client is not available for timezone parsing.")
+        return None
+
     # Используем UTC как "текущую" таймзону для LLM, т.к. ей важно само описание, а не точное текущее время
     # Но можно передать и реальную таймзону пользователя, если она известна и может помочь контексту
-    now_utc_iso = pendulum.now('UTC').to_iso8601_string()
+    # Точное время здесь не важно: округляем до дня, чтобы ответ кешировался
+    now_utc_iso = bucket_time('UTC', unit='day')
 
     prompt = TIMEZONE_PARSING_PROMPT_TEMPLATE.format(
         USER_TIMEZONE_TEXT=text,
@@ -589,14 +1553,12 @@ async def parse_timezone_from_text(text: str) -> Optional[str]:
 
     raw_response_text = ""
     try:
-        response = await model.generate_content_async(prompt)
-
-        if not response.candidates:
-            block_reason = response.prompt_feedback.block_reason if response.prompt_feedback else "Unknown"
-            logger.warning(f"LLM timezone parsing blocked. Reason: {block_reason}. Text: '{text}'")
+        raw_response_text = await _generate_text(
+            "timezone", prompt, cache_inputs={"text": text, "now": now_utc_iso}
+        )
+        if raw_response_text is None:
+            logger.warning(f"LLM timezone parsing blocked. Text: '{text}'")
             return None
-
-        raw_response_text = response.text.strip()
         logger.debug(f"Raw timezone parsing response from LLM: {raw_response_text}")
 
         # Очистка от ```json
@@ -618,6 +1580,8 @@ async def parse_timezone_from_text(text: str) -> Optional[str]:
             try:
                 pytz.timezone(iana_timezone)
                 logger.info(f"LLM successfully parsed timezone '{text}' as '{iana_timezone}'")
+                # Запоминаем ответ, чтобы в следующий раз обойтись без LLM
+                learn_timezone(text, iana_timezone)
                 return iana_timezone
             except pytz.UnknownTimeZoneError:
                 logger.warning(f"LLM returned an invalid IANA timezone: '{iana_timezone}' for input '{text}'")
@@ -628,7 +1592,10 @@ async def parse_timezone_from_text(text: str) -> Optional[str]:
 
     except json.JSONDecodeError:
         logger.error(f"Failed to decode JSON from LLM timezone response. Raw: {raw_response_text}", exc_info=True)
+        llm_telemetry.record_json_failure("timezone", current_llm_user.get())
         return None
+    except LLMUnavailableError:
+        raise
     except Exception as e:
         error_type = type(e).__name__
         logger.error(f"Error during LLM timezone parsing API call ({error_type}): {e}", exc_info=True)
@@ -637,14 +1604,17 @@ async def parse_timezone_from_text(text: str) -> Optional[str]:
 
 async def find_tasks_with_llm(
     user_query: str,
-    tasks_list: List[Dict[str, Any]] # Список задач в виде словарей
+    tasks_list: List[Dict[str, Any]], # Список задач в виде словарей
+    user_timezone: str = "UTC"
     ) -> Optional[List[int]]:
     """
     Использует LLM для поиска релевантных задач в предоставленном списке.
 
     Args:
         user_query: Текстовый запрос пользователя.
-        tasks_list: Список задач пользователя, каждая задача - словарь с 'id', 'description', 'title', 'status', 'date_utc_iso'.
+        tasks_list: Список задач пользователя в порядке приоритета, каждая задача - словарь с 'id',
+                    'description', 'title', 'status', 'next_reminder_at', 'is_repeating'.
+        user_timezone: Часовой пояс пользователя (напоминания в промпте указываются относительно его дня).
 
     Returns:
         Список ID подходящих задач или None в случае ошибки.
@@ -656,39 +1626,83 @@ async def find_tasks_with_llm(
         logger.warning("Received empty query for LLM task search.")
         return [] # Пустой запрос - пустой результат
 
-    # Преобразуем список задач в JSON строку для промпта
+    # Текущее время для контекста LLM (округлено до минуты для кеша)
+    now_local = pendulum.parse(bucket_time(user_timezone)).in_timezone(user_timezone)
+
+    # Компактные таблицы задач, каждая в пределах бюджета токенов.
+    # Если задачи не помещаются в одну таблицу - ищем по частям параллельно (map-reduce)
     try:
-        # Ограничим количество задач, если их слишком много, чтобы не превысить лимит токенов
-        MAX_TASKS_FOR_LLM = 100 # Примерный лимит, подобрать экспериментально
-        tasks_json_str = json.dumps(tasks_list[:MAX_TASKS_FOR_LLM], ensure_ascii=False, indent=2)
-        if len(tasks_list) > MAX_TASKS_FOR_LLM:
-             logger.warning(f"Too many tasks ({len(tasks_list)}) for user. Sending only first {MAX_TASKS_FOR_LLM} to LLM search.")
+        shards = shard_tasks_compact(
+            tasks_list,
+            now_local,
+            token_budget=settings.llm_task_search_token_budget,
+            description_chars=settings.llm_task_search_description_chars,
+            max_shards=max(1, settings.llm_task_search_max_shards)
+        )
     except Exception as e:
-        logger.error(f"Failed to serialize task list to JSON: {e}")
+        logger.error(f"Failed to encode task list for LLM search: {e}")
         return None # Ошибка сериализации
 
-    # Текущее время для контекста LLM
-    now_utc_iso = pendulum.now('UTC').to_iso8601_string()
+    if not shards:
+        return []
+    included_count = sum(len(shard_ids) for _, shard_ids in shards)
+    if included_count < len(tasks_list):
+        logger.warning(f"Too many tasks ({len(tasks_list)}) for user. Searching only first {included_count} "
+                       f"in {len(shards)} shards.")
+
+    if len(shards) == 1:
+        tasks_table, shard_ids = shards[0]
+        return await _search_tasks_shard(user_query, tasks_table, shard_ids, now_local)
+
+    logger.info(f"Sharded LLM task search: {included_count} tasks in {len(shards)} shards, query '{user_query}'")
+    # Все части идут через llm_scheduler, поэтому общий лимит параллельных запросов соблюдается
+    shard_results = await asyncio.gather(*(
+        _search_tasks_shard(user_query, tasks_table, shard_ids, now_local)
+        for tasks_table, shard_ids in shards
+    ))
+
+    failed_shards = sum(1 for result in shard_results if result is None)
+    if failed_shards == len(shards):
+        return None
+    if failed_shards:
+        logger.warning(f"Sharded LLM task search: {failed_shards} of {len(shards)} shards failed, "
+                       f"returning partial results for query '{user_query}'")
+
+    matching_ids: List[int] = []
+    for result in shard_results:
+        for task_id in result or []:
+            if task_id not in matching_ids:
+                matching_ids.append(task_id)
+    logger.info(f"LLM found {len(matching_ids)} matching task IDs for query '{user_query}' across {len(shards)} shards")
+    return matching_ids
+
 
+async def _search_tasks_shard(
+    user_query: str,
+    tasks_table: str,
+    shard_ids: List[int],
+    now_local: pendulum.DateTime
+) -> Optional[List[int]]:
+    """Один запрос поиска по таблице задач. Возвращает ID из этой таблицы или None при ошибке."""
+    now_local_iso = now_local.to_iso8601_string()
     prompt = TASK_SEARCH_WITH_CONTEXT_PROMPT_TEMPLATE.format(
         USER_QUERY=user_query,
-        TASK_LIST_JSON=tasks_json_str,
-        CURRENT_TIME_UTC_ISO=now_utc_iso
+        TASK_TABLE=tasks_table,
+        CURRENT_TIME_LOCAL=now_local_iso,
+        CURRENT_WEEKDAY=WEEKDAY_ABBREVIATIONS[now_local.weekday()]
     )
-    logger.debug(f"Sending task search request to LLM. Query: '{user_query}', Tasks count: {len(tasks_list)}")
-    logger.debug(f"Prompt: '{prompt}'")
-    # logger.debug(f"Full search prompt (potentially large):\n{prompt[:1000]}...") # Логируем начало промпта
+    logger.debug(f"Sending task search request to LLM. Query: '{user_query}', "
+                 f"tasks: {len(shard_ids)}, prompt ~{estimate_text_tokens(prompt)} tokens")
 
     raw_response_text = ""
     try:
-        response = await model.generate_content_async(prompt)
-
-        if not response.candidates:
-            # ... (обработка блокировки) ...
+        raw_response_text = await _generate_text(
+            "task_search", prompt,
+            cache_inputs={"query": user_query, "tasks": tasks_table, "now": now_local_iso}
+        )
+        if raw_response_text is None:
              logger.warning(f"LLM task search blocked. Query: '{user_query}'")
              return None
-
-        raw_response_text = response.text.strip()
         logger.debug(f"Raw task search response from LLM: {raw_response_text}")
 
         
@@ -715,15 +1729,23 @@ async def find_tasks_with_llm(
 
         # Валидация результата
         if isinstance(task_ids, list) and all(isinstance(tid, int) for tid in task_ids):
-            logger.info(f"LLM found {len(task_ids)} matching task IDs for query '{user_query}'")
-            return task_ids
+            # Отбрасываем ID, которых не было в таблице (галлюцинации модели)
+            known_ids = set(shard_ids)
+            valid_ids = [tid for tid in task_ids if tid in known_ids]
+            if len(valid_ids) < len(task_ids):
+                logger.warning(f"LLM returned unknown task IDs: {sorted(set(task_ids) - known_ids)}")
+            logger.info(f"LLM found {len(valid_ids)} matching task IDs for query '{user_query}'")
+            return valid_ids
         else:
             logger.error(f"LLM returned invalid format for task IDs: {task_ids}. Expected list of integers.")
             return None # Ошибка формата
 
     except json.JSONDecodeError:
         logger.error(f"Failed to decode JSON from LLM task search response. Raw: {raw_response_text}", exc_info=True)
+        llm_telemetry.record_json_failure("task_search", current_llm_user.get())
         return None
+    except LLMUnavailableError:
+        raise
     except Exception as e:
         error_type = type(e).__name__
         logger.error(f"Error during LLM task search API call ({error_type}): {e}", exc_info=True)
@@ -748,13 +1770,11 @@ async def detect_recurring_pattern(description: str) -> Optional[Dict[str, Any]]
     prompt = RECURRING_DETECTION_PROMPT.format(DESCRIPTION=description)
     
     try:
-        response = await model.generate_content_async(prompt)
-        
-        if not response.candidates:
-            logger.warning("LLM response blocked for recurring detection")
+        raw_text = await _generate_text(
+            "recurring_detection", prompt, cache_inputs={"description": description}, stream=True
+        )
+        if raw_text is None:
             return None
-            
-        raw_text = response.text.strip()
         
         # Очистка от markdown
         if raw_text.startswith("```json"):
@@ -778,7 +1798,10 @@ async def detect_recurring_pattern(description: str) -> Optional[Dict[str, Any]]
         
     except json.JSONDecodeError as e:
         logger.error(f"Failed to parse recurring detection JSON: {e}. Raw: {raw_text}")
+        llm_telemetry.record_json_failure("recurring_detection", current_llm_user.get())
         return None
+    except LLMUnavailableError:
+        raise
     except Exception as e:
         logger.error(f"Error in recurring pattern detection: {e}")
         return None
@@ -794,23 +1817,31 @@ async def generate_rrule(pattern: str) -> Optional[str]:
     Returns:
         RRULE строка или None при ошибке
     """
-    if not model or not pattern:
+    if not pattern:
+        return None
+
+    # Быстрый путь: типовые паттерны компилируются локально
+    local_rrule = compile_rrule(pattern)
+    if local_rrule:
+        logger.info(f"Compiled RRULE locally for pattern '{pattern}': {local_rrule}")
+        return local_rrule
+
+    if not model:
         return None
         
-    current_time = pendulum.now().to_iso8601_string()
+    # DTSTART в RRULE не используется, поэтому достаточно даты (ответ кешируется на день)
+    current_time = bucket_time(unit='day')
     prompt = RRULE_GENERATION_PROMPT.format(
         CURRENT_TIME=current_time,
         PATTERN=pattern
     )
     
     try:
-        response = await model.generate_content_async(prompt)
-        
-        if not response.candidates:
-            logger.warning("LLM response blocked for RRULE generation")
+        raw_text = await _generate_text(
+            "rrule", prompt, cache_inputs={"pattern": pattern, "today": current_time}, expect_json=False
+        )
+        if not raw_text:
             return None
-            
-        raw_text = response.text.strip()
         
         # RRULE обычно возвращается как простой текст, не JSON
         if raw_text and raw_text.lower() != "null":
@@ -824,7 +1855,9 @@ async def generate_rrule(pattern: str) -> Optional[str]:
         else:
             logger.info(f"No RRULE could be generated for pattern: '{pattern}'")
             return None
-        
+
+    except LLMUnavailableError:
+        raise
     except Exception as e:
         logger.error(f"Error in RRULE generation: {e}")
         return None
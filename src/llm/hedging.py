@@ -0,0 +1,161 @@
+# src/llm/hedging.py
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Сколько последних задержек помнить на промпт и сколько нужно для адаптивного порога
+LATENCY_WINDOW = 200
+MIN_SAMPLES = 20
+# Окно для ограничения доли дублей (секунды)
+CAP_WINDOW_SECONDS = 60.0
+
+
+class RequestHedger:
+    """
+    Дублирование (hedging) коротких идемпотентных запросов к LLM для срезания хвоста задержек.
+
+    Если ответ не пришел за адаптивный порог (квантиль последних задержек этого промпта),
+    отправляется второй такой же запрос; побеждает первый успешный ответ, второй отменяется.
+    Доля дублей ограничена max_rate от числа запросов за последнюю минуту.
+    """
+
+    def __init__(
+        self,
+        quantile: float = 0.9,
+        min_delay: float = 0.3,
+        initial_delay: float = 2.0,
+        max_rate: float = 0.1
+    ):
+        self.quantile = quantile
+        self.min_delay = min_delay
+        self.initial_delay = initial_delay
+        self.max_rate = max_rate
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._recent_requests: Deque[float] = deque()
+        self._recent_hedges: Deque[float] = deque()
+        self.prompts: Dict[str, Dict[str, float]] = {}
+
+    def _prompt_stats(self, prompt_name: str) -> Dict[str, float]:
+        if prompt_name not in self.prompts:
+            self.prompts[prompt_name] = {
+                "requests": 0,      # Запросов через hedger
+                "hedged": 0,        # Отправлен дубль
+                "hedge_wins": 0,    # Дубль ответил первым
+                "capped": 0,        # Дубль был нужен, но не отправлен из-за лимита
+                "latency_saved": 0.0,  # Оценка сэкономленного времени (секунды)
+            }
+        return self.prompts[prompt_name]
+
+    def _record_latency(self, prompt_name: str, latency: float) -> None:
+        self._latencies.setdefault(prompt_name, deque(maxlen=LATENCY_WINDOW)).append(latency)
+
+    def threshold(self, prompt_name: str) -> float:
+        """Через сколько секунд без ответа отправлять дубль."""
+        samples = self._latencies.get(prompt_name)
+        if not samples or len(samples) < MIN_SAMPLES:
+            return self.initial_delay
+        ordered = sorted(samples)
+        index = min(int(len(ordered) * self.quantile), len(ordered) - 1)
+        return max(self.min_delay, ordered[index])
+
+    def _expected_tail_latency(self, prompt_name: str, elapsed: float) -> float:
+        """Оценка полной задержки запроса, который уже длится elapsed секунд (среднее по хвосту окна)."""
+        tail = [latency for latency in self._latencies.get(prompt_name, ()) if latency > elapsed]
+        return sum(tail) / len(tail) if tail else elapsed
+
+    def _trim_window(self, now: float) -> None:
+        for window in (self._recent_requests, self._recent_hedges):
+            while window and now - window[0] > CAP_WINDOW_SECONDS:
+                window.popleft()
+
+    def _hedge_allowed(self, now: float) -> bool:
+        self._trim_window(now)
+        return len(self._recent_hedges) + 1 <= self.max_rate * len(self._recent_requests)
+
+    async def run(
+        self,
+        prompt_name: str,
+        request_factory: Callable[[], Awaitable[T]],
+        reserve_quota: Optional[Callable[[], bool]] = None
+    ) -> T:
+        """
+        Выполняет запрос с возможным дублем.
+
+        Args:
+            prompt_name: Имя промпта (порог и счетчики считаются по нему).
+            request_factory: Функция без аргументов, создающая корутину запроса.
+            reserve_quota: Проверка и резервирование квоты провайдера под дубль (False - дубль не отправлять).
+        """
+        stats = self._prompt_stats(prompt_name)
+        stats["requests"] += 1
+        started_at = time.perf_counter()
+        self._recent_requests.append(time.monotonic())
+
+        primary = asyncio.ensure_future(request_factory())
+        delay = self.threshold(prompt_name)
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+        except asyncio.CancelledError:
+            primary.cancel()
+            raise
+        if done:
+            if primary.exception() is None:
+                self._record_latency(prompt_name, time.perf_counter() - started_at)
+            return primary.result()
+
+        if not self._hedge_allowed(time.monotonic()) or (reserve_quota and not reserve_quota()):
+            stats["capped"] += 1
+            result = await primary
+            self._record_latency(prompt_name, time.perf_counter() - started_at)
+            return result
+
+        stats["hedged"] += 1
+        self._recent_hedges.append(time.monotonic())
+        hedge_started_at = time.perf_counter()
+        hedge = asyncio.ensure_future(request_factory())
+        attempts = {primary: started_at, hedge: hedge_started_at}
+        pending = set(attempts)
+        first_error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    if attempt.exception() is not None:
+                        first_error = first_error or attempt.exception()
+                        continue
+                    finished_at = time.perf_counter()
+                    self._record_latency(prompt_name, finished_at - attempts[attempt])
+                    if attempt is hedge:
+                        stats["hedge_wins"] += 1
+                        elapsed = finished_at - started_at
+                        saved = self._expected_tail_latency(prompt_name, elapsed) - elapsed
+                        stats["latency_saved"] += max(0.0, saved)
+                        logger.debug(f"Hedged request won for '{prompt_name}' after {elapsed:.2f}s "
+                                     f"(threshold {delay:.2f}s)")
+                    return attempt.result()
+            raise first_error
+        finally:
+            # Проигравший (или оба при отмене) отменяется
+            for attempt in attempts:
+                if not attempt.done():
+                    attempt.cancel()
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Счетчики по промптам: доля дублей, побед дубля и сэкономленное время."""
+        result = {}
+        for prompt_name, stats in self.prompts.items():
+            requests = stats["requests"]
+            result[prompt_name] = {
+                **stats,
+                "latency_saved": round(stats["latency_saved"], 3),
+                "hedge_rate": round(stats["hedged"] / requests, 3) if requests else 0.0,
+                "threshold": round(self.threshold(prompt_name), 3),
+            }
+        return result
@@ -0,0 +1,70 @@
+# src/llm/json_stream.py
+
+import json
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class JSONObjectScanner:
+    """
+    Инкрементальный поиск первого завершенного JSON-объекта в потоке текста.
+
+    Текст подается кусками (feed); как только закрывается фигурная скобка верхнего уровня
+    и объект разбирается json.loads, feed возвращает его текст - остаток потока можно не читать.
+    Строки и экранирование учитываются, поэтому скобки внутри значений не сбивают счет.
+    Мусор до объекта (```json, пояснения) пропускается.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.result: Optional[str] = None
+        self._position = 0
+        self._start: Optional[int] = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    @property
+    def done(self) -> bool:
+        return self.result is not None
+
+    def feed(self, text: str) -> Optional[str]:
+        """Добавляет кусок текста. Возвращает текст объекта, когда он завершен."""
+        if self.done:
+            return self.result
+        self.buffer += text
+
+        while self._position < len(self.buffer):
+            char = self.buffer[self._position]
+            if self._start is None:
+                if char == "{":
+                    self._start = self._position
+                    self._depth = 1
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    candidate = self.buffer[self._start:self._position + 1]
+                    try:
+                        json.loads(candidate)
+                        self.result = candidate
+                        return candidate
+                    except json.JSONDecodeError:
+                        # Скобки сошлись, но это не JSON - ищем следующий объект после открывающей скобки
+                        logger.debug(f"Skipping non-JSON braces in stream: {candidate[:50]}")
+                        self._position = self._start
+                        self._start = None
+            self._position += 1
+        return None
@@ -0,0 +1,127 @@
+# src/llm/micro_batcher.py
+
+import asyncio
+import contextvars
+import logging
+from typing import Any, Awaitable, Callable, Dict, Generic, List, Optional, Set, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Микробатчинг однотипных запросов к LLM от разных пользователей.
+
+    Запросы, пришедшие в течение max_wait секунд (но не больше max_batch_size), отправляются
+    одним вызовом process_batch. Он возвращает результат для каждого элемента по порядку;
+    элементы без результата (None или весь ответ некорректен) выполняются по одному через process_single.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        process_batch: Callable[[List[T]], Awaitable[Optional[List[Optional[R]]]]],
+        process_single: Callable[[T], Awaitable[R]],
+        max_batch_size: int = 8,
+        max_wait: float = 0.05
+    ):
+        self.name = name
+        self.process_batch = process_batch
+        self.process_single = process_single
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._pending: List[Tuple[T, asyncio.Future, contextvars.Context]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: Set[asyncio.Task] = set()
+        self.stats = {
+            "submitted": 0,
+            "batches": 0,           # Пакетных запросов (2+ элемента)
+            "items_in_batches": 0,  # Элементов, отправленных в пакетах
+            "batched_items": 0,     # Элементов, получивших результат из пакета
+            "singles": 0,           # Окно закрылось с одним элементом - обычный запрос
+            "fallback_batches": 0,  # Пакетный ответ некорректен целиком
+            "fallback_items": 0,    # Элементов, выполненных по одному после пакета
+            "max_batch_size": 0,
+        }
+
+    async def submit(self, item: T) -> R:
+        """Ставит элемент в текущий пакет и ждет его результат."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future, contextvars.copy_context()))
+        self.stats["submitted"] += 1
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        # Отмененные ожидания (пользователь ушел) в пакет не попадают
+        batch = [entry for entry in self._pending if not entry[1].done()]
+        self._pending = []
+        if not batch:
+            return
+        # Пакет общий для нескольких пользователей: запускаем его вне контекста (пользователь, приоритет)
+        # того запроса, который случайно закрыл окно
+        task = contextvars.Context().run(asyncio.get_running_loop().create_task, self._run(batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: List[Tuple[T, asyncio.Future, contextvars.Context]]) -> None:
+        results: List[Optional[R]] = [None] * len(batch)
+        if len(batch) == 1:
+            self.stats["singles"] += 1
+        else:
+            self.stats["batches"] += 1
+            self.stats["items_in_batches"] += len(batch)
+            self.stats["max_batch_size"] = max(self.stats["max_batch_size"], len(batch))
+            try:
+                batch_results = await self.process_batch([item for item, _, _ in batch])
+            except Exception as e:
+                logger.warning(f"Micro-batch '{self.name}' of {len(batch)} failed: {e}")
+                batch_results = None
+            if batch_results is None or len(batch_results) != len(batch):
+                self.stats["fallback_batches"] += 1
+                logger.warning(f"Micro-batch '{self.name}' of {len(batch)} returned unusable response, "
+                               f"falling back to individual requests")
+            else:
+                results = list(batch_results)
+
+        singles = []
+        for entry, result in zip(batch, results):
+            future = entry[1]
+            if result is None:
+                singles.append(entry)
+            elif not future.done():
+                future.set_result(result)
+                self.stats["batched_items"] += 1
+        if len(batch) > 1:
+            self.stats["fallback_items"] += len(singles)
+        await asyncio.gather(*(self._run_single(*entry) for entry in singles))
+
+    async def _run_single(self, item: T, future: asyncio.Future, context: contextvars.Context) -> None:
+        if future.done():
+            return
+        try:
+            # Одиночный запрос выполняется в контексте своего пользователя (телеметрия, приоритет)
+            result = await context.run(asyncio.get_running_loop().create_task, self.process_single(item))
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(result)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = dict(self.stats)
+        stats["avg_batch_size"] = (round(stats["items_in_batches"] / stats["batches"], 2)
+                                   if stats["batches"] else 0.0)
+        stats["pending"] = len(self._pending)
+        return stats
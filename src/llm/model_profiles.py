@@ -0,0 +1,116 @@
+# src/llm/model_profiles.py
+
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Сколько последних задержек помнить на профиль (для квантилей)
+LATENCY_WINDOW = 500
+
+PROFILE_FIELDS = ("model", "max_output_tokens", "temperature", "timeout_seconds")
+
+
+class ModelProfileRegistry:
+    """
+    Профили модели по промптам: имя модели, лимит токенов ответа, температура и таймаут.
+
+    Тривиальные шаги (интент, заголовок, часовой пояс) идут в дешевую быструю модель
+    с маленьким лимитом ответа, тяжелые (поиск, RRULE) - в более сильную.
+    Задержки и обрезанные ответы считаются по профилям.
+    """
+
+    def __init__(
+        self,
+        profiles: Dict[str, Dict[str, Any]],
+        prompt_profiles: Dict[str, str],
+        default_profile: str
+    ):
+        self.profiles: Dict[str, Dict[str, Any]] = {}
+        for name, profile in profiles.items():
+            missing = [field for field in PROFILE_FIELDS if field not in profile]
+            if missing:
+                raise ValueError(f"LLM model profile '{name}' is missing fields: {missing}")
+            self.profiles[name] = {
+                "name": name,
+                "model": str(profile["model"]),
+                "max_output_tokens": int(profile["max_output_tokens"]),
+                "temperature": float(profile["temperature"]),
+                "timeout_seconds": float(profile["timeout_seconds"]),
+            }
+        if default_profile not in self.profiles:
+            raise ValueError(f"Default LLM model profile '{default_profile}' is not defined")
+        self.default_profile = default_profile
+
+        self.prompt_profiles: Dict[str, str] = {}
+        for prompt_name, profile_name in prompt_profiles.items():
+            if profile_name not in self.profiles:
+                logger.warning(f"Unknown LLM model profile '{profile_name}' for prompt '{prompt_name}', "
+                               f"using '{default_profile}'")
+                continue
+            self.prompt_profiles[prompt_name] = profile_name
+
+        self._latencies: Dict[str, Deque[float]] = {}
+        self.stats: Dict[str, Dict[str, float]] = {}
+
+    def for_prompt(self, prompt_name: str) -> Dict[str, Any]:
+        """Профиль, которым выполняется промпт (по умолчанию - default_profile)."""
+        return self.profiles[self.prompt_profiles.get(prompt_name, self.default_profile)]
+
+    def record(
+        self,
+        prompt_name: str,
+        latency: float,
+        error: bool = False,
+        timeout: bool = False,
+        output_tokens: int = 0,
+        finish_reason: Optional[str] = None
+    ) -> None:
+        """Учитывает завершенный запрос в статистике его профиля."""
+        profile_name = self.for_prompt(prompt_name)["name"]
+        stats = self.stats.setdefault(profile_name, {
+            "calls": 0, "errors": 0, "timeouts": 0, "truncated": 0,
+            "latency_sum": 0.0, "output_tokens": 0,
+        })
+        stats["calls"] += 1
+        stats["errors"] += int(error)
+        stats["timeouts"] += int(timeout)
+        # Ответ уперся в max_output_tokens - лимит профиля слишком мал для этого промпта
+        stats["truncated"] += int(finish_reason == "MAX_TOKENS")
+        stats["latency_sum"] += latency
+        stats["output_tokens"] += output_tokens
+        self._latencies.setdefault(profile_name, deque(maxlen=LATENCY_WINDOW)).append(latency)
+
+    def _latency_quantile(self, profile_name: str, quantile: float) -> float:
+        samples = sorted(self._latencies.get(profile_name, ()))
+        if not samples:
+            return 0.0
+        return round(samples[min(int(len(samples) * quantile), len(samples) - 1)], 3)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Задержки по профилям (avg/p50/p95), ошибки, таймауты и обрезанные ответы."""
+        result = {}
+        for profile_name, stats in self.stats.items():
+            calls = stats["calls"]
+            result[profile_name] = {
+                "model": self.profiles[profile_name]["model"],
+                "calls": calls,
+                "errors": stats["errors"],
+                "timeouts": stats["timeouts"],
+                "truncated": stats["truncated"],
+                "avg_latency": round(stats["latency_sum"] / calls, 3) if calls else 0.0,
+                "p50_latency": self._latency_quantile(profile_name, 0.5),
+                "p95_latency": self._latency_quantile(profile_name, 0.95),
+                "avg_output_tokens": round(stats["output_tokens"] / calls, 1) if calls else 0.0,
+            }
+        return result
+
+
+model_profiles = ModelProfileRegistry(
+    profiles=settings.llm_model_profiles,
+    prompt_profiles=settings.llm_prompt_profiles,
+    default_profile=settings.llm_default_model_profile
+)
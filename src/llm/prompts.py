@@ -29,19 +29,22 @@ TASK_SEARCH_WITH_CONTEXT_PROMPT_TEMPLATE = """
 You are a task filtering assistant. Your goal is to analyze a user's search query and identify which tasks from a provided list match the query.
 
 Input Information:
-1.  **User's Search Query:** "{USER_QUERY}"  
-2.  **User's Task List:** A list of the user's current tasks, provided below in JSON format. Each task has an `id`, `description`, `title` (optional), `status` ('pending' or 'done'), and `due_date_utc_iso` (optional, in YYYY-MM-DDTHH:MM:SSZ format).
-3.  **Current time in UTC:** {CURRENT_TIME_UTC_ISO}
+1.  **User's Search Query:** "{USER_QUERY}"
+2.  **Current local time of the user:** {CURRENT_TIME_LOCAL} ({CURRENT_WEEKDAY})
+3.  **User's Task List:** one task per line, columns separated by "|":
+    - `id` - integer task id
+    - `заголовок` - short title (may be empty)
+    - `описание` - description (empty if it repeats the title, long ones are clipped with "…")
+    - `напоминание` - reminder time relative to the user's current day: "0д 18:00" = today at 18:00, "+1д пт 09:00" = tomorrow (Friday) at 09:00, "-2д 10:00" = two days ago (overdue); empty = no reminder
+    - `флаги` - "R" = repeating task, "D" = done
 User's Task List:
-```json
-{TASK_LIST_JSON}
-```
+{TASK_TABLE}
 
 Your Task:
 
 1. Carefully read the "User's Search Query".
 2. Examine the "User's Task List".
-3. Identify all tasks from the list whose content (description, title) or properties (status, due date relative to current time) semantically match the user's query. Consider synonyms, different phrasings, and context. For example, if the query is "страховка", a task with "оформить полис" might be relevant. If the query is "задачи на завтра", filter tasks with a due_date_utc_iso corresponding to tomorrow relative to the Current time in UTC. If the query asks for "выполненные", filter by status: done.
+3. Identify all tasks from the list whose content (title, description) or properties (reminder time, flags) semantically match the user's query. Consider synonyms, different phrasings, and context. For example, if the query is "страховка", a task with "оформить полис" might be relevant. If the query is "задачи на завтра", select tasks whose reminder starts with "+1д". If the query asks for "выполненные", select tasks with flag D.
 4. Return ONLY a single JSON object containing a list of the integer ids of the matching tasks. The list should be empty if no tasks match.
 
 Output JSON Format:
@@ -75,10 +78,8 @@ Concise Title:
 
 # === НОВЫЕ УПРОЩЕННЫЕ ПРОМПТЫ ===
 
-# 1. КОРОТКИЙ промпт для определения интента (вместо INTENT_RECOGNITION_PROMPT_TEMPLATE)
-SIMPLE_INTENT_DETECTION_PROMPT = """
-Analyze Russian text and return intent:
-
+# Общая часть промптов определения интента (одиночного и пакетного)
+INTENT_DEFINITIONS = """
 add_task - создать задачу/напоминание
 find_tasks - найти/показать задачи  
 complete_task - отметить выполненной (ТОЛЬКО при ответе на сообщение бота)
@@ -115,13 +116,29 @@ Examples for other intents:
 "найди задачи про банк" → find_tasks
 "я в Барселоне" → update_timezone
 "переехал в Лондон" → update_timezone
+"""
 
+# 1. КОРОТКИЙ промпт для определения интента (вместо INTENT_RECOGNITION_PROMPT_TEMPLATE)
+SIMPLE_INTENT_DETECTION_PROMPT = """
+Analyze Russian text and return intent:
+""" + INTENT_DEFINITIONS + """
 Text: "{USER_TEXT}"
 Is reply to bot message: {IS_REPLY}
 
 Return only JSON: {{"intent": "add_task"}}
 """
 
+# 1a. Пакетный вариант: тексты разных пользователей одним запросом (микробатчинг под нагрузкой)
+BATCH_INTENT_DETECTION_PROMPT = """
+Analyze each numbered Russian text independently and return its intent:
+""" + INTENT_DEFINITIONS + """
+Texts (reply=True means the text is a reply to bot message):
+{USER_TEXTS}
+
+Return only JSON with one intent per text, in the same order:
+{{"intents": ["add_task", "complete_task"]}}
+"""
+
 # 2. Промпт для парсинга задачи (только для add_task)
 TASK_PARSING_PROMPT = """
 Parse task creation request. Extract:
@@ -265,3 +282,127 @@ Text: "{USER_TEXT}"
 Return only JSON:
 """
 
+# Ответ на сообщение бота о задаче: интент и его поля одним запросом
+# (вместо SIMPLE_INTENT_DETECTION_PROMPT → RESCHEDULE_TIME_EXTRACTION_PROMPT → REMINDER_TIME_PARSING_PROMPT)
+CONTEXTUAL_REPLY_PROMPT = """
+User replied to a bot message about one of their tasks. Detect what they want and extract the fields in one JSON object.
+
+Current time: {CURRENT_DATETIME_ISO} in {USER_TIMEZONE}
+Text: "{USER_TEXT}"
+
+Intents:
+complete_task - the task is done ("сделал", "готово", "выполнено")
+reschedule_task - move the task to another date/time ("перенеси на завтра", "сделаю в понедельник")
+snooze_task - remind again a bit later ("отложи на 15 минут", "напомни через час", "позже")
+edit_task_description - change the task text ("измени на купить хлеб и молоко")
+add_task - a new unrelated task
+find_tasks - find/show tasks
+update_timezone - set/change timezone or location
+unknown - not clear
+
+Fields:
+1. intent - one of the intents above.
+2. time_text - for reschedule_task/snooze_task: the part of text with the new time, otherwise null.
+3. reminder_datetime_utc - time_text converted to UTC (YYYY-MM-DDTHH:MM:SSZ), otherwise null.
+   Always include specific time. Defaults: "утром" = 09:00, "днем" = 12:00, "вечером" = 18:00,
+   "ночью" = 21:00, no time specified = 12:00 (user timezone, then convert to UTC).
+   snooze_task without explicit time ("позже", "отложи") = current time + 1 hour.
+4. new_description - for edit_task_description: the new task text, otherwise null.
+
+Examples:
+"перенеси на завтра в 15:00" →
+{{"intent": "reschedule_task", "time_text": "завтра в 15:00", "reminder_datetime_utc": "2025-01-16T12:00:00Z", "new_description": null}}
+
+"отложи на полчаса" →
+{{"intent": "snooze_task", "time_text": "через полчаса", "reminder_datetime_utc": "2025-01-15T10:30:00Z", "new_description": null}}
+
+"измени на позвонить врачу" →
+{{"intent": "edit_task_description", "time_text": null, "reminder_datetime_utc": null, "new_description": "позвонить врачу"}}
+
+"сделал" →
+{{"intent": "complete_task", "time_text": null, "reminder_datetime_utc": null, "new_description": null}}
+
+Return only JSON.
+"""
+
+
+# === ПРОМПТ ДЛЯ ИЗВЛЕЧЕНИЯ ЗАДАЧИ ОДНИМ ВЫЗОВОМ (add_task) ===
+
+# Заменяет цепочку TASK_PARSING_PROMPT → RECURRING_DETECTION_PROMPT → RRULE_GENERATION_PROMPT →
+# REMINDER_TIME_PARSING_PROMPT → GENERATE_TITLE_PROMPT_TEMPLATE одним запросом.
+TASK_EXTRACTION_SINGLE_CALL_PROMPT = """
+Parse Russian task creation request and return ALL fields in one JSON object.
+
+Current time: {CURRENT_DATETIME_ISO} in {USER_TIMEZONE}
+Text: "{USER_TEXT}"
+
+Fields:
+1. description - what to do/remember. Put ALL details about time/place of the event into description.
+2. title - 2-3 word summary in Russian, no longer than {MAX_TITLE_LENGTH} characters, no quotes.
+3. reminder_text - the part of text that says when user wants to be notified, or null.
+4. reminder_datetime_utc - reminder_text converted to UTC (YYYY-MM-DDTHH:MM:SSZ), or null if no reminder.
+   Always include specific time. Defaults: "утром" = 09:00, "днем" = 12:00, "вечером" = 18:00,
+   "ночью" = 21:00, no time specified = 12:00 (user timezone, then convert to UTC).
+   For recurring tasks without explicit reminder use the first occurrence of the pattern.
+5. is_recurring - true only for repeating tasks ("каждый понедельник", "ежедневно", "раз в неделю",
+   "15 числа каждого месяца", "по пятницам", birthdays/anniversaries), otherwise false.
+6. recurrence_rule - RRULE string (RFC 5545, without "RRULE:" prefix) if is_recurring, otherwise null.
+   Examples: "каждый день" → "FREQ=DAILY", "каждый понедельник" → "FREQ=WEEKLY;BYDAY=MO",
+   "каждые 3 дня" → "FREQ=DAILY;INTERVAL=3", "15 числа каждого месяца" → "FREQ=MONTHLY;BYMONTHDAY=15",
+   "15 марта каждый год" → "FREQ=YEARLY;BYMONTH=3;BYMONTHDAY=15".
+
+Examples:
+"купить молоко завтра" →
+{{"description": "купить молоко", "title": "Купить молоко", "reminder_text": "завтра", "reminder_datetime_utc": "2025-01-16T09:00:00Z", "is_recurring": false, "recurrence_rule": null}}
+
+"каждый понедельник в 10 созвон" →
+{{"description": "созвон в 10", "title": "Созвон", "reminder_text": "каждый понедельник в 10", "reminder_datetime_utc": "2025-01-20T07:00:00Z", "is_recurring": true, "recurrence_rule": "FREQ=WEEKLY;BYDAY=MO"}}
+
+"купить подарок маме" →
+{{"description": "купить подарок маме", "title": "Подарок маме", "reminder_text": null, "reminder_datetime_utc": null, "is_recurring": false, "recurrence_rule": null}}
+
+Return only JSON.
+"""
+
+# Несколько сообщений подряд от одного пользователя ("купить хлеб", "и молоко", "и позвонить маме завтра")
+# или одно сообщение со списком задач ("завтра: купить хлеб, забрать посылку, позвонить в банк в 11")
+MULTI_TASK_EXTRACTION_PROMPT = """
+User sent one or several Russian messages that may contain several tasks. Turn them into a list of tasks.
+
+Current time: {CURRENT_DATETIME_ISO} in {USER_TIMEZONE}
+Messages:
+{USER_MESSAGES}
+
+Rules:
+- A message that continues the previous one ("и молоко" after "купить хлеб") is a separate task:
+  repeat the missing verb ("купить молоко").
+- A message that only adds time or details to the previous task ("в 10 утра", "это срочно")
+  is merged into that task, not a new task.
+- Skip messages that are not tasks (greetings, "спасибо", "ок").
+- One message can list several tasks (lines, commas, "и"). Time before the list ("завтра: ...")
+  applies to every task of the list unless a task has its own time.
+- Steps of one errand stay one task ("позвонить маме и спросить про дачу").
+
+Each task has the same fields:
+1. description - what to do/remember, with all details about time/place of the event.
+2. title - 2-3 word summary in Russian, no longer than {MAX_TITLE_LENGTH} characters, no quotes.
+3. reminder_text - the part of text that says when user wants to be notified, or null.
+4. reminder_datetime_utc - reminder_text converted to UTC (YYYY-MM-DDTHH:MM:SSZ), or null if no reminder.
+   Always include specific time. Defaults: "утром" = 09:00, "днем" = 12:00, "вечером" = 18:00,
+   "ночью" = 21:00, no time specified = 12:00 (user timezone, then convert to UTC).
+5. is_recurring - true only for repeating tasks ("каждый понедельник", "ежедневно", "по пятницам").
+6. recurrence_rule - RRULE string (RFC 5545, without "RRULE:" prefix) if is_recurring, otherwise null.
+
+Example:
+1. купить хлеб
+2. и молоко
+3. и позвонить маме завтра в 10
+→
+{{"tasks": [
+{{"description": "купить хлеб", "title": "Купить хлеб", "reminder_text": null, "reminder_datetime_utc": null, "is_recurring": false, "recurrence_rule": null}},
+{{"description": "купить молоко", "title": "Купить молоко", "reminder_text": null, "reminder_datetime_utc": null, "is_recurring": false, "recurrence_rule": null}},
+{{"description": "позвонить маме", "title": "Позвонить маме", "reminder_text": "завтра в 10", "reminder_datetime_utc": "2025-01-16T07:00:00Z", "is_recurring": false, "recurrence_rule": null}}
+]}}
+
+Return only JSON.
+"""
@@ -0,0 +1,271 @@
+# src/llm/request_scheduler.py
+
+import asyncio
+import contextvars
+import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Приоритеты (меньше - важнее)
+PRIORITY_INTERACTIVE = 0   # Определение интента и то, чего пользователь ждет прямо сейчас
+PRIORITY_NORMAL = 1        # Остальные стадии разбора сообщения
+PRIORITY_BACKGROUND = 2    # Заголовки, фоновое уточнение задач, теневые проверки, бэкфиллы
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_NORMAL: "normal",
+    PRIORITY_BACKGROUND: "background",
+}
+
+# Контекст запроса: пользователь (для справедливой очереди) и принудительный приоритет
+current_llm_user: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar("current_llm_user", default=None)
+current_llm_priority: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar("current_llm_priority", default=None)
+
+# Сколько токенов резервируем под ответ модели при оценке запроса
+OUTPUT_TOKENS_RESERVE = 256
+WAIT_SAMPLES = 500
+
+
+@contextmanager
+def llm_request_context(user_id: Optional[int] = None, priority: Optional[int] = None):
+    """
+    Задает пользователя и/или приоритет для всех вызовов LLM внутри блока
+    (включая asyncio-задачи, созданные внутри него).
+    """
+    user_token = current_llm_user.set(user_id) if user_id is not None else None
+    priority_token = current_llm_priority.set(priority) if priority is not None else None
+    try:
+        yield
+    finally:
+        if priority_token is not None:
+            current_llm_priority.reset(priority_token)
+        if user_token is not None:
+            current_llm_user.reset(user_token)
+
+
+def estimate_tokens(prompt: str) -> int:
+    """Грубая оценка токенов запроса (~4 символа на токен) плюс резерв под ответ."""
+    return len(prompt) // 4 + OUTPUT_TOKENS_RESERVE
+
+
+class TokenBucket:
+    """Token bucket с пополнением rate_per_minute единиц в минуту (0 - без ограничения)."""
+
+    def __init__(self, rate_per_minute: int):
+        self.rate_per_minute = rate_per_minute
+        self.capacity = float(rate_per_minute)
+        self.tokens = float(rate_per_minute)
+        self.updated_at = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.rate_per_minute <= 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate_per_minute / 60)
+        self.updated_at = now
+
+    def delay_for(self, amount: float) -> float:
+        """Сколько секунд ждать, пока в ведре накопится amount единиц."""
+        if self.unlimited:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) * 60 / self.rate_per_minute
+
+    def consume(self, amount: float) -> None:
+        if not self.unlimited:
+            self._refill()
+            self.tokens -= min(amount, self.capacity)
+
+    def drain(self) -> None:
+        """Опустошает ведро (после ошибки квоты у провайдера)."""
+        if not self.unlimited:
+            self.tokens = 0.0
+            self.updated_at = time.monotonic()
+
+
+class LLMRequestScheduler:
+    """
+    Единая точка отправки запросов к LLM.
+
+    - не больше max_concurrency запросов одновременно;
+    - token buckets на запросы в минуту (RPM) и токены в минуту (TPM);
+    - очереди по приоритетам: interactive обслуживается раньше normal и background;
+    - внутри приоритета пользователи обслуживаются по кругу (round-robin),
+      чтобы один активный пользователь не занимал всю очередь.
+    """
+
+    def __init__(self, max_concurrency: int = 8, requests_per_minute: int = 0, tokens_per_minute: int = 0):
+        self.max_concurrency = max_concurrency
+        self.rpm_bucket = TokenBucket(requests_per_minute)
+        self.tpm_bucket = TokenBucket(tokens_per_minute)
+        # priority -> OrderedDict(user_key -> deque ожидающих)
+        self._lanes: Dict[int, "OrderedDict[Any, Deque[Dict[str, Any]]]"] = {
+            priority: OrderedDict() for priority in PRIORITY_NAMES
+        }
+        self._active = 0
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+        self._wait_samples: Dict[int, Deque[float]] = {
+            priority: deque(maxlen=WAIT_SAMPLES) for priority in PRIORITY_NAMES
+        }
+        self.stats = {
+            "submitted": 0, "completed": 0, "failed": 0, "cancelled": 0, "quota_errors": 0, "extra_reserved": 0
+        }
+
+    async def run(
+        self,
+        request_factory: Callable[[], Awaitable[T]],
+        priority: int = PRIORITY_NORMAL,
+        estimated_tokens: int = OUTPUT_TOKENS_RESERVE,
+        user_id: Optional[int] = None
+    ) -> T:
+        """
+        Дожидается своей очереди и выполняет запрос.
+
+        Args:
+            request_factory: Функция без аргументов, создающая корутину запроса.
+            priority: Приоритет (переопределяется current_llm_priority, если он задан).
+            estimated_tokens: Оценка токенов запроса для TPM-лимита.
+            user_id: Пользователь (по умолчанию берется из current_llm_user).
+        """
+        override = current_llm_priority.get()
+        if override is not None:
+            priority = override
+        user_key = user_id if user_id is not None else current_llm_user.get()
+
+        await self._acquire(priority, user_key, estimated_tokens)
+        try:
+            result = await request_factory()
+            self.stats["completed"] += 1
+            return result
+        except Exception as e:
+            self.stats["failed"] += 1
+            if _is_quota_error(e):
+                # Провайдер уже отказал по квоте - притормаживаем все следующие запросы
+                self.stats["quota_errors"] += 1
+                self.rpm_bucket.drain()
+                logger.warning(f"LLM quota error, throttling further requests: {e}")
+            raise
+        finally:
+            self._active -= 1
+            self._dispatch()
+
+    async def _acquire(self, priority: int, user_key: Any, tokens: int) -> None:
+        loop = asyncio.get_running_loop()
+        waiter = {"future": loop.create_future(), "tokens": tokens, "enqueued_at": time.monotonic()}
+        self._lanes[priority].setdefault(user_key, deque()).append(waiter)
+        self.stats["submitted"] += 1
+        self._dispatch()
+
+        try:
+            await waiter["future"]
+        except asyncio.CancelledError:
+            if waiter["future"].done() and not waiter["future"].cancelled():
+                # Слот уже выдан, но запрос отменили - освобождаем его
+                self._active -= 1
+                self._dispatch()
+            else:
+                self._remove_waiter(priority, user_key, waiter)
+            self.stats["cancelled"] += 1
+            raise
+
+        wait_seconds = time.monotonic() - waiter["enqueued_at"]
+        self._wait_samples[priority].append(wait_seconds)
+        if wait_seconds > 1.0:
+            logger.info(f"LLM request waited {wait_seconds:.2f}s in '{PRIORITY_NAMES[priority]}' queue "
+                        f"(user {user_key})")
+
+    def _remove_waiter(self, priority: int, user_key: Any, waiter: Dict[str, Any]) -> None:
+        user_queue = self._lanes[priority].get(user_key)
+        if user_queue and waiter in user_queue:
+            user_queue.remove(waiter)
+            if not user_queue:
+                del self._lanes[priority][user_key]
+
+    def _peek_next(self):
+        for priority in sorted(self._lanes):
+            lane = self._lanes[priority]
+            if lane:
+                user_key, user_queue = next(iter(lane.items()))
+                return priority, user_key, user_queue[0]
+        return None
+
+    def _dispatch(self) -> None:
+        while self._active < self.max_concurrency:
+            candidate = self._peek_next()
+            if candidate is None:
+                return
+            priority, user_key, waiter = candidate
+
+            delay = max(self.rpm_bucket.delay_for(1), self.tpm_bucket.delay_for(waiter["tokens"]))
+            if delay > 0:
+                if self._wakeup is None:
+                    loop = asyncio.get_running_loop()
+                    self._wakeup = loop.call_later(delay, self._on_wakeup)
+                return
+
+            lane = self._lanes[priority]
+            user_queue = lane[user_key]
+            user_queue.popleft()
+            # Round-robin: пользователь уходит в конец очереди своего приоритета
+            del lane[user_key]
+            if user_queue:
+                lane[user_key] = user_queue
+
+            self.rpm_bucket.consume(1)
+            self.tpm_bucket.consume(waiter["tokens"])
+            self._active += 1
+            waiter["future"].set_result(True)
+
+    def queue_depth(self, max_priority: int = PRIORITY_NORMAL) -> int:
+        """Сколько запросов ждет в очередях с приоритетом не ниже max_priority."""
+        return sum(
+            len(user_queue)
+            for priority, lane in self._lanes.items() if priority <= max_priority
+            for user_queue in lane.values()
+        )
+
+    def try_reserve_quota(self, tokens: int) -> bool:
+        """
+        Резервирует квоту RPM/TPM под дополнительный запрос вне очереди (дубль при hedging).
+        Возвращает False, если квоты сейчас нет - дополнительный запрос не отправляется.
+        """
+        if self.rpm_bucket.delay_for(1) > 0 or self.tpm_bucket.delay_for(tokens) > 0:
+            return False
+        self.rpm_bucket.consume(1)
+        self.tpm_bucket.consume(tokens)
+        self.stats["extra_reserved"] += 1
+        return True
+
+    def _on_wakeup(self) -> None:
+        self._wakeup = None
+        self._dispatch()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Метрики: глубина очередей, активные запросы и время ожидания по приоритетам."""
+        stats: Dict[str, Any] = dict(self.stats)
+        stats["active"] = self._active
+        stats["max_concurrency"] = self.max_concurrency
+        for priority, name in PRIORITY_NAMES.items():
+            lane = self._lanes[priority]
+            samples = sorted(self._wait_samples[priority])
+            stats[f"queue_depth_{name}"] = sum(len(user_queue) for user_queue in lane.values())
+            stats[f"queued_users_{name}"] = len(lane)
+            stats[f"wait_p50_{name}"] = round(samples[len(samples) // 2], 3) if samples else 0.0
+            stats[f"wait_p95_{name}"] = round(samples[int(len(samples) * 0.95)], 3) if samples else 0.0
+            stats[f"wait_max_{name}"] = round(samples[-1], 3) if samples else 0.0
+        return stats
+
+
+def _is_quota_error(error: Exception) -> bool:
+    # google.api_core.exceptions.ResourceExhausted (HTTP 429)
+    return type(error).__name__ == "ResourceExhausted" or "429" in str(error)
@@ -0,0 +1,133 @@
+# src/llm/task_encoding.py
+
+import datetime
+import logging
+import math
+from typing import Optional, Dict, Any, List, Tuple
+
+import pendulum
+
+logger = logging.getLogger(__name__)
+
+# Консервативная оценка для смешанного русского/английского текста
+CHARS_PER_TOKEN = 3.0
+
+WEEKDAY_ABBREVIATIONS = ["пн", "вт", "ср", "чт", "пт", "сб", "вс"]
+
+# Шапка таблицы задач в промпте (формат описан в TASK_SEARCH_WITH_CONTEXT_PROMPT_TEMPLATE)
+TASK_TABLE_HEADER = "id|заголовок|описание|напоминание|флаги"
+
+
+def estimate_text_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _clean(text: Optional[str]) -> str:
+    """Убирает переводы строк и разделитель колонок."""
+    if not text:
+        return ""
+    return " ".join(text.replace("|", "/").split())
+
+
+def _clip(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars - 1].rstrip() + "…"
+
+
+def format_relative_reminder(
+    reminder_at: Optional[datetime.datetime],
+    now_local: pendulum.DateTime
+) -> str:
+    """
+    Время напоминания относительно текущего дня пользователя: "0д 18:00" (сегодня),
+    "+1д пт 09:00" (завтра, пятница), "-3д 10:00" (просрочено). Пустая строка, если напоминания нет.
+    """
+    if not reminder_at:
+        return ""
+    reminder_local = pendulum.instance(reminder_at).in_timezone(now_local.timezone)
+    day_offset = (reminder_local.date() - now_local.date()).days
+    offset_text = f"+{day_offset}д" if day_offset > 0 else f"{day_offset}д"
+    if 0 < day_offset <= 13:
+        # Для ближайших двух недель добавляем день недели ("в пятницу", "на следующей неделе")
+        offset_text += f" {WEEKDAY_ABBREVIATIONS[reminder_local.weekday()]}"
+    return f"{offset_text} {reminder_local.format('HH:mm')}"
+
+
+def encode_task_line(task: Dict[str, Any], now_local: pendulum.DateTime, description_chars: int) -> str:
+    """
+    Одна задача -> строка таблицы "id|заголовок|описание|напоминание|флаги".
+    Описание, совпадающее с заголовком, не дублируется.
+    """
+    title = _clean(task.get("title"))
+    description = _clean(task.get("description"))
+    if title and description.casefold() == title.casefold():
+        description = ""
+    flags = ""
+    if task.get("status") == "done":
+        flags += "D"
+    if task.get("is_repeating"):
+        flags += "R"
+    reminder = format_relative_reminder(task.get("next_reminder_at"), now_local)
+    return f"{task['id']}|{_clip(title, 60)}|{_clip(description, description_chars)}|{reminder}|{flags}"
+
+
+def shard_tasks_compact(
+    tasks: List[Dict[str, Any]],
+    now_local: pendulum.DateTime,
+    token_budget: int,
+    description_chars: int = 80,
+    max_shards: Optional[int] = None
+) -> List[Tuple[str, List[int]]]:
+    """
+    Разбивает задачи на таблицы для промпта поиска, каждая не больше token_budget токенов.
+
+    Args:
+        tasks: Задачи в порядке приоритета (dict с id, title, description, status,
+               next_reminder_at, is_repeating).
+        now_local: Текущее время в часовом поясе пользователя.
+        token_budget: Бюджет токенов на одну таблицу.
+        description_chars: Максимальная длина описания в строке.
+        max_shards: Максимум таблиц (None - без ограничения); не вошедшие задачи отбрасываются.
+
+    Returns:
+        Список (текст таблицы, id вошедших в нее задач).
+    """
+    header_tokens = estimate_text_tokens(TASK_TABLE_HEADER) + 1
+    shards: List[Tuple[str, List[int]]] = []
+    lines, task_ids, used_tokens = [TASK_TABLE_HEADER], [], header_tokens
+
+    for task in tasks:
+        line = encode_task_line(task, now_local, description_chars)
+        line_tokens = estimate_text_tokens(line) + 1  # +1 за перевод строки
+        if task_ids and used_tokens + line_tokens > token_budget:
+            shards.append(("\n".join(lines), task_ids))
+            lines, task_ids, used_tokens = [TASK_TABLE_HEADER], [], header_tokens
+            if max_shards is not None and len(shards) >= max_shards:
+                break
+        lines.append(line)
+        task_ids.append(task["id"])
+        used_tokens += line_tokens
+
+    if task_ids:
+        shards.append(("\n".join(lines), task_ids))
+    return shards
+
+
+def encode_tasks_compact(
+    tasks: List[Dict[str, Any]],
+    now_local: pendulum.DateTime,
+    token_budget: int,
+    description_chars: int = 80
+) -> Tuple[str, int]:
+    """
+    Упаковывает задачи в одну таблицу для промпта поиска, пока не кончится бюджет токенов.
+
+    Returns:
+        (текст таблицы, количество вошедших задач)
+    """
+    shards = shard_tasks_compact(tasks, now_local, token_budget, description_chars, max_shards=1)
+    if not shards:
+        return TASK_TABLE_HEADER, 0
+    tasks_table, task_ids = shards[0]
+    return tasks_table, len(task_ids)
@@ -0,0 +1,198 @@
+# src/llm/telemetry.py
+
+import datetime
+import logging
+from collections import Counter
+from typing import Optional, Dict, Any, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Границы бакетов гистограммы задержек (секунды), как в Prometheus
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0, 30.0)
+
+USAGE_FIELDS = ("calls", "prompt_tokens", "output_tokens", "latency_ms", "errors", "blocked", "json_failures")
+
+
+def _empty_prompt_stats() -> Dict[str, Any]:
+    return {
+        "calls": 0,
+        "cache_hits": 0,
+        "errors": 0,
+        "blocked": 0,
+        "json_failures": 0,
+        "prompt_tokens": 0,
+        "output_tokens": 0,
+        "latency_sum": 0.0,
+        # Время до решения: когда из потока получен завершенный JSON (для непотоковых = latency)
+        "decision_sum": 0.0,
+        "early_stops": 0,
+        "latency_buckets": [0] * (len(LATENCY_BUCKETS) + 1),  # последний - +Inf
+        "finish_reasons": Counter(),
+    }
+
+
+class LLMTelemetry:
+    """
+    Счетчики и гистограммы по вызовам LLM в разрезе шаблонов промптов,
+    плюс суточные итоги по пользователям, которые периодически сбрасываются в БД.
+    """
+
+    def __init__(self):
+        self.prompts: Dict[str, Dict[str, Any]] = {}
+        # (user_telegram_id, дата UTC) -> счетчики, еще не записанные в БД
+        self._pending_usage: Dict[Tuple[int, datetime.date], Dict[str, int]] = {}
+
+    def _prompt(self, prompt_name: str) -> Dict[str, Any]:
+        return self.prompts.setdefault(prompt_name, _empty_prompt_stats())
+
+    def _usage(self, user_id: Optional[int]) -> Dict[str, int]:
+        key = (user_id or 0, datetime.datetime.now(datetime.timezone.utc).date())
+        return self._pending_usage.setdefault(key, {field: 0 for field in USAGE_FIELDS})
+
+    def record_call(
+        self,
+        prompt_name: str,
+        latency: float,
+        user_id: Optional[int] = None,
+        prompt_tokens: int = 0,
+        output_tokens: int = 0,
+        finish_reason: Optional[str] = None,
+        blocked: bool = False,
+        error: bool = False,
+        time_to_decision: Optional[float] = None
+    ) -> None:
+        """Учитывает один запрос к модели (кеш-хиты сюда не попадают)."""
+        stats = self._prompt(prompt_name)
+        stats["calls"] += 1
+        stats["errors"] += int(error)
+        stats["blocked"] += int(blocked)
+        stats["prompt_tokens"] += prompt_tokens
+        stats["output_tokens"] += output_tokens
+        stats["latency_sum"] += latency
+        stats["decision_sum"] += time_to_decision if time_to_decision is not None else latency
+        bucket_index = next(
+            (index for index, bound in enumerate(LATENCY_BUCKETS) if latency <= bound), len(LATENCY_BUCKETS)
+        )
+        stats["latency_buckets"][bucket_index] += 1
+        if finish_reason:
+            stats["finish_reasons"][finish_reason] += 1
+
+        usage = self._usage(user_id)
+        usage["calls"] += 1
+        usage["prompt_tokens"] += prompt_tokens
+        usage["output_tokens"] += output_tokens
+        usage["latency_ms"] += int(latency * 1000)
+        usage["errors"] += int(error)
+        usage["blocked"] += int(blocked)
+
+    def record_cache_hit(self, prompt_name: str) -> None:
+        self._prompt(prompt_name)["cache_hits"] += 1
+
+    def record_early_stop(self, prompt_name: str) -> None:
+        """Поток ответа закрыт досрочно, как только JSON был получен целиком."""
+        self._prompt(prompt_name)["early_stops"] += 1
+
+    def record_json_failure(self, prompt_name: str, user_id: Optional[int] = None) -> None:
+        """Ответ модели не удалось разобрать как JSON."""
+        self._prompt(prompt_name)["json_failures"] += 1
+        self._usage(user_id)["json_failures"] += 1
+
+    def latency_quantile(self, prompt_name: str, quantile: float) -> Optional[float]:
+        """Оценка квантиля задержки по гистограмме (верхняя граница бакета)."""
+        stats = self.prompts.get(prompt_name)
+        if not stats or not stats["calls"]:
+            return None
+        target = quantile * stats["calls"]
+        cumulative = 0
+        for index, count in enumerate(stats["latency_buckets"]):
+            cumulative += count
+            if cumulative >= target:
+                return LATENCY_BUCKETS[index] if index < len(LATENCY_BUCKETS) else float("inf")
+        return float("inf")
+
+    def get_summary(self) -> List[Dict[str, Any]]:
+        """Сводка по промптам, отсортированная по суммарному времени."""
+        summary = []
+        for prompt_name, stats in self.prompts.items():
+            calls = stats["calls"]
+            summary.append({
+                "prompt": prompt_name,
+                "calls": calls,
+                "cache_hits": stats["cache_hits"],
+                "avg_latency": round(stats["latency_sum"] / calls, 3) if calls else 0.0,
+                "p90_latency": self.latency_quantile(prompt_name, 0.9),
+                "avg_decision": round(stats["decision_sum"] / calls, 3) if calls else 0.0,
+                "early_stops": stats["early_stops"],
+                "total_latency": round(stats["latency_sum"], 1),
+                "prompt_tokens": stats["prompt_tokens"],
+                "output_tokens": stats["output_tokens"],
+                "errors": stats["errors"],
+                "blocked": stats["blocked"],
+                "json_failures": stats["json_failures"],
+                "finish_reasons": dict(stats["finish_reasons"]),
+            })
+        return sorted(summary, key=lambda item: item["total_latency"], reverse=True)
+
+    def render_prometheus(self) -> str:
+        """Метрики в текстовом формате Prometheus."""
+        lines = [
+            "# TYPE llm_request_duration_seconds histogram",
+        ]
+        for prompt_name, stats in sorted(self.prompts.items()):
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, stats["latency_buckets"]):
+                cumulative += count
+                lines.append(f'llm_request_duration_seconds_bucket{{prompt="{prompt_name}",le="{bound}"}} {cumulative}')
+            lines.append(f'llm_request_duration_seconds_bucket{{prompt="{prompt_name}",le="+Inf"}} {stats["calls"]}')
+            lines.append(f'llm_request_duration_seconds_sum{{prompt="{prompt_name}"}} {stats["latency_sum"]:.3f}')
+            lines.append(f'llm_request_duration_seconds_count{{prompt="{prompt_name}"}} {stats["calls"]}')
+
+        lines.append("# TYPE llm_time_to_decision_seconds summary")
+        for prompt_name, stats in sorted(self.prompts.items()):
+            lines.append(f'llm_time_to_decision_seconds_sum{{prompt="{prompt_name}"}} {stats["decision_sum"]:.3f}')
+            lines.append(f'llm_time_to_decision_seconds_count{{prompt="{prompt_name}"}} {stats["calls"]}')
+
+        counters = (
+            ("llm_cache_hits_total", "cache_hits"),
+            ("llm_errors_total", "errors"),
+            ("llm_blocked_total", "blocked"),
+            ("llm_json_failures_total", "json_failures"),
+            ("llm_stream_early_stops_total", "early_stops"),
+        )
+        for metric_name, field in counters:
+            lines.append(f"# TYPE {metric_name} counter")
+            for prompt_name, stats in sorted(self.prompts.items()):
+                lines.append(f'{metric_name}{{prompt="{prompt_name}"}} {stats[field]}')
+
+        lines.append("# TYPE llm_tokens_total counter")
+        for prompt_name, stats in sorted(self.prompts.items()):
+            lines.append(f'llm_tokens_total{{prompt="{prompt_name}",kind="prompt"}} {stats["prompt_tokens"]}')
+            lines.append(f'llm_tokens_total{{prompt="{prompt_name}",kind="output"}} {stats["output_tokens"]}')
+
+        lines.append("# TYPE llm_finish_reason_total counter")
+        for prompt_name, stats in sorted(self.prompts.items()):
+            for reason, count in sorted(stats["finish_reasons"].items()):
+                lines.append(f'llm_finish_reason_total{{prompt="{prompt_name}",reason="{reason}"}} {count}')
+
+        return "\n".join(lines) + "\n"
+
+    def take_pending_usage(self) -> List[Dict[str, Any]]:
+        """Забирает накопленные суточные итоги (для записи в БД)."""
+        rows = [
+            {"user_telegram_id": user_id, "usage_date": usage_date, **counters}
+            for (user_id, usage_date), counters in self._pending_usage.items()
+        ]
+        self._pending_usage = {}
+        return rows
+
+    def restore_pending_usage(self, rows: List[Dict[str, Any]]) -> None:
+        """Возвращает итоги обратно, если запись в БД не удалась."""
+        for row in rows:
+            key = (row["user_telegram_id"], row["usage_date"])
+            usage = self._pending_usage.setdefault(key, {field: 0 for field in USAGE_FIELDS})
+            for field in USAGE_FIELDS:
+                usage[field] += row[field]
+
+
+llm_telemetry = LLMTelemetry()
+
@@ -0,0 +1,88 @@
+# src/metrics_server.py
+
+import logging
+from typing import Optional, Dict, Any, List
+
+from aiohttp import web
+
+from src.config import settings
+from src.llm.gemini_client import (
+    llm_cache, llm_scheduler, llm_hedger, llm_breaker, degraded_mode_stats, intent_batcher
+)
+from src.llm.model_profiles import model_profiles
+from src.llm.telemetry import llm_telemetry
+from src.scheduler.enrichment import enrichment_queue
+from src.utils.date_parser import get_local_parser_stats
+from src.utils.intent_classifier import get_intent_classifier_stats
+from src.utils.message_burst import message_bursts
+from src.utils.query_planner import get_query_planner_stats
+from src.utils.recurrence import get_recurrence_stats
+from src.utils.title_generator import get_title_generator_stats
+from src.utils.task_vector_index import task_vector_index
+from src.utils.timezone_index import get_timezone_index_stats
+
+logger = logging.getLogger(__name__)
+
+_runner: Optional[web.AppRunner] = None
+
+
+def _render_gauges(metric_prefix: str, stats: Dict[str, Any], labels: str = "") -> List[str]:
+    """Числовые поля словаря статистики -> строки метрик Prometheus."""
+    lines = []
+    for name, value in stats.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        lines.append(f"{metric_prefix}_{name}{{{labels}}} {value}" if labels else f"{metric_prefix}_{name} {value}")
+    return lines
+
+
+def render_metrics() -> str:
+    """Собирает метрики всех компонентов LLM-пайплайна."""
+    lines = [llm_telemetry.render_prometheus().rstrip("\n")]
+    lines += _render_gauges("llm_cache", llm_cache.get_stats())
+    lines += _render_gauges("llm_scheduler", llm_scheduler.get_stats())
+    lines += _render_gauges("llm_circuit_breaker", llm_breaker.get_stats())
+    lines += _render_gauges("llm_degraded_messages", degraded_mode_stats)
+    lines += _render_gauges("llm_intent_batcher", intent_batcher.get_stats())
+    lines += _render_gauges("enrichment_queue", enrichment_queue.get_stats())
+    lines += _render_gauges("message_bursts", message_bursts.get_stats())
+    lines += _render_gauges("local_time_parser", get_local_parser_stats())
+    lines += _render_gauges("local_recurrence", get_recurrence_stats())
+    lines += _render_gauges("local_title_generator", get_title_generator_stats())
+    lines += _render_gauges("timezone_index", get_timezone_index_stats())
+    lines += _render_gauges("task_query_planner", get_query_planner_stats())
+    lines += _render_gauges("task_vector_index", task_vector_index.get_stats())
+    for profile_name, stats in model_profiles.get_stats().items():
+        lines += _render_gauges("llm_model_profile", stats,
+                                labels=f'profile="{profile_name}",model="{stats["model"]}"')
+    for prompt_name, stats in llm_hedger.get_stats().items():
+        lines += _render_gauges("llm_hedge", stats, labels=f'prompt="{prompt_name}"')
+    for intent, stats in get_intent_classifier_stats().items():
+        lines += _render_gauges("local_intent", stats, labels=f'intent="{intent}"')
+    return "\n".join(lines) + "\n"
+
+
+async def _handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(text=render_metrics(), content_type="text/plain", charset="utf-8")
+
+
+async def start_metrics_server() -> None:
+    """Запускает HTTP-эндпоинт /metrics, если задан settings.metrics_port."""
+    global _runner
+    if not settings.metrics_port or _runner is not None:
+        return
+    app = web.Application()
+    app.router.add_get("/metrics", _handle_metrics)
+    _runner = web.AppRunner(app)
+    await _runner.setup()
+    await web.TCPSite(_runner, port=settings.metrics_port).start()
+    logger.info(f"Metrics endpoint started on port {settings.metrics_port}.")
+
+
+async def stop_metrics_server() -> None:
+    global _runner
+    if _runner is None:
+        return
+    await _runner.cleanup()
+    _runner = None
+    logger.info("Metrics endpoint stopped.")
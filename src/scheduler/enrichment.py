@@ -0,0 +1,302 @@
+# src/scheduler/enrichment.py
+
+import asyncio
+import logging
+from typing import Optional, Dict, Any, List
+
+import pendulum
+from aiogram import Bot
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.config import settings
+from src.database.crud import apply_task_enrichment, get_task_by_id, get_user_by_telegram_id
+from src.llm.request_scheduler import llm_request_context, PRIORITY_BACKGROUND
+from src.tgbot import responses
+from src.utils.title_generator import truncate_title
+
+logger = logging.getLogger(__name__)
+
+ENRICHMENT_PENDING_FOOTER = "⏳ Уточняю детали задачи..."
+
+
+class EnrichmentQueue:
+    """
+    Очередь фонового уточнения оптимистично созданных задач.
+
+    Задача сохраняется сразу с исходным текстом, а заголовок, время напоминания и RRULE
+    дописываются воркерами после разбора LLM; затем редактируется сообщение-подтверждение.
+    Количество одновременных разборов ограничено числом воркеров, неудачи повторяются с backoff.
+
+    Второй вид заданий - замена локального заголовка задачи заголовком от LLM (llm_title_upgrade).
+    """
+
+    def __init__(self, max_concurrency: int = 4, max_retries: int = 3, retry_base_delay: float = 2.0):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.bot: Optional[Bot] = None
+        self.session_pool: Optional[async_sessionmaker[AsyncSession]] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._retry_timers: set = set()
+        self.stats = {
+            "enqueued": 0, "enriched": 0, "retried": 0, "failed": 0,
+            "title_upgrades": 0,        # Заголовок от LLM заменил локальный
+            "title_upgrades_skipped": 0 # LLM вернула тот же заголовок или пользователь уже переименовал задачу
+        }
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._workers)
+
+    def start(self, bot: Bot, session_pool: async_sessionmaker[AsyncSession]) -> None:
+        """Запускает воркеры (вызывается при старте бота)."""
+        if self.is_running:
+            logger.warning("Enrichment queue is already running.")
+            return
+        self.bot = bot
+        self.session_pool = session_pool
+        self._queue = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._worker(index), name=f"enrichment-worker-{index}")
+            for index in range(self.max_concurrency)
+        ]
+        logger.info(f"Enrichment queue started with {self.max_concurrency} workers.")
+
+    async def stop(self) -> None:
+        """Останавливает воркеры. Незавершенные задачи остаются с исходным текстом."""
+        for timer in list(self._retry_timers):
+            timer.cancel()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._queue and not self._queue.empty():
+            logger.warning(f"Enrichment queue stopped with {self._queue.qsize()} pending jobs.")
+        logger.info("Enrichment queue stopped.")
+
+    def enqueue(
+        self,
+        task_id: int,
+        user_telegram_id: int,
+        user_text: str,
+        user_timezone: str,
+        chat_id: int,
+        message_id: Optional[int],
+        provisional_title: Optional[str] = None
+    ) -> bool:
+        """
+        Ставит задачу в очередь уточнения. provisional_title - заголовок, с которым задача сохранена:
+        заголовок от LLM заменит его, только если пользователь не переименовал задачу.
+        Возвращает False, если очередь не запущена.
+        """
+        if not self.is_running:
+            logger.error(f"Enrichment queue is not running, task {task_id} stays unenriched.")
+            return False
+        job = {
+            "kind": "enrich",
+            "task_id": task_id,
+            "user_telegram_id": user_telegram_id,
+            "user_text": user_text,
+            "user_timezone": user_timezone,
+            "chat_id": chat_id,
+            "message_id": message_id,
+            "provisional_title": provisional_title,
+            "attempt": 0,
+        }
+        self._queue.put_nowait(job)
+        self.stats["enqueued"] += 1
+        logger.debug(f"Task {task_id} enqueued for enrichment (queue size {self._queue.qsize()})")
+        return True
+
+    def enqueue_title_upgrade(
+        self,
+        task_id: int,
+        user_telegram_id: int,
+        description: str,
+        local_title: str,
+        chat_id: int,
+        message_id: Optional[int]
+    ) -> bool:
+        """
+        Ставит в очередь замену локального заголовка заголовком от LLM.
+        Возвращает False, если очередь не запущена (задача остается с локальным заголовком).
+        """
+        if not self.is_running:
+            logger.debug(f"Enrichment queue is not running, task {task_id} keeps local title.")
+            return False
+        job = {
+            "kind": "title",
+            "task_id": task_id,
+            "user_telegram_id": user_telegram_id,
+            "description": description,
+            "local_title": local_title,
+            "chat_id": chat_id,
+            "message_id": message_id,
+            "attempt": 0,
+        }
+        self._queue.put_nowait(job)
+        self.stats["enqueued"] += 1
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = dict(self.stats)
+        stats["queue_size"] = self._queue.qsize() if self._queue else 0
+        return stats
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._process_job(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Enrichment of task {job['task_id']} failed (attempt {job['attempt'] + 1}): {e}",
+                             exc_info=True)
+                self._schedule_retry(job)
+            finally:
+                self._queue.task_done()
+
+    def _schedule_retry(self, job: Dict[str, Any]) -> None:
+        job["attempt"] += 1
+        if job["attempt"] > self.max_retries:
+            self.stats["failed"] += 1
+            logger.error(f"Giving up enrichment of task {job['task_id']} after {self.max_retries} retries.")
+            if job["kind"] == "title":
+                # Задача остается с локальным заголовком, подтверждение уже окончательное
+                return
+            timer = asyncio.create_task(self._finalize_message(job))
+        else:
+            self.stats["retried"] += 1
+            delay = self.retry_base_delay * 2 ** (job["attempt"] - 1)
+            timer = asyncio.create_task(self._requeue_later(job, delay))
+        self._retry_timers.add(timer)
+        timer.add_done_callback(self._retry_timers.discard)
+
+    async def _requeue_later(self, job: Dict[str, Any], delay: float) -> None:
+        await asyncio.sleep(delay)
+        self._queue.put_nowait(job)
+
+    async def _process_job(self, job: Dict[str, Any]) -> None:
+        if job["kind"] == "title":
+            await self._process_title_job(job)
+            return
+
+        # Импорт внутри метода: gemini_client тяжелый и нужен только воркерам
+        from src.llm.gemini_client import process_add_task_fields
+
+        with llm_request_context(user_id=job["user_telegram_id"]):
+            result = await process_add_task_fields(job["user_text"], job["user_timezone"])
+        status = result.get("status")
+        if status == "clarification_needed":
+            # Уточнять нечего - оставляем задачу как есть
+            await self._finalize_message(job)
+            return
+        if status != "success":
+            raise RuntimeError(result.get("message", f"LLM status '{status}'"))
+
+        params = result.get("params", {})
+        next_reminder_at = None
+        if params.get("parsed_reminder_utc"):
+            next_reminder_at = pendulum.parse(params["parsed_reminder_utc"])
+
+        async with self.session_pool() as session:
+            task = await apply_task_enrichment(
+                session=session,
+                task_id=job["task_id"],
+                expected_description=job["user_text"],
+                description=params.get("description"),
+                title=params.get("title"),
+                original_due_text=params.get("due_date_time_text"),
+                is_repeating=params.get("is_repeating", False),
+                recurrence_rule=params.get("recurrence_rule"),
+                next_reminder_at=next_reminder_at,
+                expected_title=job["provisional_title"]
+            )
+            if task is None:
+                return
+            user = await get_user_by_telegram_id(session, job["user_telegram_id"])
+
+        self.stats["enriched"] += 1
+        if user and job["message_id"]:
+            await responses.edit_task_operation_confirmation(
+                bot=self.bot,
+                chat_id=job["chat_id"],
+                message_id=job["message_id"],
+                action_title="Задача добавлена",
+                task=task,
+                user=user
+            )
+        if settings.llm_title_upgrade and task.title:
+            self.enqueue_title_upgrade(
+                task_id=task.task_id,
+                user_telegram_id=job["user_telegram_id"],
+                description=task.description,
+                local_title=task.title,
+                chat_id=job["chat_id"],
+                message_id=job["message_id"]
+            )
+
+    async def _process_title_job(self, job: Dict[str, Any]) -> None:
+        from src.llm.gemini_client import generate_title_with_llm
+
+        with llm_request_context(user_id=job["user_telegram_id"], priority=PRIORITY_BACKGROUND):
+            title = await generate_title_with_llm(job["description"])
+        # Лимит 21 символ, как у локального заголовка: апгрейд не должен его удлинять
+        title = truncate_title(title.strip().strip('"')) if title else None
+        if not title:
+            raise RuntimeError("LLM returned no title")
+        if title == job["local_title"]:
+            self.stats["title_upgrades_skipped"] += 1
+            return
+
+        async with self.session_pool() as session:
+            task = await apply_task_enrichment(
+                session=session,
+                task_id=job["task_id"],
+                expected_description=job["description"],
+                title=title,
+                expected_title=job["local_title"]
+            )
+            if task is None or task.title != title:
+                self.stats["title_upgrades_skipped"] += 1
+                return
+            user = await get_user_by_telegram_id(session, job["user_telegram_id"])
+
+        self.stats["title_upgrades"] += 1
+        if user and job["message_id"]:
+            await responses.edit_task_operation_confirmation(
+                bot=self.bot,
+                chat_id=job["chat_id"],
+                message_id=job["message_id"],
+                action_title="Задача добавлена",
+                task=task,
+                user=user
+            )
+
+    async def _finalize_message(self, job: Dict[str, Any]) -> None:
+        """Убирает из подтверждения строку "уточняю детали", когда уточнение невозможно."""
+        if not job["message_id"]:
+            return
+        try:
+            async with self.session_pool() as session:
+                task = await get_task_by_id(session, job["task_id"])
+                user = await get_user_by_telegram_id(session, job["user_telegram_id"])
+            if task and user:
+                await responses.edit_task_operation_confirmation(
+                    bot=self.bot,
+                    chat_id=job["chat_id"],
+                    message_id=job["message_id"],
+                    action_title="Задача добавлена",
+                    task=task,
+                    user=user
+                )
+        except Exception as e:
+            logger.error(f"Failed to finalize confirmation for task {job['task_id']}: {e}")
+
+
+enrichment_queue = EnrichmentQueue(
+    max_concurrency=settings.enrichment_max_concurrency,
+    max_retries=settings.enrichment_max_retries
+)
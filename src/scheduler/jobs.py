@@ -10,7 +10,11 @@ from typing import List, Optional, Dict
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
 from src.database.models import Task, User
-from src.database.crud import get_user_by_telegram_id, add_task, get_all_active_users
+from src.database.crud import (
+    get_user_by_telegram_id, add_task, get_all_active_users, delete_expired_llm_cache_entries, add_llm_usage_daily
+)
+from src.llm.telemetry import llm_telemetry
+from src.config import settings
 
 # Импортируем функцию отправки напоминания из responses
 from src.tgbot import responses
@@ -287,6 +291,32 @@ async def restore_user_daily_reminders(
     return restored_count
 
 
+async def cleanup_llm_cache_job(session_pool: async_sessionmaker[AsyncSession]):
+    """Удаляет просроченные записи персистентного кеша LLM."""
+    try:
+        async with session_pool() as session:
+            deleted = await delete_expired_llm_cache_entries(session)
+        if deleted:
+            logger.info(f"LLM cache cleanup: removed {deleted} expired entries")
+    except Exception as e:
+        logger.error(f"Error in LLM cache cleanup job: {e}", exc_info=True)
+
+
+async def flush_llm_usage_job(session_pool: async_sessionmaker[AsyncSession]):
+    """Записывает накопленные в памяти суточные итоги использования LLM в таблицу llm_usage_daily."""
+    rows = llm_telemetry.take_pending_usage()
+    if not rows:
+        return
+    try:
+        async with session_pool() as session:
+            await add_llm_usage_daily(session, rows)
+        logger.debug(f"LLM usage flushed: {len(rows)} rows")
+    except Exception as e:
+        # Не теряем счетчики - попробуем записать их при следующем запуске
+        llm_telemetry.restore_pending_usage(rows)
+        logger.error(f"Error in LLM usage flush job: {e}", exc_info=True)
+
+
 def register_jobs(
     scheduler: AsyncIOScheduler,
     bot: Bot,
@@ -315,6 +345,29 @@ def register_jobs(
             kwargs={'session_pool': session_pool}
         )
         logger.info("Job 'restore_daily_reminders' scheduled to run every hour.")
+
+        # Джоб очистки персистентного кеша LLM
+        if settings.llm_cache_enabled and settings.llm_cache_persistent:
+            scheduler.add_job(
+                cleanup_llm_cache_job,
+                trigger='interval',
+                hours=1,
+                id='llm_cache_cleanup_job',
+                replace_existing=True,
+                kwargs={'session_pool': session_pool}
+            )
+            logger.info("Job 'cleanup_llm_cache' scheduled to run every hour.")
+
+        # Джоб записи статистики использования LLM
+        scheduler.add_job(
+            flush_llm_usage_job,
+            trigger='interval',
+            minutes=1,
+            id='llm_usage_flush_job',
+            replace_existing=True,
+            kwargs={'session_pool': session_pool}
+        )
+        logger.info("Job 'flush_llm_usage' scheduled to run every 1 minute.")
         
     except Exception as e:
         logger.error(f"Error scheduling jobs: {e}", exc_info=True)
\ No newline at end of file
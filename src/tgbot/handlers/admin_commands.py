@@ -0,0 +1,84 @@
+# src/tgbot/handlers/admin_commands.py
+import logging
+import datetime
+from aiogram import Router, types
+from aiogram.filters import Command
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.database.crud import get_top_llm_users
+from src.llm.gemini_client import llm_cache, llm_scheduler, llm_hedger, llm_breaker, degraded_mode_stats
+from src.llm.model_profiles import model_profiles
+from src.llm.telemetry import llm_telemetry
+
+logger = logging.getLogger(__name__)
+admin_router = Router(name="admin_commands")
+
+
+def _format_prompt_summary() -> str:
+    summary = llm_telemetry.get_summary()
+    if not summary:
+        return "Вызовов LLM с момента запуска не было."
+    lines = ["<b>LLM по промптам</b> (вызовы / кеш / avg / решение / p90 / токены in+out / ошибки):"]
+    for item in summary:
+        p90 = f"≤{item['p90_latency']}s" if item["p90_latency"] is not None else "-"
+        failures = item["errors"] + item["blocked"] + item["json_failures"]
+        lines.append(
+            f"• <code>{item['prompt']}</code>: {item['calls']} / {item['cache_hits']} / "
+            f"{item['avg_latency']}s / {item['avg_decision']}s / {p90} / "
+            f"{item['prompt_tokens']}+{item['output_tokens']} / {failures}"
+        )
+    return "\n".join(lines)
+
+
+@admin_router.message(Command("llmstats"))
+async def handle_llmstats_command(message: types.Message, session: AsyncSession):
+    """Обрабатывает команду /llmstats (только для администраторов)."""
+    if message.from_user.id not in settings.admin_ids:
+        return
+
+    try:
+        today = datetime.datetime.now(datetime.timezone.utc).date()
+        top_users = await get_top_llm_users(session, today)
+
+        cache_stats = llm_cache.get_stats()
+        scheduler_stats = llm_scheduler.get_stats()
+        parts = [
+            _format_prompt_summary(),
+            f"<b>Кеш:</b> hit rate {cache_stats['hit_rate']}, записей {cache_stats['size']}",
+            f"<b>Очередь:</b> активных {scheduler_stats['active']}/{scheduler_stats['max_concurrency']}, "
+            f"ожидание p95 {scheduler_stats['wait_p95_interactive']}s",
+            f"<b>Предохранитель:</b> {llm_breaker.get_stats()['state']}, "
+            f"без LLM: {sum(degraded_mode_stats.values())} {degraded_mode_stats}",
+        ]
+        profile_stats = model_profiles.get_stats()
+        if profile_stats:
+            lines = ["<b>Профили модели</b> (вызовы / avg / p95 / токенов ответа / таймауты / обрезано):"]
+            for profile_name, stats in profile_stats.items():
+                lines.append(
+                    f"• <code>{profile_name}</code> ({stats['model']}): {stats['calls']} / "
+                    f"{stats['avg_latency']}s / {stats['p95_latency']}s / {stats['avg_output_tokens']} / "
+                    f"{stats['timeouts']} / {stats['truncated']}"
+                )
+            parts.append("\n".join(lines))
+        hedge_stats = llm_hedger.get_stats()
+        if hedge_stats:
+            lines = ["<b>Hedging</b> (доля дублей / победы дубля / сэкономлено / порог):"]
+            for prompt_name, stats in hedge_stats.items():
+                lines.append(
+                    f"• <code>{prompt_name}</code>: {stats['hedge_rate']} / {stats['hedge_wins']} / "
+                    f"{stats['latency_saved']}s / {stats['threshold']}s"
+                )
+            parts.append("\n".join(lines))
+        if top_users:
+            lines = ["<b>Топ пользователей за сегодня</b> (токены, вызовы):"]
+            for usage in top_users:
+                lines.append(
+                    f"• {usage.user_telegram_id}: {usage.prompt_tokens + usage.output_tokens}, {usage.calls}"
+                )
+            parts.append("\n".join(lines))
+
+        await message.answer("\n\n".join(parts))
+    except Exception as e:
+        logger.error(f"Error processing /llmstats for user {message.from_user.id}: {e}", exc_info=True)
+        await message.answer("Не удалось получить статистику.")
@@ -2,7 +2,7 @@
 
 # Импортируем функции из соседних модулей для удобства
 
-from .add_task import handle_add_task
+from .add_task import handle_add_task, handle_add_tasks
 from .find_tasks import handle_find_tasks
 from .update_timezone import handle_update_timezone
 from .complete_task import handle_complete_task       
@@ -15,6 +15,7 @@ from .unknown import handle_unknown_intent, handle_error_intent
 # Экспортируем их все с новыми именами
 __all__ = [
     "handle_add_task",
+    "handle_add_tasks",
     "handle_find_tasks",
     "handle_update_timezone",
     "handle_complete_task",
@@ -8,17 +8,21 @@ from typing import Optional, List, Dict, Any
 
 from src.tgbot import responses
 
-from src.database.crud import add_task
+from src.database.crud import add_task, add_tasks_bulk
 from src.database.models import User
 from src.utils.date_parser import text_to_datetime_obj
 from src.utils.reminders import calculate_next_reminder # Импортируем обновленную функцию
 
 from src.utils.tasks import get_due_and_notification_datetime
+from src.utils.title_generator import generate_title_locally
 
-from src.llm.gemini_client import generate_title_with_llm
+from src.config import settings
+from src.scheduler.enrichment import enrichment_queue, ENRICHMENT_PENDING_FOOTER
 
 logger = logging.getLogger(__name__)
 
+DEGRADED_MODE_FOOTER = "⚠️ ИИ сейчас недоступен: задача сохранена как есть, время распознано локально."
+
 async def handle_add_task(
     message: types.Message,
     session: AsyncSession,
@@ -39,12 +43,17 @@ async def handle_add_task(
         await message.reply("Не удалось извлечь описание задачи.")
         return
 
-    # Показываем статус генерации заголовка
-    if progress_tracker:
-        await progress_tracker.update("📝 Придумываю заголовок задачи...")
-    
-    task_title = await generate_title_with_llm(description)
-    logger.debug(f"Task title generated: {task_title}")
+    if params.get("optimistic"):
+        await _handle_add_task_optimistic(message, session, db_user, description, progress_tracker)
+        return
+
+    # Заголовок уже мог прийти из режима одного запроса, иначе строим его локально, без LLM
+    task_title = params.get("title")
+    upgrade_title = False
+    if not task_title:
+        task_title = generate_title_locally(description)
+        upgrade_title = settings.llm_title_upgrade and not params.get("degraded")
+        logger.debug(f"Task title generated locally: {task_title}")
 
     # УПРОЩЁННАЯ ЛОГИКА: Используем только готовое время напоминания
     reminder_datetime = None
@@ -75,12 +84,22 @@ async def handle_add_task(
             raw_input=message.text
        )
         # --- Ответ пользователю ---
-        await responses.send_task_operation_confirmation(
+        confirmation = await responses.send_task_operation_confirmation(
             message=message,
             action_title="Задача добавлена",
             task=new_task,
-            user=db_user
+            user=db_user,
+            footer=DEGRADED_MODE_FOOTER if params.get("degraded") else None
         )
+        if upgrade_title:
+            enrichment_queue.enqueue_title_upgrade(
+                task_id=new_task.task_id,
+                user_telegram_id=db_user.telegram_id,
+                description=description,
+                local_title=task_title,
+                chat_id=message.chat.id,
+                message_id=confirmation.message_id if confirmation else None
+            )
         
         # Завершаем трекер прогресса после успешного создания задачи
         if progress_tracker:
@@ -90,4 +109,108 @@ async def handle_add_task(
         # Завершаем трекер прогресса даже в случае ошибки
         if progress_tracker:
             await progress_tracker.finish()
-        await message.reply("Не удалось сохранить задачу...")
\ No newline at end of file
+        await message.reply("Не удалось сохранить задачу...")
+
+
+async def handle_add_tasks(
+    message: types.Message,
+    session: AsyncSession,
+    db_user: User,
+    tasks_params: List[Dict[str, Any]],
+    raw_input: Optional[str] = None,
+    progress_tracker=None
+):
+    """
+    Создает несколько задач, извлеченных одним запросом (список в сообщении или серия сообщений),
+    одной вставкой в БД и отправляет одно общее подтверждение. params задач - в формате handle_add_task.
+    """
+    logger.debug(f"Handling add_tasks for user {db_user.telegram_id}: {len(tasks_params)} tasks")
+    if progress_tracker:
+        await progress_tracker.update("💾 Сохраняю задачи в базу...")
+
+    tasks = []
+    for params in tasks_params:
+        reminder_datetime = None
+        if params.get("parsed_reminder_utc"):
+            try:
+                reminder_datetime = pendulum.parse(params["parsed_reminder_utc"])
+            except Exception as e:
+                logger.error(f"Failed to parse reminder time: {params['parsed_reminder_utc']}, error: {e}")
+        description = params["description"]
+        tasks.append({
+            "description": description,
+            "title": params.get("title") or generate_title_locally(description),
+            "original_due_text": params.get("due_date_time_text"),
+            "is_repeating": params.get("is_repeating", False),
+            "recurrence_rule": params.get("recurrence_rule"),
+            "next_reminder_at": reminder_datetime,
+        })
+
+    try:
+        new_tasks = await add_tasks_bulk(
+            session=session,
+            user_telegram_id=db_user.telegram_id,
+            tasks=tasks,
+            raw_input=raw_input
+        )
+    except Exception as e:
+        logger.error(f"Failed to add tasks in intent handler for user {db_user.telegram_id}: {e}", exc_info=True)
+        if progress_tracker:
+            await progress_tracker.finish()
+        await message.reply("Не удалось сохранить задачи...")
+        return
+
+    if progress_tracker:
+        await progress_tracker.finish()
+    await responses.send_tasks_added_confirmation(message=message, tasks=new_tasks, user=db_user)
+
+
+async def _handle_add_task_optimistic(
+    message: types.Message,
+    session: AsyncSession,
+    db_user: User,
+    description: str,
+    progress_tracker=None
+):
+    """
+    Сохраняет задачу с исходным текстом и сразу отвечает пользователю.
+    Заголовок, время напоминания и RRULE дописывает фоновый воркер (enrichment_queue),
+    после чего подтверждение редактируется.
+    """
+    try:
+        new_task = await add_task(
+            session=session,
+            user_telegram_id=db_user.telegram_id,
+            description=description,
+            title=generate_title_locally(description),
+            raw_input=message.text
+        )
+    except Exception as e:
+        logger.error(f"Failed to add optimistic task for user {db_user.telegram_id}: {e}", exc_info=True)
+        if progress_tracker:
+            await progress_tracker.finish()
+        await message.reply("Не удалось сохранить задачу...")
+        return
+
+    if progress_tracker:
+        await progress_tracker.finish()
+
+    user_timezone = db_user.timezone if db_user.timezone else "Europe/Moscow"
+    footer = ENRICHMENT_PENDING_FOOTER if enrichment_queue.is_running else None
+    confirmation = await responses.send_task_operation_confirmation(
+        message=message,
+        action_title="Задача добавлена",
+        task=new_task,
+        user=db_user,
+        footer=footer
+    )
+
+    enrichment_queue.enqueue(
+        task_id=new_task.task_id,
+        user_telegram_id=db_user.telegram_id,
+        user_text=description,
+        user_timezone=user_timezone,
+        chat_id=message.chat.id,
+        message_id=confirmation.message_id if confirmation else None,
+        provisional_title=new_task.title
+    )
@@ -2,21 +2,28 @@
 import logging
 from aiogram import types
 from sqlalchemy.ext.asyncio import AsyncSession
-import pendulum # Для форматирования
-import json # Для сериализации задач в JSON
 
 # Импорты
 from src.database.models import User, Task
 # Импортируем НОВЫЕ CRUD функции
-from src.database.crud import get_all_user_tasks, get_tasks_by_ids
+from src.database.crud import (
+    get_all_user_tasks, get_tasks_by_ids, search_tasks_ranked, find_tasks_by_criteria,
+    semantic_search_tasks
+)
 # Импортируем НОВУЮ LLM функцию
 from src.llm.gemini_client import find_tasks_with_llm
+from src.llm.embeddings import task_embedder
+from src.llm.circuit_breaker import LLMUnavailableError
 
 # Импортируем форматирование списка
 from src.utils.formatters import format_task_list
 from src.tgbot.keyboards.inline import create_tasks_keyboard
+from src.utils.search_query import extract_plain_keywords
+from src.utils.query_planner import plan_task_query
+from src.config import settings
+
+from typing import List
 
-from typing import Optional
 
 logger = logging.getLogger(__name__)
 
@@ -27,8 +34,9 @@ async def handle_find_tasks(
     params: dict # Содержит query_text
 ):
     """
-    Обрабатывает намерение найти задачи, используя LLM для фильтрации
-    всего списка задач пользователя.
+    Обрабатывает намерение найти задачи. Структурные запросы ("на завтра", "просроченные")
+    выполняются планировщиком как SQL-фильтр, простые ключевые слова - по поисковому индексу,
+    остальное - векторный поиск по эмбеддингам задач; неуверенные результаты переранжирует LLM.
     """
     query_text = params.get("query_text", "")
     user_telegram_id = db_user.telegram_id
@@ -38,51 +46,108 @@ async def handle_find_tasks(
         await message.reply("Уточните, какие задачи вы ищете.")
         return
 
+    # 0. Фильтры по дате/статусу без содержательных слов - сразу SQL, без LLM
+    plan = plan_task_query(query_text, user_timezone)
+    if plan:
+        await _reply_with_planned_tasks(message, session, db_user, plan)
+        return
+
     logger.info(f"Handling find_tasks intent via LLM context search for user {user_telegram_id}. Query: '{query_text}'")
 
     try:
-        # 1. Получаем все (или активные) задачи пользователя из БД
-        # TODO: Решить, передавать все или только pending в LLM? Начнем с pending.
-        all_user_tasks = await get_all_user_tasks(session, user_telegram_id, only_pending=True)
+        # 1. Ранжированный поиск по индексу (полнотекстовый + триграммы)
+        shortlist_size = settings.task_search_llm_candidates
+        ranked_hits = []
+        try:
+            # Точка сохранения: сбой поиска (например, нет pg_trgm) не обрывает остальные запросы сессии
+            async with session.begin_nested():
+                ranked_hits = await search_tasks_ranked(
+                    session, user_telegram_id, query_text, limit=shortlist_size or 200
+                )
+        except Exception as e:
+            logger.warning(f"Ranked task search unavailable, using plain task list: {e}")
+
+        # Простой запрос по ключевому слову с уверенными совпадениями - отвечаем без LLM
+        keywords = extract_plain_keywords(query_text)
+        min_score = settings.task_search_keyword_min_score
+        if keywords and ranked_hits and ranked_hits[0]["score"] >= min_score:
+            found_tasks = [hit["task"] for hit in ranked_hits if hit["score"] >= min_score]
+            logger.info(f"Keyword query '{keywords}' answered from search index without LLM: "
+                        f"{len(found_tasks)} tasks (top score {ranked_hits[0]['score']:.2f})")
+            await _reply_with_tasks(message, found_tasks, db_user)
+            return
+
+        # 2. Векторный поиск по эмбеддингам задач (миллисекунды, без LLM)
+        vector_hits = []
+        try:
+            vector_hits = await semantic_search_tasks(
+                session, user_telegram_id, query_text, limit=shortlist_size or 200,
+                min_score=settings.task_search_vector_min_score
+            )
+        except Exception as e:
+            logger.warning(f"Semantic task search unavailable for user {user_telegram_id}: {e}")
+        vector_tasks = [hit["task"] for hit in vector_hits]
+
+        # Высокая близость у локального hashing-эмбеддера - это лексическое совпадение n-грамм,
+        # а не смысл ("страховка" ~ "продлить страховку" = 0.7): без LLM отвечаем только семантическому
+        confident_vector_hit = (
+            task_embedder is not None and task_embedder.semantic
+            and bool(vector_hits) and vector_hits[0]["score"] >= settings.task_search_vector_confident_score
+        )
+        if not settings.task_search_llm_rerank or confident_vector_hit:
+            logger.info(f"Query '{query_text}' answered by vector search without LLM: {len(vector_tasks)} tasks"
+                        + (f" (top score {vector_hits[0]['score']:.2f})" if vector_hits else ""))
+            if vector_tasks:
+                await _reply_with_tasks(message, vector_tasks, db_user)
+            else:
+                await message.reply("Не нашел задач, соответствующих вашему запросу.")
+            return
+
+        # 3. Кандидаты для LLM: совпадения из индексов (текстового и векторного), затем остальные активные задачи
+        shortlisted_tasks = [hit["task"] for hit in ranked_hits]
+        shortlisted_ids = {task.task_id for task in shortlisted_tasks}
+        shortlisted_tasks += [task for task in vector_tasks if task.task_id not in shortlisted_ids]
+        if shortlist_size:
+            shortlisted_tasks = shortlisted_tasks[:shortlist_size]
+        other_tasks = []
+        if not shortlist_size or len(shortlisted_tasks) < shortlist_size:
+            other_tasks = await get_all_user_tasks(
+                session, user_telegram_id, only_pending=True,
+                limit=shortlist_size - len(shortlisted_tasks) if shortlist_size else None,
+                exclude_ids=[task.task_id for task in shortlisted_tasks]
+            )
+        all_user_tasks = shortlisted_tasks + other_tasks
 
         if not all_user_tasks:
             await message.reply("У вас пока нет активных задач для поиска.")
             return
+        logger.debug(f"LLM search candidates for user {user_telegram_id}: {len(shortlisted_tasks)} from indexes, "
+                     f"{len(other_tasks)} recent")
 
-        # 2. Форматируем задачи для LLM
-        tasks_for_llm = []
-        for task in all_user_tasks:
-
-            due_date_iso_str: Optional[str] = None # Явно строка или None
-
-            if task.has_time and task.due_datetime:
-                try:
-                    # Конвертируем datetime UTC в строку ISO 8601
-                    due_date_iso_str = pendulum.instance(task.due_datetime).to_iso8601_string()
-                except Exception as e:
-                     logger.error(f"Error converting due_datetime {task.due_datetime} to ISO string: {e}")
-                     # Оставляем None в случае ошибки
-            elif not task.has_time and task.due_date:
-                try:
-                    # Конвертируем date в строку ISO 8601 (YYYY-MM-DD)
-                    due_date_iso_str = task.due_date.isoformat()
-                except Exception as e:
-                    logger.error(f"Error converting due_date {task.due_date} to ISO string: {e}")
-                    # Оставляем None
-
-
-            tasks_for_llm.append({
+        # 4. Готовим задачи для LLM (компактная кодировка строится в find_tasks_with_llm)
+        tasks_for_llm = [
+            {
                 "id": task.task_id,
                 "description": task.description,
                 "title": task.title,
                 "status": task.status,
-                "due_date_utc_iso": due_date_iso_str
-            })
-
-        # 3. Вызываем LLM для поиска по контексту
-        matching_ids = await find_tasks_with_llm(query_text, tasks_for_llm)
+                "next_reminder_at": task.next_reminder_at,
+                "is_repeating": task.is_repeating
+            }
+            for task in all_user_tasks
+        ]
+
+        # 5. LLM переранжирует кандидатов по смыслу запроса
+        try:
+            matching_ids = await find_tasks_with_llm(query_text, tasks_for_llm, user_timezone)
+        except LLMUnavailableError:
+            matching_ids = None # Предохранитель разомкнут - как при ошибке LLM
 
         if matching_ids is None: # Ошибка LLM
+            if vector_tasks:
+                # LLM недоступна - отвечаем результатами векторного поиска как есть
+                await _reply_with_tasks(message, vector_tasks, db_user)
+                return
             await message.reply("Не удалось обработать поисковый запрос с помощью ИИ. Попробуйте позже.")
             return
 
@@ -90,18 +155,51 @@ async def handle_find_tasks(
             await message.reply("Не нашел задач, соответствующих вашему запросу.")
             return
 
-        # 4. Получаем найденные задачи из БД по ID
+        # 6. Получаем найденные задачи из БД по ID
         found_tasks = await get_tasks_by_ids(session, user_telegram_id, matching_ids)
-
-        # 5. Отправляем результат как инлайн-кнопки (без текстового списка)
-        keyboard = create_tasks_keyboard(found_tasks, db_user)
-        
-        if found_tasks:
-            response_text = f"Найдено задач: {len(found_tasks)}"
-            await message.answer(response_text, reply_markup=keyboard)
-        else:
-            await message.answer("Задач не найдено.")
+        await _reply_with_tasks(message, found_tasks, db_user)
 
     except Exception as e:
         logger.error(f"Error during LLM-based task search for user {user_telegram_id}: {e}", exc_info=True)
-        await message.reply("Произошла ошибка во время поиска задач.")
\ No newline at end of file
+        await message.reply("Произошла ошибка во время поиска задач.")
+
+
+async def _reply_with_tasks(message: types.Message, found_tasks: List[Task], db_user: User):
+    """Отправляет результат как инлайн-кнопки (без текстового списка)."""
+    keyboard = create_tasks_keyboard(found_tasks, db_user)
+
+    if found_tasks:
+        response_text = f"Найдено задач: {len(found_tasks)}"
+        await message.answer(response_text, reply_markup=keyboard)
+    else:
+        await message.answer("Задач не найдено.")
+
+
+async def _reply_with_planned_tasks(
+    message: types.Message,
+    session: AsyncSession,
+    db_user: User,
+    plan: dict
+):
+    """Выполняет план запроса из query_planner через find_tasks_by_criteria и отвечает списком."""
+    try:
+        tasks = await find_tasks_by_criteria(
+            session=session,
+            db_user=db_user,
+            search_text=None,
+            start_date=plan["start_date"],
+            end_date=plan["end_date"],
+            status=plan["status"],
+            completed_date_filter=plan["completed_date_filter"]
+        )
+        if plan["only_recurring"]:
+            tasks = [task for task in tasks if task.recurrence_rule]
+
+        keyboard = create_tasks_keyboard(tasks, db_user)
+        if tasks:
+            await message.answer(f"{plan['label']}: {len(tasks)}", reply_markup=keyboard)
+        else:
+            await message.answer(f"{plan['label']}: не найдено.")
+    except Exception as e:
+        logger.error(f"Error executing planned task query for user {db_user.telegram_id}: {e}", exc_info=True)
+        await message.reply("Произошла ошибка во время поиска задач.")
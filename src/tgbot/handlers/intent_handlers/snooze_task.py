@@ -20,7 +20,7 @@ async def handle_snooze_task(
     message: types.Message,
     session: AsyncSession,
     db_user: User,
-    params: dict, # Содержит snooze_details
+    params: dict, # Содержит snooze_details и, если время уже разобрано LLM, parsed_reminder_utc
     task_id: int  # ID из контекста реплая
 ):
     """Обрабатывает намерение отложить напоминание для КОНКРЕТНОЙ задачи."""
@@ -44,10 +44,17 @@ async def handle_snooze_task(
             await message.reply("Похоже, эта задача не ваша.")
             return
 
-        # Парсим время откладывания
-        parsed_time_info = await text_to_datetime_obj(snooze_details, user_timezone)
-        logger.debug(f"Snooze handle time info: {parsed_time_info}")
-        new_reminder_time_utc = parsed_time_info.get('datetime')
+        # Время уже разобрано вместе с интентом (ответ на сообщение бота) - повторно не парсим
+        new_reminder_time_utc = None
+        if params.get("parsed_reminder_utc"):
+            try:
+                new_reminder_time_utc = pendulum.parse(params["parsed_reminder_utc"])
+            except Exception as e:
+                logger.error(f"Failed to parse snooze time from prompts: {params['parsed_reminder_utc']}, error: {e}")
+        if not new_reminder_time_utc:
+            parsed_time_info = await text_to_datetime_obj(snooze_details, user_timezone)
+            logger.debug(f"Snooze handle time info: {parsed_time_info}")
+            new_reminder_time_utc = parsed_time_info.get('datetime')
 
         if not new_reminder_time_utc:
             await message.reply(f"Не смог разобрать время '{snooze_details}'. Попробуйте: 'через 15 минут', 'в 17:00', 'завтра утром'.")
@@ -7,6 +7,7 @@ import pytz
 from src.database.crud import update_user_timezone
 from src.database.models import User
 from src.llm.gemini_client import parse_timezone_from_text
+from src.llm.circuit_breaker import LLMUnavailableError
 
 logger = logging.getLogger(__name__)
 
@@ -25,7 +26,13 @@ async def handle_update_timezone(
         return
 
     logger.info(f"Handling update_timezone intent for user {user_telegram_id}. Text: '{location_text}'")
-    parsed_timezone_iana = await parse_timezone_from_text(location_text)
+    try:
+        parsed_timezone_iana = await parse_timezone_from_text(location_text)
+    except LLMUnavailableError:
+        # Город не нашелся в локальном справочнике, а LLM сейчас недоступна
+        await message.reply("Сервис ИИ сейчас перегружен. Попробуйте через пару минут "
+                            "или укажите смещение, например «UTC+3».")
+        return
 
     if parsed_timezone_iana:
         try:
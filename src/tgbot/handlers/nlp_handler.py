@@ -1,5 +1,6 @@
 # src/tgbot/handlers/nlp_handler.py
 
+import asyncio
 import logging
 from typing import Optional
 from aiogram import F, Router, types, Bot
@@ -7,14 +8,17 @@ from aiogram.fsm.context import FSMContext
 from sqlalchemy.ext.asyncio import AsyncSession
 
 # Импорты
-from src.llm.gemini_client import process_user_input
-from src.database.crud import get_or_create_user
+from src.llm.gemini_client import process_user_input, process_message_burst
+from src.database.crud import get_or_create_user, get_task_by_id
+from src.database.models import User
 from src.utils.parsers import extract_task_id_from_text
 from src.utils.llm_progress_tracker import LLMProgressTracker
+from src.utils.message_burst import message_bursts
 
 # Импортируем функции-обработчики для каждого интента
 from .intent_handlers import (
     handle_add_task,
+    handle_add_tasks,
     handle_find_tasks,
     handle_update_timezone,
     handle_complete_task,
@@ -55,6 +59,14 @@ async def handle_natural_language_query(
 
     logger.info(f"Processing NLP query from user {user_telegram_id}. Text: '{user_text[:100]}...'")
 
+    # Серия сообщений подряд разбирается одним проходом; реплаи относятся к конкретной задаче и не склеиваются
+    burst = None
+    if message_bursts.enabled and not message.reply_to_message:
+        burst = message_bursts.join(message.chat.id, user_telegram_id, message)
+        if burst is None:
+            logger.info(f"Message from user {user_telegram_id} joined the open message burst")
+            return
+
     try:
         # Проверка на реплай и извлечение ID
         if message.reply_to_message and message.reply_to_message.from_user.is_bot:
@@ -65,102 +77,153 @@ async def handle_natural_language_query(
             else:
                 logger.debug("Reply detected, but no task ID found.")
 
+        # Инициализируем трекер прогресса LLM
+        progress_tracker = LLMProgressTracker(bot, message.chat.id)
+        messages = [message]
+        if burst:
+            # Пока показывается "печатает...", в серию успевают прийти следующие сообщения
+            _, messages = await asyncio.gather(
+                progress_tracker.start("🤖 Анализирую тип запроса..."),
+                message_bursts.wait(burst)
+            )
+
         # Получаем/создаем пользователя (нужен для контекста и ID)
         db_user = await get_or_create_user(session, user_telegram_id, user.full_name, user.username)
         if not db_user:
             logger.error(f"Failed to get or create user {user_telegram_id} in NLP handler.")
+            await progress_tracker.finish()
             await message.reply("Не удалось обработать ваш профиль. Пожалуйста, попробуйте выполнить команду /start.")
             return
 
-        # Инициализируем трекер прогресса LLM
-        progress_tracker = LLMProgressTracker(bot, message.chat.id)
-        await progress_tracker.start("🤖 Анализирую тип запроса...")
-        
-        try:
-            # Вызов LLM для определения намерения (с новыми параметрами)
-            is_reply = context_task_id is not None
+        if not burst:
+            await progress_tracker.start("🤖 Анализирую тип запроса...")
+
+        if len(messages) > 1:
             user_timezone = db_user.timezone if db_user.timezone else "Europe/Moscow"
-            llm_result = await process_user_input(user_text, is_reply=is_reply, user_timezone=user_timezone, progress_tracker=progress_tracker)
-            logger.debug(f"LLM intent result for user {user_telegram_id}: {llm_result}")
-            
-        except Exception as llm_error:
-            # В случае ошибки LLM завершаем трекер
+            burst_texts = [burst_message.text for burst_message in messages]
+            burst_result = await process_message_burst(burst_texts, user_timezone, progress_tracker)
+            if burst_result:
+                await handle_add_tasks(message, session, db_user, burst_result["params"]["tasks"],
+                                       raw_input="\n".join(burst_texts), progress_tracker=progress_tracker)
+                return
+
+        # По одному сообщению; статус серии показывается только для первого из них
+        for index, current_message in enumerate(messages):
+            tracker = progress_tracker if index == 0 else LLMProgressTracker(bot, message.chat.id)
+            await _process_message(current_message, session, db_user, context_task_id, tracker)
+
+    except Exception as e:
+        logger.exception(f"General error in handle_natural_language_query for user {user_telegram_id}")
+        # Завершаем трекер прогресса в случае общей ошибки
+        if 'progress_tracker' in locals():
             await progress_tracker.finish()
-            raise llm_error
-
-        status = llm_result.get("status")
-        intent = llm_result.get("intent")
-        params = llm_result.get("params", {})
-
-        # Диспетчеризация по результату LLM
-        if status == "success":
-            # Обработка контекстных интентов
-            if intent in CONTEXTUAL_INTENTS:
-                if context_task_id:
-                    # Вызываем соответствующий обработчик, передавая ID
-                    if intent == "complete_task":
-                        await handle_complete_task(message, session, db_user, context_task_id)
-                    elif intent == "reschedule_task":
-                        await handle_reschedule_task(message, session, db_user, params, context_task_id)
-                    elif intent == "edit_task_description":
-                        await handle_edit_task_description(message, session, db_user, params, context_task_id)
-                    elif intent == "snooze_task":
-                        await handle_snooze_task(message, session, db_user, params, context_task_id)
-                    # Добавить другие контекстные интенты здесь, если появятся
-                    
-                    # Завершаем трекер прогресса для контекстных интентов
-                    await progress_tracker.finish()
-                else:
-                    # Интент требует контекста, но его нет
-                    logger.warning(f"Contextual intent '{intent}' received without valid reply/task_id for user {user_telegram_id}")
-                    await message.reply(
-                        "Пожалуйста, используйте функцию 'Ответить' (Reply) на сообщении с задачей (у него должен быть ID в скобках), "
-                        "чтобы я понял, к какой именно задаче применить команду."
-                    )
-                    # Завершаем трекер прогресса и для случая отсутствия контекста
-                    await progress_tracker.finish()
-            # Обработка неконтекстных интентов
-            elif intent == "add_task":
-                # Передаем state, т.к. этот хендлер может инициировать FSM для таймзоны
-                await handle_add_task(message, session, db_user, params, progress_tracker)
-            elif intent == "find_tasks":
-                await handle_find_tasks(message, session, db_user, params)
-                # Завершаем трекер прогресса для поиска задач
-                await progress_tracker.finish()
-            elif intent == "update_timezone":
-                await handle_update_timezone(message, session, db_user, params)
-                # Завершаем трекер прогресса для обновления таймзоны
+        await message.reply("💥 Ой! Что-то пошло не так при обработке вашего сообщения.")
+
+
+async def _process_message(
+    message: types.Message,
+    session: AsyncSession,
+    db_user: User,
+    context_task_id: Optional[int],
+    progress_tracker: LLMProgressTracker
+):
+    """Разбирает одно сообщение через LLM и передает результат обработчику интента."""
+    user_telegram_id = db_user.telegram_id
+    user_text = message.text
+    # Задачу из реплая загружаем параллельно с определением интента:
+    # обработчики получат ее из identity map сессии без повторного запроса
+    task_prefetch = None
+    if context_task_id:
+        task_prefetch = asyncio.create_task(get_task_by_id(session, context_task_id))
+
+    try:
+        # Вызов LLM для определения намерения (с новыми параметрами)
+        is_reply = context_task_id is not None
+        user_timezone = db_user.timezone if db_user.timezone else "Europe/Moscow"
+        llm_result = await process_user_input(user_text, is_reply=is_reply, user_timezone=user_timezone, progress_tracker=progress_tracker)
+        logger.debug(f"LLM intent result for user {user_telegram_id}: {llm_result}")
+        
+    except Exception as llm_error:
+        # В случае ошибки LLM завершаем трекер
+        await progress_tracker.finish()
+        raise llm_error
+    finally:
+        # Сессия не должна использоваться параллельно, дожидаемся prefetch до вызова обработчиков
+        if task_prefetch:
+            prefetch_result = (await asyncio.gather(task_prefetch, return_exceptions=True))[0]
+            if isinstance(prefetch_result, Exception):
+                logger.warning(f"Failed to prefetch task {context_task_id}: {prefetch_result}")
+
+    status = llm_result.get("status")
+    intent = llm_result.get("intent")
+    params = llm_result.get("params", {})
+
+    # Диспетчеризация по результату LLM
+    if status == "success":
+        # Обработка контекстных интентов
+        if intent in CONTEXTUAL_INTENTS:
+            if context_task_id:
+                # Вызываем соответствующий обработчик, передавая ID
+                if intent == "complete_task":
+                    await handle_complete_task(message, session, db_user, context_task_id)
+                elif intent == "reschedule_task":
+                    await handle_reschedule_task(message, session, db_user, params, context_task_id)
+                elif intent == "edit_task_description":
+                    await handle_edit_task_description(message, session, db_user, params, context_task_id)
+                elif intent == "snooze_task":
+                    await handle_snooze_task(message, session, db_user, params, context_task_id)
+                # Добавить другие контекстные интенты здесь, если появятся
+                
+                # Завершаем трекер прогресса для контекстных интентов
                 await progress_tracker.finish()
             else:
-                # Успешный статус, но неизвестный интент
-                logger.warning(f"LLM success with unknown intent: {intent}")
-                await handle_unknown_intent(message) # Передаем управление обработчику неизвестных
-                # Завершаем трекер прогресса для неизвестного интента
+                # Интент требует контекста, но его нет
+                logger.warning(f"Contextual intent '{intent}' received without valid reply/task_id for user {user_telegram_id}")
+                await message.reply(
+                    "Пожалуйста, используйте функцию 'Ответить' (Reply) на сообщении с задачей (у него должен быть ID в скобках), "
+                    "чтобы я понял, к какой именно задаче применить команду."
+                )
+                # Завершаем трекер прогресса и для случая отсутствия контекста
                 await progress_tracker.finish()
-
-        elif status == "clarification_needed":
-             # Передаем state, т.к. этот обработчик точно работает с FSM
-            await handle_clarification_request(message, llm_result)
-            # Завершаем трекер прогресса для запроса уточнения
+        # Обработка неконтекстных интентов
+        elif intent == "add_task":
+            # Передаем state, т.к. этот хендлер может инициировать FSM для таймзоны
+            await handle_add_task(message, session, db_user, params, progress_tracker)
+        elif intent == "add_tasks":
+            # Несколько задач из одного сообщения (список)
+            await handle_add_tasks(message, session, db_user, params["tasks"], raw_input=message.text,
+                                   progress_tracker=progress_tracker)
+        elif intent == "find_tasks":
+            await handle_find_tasks(message, session, db_user, params)
+            # Завершаем трекер прогресса для поиска задач
             await progress_tracker.finish()
-
-        elif status == "unknown_intent":
-            await handle_unknown_intent(message)
-            # Завершаем трекер прогресса для неизвестного интента
-            await progress_tracker.finish()
-        elif status == "error":
-            await handle_error_intent(message, llm_result)
-            # Завершаем трекер прогресса для ошибки
+        elif intent == "update_timezone":
+            await handle_update_timezone(message, session, db_user, params)
+            # Завершаем трекер прогресса для обновления таймзоны
             await progress_tracker.finish()
         else:
-            logger.error(f"Unexpected LLM status: {status}")
-            await message.reply("Произошла неожиданная ошибка при обработке вашего запроса.")
-            # Завершаем трекер прогресса для неожиданного статуса
+            # Успешный статус, но неизвестный интент
+            logger.warning(f"LLM success with unknown intent: {intent}")
+            await handle_unknown_intent(message) # Передаем управление обработчику неизвестных
+            # Завершаем трекер прогресса для неизвестного интента
             await progress_tracker.finish()
 
-    except Exception as e:
-        logger.exception(f"General error in handle_natural_language_query for user {user_telegram_id}")
-        # Завершаем трекер прогресса в случае общей ошибки
-        if 'progress_tracker' in locals():
-            await progress_tracker.finish()
-        await message.reply("💥 Ой! Что-то пошло не так при обработке вашего сообщения.")
\ No newline at end of file
+    elif status == "clarification_needed":
+         # Передаем state, т.к. этот обработчик точно работает с FSM
+        await handle_clarification_request(message, llm_result)
+        # Завершаем трекер прогресса для запроса уточнения
+        await progress_tracker.finish()
+
+    elif status == "unknown_intent":
+        await handle_unknown_intent(message)
+        # Завершаем трекер прогресса для неизвестного интента
+        await progress_tracker.finish()
+    elif status == "error":
+        await handle_error_intent(message, llm_result)
+        # Завершаем трекер прогресса для ошибки
+        await progress_tracker.finish()
+    else:
+        logger.error(f"Unexpected LLM status: {status}")
+        await message.reply("Произошла неожиданная ошибка при обработке вашего запроса.")
+        # Завершаем трекер прогресса для неожиданного статуса
+        await progress_tracker.finish()
@@ -0,0 +1,29 @@
+# src/tgbot/middlewares/llm_context_middleware.py
+
+import logging
+from typing import Callable, Dict, Any, Awaitable
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from src.llm.request_scheduler import llm_request_context
+
+logger = logging.getLogger(__name__)
+
+class LLMContextMiddleware(BaseMiddleware):
+    """
+    Привязывает все запросы к LLM, сделанные при обработке апдейта, к пользователю.
+    Нужно для справедливой очереди в планировщике запросов (см. LLMRequestScheduler).
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is None:
+            return await handler(event, data)
+
+        with llm_request_context(user_id=user.id):
+            return await handler(event, data)
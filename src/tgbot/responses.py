@@ -1,7 +1,7 @@
 # src/tgbot/responses.py
 
 import logging
-from typing import Optional
+from typing import Optional, List
 from aiogram import types, Bot
 import pendulum # Для форматирования дат
 
@@ -9,20 +9,19 @@ import pendulum # Для форматирования дат
 from src.database.models import Task, User
 
 from src.utils.formatters import format_reminder_time_human
-from src.tgbot.keyboards.inline import create_reminder_keyboard, create_task_actions_keyboard
+from src.tgbot.keyboards.inline import create_reminder_keyboard, create_task_actions_keyboard, create_tasks_keyboard
 
 logger = logging.getLogger(__name__)
 
-# --- НОВАЯ Функция Подтверждения Действий с Задачей ---
-async def send_task_operation_confirmation(
-    message: types.Message,
-    action_title: str, # Что было сделано: "Задача добавлена", "Срок изменен" и т.д.
-    task: Task, # Объект задачи (уже обновленный или новый)
-    user: User, # Объект пользователя (нужен для таймзоны)
-    include_action_buttons: bool = False  # Добавить кнопки действий (Сделано, Перенести)
-):
+def format_task_operation_text(
+    action_title: str,
+    task: Task,
+    user: User,
+    footer: Optional[str] = None
+) -> str:
     """
-    Отправляет унифицированное сообщение о результате операции с задачей.
+    Формирует текст сообщения о результате операции с задачей.
+    Используется и при отправке, и при редактировании подтверждения.
     """
     user_timezone = user.timezone # Берем таймзону из объекта User
 
@@ -73,7 +72,27 @@ async def send_task_operation_confirmation(
     # Всегда добавляем ID
     response_lines.append(f"(ID: {task.task_id})")
 
-    response_text = "\n".join(response_lines)
+    # Дополнительная строка (например, "уточняю детали" при оптимистичном создании)
+    if footer:
+        response_lines.append(f"\n{footer}")
+
+    return "\n".join(response_lines)
+
+
+# --- НОВАЯ Функция Подтверждения Действий с Задачей ---
+async def send_task_operation_confirmation(
+    message: types.Message,
+    action_title: str, # Что было сделано: "Задача добавлена", "Срок изменен" и т.д.
+    task: Task, # Объект задачи (уже обновленный или новый)
+    user: User, # Объект пользователя (нужен для таймзоны)
+    include_action_buttons: bool = False,  # Добавить кнопки действий (Сделано, Перенести)
+    footer: Optional[str] = None  # Дополнительная строка в конце сообщения
+) -> Optional[types.Message]:
+    """
+    Отправляет унифицированное сообщение о результате операции с задачей.
+    Возвращает отправленное сообщение (чтобы его можно было отредактировать позже) или None.
+    """
+    response_text = format_task_operation_text(action_title, task, user, footer)
     
     # Создаем клавиатуру с кнопками если запрошено
     keyboard = None
@@ -82,15 +101,59 @@ async def send_task_operation_confirmation(
 
     # Отправляем ответ на исходное сообщение пользователя
     try:
-        await message.answer(response_text, reply_markup=keyboard)
+        return await message.answer(response_text, reply_markup=keyboard)
     except Exception as e:
         # Ловим возможные ошибки отправки (например, сообщение удалено)
         logger.error(f"Failed to send task confirmation reply to user {message.from_user.id}: {e}")
         # Пытаемся отправить обычное сообщение
         try:
-            await message.answer(response_text, reply_markup=keyboard)
+            return await message.answer(response_text, reply_markup=keyboard)
         except Exception as e2:
              logger.error(f"Failed to send task confirmation answer to user {message.from_user.id}: {e2}")
+             return None
+
+
+async def send_tasks_added_confirmation(
+    message: types.Message,
+    tasks: List[Task],
+    user: User,
+    footer: Optional[str] = None
+) -> Optional[types.Message]:
+    """
+    Одно подтверждение для нескольких задач, созданных за один проход (список или серия сообщений):
+    заголовок с количеством и клавиатура со списком задач.
+    """
+    response_text = f"✅ Добавлено задач: {len(tasks)}"
+    if footer:
+        response_text += f"\n\n{footer}"
+    try:
+        return await message.answer(response_text, reply_markup=create_tasks_keyboard(tasks, user))
+    except Exception as e:
+        logger.error(f"Failed to send tasks confirmation to user {message.from_user.id}: {e}")
+        return None
+
+
+async def edit_task_operation_confirmation(
+    bot: Bot,
+    chat_id: int,
+    message_id: int,
+    action_title: str,
+    task: Task,
+    user: User,
+    footer: Optional[str] = None
+) -> bool:
+    """
+    Редактирует ранее отправленное подтверждение операции с задачей
+    (например, после фонового уточнения задачи). Возвращает True при успехе.
+    """
+    response_text = format_task_operation_text(action_title, task, user, footer)
+    try:
+        await bot.edit_message_text(text=response_text, chat_id=chat_id, message_id=message_id)
+        return True
+    except Exception as e:
+        # "message is not modified" и удаленные сообщения не считаем критичными
+        logger.warning(f"Failed to edit task confirmation {message_id} in chat {chat_id}: {e}")
+        return False
 
 async def send_reminder_notification(
     bot: Bot, # Принимает объект Bot
@@ -1,19 +1,365 @@
 # src/utils/date_parser.py
 
 import logging
-from typing import Optional, Dict, Any
+import re
+from typing import Optional, Dict, Any, List
 import pendulum
 import datetime
 
-# Импортируем LLM функцию
-try:
-    from src.llm.gemini_client import process_date_text_with_llm
-except ImportError:
-    logging.error("Could not import LLM client for date parsing!")
-    process_date_text_with_llm = None
-
 logger = logging.getLogger(__name__)
 
+# --- Локальный парсер русских выражений времени (быстрый путь перед LLM) ---
+
+# Время по умолчанию для частей суток (совпадает с правилами REMINDER_TIME_PARSING_PROMPT)
+DAY_PART_HOURS = {
+    "утр": 9,
+    "дн": 12,
+    "вечер": 18,
+    "ноч": 21,
+}
+DEFAULT_HOUR = 12
+
+WEEKDAYS = {
+    "понедельник": 0,
+    "вторник": 1,
+    "сред": 2,
+    "четверг": 3,
+    "пятниц": 4,
+    "суббот": 5,
+    "воскресень": 6,
+}
+
+MONTHS = {
+    "январ": 1, "феврал": 2, "март": 3, "апрел": 4, "ма": 5, "июн": 6,
+    "июл": 7, "август": 8, "сентябр": 9, "октябр": 10, "ноябр": 11, "декабр": 12,
+}
+
+NUMBER_WORDS = {
+    "один": 1, "одну": 1, "одна": 1, "два": 2, "две": 2, "пару": 2, "три": 3, "четыре": 4,
+    "пять": 5, "шесть": 6, "семь": 7, "восемь": 8, "девять": 9, "десять": 10,
+    "пятнадцать": 15, "двадцать": 20, "тридцать": 30, "сорок": 40,
+}
+
+# Слова, которые не несут информации о времени и могут остаться после разбора
+FILLER_WORDS = {
+    "в", "во", "на", "к", "ко", "около", "примерно", "где-то", "и", "с", "это",
+    "напомни", "напомнить", "напоминание", "мне", "пожалуйста", "перенеси", "перенести",
+    "отложи", "отложить", "сделаю", "давай", "лучше", "часов", "часа", "час", "ч",
+    "числа", "ровно",
+}
+
+# Маркеры повторения: "каждый понедельник в 9" - не разовое время, его разбирает recurrence
+RECURRING_RE = re.compile(
+    r"\b(?:кажд\w*|ежедневно|еженедельно|ежемесячно|ежегодно)\b|"
+    r"\bпо\s+(?:будням|выходным|утрам|вечерам|понедельникам|вторникам|средам|четвергам|пятницам|субботам|воскресеньям)\b"
+)
+
+_NUM = r"(\d+|" + "|".join(NUMBER_WORDS) + r")"
+
+RELATIVE_RE = re.compile(
+    r"через\s+(?:(полчаса|полтора\s+часа)|(?:" + _NUM + r"\s+)?"
+    r"(минут[уы]?|мин|час(?:а|ов)?|дн(?:я|ей)|день|недел(?:ю|и|ь)|месяц(?:а|ев)?))"
+)
+DAY_WORD_RE = re.compile(r"\b(послезавтра|завтра|сегодня)\b")
+WEEKDAY_RE = re.compile(
+    r"\b(?:(?:в|во|на|к|ко)\s+)?(следующ\w*\s+)?"
+    r"(понедельник\w*|вторник\w*|сред[аеуы]|четверг\w*|пятниц\w*|суббот\w*|воскресень\w*)\b"
+)
+DATE_NUMERIC_RE = re.compile(r"\b(\d{1,2})\.(\d{1,2})(?:\.(\d{2,4}))?\b")
+DATE_TEXT_RE = re.compile(
+    r"\b(\d{1,2})\s+(январ\w*|феврал\w*|март\w*|апрел\w*|ма[яй]|июн\w*|июл\w*|август\w*|"
+    r"сентябр\w*|октябр\w*|ноябр\w*|декабр\w*)\b"
+)
+TIME_COLON_RE = re.compile(r"\b(?:(?:в|к|на)\s+)?(\d{1,2}):(\d{2})\b")
+TIME_DOT_RE = re.compile(r"\b(?:в|к)\s+(\d{1,2})\.(\d{2})\b")
+TIME_HOUR_RE = re.compile(
+    r"\b(?:в|к)\s+(\d{1,2})(?:\s*(?:часов|часа|час|ч))?(?:\s+(утра|дня|вечера|ночи))?\b"
+)
+DAY_PART_RE = re.compile(r"\b(утром|утро|утра|днем|день|дня|вечером|вечер|вечера|ночью|ночь|ночи)\b")
+
+# Счетчики быстрого пути (сколько вызовов LLM сэкономлено)
+local_parser_stats = {
+    "calls": 0,          # Всего обращений к локальному парсеру
+    "hits": 0,           # Разобрано локально с достаточной уверенностью (LLM не нужен)
+    "low_confidence": 0, # Разобрано, но уверенность ниже порога (ушло в LLM)
+    "no_match": 0,       # Ничего не распознано (ушло в LLM)
+}
+
+
+def _normalize(text: str) -> str:
+    text = text.lower().replace("ё", "е")
+    text = re.sub(r"[,;!?«»\"()]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _to_number(token: Optional[str]) -> Optional[int]:
+    if token is None:
+        return 1
+    if token.isdigit():
+        return int(token)
+    return NUMBER_WORDS.get(token)
+
+
+def _day_part_hour(word: str) -> Optional[int]:
+    for stem, hour in DAY_PART_HOURS.items():
+        if word.startswith(stem):
+            return hour
+    return None
+
+
+def _apply_meridiem(hour: int, qualifier: Optional[str]) -> int:
+    """'в 3 дня' -> 15, 'в 7 вечера' -> 19, 'в 12 ночи' -> 0."""
+    if qualifier in ("дня", "вечера") and hour < 12:
+        return hour + 12
+    if qualifier == "ночи" and hour == 12:
+        return 0
+    return hour
+
+
+def parse_time_expression_locally(
+    text: Optional[str],
+    user_timezone: str = "UTC",
+    now: Optional[pendulum.DateTime] = None,
+    allow_recurring: bool = False
+) -> Optional[Dict[str, Any]]:
+    """
+    Разбирает типовые русские выражения времени без обращения к LLM:
+    "завтра в 15:00", "через 3 часа", "в пятницу вечером", "послезавтра утром", "15 марта".
+
+    Args:
+        text: Текст с выражением времени.
+        user_timezone: Таймзона пользователя, относительно которой считаются даты.
+        now: Текущее время (для тестов), по умолчанию pendulum.now(user_timezone).
+        allow_recurring: Разбирать и фразы с повторением ("каждый понедельник в 9" -> ближайший
+            понедельник). По умолчанию для них возвращается None - правило повторения важнее.
+
+    Returns:
+        Словарь с ключами 'datetime' (pendulum.DateTime в UTC) и 'confidence' (0..1)
+        или None, если выражение не распознано.
+    """
+    if not text or text.isspace():
+        return None
+
+    try:
+        now_local = (now or pendulum.now(user_timezone)).in_timezone(user_timezone)
+    except Exception as e:
+        logger.error(f"Local time parser: invalid timezone '{user_timezone}': {e}")
+        return None
+
+    remaining = _normalize(text)
+    if not allow_recurring and RECURRING_RE.search(remaining):
+        return None
+    original_length = len(remaining.replace(" ", ""))
+    confidence = 1.0
+    consumed: List[str] = []
+
+    def consume(match: re.Match) -> None:
+        nonlocal remaining
+        consumed.append(match.group(0))
+        remaining = (remaining[:match.start()] + " " + remaining[match.end():]).strip()
+
+    target_date: Optional[pendulum.Date] = None
+    hour: Optional[int] = None
+    minute = 0
+    relative: Optional[pendulum.Duration] = None
+    weekday_is_today = False
+    bare_early_hour = False
+
+    # 1. Относительное смещение: "через 3 часа", "через полчаса", "через 2 дня"
+    match = RELATIVE_RE.search(remaining)
+    if match:
+        half, number_token, unit = match.group(1), match.group(2), match.group(3)
+        if half:
+            relative = pendulum.duration(minutes=30) if half == "полчаса" else pendulum.duration(minutes=90)
+        else:
+            amount = _to_number(number_token)
+            if amount is None:
+                return None
+            if unit.startswith("мин"):
+                relative = pendulum.duration(minutes=amount)
+            elif unit.startswith("час"):
+                relative = pendulum.duration(hours=amount)
+            elif unit.startswith("дн") or unit == "день":
+                target_date = now_local.add(days=amount).date()
+            elif unit.startswith("недел"):
+                target_date = now_local.add(weeks=amount).date()
+            elif unit.startswith("месяц"):
+                target_date = now_local.add(months=amount).date()
+        consume(match)
+
+    # 2. Явная дата: "15 марта", "15.03", "15.03.2026"
+    match = DATE_TEXT_RE.search(remaining)
+    if match and target_date is None:
+        day = int(match.group(1))
+        month = next((num for stem, num in MONTHS.items() if match.group(2).startswith(stem)), None)
+        try:
+            candidate = pendulum.date(now_local.year, month, day)
+        except (TypeError, ValueError):
+            return None
+        if candidate < now_local.date():
+            candidate = candidate.add(years=1)
+        target_date = candidate
+        consume(match)
+
+    match = TIME_DOT_RE.search(remaining)
+    if match:
+        # "в 15.30" - это время, а не дата
+        hour, minute = int(match.group(1)), int(match.group(2))
+        consume(match)
+    else:
+        match = DATE_NUMERIC_RE.search(remaining)
+        if match and target_date is None:
+            day, month = int(match.group(1)), int(match.group(2))
+            year = match.group(3)
+            try:
+                if year:
+                    year_value = int(year) + (2000 if len(year) == 2 else 0)
+                    candidate = pendulum.date(year_value, month, day)
+                else:
+                    candidate = pendulum.date(now_local.year, month, day)
+                    if candidate < now_local.date():
+                        candidate = candidate.add(years=1)
+            except ValueError:
+                return None
+            target_date = candidate
+            consume(match)
+
+    # 3. Относительный день: "сегодня", "завтра", "послезавтра"
+    match = DAY_WORD_RE.search(remaining)
+    if match:
+        if target_date is not None:
+            confidence = min(confidence, 0.5) # Противоречивые указания даты
+        offset = {"сегодня": 0, "завтра": 1, "послезавтра": 2}[match.group(1)]
+        target_date = now_local.add(days=offset).date()
+        consume(match)
+
+    # 4. День недели: "в пятницу", "воскресенье", "вечером воскресенья"
+    match = WEEKDAY_RE.search(remaining)
+    if match:
+        if target_date is not None:
+            confidence = min(confidence, 0.5)
+        weekday = next(num for stem, num in WEEKDAYS.items() if match.group(2).startswith(stem))
+        days_ahead = (weekday - now_local.weekday()) % 7
+        # "в пятницу", сказанное в пятницу: сегодня, если время еще не прошло (проверка при сборке)
+        weekday_is_today = days_ahead == 0
+        if match.group(1):
+            # "в следующую пятницу" трактуется по-разному - пусть решает LLM
+            confidence = min(confidence, 0.7)
+        target_date = now_local.add(days=days_ahead).date()
+        consume(match)
+
+    # 5. Время: "в 15:00", "в 15.30" (разобрано выше), "в 9 утра", "в 3 дня"
+    if hour is None:
+        match = TIME_COLON_RE.search(remaining)
+        if match:
+            hour, minute = int(match.group(1)), int(match.group(2))
+            consume(match)
+        else:
+            match = TIME_HOUR_RE.search(remaining)
+            if match:
+                hour = _apply_meridiem(int(match.group(1)), match.group(2))
+                minute = 0
+                # "в 5" без "утра"/"вечера": скорее 17:00, чем 05:00 - пусть решает LLM
+                bare_early_hour = match.group(2) is None and 1 <= hour <= 7
+                consume(match)
+
+    # 6. Часть суток: "утром", "вечером", "днем"
+    match = DAY_PART_RE.search(remaining)
+    if match:
+        part_hour = _day_part_hour(match.group(1))
+        if hour is None:
+            hour = part_hour
+        elif part_hour is not None and part_hour >= 12 and hour < 12:
+            hour += 12 # "в 7 ... вечером"
+        bare_early_hour = False
+        consume(match)
+
+    if bare_early_hour:
+        confidence = min(confidence, 0.5)
+
+    if hour is not None and not (0 <= hour <= 23 and 0 <= minute <= 59):
+        return None
+
+    if relative is None and target_date is None and hour is None:
+        return None
+
+    # Сборка итогового момента времени
+    if relative is not None:
+        if hour is not None or target_date is not None:
+            confidence = min(confidence, 0.5) # "через 2 часа в 15:00" - противоречие
+        result_local = now_local + relative
+    else:
+        if target_date is None:
+            # Только время/часть суток: сегодня, а если уже прошло - завтра
+            candidate = now_local.set(hour=hour, minute=minute, second=0, microsecond=0)
+            if candidate <= now_local:
+                candidate = candidate.add(days=1)
+            result_local = candidate
+        else:
+            result_local = pendulum.datetime(
+                target_date.year, target_date.month, target_date.day,
+                hour if hour is not None else DEFAULT_HOUR, minute,
+                tz=user_timezone
+            )
+            if result_local <= now_local and weekday_is_today:
+                result_local = result_local.add(weeks=1) # Сегодняшнее время прошло - следующая неделя
+            if result_local <= now_local:
+                confidence = min(confidence, 0.5) # Время в прошлом - пусть перепроверит LLM
+
+    # Уверенность снижается пропорционально нераспознанному тексту
+    leftover = [token for token in remaining.split() if token not in FILLER_WORDS]
+    if leftover:
+        leftover_length = sum(len(token) for token in leftover)
+        confidence = min(confidence, 1.0 - leftover_length / max(original_length, 1))
+
+    return {
+        "datetime": result_local.in_timezone("UTC"),
+        "confidence": round(max(confidence, 0.0), 2),
+        "matched": consumed,
+        "unparsed": leftover,
+    }
+
+
+def try_parse_time_locally(
+    text: Optional[str],
+    user_timezone: str = "UTC",
+    min_confidence: float = 0.9
+) -> Optional[pendulum.DateTime]:
+    """
+    Быстрый путь перед LLM: возвращает время в UTC, если локальный парсер уверен,
+    иначе None (тогда вызывающий код обращается к LLM). Ведет счетчики local_parser_stats.
+    """
+    local_parser_stats["calls"] += 1
+    try:
+        result = parse_time_expression_locally(text, user_timezone)
+    except Exception as e:
+        logger.error(f"Local time parser failed for '{text}': {e}", exc_info=True)
+        result = None
+
+    if not result:
+        local_parser_stats["no_match"] += 1
+        logger.debug(f"Local time parser: no match for '{text}'")
+        return None
+
+    if result["confidence"] < min_confidence:
+        local_parser_stats["low_confidence"] += 1
+        logger.debug(f"Local time parser: low confidence {result['confidence']} for '{text}' "
+                     f"(unparsed: {result['unparsed']})")
+        return None
+
+    local_parser_stats["hits"] += 1
+    logger.info(f"Local time parser: '{text}' → {result['datetime'].to_iso8601_string()} "
+                f"(confidence {result['confidence']})")
+    return result["datetime"]
+
+
+def get_local_parser_stats() -> Dict[str, Any]:
+    """Возвращает счетчики локального парсера и долю сэкономленных вызовов LLM."""
+    stats = dict(local_parser_stats)
+    stats["hit_rate"] = round(stats["hits"] / stats["calls"], 3) if stats["calls"] else 0.0
+    return stats
+
+
 async def text_to_datetime_obj(text_date: Optional[str], user_timezone: str = 'UTC') -> Dict[str, Any]:
     """
     Парсит дату/время/повторение.
@@ -24,6 +370,13 @@ async def text_to_datetime_obj(text_date: Optional[str], user_timezone: str = 'U
         'is_repeating': bool
         'rrule': str | None
     """
+    # Импорт внутри функции: gemini_client сам использует локальный парсер из этого модуля
+    try:
+        from src.llm.gemini_client import process_date_text_with_llm
+    except ImportError:
+        logger.error("Could not import LLM client for date parsing!")
+        process_date_text_with_llm = None
+
     if not text_date:
         return {'has_time': False, 'is_repeating': False} # Возвращаем пустой словарь, но с флагами
 
@@ -50,7 +403,7 @@ async def text_to_datetime_obj(text_date: Optional[str], user_timezone: str = 'U
                     else:
                         date_time = None
                         date = dt_utc_from_llm.in_timezone(user_timezone).date() # Сохраняем только дату
-                        
+
                     logger.info(f"LLM parsed -> Date: {date}, DateTimeUTC: {date_time}, HasTime: {has_time}")
                 except Exception as parse_exc:
                     logger.error(f"LLM returned invalid ISO date format: '{iso_date_str}'. Error: {parse_exc}")
@@ -67,7 +420,7 @@ async def text_to_datetime_obj(text_date: Optional[str], user_timezone: str = 'U
     # Формируем финальный результат
     # Возвращаем только если удалось получить дату или правило
 
-    
+
 
     if date or date_time:
         return {
@@ -79,4 +432,4 @@ async def text_to_datetime_obj(text_date: Optional[str], user_timezone: str = 'U
         }
     else:
         logger.warning(f"Could not parse date from text: '{text_date}'")
-        return {'has_time': False, 'is_repeating': False}
\ No newline at end of file
+        return {'has_time': False, 'is_repeating': False}
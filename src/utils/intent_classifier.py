@@ -0,0 +1,212 @@
+# src/utils/intent_classifier.py
+
+import logging
+import re
+from typing import Optional, Dict, Any, List, Tuple
+
+from src.utils.date_parser import parse_time_expression_locally
+from src.utils.timezone_index import resolve_timezone_locally
+from src.utils.title_generator import starts_with_verb
+
+logger = logging.getLogger(__name__)
+
+# Те же метки, что и в SIMPLE_INTENT_DETECTION_PROMPT
+INTENT_LABELS = (
+    "add_task",
+    "find_tasks",
+    "complete_task",
+    "reschedule_task",
+    "edit_task_description",
+    "update_timezone",
+    "unknown",
+)
+
+# Интенты, которые имеют смысл только при ответе на сообщение бота
+REPLY_ONLY_INTENTS = {"complete_task", "reschedule_task", "edit_task_description"}
+
+# Правила: (регулярное выражение, интент, вес, условие по реплаю: True - только реплай,
+# False - только не реплай, None - в обоих случаях)
+INTENT_RULES: List[Tuple[re.Pattern, str, float, Optional[bool]]] = [
+    # complete_task: короткие ответы "готово", "сделал"
+    (re.compile(r"^(сделал[аи]?|сделано|готово|выполнено|выполнил[аи]?|сделала|done|закрыто|"
+                r"отметь(?: как)? выполненн\w+|уже сделал[аи]?|все сделал[аи]?|всё сделал[аи]?)$"),
+     "complete_task", 1.0, True),
+    # "ок" чаще значит "понял", чем "сделал" - решает LLM
+    (re.compile(r"^(ок|ok|окей)$"), "complete_task", 0.6, True),
+    (re.compile(r"\b(сделал[аи]?|выполнил[аи]?|готово|выполнено)\b"), "complete_task", 0.6, True),
+
+    # reschedule_task
+    (re.compile(r"^(перенеси|перенести|отложи|отложить|сдвинь|передвинь|напомни|сделаю)\b"),
+     "reschedule_task", 0.9, True),
+
+    # edit_task_description
+    (re.compile(r"^(измени|поменяй|исправь|уточни|смени|замени|переименуй|перепиши)\b"),
+     "edit_task_description", 0.95, True),
+    (re.compile(r"\b(добавь в описание|описание на|текст задачи)\b"), "edit_task_description", 0.9, True),
+
+    # find_tasks
+    (re.compile(r"^(найди|найти|покажи|показать|поищи|выведи|какие|что у меня|список)\b.*\b(задач\w*|дел\w*|напоминани\w*)\b"),
+     "find_tasks", 0.95, None),
+    (re.compile(r"^(найди|поищи|покажи)\b"), "find_tasks", 0.7, None),
+
+    # update_timezone
+    (re.compile(r"\b(часов\w+ пояс\w*|таймзон\w*|тайм-зон\w*|timezone)\b"), "update_timezone", 0.95, None),
+    (re.compile(r"^(переехал[аи]? (в|во)|нахожусь (в|во)|живу (в|во)|прилетел[аи]? (в|во)|мой город)\s+\S+"),
+     "update_timezone", 0.9, None),
+
+    # add_task
+    (re.compile(r"^(напомни|напомнить|не забыть|надо|нужно|запиши|добавь задачу|создай задачу)\b"),
+     "add_task", 0.95, False),
+    (re.compile(r"^(купить|позвонить|написать|отправить|оплатить|забрать|сделать|подготовить|записаться|"
+                r"встреча|созвон|заказать|проверить|отнести|взять|сходить|поздравить)\b"),
+     "add_task", 0.9, False),
+]
+
+
+# "я в Барселоне" - смена часового пояса, только если после "в" стоит известное место
+# ("я в пятницу иду к врачу", "я во вторник занят" - это задачи)
+LOCATION_STATEMENT_RE = re.compile(r"^я (?:сейчас )?(?:в|во)\s+(\w+)")
+NOT_LOCATION_WORDS_RE = re.compile(
+    r"^(понедельник|вторник|сред[уае]|четверг|пятниц\w*|суббот\w*|воскресень\w*|выходн\w*|будн\w*|"
+    r"\d+|час\w*|полдень|полночь|обед|утро|вечер|ночь)$"
+)
+
+# Список задач в одном сообщении: маркеры строк ("- купить хлеб", "2) позвонить") и разделители действий
+LIST_BULLET_RE = re.compile(r"^\s*(?:[-•*—]|\d{1,2}[.)])\s*")
+LIST_HEADER_RE = re.compile(r":\s")
+LIST_SEPARATOR_RE = re.compile(r"[,;]|\s+и\s+")
+
+
+def _empty_counters() -> Dict[str, int]:
+    return {
+        "local_decisions": 0,   # Решено локально (LLM не вызывался)
+        "shadow_checked": 0,    # Локальные решения, перепроверенные LLM в теневом режиме
+        "shadow_agree": 0,      # ... из них LLM согласилась
+        "deferred": 0,          # Низкая уверенность: локальная гипотеза есть, но решала LLM
+        "deferred_agree": 0,    # ... из них LLM вернула тот же интент
+    }
+
+
+# Счетчики точности по интентам (для подбора порога на реальном трафике)
+intent_classifier_stats: Dict[str, Dict[str, int]] = {label: _empty_counters() for label in INTENT_LABELS}
+
+
+def _normalize(text: str) -> str:
+    text = text.lower().replace("ё", "е").strip()
+    text = re.sub(r"[.,!?;:)(«»\"]+$", "", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def classify_intent_locally(user_text: str, is_reply: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Быстрая классификация интента по ключевым словам, без обращения к LLM.
+
+    Args:
+        user_text: Текст пользователя.
+        is_reply: Является ли сообщение ответом на сообщение бота.
+
+    Returns:
+        Словарь {'intent': str, 'confidence': float, 'scores': dict} или None, если ни одно правило не сработало.
+    """
+    if not user_text or user_text.isspace():
+        return None
+
+    text = _normalize(user_text)
+    scores: Dict[str, float] = {}
+
+    for pattern, intent, weight, reply_condition in INTENT_RULES:
+        if reply_condition is not None and reply_condition != is_reply:
+            continue
+        if pattern.search(text):
+            scores[intent] = max(scores.get(intent, 0.0), weight)
+
+    location = LOCATION_STATEMENT_RE.match(text)
+    if location and not NOT_LOCATION_WORDS_RE.match(location.group(1)) \
+            and resolve_timezone_locally(location.group(1)):
+        scores["update_timezone"] = max(scores.get("update_timezone", 0.0), 0.9)
+
+    # Ответ на сообщение бота, состоящий только из выражения времени ("завтра в 15"), - перенос
+    if is_reply and "reschedule_task" not in scores:
+        parsed = parse_time_expression_locally(text)
+        if parsed and parsed["confidence"] >= 0.9:
+            scores["reschedule_task"] = 0.9
+
+    if not scores:
+        return None
+
+    # Без реплая контекстные интенты невозможны
+    if not is_reply:
+        for intent in REPLY_ONLY_INTENTS:
+            scores.pop(intent, None)
+        if not scores:
+            return None
+
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    best_intent, best_score = ranked[0]
+    # Конкурирующие гипотезы снижают уверенность
+    if len(ranked) > 1:
+        best_score = best_score * (1.0 - ranked[1][1] / 2)
+
+    return {"intent": best_intent, "confidence": round(best_score, 3), "scores": scores}
+
+
+def looks_like_task_list(user_text: str) -> bool:
+    """
+    Похоже ли сообщение на несколько задач сразу: несколько строк (списком) или
+    действия через запятую/"и" ("завтра: купить хлеб, забрать посылку, позвонить в банк в 11").
+    Окончательно задачи делит LLM - ложное срабатывание дает одну задачу.
+    """
+    if not user_text or user_text.isspace():
+        return False
+    lines = [LIST_BULLET_RE.sub("", line).strip() for line in user_text.splitlines()]
+    # Строка-заголовок ("Завтра:") задачей не считается
+    lines = [line for line in lines if line and not line.endswith(":")]
+    if len(lines) >= 2:
+        return True
+
+    # "завтра: ..." - общее время перед списком
+    text = LIST_HEADER_RE.split(lines[0] if lines else user_text, maxsplit=1)[-1]
+    actions = [part for part in LIST_SEPARATOR_RE.split(text) if starts_with_verb(part)]
+    return len(actions) >= 2
+
+
+def record_local_decision(intent: str) -> None:
+    """Учитывает решение, принятое локально без LLM."""
+    intent_classifier_stats.setdefault(intent, _empty_counters())["local_decisions"] += 1
+
+
+def record_intent_feedback(local_intent: str, llm_intent: Optional[str], shadow: bool) -> None:
+    """
+    Сравнивает локальную гипотезу с ответом LLM.
+
+    Args:
+        local_intent: Интент локального классификатора.
+        llm_intent: Интент, который вернула LLM (None - ошибка LLM, не учитываем).
+        shadow: True - теневая перепроверка уверенного локального решения,
+                False - локальная уверенность была ниже порога и решала LLM.
+    """
+    if not llm_intent:
+        return
+    counters = intent_classifier_stats.setdefault(local_intent, _empty_counters())
+    agree = local_intent == llm_intent
+    if shadow:
+        counters["shadow_checked"] += 1
+        counters["shadow_agree"] += int(agree)
+    else:
+        counters["deferred"] += 1
+        counters["deferred_agree"] += int(agree)
+    if not agree:
+        logger.info(f"Local intent classifier disagreement: local='{local_intent}', llm='{llm_intent}' (shadow={shadow})")
+
+
+def get_intent_classifier_stats() -> Dict[str, Dict[str, Any]]:
+    """Возвращает счетчики и оценки точности по каждому интенту."""
+    result = {}
+    for intent, counters in intent_classifier_stats.items():
+        stats: Dict[str, Any] = dict(counters)
+        stats["precision"] = (round(counters["shadow_agree"] / counters["shadow_checked"], 3)
+                              if counters["shadow_checked"] else None)
+        stats["deferred_precision"] = (round(counters["deferred_agree"] / counters["deferred"], 3)
+                                       if counters["deferred"] else None)
+        result[intent] = stats
+    return result
@@ -0,0 +1,99 @@
+# src/utils/message_burst.py
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiogram import types
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class MessageBurstCoalescer:
+    """
+    Собирает сообщения одного отправителя в чате, пришедшие подряд, в серию (debounce).
+    В групповом чате у каждого участника своя серия: задачи создаются от имени отправителя.
+
+    Первое сообщение серии становится ведущим: его обработчик ждет, пока пауза между
+    сообщениями не превысит window секунд (но не дольше max_wait), и обрабатывает всю серию.
+    Обработчики остальных сообщений серии сразу завершаются.
+    """
+
+    def __init__(self, window: float, max_wait: float = 4.0, max_messages: int = 10):
+        self.window = window
+        self.max_wait = max_wait
+        self.max_messages = max_messages
+        self._bursts: Dict[Tuple[int, int], Dict[str, Any]] = {}
+        self.stats = {
+            "bursts": 0,         # Серий (включая одиночные сообщения)
+            "coalesced": 0,      # Сообщений, присоединенных к чужой серии
+            "max_burst_size": 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0
+
+    def join(self, chat_id: int, user_id: int, message: types.Message) -> Optional[Dict[str, Any]]:
+        """
+        Добавляет сообщение в текущую серию отправителя в чате.
+
+        Returns:
+            Новую серию, если сообщение ее открыло (вызывающий должен дождаться wait()),
+            или None, если сообщение присоединено к уже открытой серии.
+        """
+        key = (chat_id, user_id)
+        burst = self._bursts.get(key)
+        if burst is not None and len(burst["messages"]) < self.max_messages:
+            burst["messages"].append(message)
+            burst["event"].set()
+            self.stats["coalesced"] += 1
+            return None
+
+        # Серия заполнена - сообщение открывает новую (старая будет обработана своим ведущим)
+        burst = {"key": key, "messages": [message], "event": asyncio.Event(), "started_at": time.monotonic()}
+        self._bursts[key] = burst
+        self.stats["bursts"] += 1
+        return burst
+
+    async def wait(self, burst: Dict[str, Any]) -> List[types.Message]:
+        """Ждет окончания серии и возвращает ее сообщения в порядке поступления."""
+        deadline = burst["started_at"] + self.max_wait
+        try:
+            while len(burst["messages"]) < self.max_messages:
+                timeout = min(self.window, deadline - time.monotonic())
+                if timeout <= 0:
+                    break
+                burst["event"].clear()
+                try:
+                    await asyncio.wait_for(burst["event"].wait(), timeout)
+                except asyncio.TimeoutError:
+                    break
+        finally:
+            # Между выходом из цикла и этой строкой нет await - новые сообщения не потеряются
+            if self._bursts.get(burst["key"]) is burst:
+                del self._bursts[burst["key"]]
+
+        messages = burst["messages"]
+        self.stats["max_burst_size"] = max(self.stats["max_burst_size"], len(messages))
+        if len(messages) > 1:
+            chat_id, user_id = burst["key"]
+            logger.info(f"Coalesced {len(messages)} messages from user {user_id} in chat {chat_id} into one burst")
+        return messages
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = dict(self.stats)
+        stats["open_bursts"] = len(self._bursts)
+        total = stats["bursts"] + stats["coalesced"]
+        stats["coalesced_rate"] = round(stats["coalesced"] / total, 3) if total else 0.0
+        return stats
+
+
+message_bursts = MessageBurstCoalescer(
+    window=settings.message_burst_window_ms / 1000,
+    max_wait=settings.message_burst_max_wait_ms / 1000,
+    max_messages=settings.message_burst_max_messages
+)
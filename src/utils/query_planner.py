@@ -0,0 +1,244 @@
+# src/utils/query_planner.py
+
+import logging
+import re
+from typing import Optional, Dict, Any, Tuple
+
+import pendulum
+
+from src.utils.search_query import SEARCH_FILLER_WORDS, WORD_RE
+
+logger = logging.getLogger(__name__)
+
+# --- Локальный планировщик поисковых запросов (фильтры по дате/статусу -> SQL без LLM) ---
+
+WEEKDAY_STEMS = {
+    "понедельник": 0, "вторник": 1, "сред": 2, "четверг": 3,
+    "пятниц": 4, "суббот": 5, "воскресень": 6,
+}
+
+WEEKDAY_LABELS = ["понедельник", "вторник", "среду", "четверг", "пятницу", "субботу", "воскресенье"]
+
+# Статусы
+DONE_RE = re.compile(r"\b(выполненн\w*|сделанн\w*|завершенн\w*|законченн\w*|закрыт\w*|готов(ые|ых))\b")
+OVERDUE_RE = re.compile(r"\b(просроченн\w*|просрочк\w*|пропущенн\w*)\b")
+PENDING_RE = re.compile(r"\b(активн\w*|невыполненн\w*|незавершенн\w*|открыт\w*|текущ\w*)\b")
+RECURRING_RE = re.compile(r"\b(повторяющ\w*|регулярн\w*|периодическ\w*)\b")
+
+# Периоды (порядок важен: сначала более длинные фразы)
+PERIOD_RULES = [
+    (re.compile(r"\b(?:до|к)\s+конц\w*\s+недел\w*\b"), "until_end_of_week"),
+    (re.compile(r"\b(?:до|к)\s+конц\w*\s+месяц\w*\b"), "until_end_of_month"),
+    (re.compile(r"\b(?:(?:на|в)\s+)?следующ\w*\s+недел\w*\b"), "next_week"),
+    (re.compile(r"\b(?:(?:на|в)\s+)?прошл\w*\s+недел\w*\b"), "last_week"),
+    (re.compile(r"\b(?:(?:на|в)\s+)?(?:эт\w+|текущ\w+)\s+недел\w*\b|\bна\s+неделе\b"), "this_week"),
+    (re.compile(r"\b(?:(?:на|в)\s+)?ближайш\w*\s+недел\w*\b"), "next_7_days"),
+    (re.compile(r"\b(?:(?:в|на)\s+)?следующ\w*\s+месяц\w*\b"), "next_month"),
+    (re.compile(r"\b(?:(?:в|за)\s+)?прошл\w*\s+месяц\w*\b"), "last_month"),
+    (re.compile(r"\b(?:(?:в|на|за)\s+)?(?:эт\w+|текущ\w+)\s+месяц\w*\b"), "this_month"),
+    (re.compile(r"\b(?:(?:на|в)\s+)?(?:эт\w+\s+)?выходн\w*\b"), "weekend"),
+    (re.compile(r"\b(?:на|за|к)?\s*послезавтра\b"), "day_after_tomorrow"),
+    (re.compile(r"\b(?:на|за|к)?\s*завтра\b"), "tomorrow"),
+    (re.compile(r"\b(?:на|за|к)?\s*сегодня\b"), "today"),
+    (re.compile(r"\b(?:на|за|к)?\s*вчера\b"), "yesterday"),
+    (re.compile(r"\b(?:(?:в|во|на)\s+)?(понедельник\w*|вторник\w*|сред[аеуы]|четверг\w*|пятниц\w*|"
+                r"суббот\w*|воскресень\w*)\b"), "weekday"),
+]
+
+PERIOD_LABELS = {
+    "today": "на сегодня",
+    "tomorrow": "на завтра",
+    "day_after_tomorrow": "на послезавтра",
+    "yesterday": "за вчера",
+    "this_week": "на этой неделе",
+    "next_week": "на следующей неделе",
+    "last_week": "на прошлой неделе",
+    "next_7_days": "на ближайшую неделю",
+    "until_end_of_week": "до конца недели",
+    "weekend": "на выходные",
+    "this_month": "в этом месяце",
+    "next_month": "в следующем месяце",
+    "last_month": "в прошлом месяце",
+    "until_end_of_month": "до конца месяца",
+}
+
+# Слова, которые не меняют смысла структурного запроса ("что у меня на завтра?")
+PLANNER_FILLER_WORDS = SEARCH_FILLER_WORDS | {
+    "на", "в", "во", "за", "к", "до", "надо", "нужно", "запланировано", "запланированные",
+    "стоит", "сделать", "список", "план", "планы", "там", "вообще", "а", "и", "еще", "ещё",
+    "которые", "который", "было", "будет", "есть", "напоминаний",
+}
+
+# Счетчики (сколько поисковых запросов решено без LLM)
+query_planner_stats = {
+    "calls": 0,      # Всего обращений к планировщику
+    "planned": 0,    # Запрос превращен в SQL-фильтр
+    "semantic": 0,   # Остались содержательные слова - нужен LLM
+    "no_filters": 0, # Фильтров по дате/статусу не найдено
+}
+
+
+def _normalize(text: str) -> str:
+    text = text.lower().replace("ё", "е")
+    text = re.sub(r"[,;:!?«»\"()]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _weekday_index(word: str) -> Optional[int]:
+    for stem, index in WEEKDAY_STEMS.items():
+        if word.startswith(stem):
+            return index
+    return None
+
+
+def _period_bounds(
+    period: str,
+    now_local: pendulum.DateTime,
+    weekday: Optional[int] = None
+) -> Tuple[Optional[pendulum.DateTime], Optional[pendulum.DateTime]]:
+    """Границы периода в часовом поясе пользователя (неделя начинается с понедельника)."""
+    today = now_local.start_of("day")
+    week_start = now_local.start_of("week")
+    month_start = now_local.start_of("month")
+
+    if period == "today":
+        return today, today.end_of("day")
+    if period == "tomorrow":
+        return today.add(days=1), today.add(days=1).end_of("day")
+    if period == "day_after_tomorrow":
+        return today.add(days=2), today.add(days=2).end_of("day")
+    if period == "yesterday":
+        return today.subtract(days=1), today.subtract(days=1).end_of("day")
+    if period == "this_week":
+        return week_start, week_start.end_of("week")
+    if period == "next_week":
+        return week_start.add(weeks=1), week_start.add(weeks=1).end_of("week")
+    if period == "last_week":
+        return week_start.subtract(weeks=1), week_start.subtract(weeks=1).end_of("week")
+    if period == "next_7_days":
+        return now_local, today.add(days=7).end_of("day")
+    if period == "until_end_of_week":
+        return now_local, week_start.end_of("week")
+    if period == "weekend":
+        # Ближайшие суббота и воскресенье (в воскресенье - только сегодня)
+        saturday = week_start.add(days=5)
+        start = today if now_local.weekday() == 6 else saturday
+        return start, saturday.add(days=1).end_of("day")
+    if period == "this_month":
+        return month_start, month_start.end_of("month")
+    if period == "next_month":
+        return month_start.add(months=1), month_start.add(months=1).end_of("month")
+    if period == "last_month":
+        return month_start.subtract(months=1), month_start.subtract(months=1).end_of("month")
+    if period == "until_end_of_month":
+        return now_local, month_start.end_of("month")
+    if period == "weekday" and weekday is not None:
+        # Ближайший такой день недели, включая сегодня
+        day = today.add(days=(weekday - now_local.weekday()) % 7)
+        return day, day.end_of("day")
+    return None, None
+
+
+def plan_task_query(
+    query_text: Optional[str],
+    user_timezone: str = "UTC",
+    now: Optional[pendulum.DateTime] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Превращает структурный поисковый запрос ("задачи на завтра", "что на этой неделе",
+    "выполненные сегодня", "просроченные") в критерии для find_tasks_by_criteria.
+
+    Args:
+        query_text: Поисковый запрос пользователя.
+        user_timezone: Часовой пояс пользователя (границы дней и недель считаются в нем).
+        now: Текущее время (для тестов), по умолчанию - сейчас.
+
+    Returns:
+        Словарь с start_date/end_date (UTC), status, completed_date_filter, only_recurring и label
+        (заголовок ответа) или None, если в запросе есть содержательные слова и нужен LLM.
+    """
+    query_planner_stats["calls"] += 1
+    if not query_text:
+        query_planner_stats["no_filters"] += 1
+        return None
+
+    text = _normalize(query_text)
+    try:
+        now_local = (now or pendulum.now("UTC")).in_timezone(user_timezone)
+    except Exception:
+        logger.warning(f"Invalid timezone '{user_timezone}' in query planner, using UTC")
+        now_local = (now or pendulum.now("UTC")).in_timezone("UTC")
+
+    period, weekday = None, None
+    for pattern, name in PERIOD_RULES:
+        match = pattern.search(text)
+        if match:
+            period = name
+            if name == "weekday":
+                weekday = _weekday_index(match.group(1))
+            text = pattern.sub(" ", text, count=1)
+            break
+
+    is_done = bool(DONE_RE.search(text))
+    is_overdue = not is_done and bool(OVERDUE_RE.search(text))
+    only_recurring = bool(RECURRING_RE.search(text))
+    has_pending_marker = bool(PENDING_RE.search(text))
+    for pattern in (DONE_RE, OVERDUE_RE, PENDING_RE, RECURRING_RE):
+        text = pattern.sub(" ", text)
+
+    if not (period or is_done or is_overdue or only_recurring or has_pending_marker):
+        query_planner_stats["no_filters"] += 1
+        return None
+
+    # Остались содержательные слова ("оплатить", "маме") - это семантический запрос для LLM
+    leftover = [word for word in WORD_RE.findall(text) if word not in PLANNER_FILLER_WORDS]
+    if leftover:
+        query_planner_stats["semantic"] += 1
+        logger.debug(f"Query planner: '{query_text}' has semantic words {leftover}, leaving it to LLM")
+        return None
+
+    start_local, end_local = _period_bounds(period, now_local, weekday) if period else (None, None)
+    if period and start_local is None:
+        query_planner_stats["semantic"] += 1
+        return None
+
+    if is_overdue:
+        # Просроченные: активные задачи с напоминанием в прошлом (в пределах периода, если он указан)
+        end_local = min(end_local, now_local) if end_local else now_local
+        label = "Просроченные задачи"
+    elif is_done:
+        label = "Выполненные задачи"
+    elif only_recurring:
+        label = "Повторяющиеся задачи"
+    elif has_pending_marker and not period:
+        label = "Все активные задачи"
+    else:
+        label = "Задачи"
+
+    if period:
+        period_label = PERIOD_LABELS.get(period)
+        if period == "weekday":
+            period_label = f"на {WEEKDAY_LABELS[weekday]}"
+        if is_done and period == "today":
+            period_label = "за сегодня"
+        label = f"{label} {period_label}"
+
+    plan = {
+        "start_date": start_local.in_timezone("UTC") if start_local else None,
+        "end_date": end_local.in_timezone("UTC") if end_local else None,
+        "status": "done" if is_done else "pending",
+        "completed_date_filter": is_done and period is not None,
+        "only_recurring": only_recurring,
+        "label": label,
+    }
+    query_planner_stats["planned"] += 1
+    logger.info(f"Query planner: '{query_text}' -> {label} "
+                f"[{plan['start_date']} .. {plan['end_date']}], status={plan['status']}")
+    return plan
+
+
+def get_query_planner_stats() -> Dict[str, Any]:
+    """Статистика планировщика (для /metrics)."""
+    stats = dict(query_planner_stats)
+    stats["planned_rate"] = round(stats["planned"] / stats["calls"], 3) if stats["calls"] else 0.0
+    return stats
@@ -0,0 +1,266 @@
+# src/utils/recurrence.py
+
+import logging
+import re
+from typing import Optional, Dict, Any, List
+
+from src.utils.date_parser import WEEKDAYS, MONTHS, NUMBER_WORDS
+from src.utils.rrule_helper import validate_rrule
+
+logger = logging.getLogger(__name__)
+
+RRULE_WEEKDAYS = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+
+# Признаки повторения. Если ни одного нет - задача точно разовая и LLM не нужна.
+# "через день/неделю" без "каждые"/"раз в" - разовый срок ("через неделю позвонить"), не признак.
+RECURRENCE_MARKER_RE = re.compile(
+    r"\b(кажд\w*|ежедневн\w*|еженедельн\w*|ежемесячн\w*|ежегодн\w*|ежечасн\w*|раз\s+в\b|"
+    r"по\s+(?:понедельникам|вторникам|средам|четвергам|пятницам|субботам|воскресеньям|"
+    r"будням|выходным|будним|утрам|вечерам|ночам|дням|числам)|"
+    r"в\s+будни|(?:день|дн\w+)\s+рождени\w*|годовщин\w*|"
+    r"(?:перв|втор|трет|четверт|последн)\w+\s+(?:день|число|понедельник|вторник|сред[ау]|четверг|"
+    r"пятниц[ау]|суббот[ау]|воскресенье)\s+месяц\w*|"
+    r"every|daily|weekly|monthly|yearly)\b"
+)
+
+_NUM = r"(\d+|" + "|".join(NUMBER_WORDS) + r"|втор\w+|трет\w+)"
+_WEEKDAY = r"(понедельник\w*|вторник\w*|сред[аеуы]|сред(?:ам)?|четверг\w*|пятниц\w*|суббот\w*|воскресень\w*)"
+_MONTH = (r"(январ\w*|феврал\w*|март\w*|апрел\w*|ма[яй]|июн\w*|июл\w*|август\w*|"
+          r"сентябр\w*|октябр\w*|ноябр\w*|декабр\w*)")
+
+ORDINALS = {"перв": 1, "втор": 2, "трет": 3, "четверт": 4, "последн": -1}
+
+# Типовые паттерны повторения (проверяются в _compile по порядку, от более специфичных)
+WEEKDAYS_WORK_RE = re.compile(
+    r"\b(?:кажд\w+\s+будн\w+\s+д\w+|по\s+будн\w+(?:\s+дням)?|в\s+будни|"
+    r"по\s+рабочим\s+дням|кажд\w+\s+рабоч\w+\s+д\w+)\b"
+)
+WEEKEND_RE = re.compile(r"\b(?:по\s+выходным|кажд\w+\s+выходн\w+|в\s+выходные\s+кажд\w+\s+недел\w+)\b")
+INTERVAL_RE = re.compile(
+    r"\b(?:кажд\w+|раз\s+в)\s+" + _NUM + r"\s+(дн\w*|день|недел\w*|месяц\w*|год\w*|лет)\b"
+)
+EVERY_UNIT_RE = re.compile(
+    r"\b(?:кажд\w+|раз\s+в)\s+(день|дн\w+|сутки|утро|вечер|недел\w+|месяц\w*|год\w*)\b|"
+    r"\b(ежедневн\w*|еженедельн\w*|ежемесячн\w*|ежегодн\w*)\b|"
+    r"\bпо\s+(утрам|вечерам)\b"
+)
+ORDINAL_WEEKDAY_RE = re.compile(
+    r"\b(?:(?:в|во)\s+)?(перв\w+|втор\w+|трет\w+|четверт\w+|последн\w+)\s+" + _WEEKDAY +
+    r"\s+(?:кажд\w+\s+)?месяц\w*\b"
+)
+LAST_DAY_RE = re.compile(r"\b(?:в\s+)?последн\w+\s+(?:день|число)\s+(?:кажд\w+\s+)?месяц\w*\b")
+MONTHDAY_RE = re.compile(
+    r"\b(\d{1,2})(?:-?(?:го|е|ое))?\s+числ\w*\s+(?:кажд\w+\s+месяц\w*|ежемесячно)\b|"
+    r"\b(?:кажд\w+\s+месяц\w*|ежемесячно)\s+(\d{1,2})(?:-?(?:го|е|ое))?\s+числ\w*\b|"
+    r"\bкажд\w+\s+(\d{1,2})(?:-?(?:го|е|ое))?\s+числ\w*\b"
+)
+YEARLY_DATE_RE = re.compile(
+    r"\b(\d{1,2})\s+" + _MONTH + r"\s+(?:кажд\w+\s+год\w*|ежегодно)\b|"
+    r"\b(?:кажд\w+\s+год\w*|ежегодно)\s+(\d{1,2})\s+" + _MONTH + r"\b|"
+    r"\bкажд\w+\s+(\d{1,2})\s+" + _MONTH + r"\b"
+)
+ANNIVERSARY_RE = re.compile(
+    r"\b(?:(?:день|дн\w+)\s+рождени\w*|годовщин\w*).*?\b(\d{1,2})\s+" + _MONTH + r"\b|"
+    r"\b(\d{1,2})\s+" + _MONTH + r"\b.*?\b(?:(?:день|дн\w+)\s+рождени\w*|годовщин\w*)"
+)
+WEEKDAY_LIST_RE = re.compile(
+    r"\b(?:кажд\w+|по)\s+" + _WEEKDAY + r"(?:\s*(?:,|и)\s*(?:(?:кажд\w+|по)\s+)?" + _WEEKDAY + r")*"
+)
+WEEKDAY_ANY_RE = re.compile(_WEEKDAY)
+# "каждый день кроме выходных", "ежедневно кроме воскресенья"
+_EXCEPT_ITEM = r"(?:выходн\w*|будн\w*|" + _WEEKDAY + r")"
+EXCEPT_RE = re.compile(r"\bкроме\s+" + _EXCEPT_ITEM + r"(?:\s*(?:,|и)\s*" + _EXCEPT_ITEM + r")*")
+EXCEPT_ITEM_RE = re.compile(_EXCEPT_ITEM)
+
+# Счетчики: сколько задач обработано локально, а сколько ушло в LLM
+recurrence_stats: Dict[str, int] = {"not_recurring": 0, "compiled": 0, "deferred_to_llm": 0}
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text.lower().replace("ё", "е")).strip()
+
+
+def _to_number(token: str) -> Optional[int]:
+    if token.isdigit():
+        return int(token)
+    if token in NUMBER_WORDS:
+        return NUMBER_WORDS[token]
+    # "каждый второй день", "каждую третью неделю"
+    for stem, value in ORDINALS.items():
+        if token.startswith(stem) and value > 0:
+            return value
+    return None
+
+
+def _weekday_code(token: str) -> Optional[str]:
+    for stem, index in WEEKDAYS.items():
+        if token.startswith(stem):
+            return RRULE_WEEKDAYS[index]
+    return None
+
+
+def _month_number(token: str) -> Optional[int]:
+    # "ма" - префикс мая, проверяем его последним, чтобы не перехватить "март"
+    for stem, number in sorted(MONTHS.items(), key=lambda item: len(item[0]), reverse=True):
+        if token.startswith(stem):
+            return number
+    return None
+
+
+def _freq_for_unit(unit: str) -> Optional[str]:
+    if unit.startswith(("дн", "день", "сутки", "утр", "вечер", "ежедневн")):
+        return "DAILY"
+    if unit.startswith(("недел", "еженедельн")):
+        return "WEEKLY"
+    if unit.startswith(("месяц", "ежемесячн")):
+        return "MONTHLY"
+    if unit.startswith(("год", "лет", "ежегодн")):
+        return "YEARLY"
+    return None
+
+
+def _excluded_weekdays(except_text: str) -> List[str]:
+    codes: List[str] = []
+    for token in (match.group(0) for match in EXCEPT_ITEM_RE.finditer(except_text)):
+        if token.startswith("выходн"):
+            codes += ["SA", "SU"]
+        elif token.startswith("будн"):
+            codes += RRULE_WEEKDAYS[:5]
+        elif _weekday_code(token):
+            codes.append(_weekday_code(token))
+    return codes
+
+
+def _compile(text: str) -> Optional[Dict[str, str]]:
+    """Пробует сопоставить текст с типовыми паттернами. Возвращает {'pattern', 'rrule'} или None."""
+    if re.search(r"\bкроме\b", text):
+        # Исключения понятны только для дней недели при ежедневном повторении, остальное решает LLM
+        exception = EXCEPT_RE.search(text)
+        if not exception:
+            return None
+        match = EVERY_UNIT_RE.search(text)
+        unit = next((group for group in match.groups() if group), None) if match else None
+        if not unit or _freq_for_unit(unit) != "DAILY":
+            return None
+        excluded = _excluded_weekdays(exception.group(0))
+        codes = [code for code in RRULE_WEEKDAYS if code not in excluded]
+        if not codes:
+            return None
+        return {"pattern": f"{match.group(0)} {exception.group(0)}", "rrule": f"FREQ=WEEKLY;BYDAY={','.join(codes)}"}
+
+    match = ORDINAL_WEEKDAY_RE.search(text)
+    if match:
+        ordinal = next((value for stem, value in ORDINALS.items() if match.group(1).startswith(stem)), None)
+        weekday = _weekday_code(match.group(2))
+        if ordinal and weekday:
+            return {"pattern": match.group(0), "rrule": f"FREQ=MONTHLY;BYDAY={ordinal}{weekday}"}
+
+    match = LAST_DAY_RE.search(text)
+    if match:
+        return {"pattern": match.group(0), "rrule": "FREQ=MONTHLY;BYMONTHDAY=-1"}
+
+    match = MONTHDAY_RE.search(text)
+    if match:
+        day = int(next(group for group in match.groups() if group))
+        if 1 <= day <= 31:
+            return {"pattern": match.group(0), "rrule": f"FREQ=MONTHLY;BYMONTHDAY={day}"}
+
+    match = YEARLY_DATE_RE.search(text) or ANNIVERSARY_RE.search(text)
+    if match:
+        groups = [group for group in match.groups() if group]
+        day, month = int(groups[0]), _month_number(groups[1])
+        if month and 1 <= day <= 31:
+            # Паттерн в форме промпта RECURRING_DETECTION_PROMPT: "15 марта каждый год"
+            return {"pattern": f"{day} {groups[1]} каждый год",
+                    "rrule": f"FREQ=YEARLY;BYMONTH={month};BYMONTHDAY={day}"}
+
+    match = WEEKDAYS_WORK_RE.search(text)
+    if match:
+        return {"pattern": match.group(0), "rrule": "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR"}
+
+    match = WEEKEND_RE.search(text)
+    if match:
+        return {"pattern": match.group(0), "rrule": "FREQ=WEEKLY;BYDAY=SA,SU"}
+
+    match = INTERVAL_RE.search(text)
+    if match:
+        interval = _to_number(match.group(1))
+        freq = _freq_for_unit(match.group(2))
+        if interval and freq:
+            rrule = f"FREQ={freq}" if interval == 1 else f"FREQ={freq};INTERVAL={interval}"
+            return {"pattern": match.group(0), "rrule": rrule}
+
+    match = WEEKDAY_LIST_RE.search(text)
+    if match:
+        codes: List[str] = []
+        for token in WEEKDAY_ANY_RE.findall(match.group(0)):
+            code = _weekday_code(token)
+            if code and code not in codes:
+                codes.append(code)
+        if codes:
+            codes.sort(key=RRULE_WEEKDAYS.index)
+            return {"pattern": match.group(0), "rrule": f"FREQ=WEEKLY;BYDAY={','.join(codes)}"}
+
+    match = EVERY_UNIT_RE.search(text)
+    if match:
+        unit = next(group for group in match.groups() if group)
+        freq = _freq_for_unit(unit)
+        if freq:
+            return {"pattern": match.group(0), "rrule": f"FREQ={freq}"}
+
+    return None
+
+
+def has_recurrence_markers(text: str) -> bool:
+    """Быстрая проверка: есть ли в тексте хоть один признак повторения."""
+    return bool(text) and bool(RECURRENCE_MARKER_RE.search(_normalize(text)))
+
+
+def compile_rrule(pattern: str) -> Optional[str]:
+    """
+    Компилирует RRULE для типового русского паттерна повторения без LLM.
+
+    Args:
+        pattern: Паттерн ("каждый понедельник", "каждые 3 дня", "15 числа каждого месяца").
+
+    Returns:
+        Проверенная RRULE строка (без префикса "RRULE:") или None.
+    """
+    if not pattern:
+        return None
+    compiled = _compile(_normalize(pattern))
+    if compiled and validate_rrule(compiled["rrule"]):
+        return compiled["rrule"]
+    return None
+
+
+def detect_recurrence_locally(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Локальное определение повторяемости задачи.
+
+    Returns:
+        {'is_recurring': False, 'pattern': None, 'rrule': None} - признаков повторения нет;
+        {'is_recurring': True, 'pattern': str, 'rrule': str} - паттерн распознан и RRULE проверен;
+        None - признаки есть, но паттерн нетиповой (решает LLM).
+    """
+    if not text:
+        return None
+    normalized = _normalize(text)
+
+    if not RECURRENCE_MARKER_RE.search(normalized):
+        recurrence_stats["not_recurring"] += 1
+        return {"is_recurring": False, "pattern": None, "rrule": None}
+
+    compiled = _compile(normalized)
+    if compiled and validate_rrule(compiled["rrule"]):
+        recurrence_stats["compiled"] += 1
+        logger.info(f"Local recurrence: '{compiled['pattern']}' -> {compiled['rrule']}")
+        return {"is_recurring": True, "pattern": compiled["pattern"], "rrule": compiled["rrule"]}
+
+    recurrence_stats["deferred_to_llm"] += 1
+    logger.debug(f"Recurrence markers found but pattern is not recognized locally: '{text[:50]}'")
+    return None
+
+
+def get_recurrence_stats() -> Dict[str, int]:
+    return dict(recurrence_stats)
@@ -0,0 +1,47 @@
+# src/utils/search_query.py
+
+import re
+from typing import List, Optional
+
+# Служебные слова поисковых запросов ("найди задачи про ...")
+SEARCH_FILLER_WORDS = {
+    "найди", "найти", "поищи", "покажи", "показать", "выведи", "есть", "ли", "у", "меня", "мне",
+    "задача", "задачи", "задачу", "задач", "дело", "дела", "дел", "напоминание", "напоминания",
+    "мои", "мой", "моя", "все", "всё", "что", "какие", "какая", "какой", "где", "про", "о", "об", "обо",
+    "с", "со", "по", "насчет", "насчёт", "связанные", "связанное", "связанная", "касающиеся", "пожалуйста",
+}
+
+# Слова, которые делают запрос не "ключевым словом": фильтры по времени, статусу и т.п.
+# Такие запросы решает LLM (или планировщик запросов), простое совпадение по тексту неверно.
+NON_KEYWORD_RE = re.compile(
+    r"\b(сегодня|завтра|вчера|послезавтра|недел\w*|месяц\w*|год\w*|выходн\w*|утр\w*|вечер\w*|"
+    r"понедельник\w*|вторник\w*|сред[аеуы]|четверг\w*|пятниц\w*|суббот\w*|воскресень\w*|"
+    r"январ\w*|феврал\w*|март\w*|апрел\w*|ма[йя]|июн\w*|июл\w*|август\w*|сентябр\w*|октябр\w*|ноябр\w*|декабр\w*|"
+    r"выполнен\w*|сделан\w*|заверш\w*|просроч\w*|повтор\w*|регулярн\w*|важн\w*|срочн\w*|"
+    r"скоро|ближайш\w*|последн\w*|недавн\w*|\d+)\b"
+)
+
+WORD_RE = re.compile(r"[0-9a-zа-яё]+(?:-[0-9a-zа-яё]+)*")
+
+MAX_KEYWORD_WORDS = 3
+
+
+def search_terms(text: str) -> List[str]:
+    """Значимые слова запроса (без служебных) в нижнем регистре."""
+    if not text:
+        return []
+    words = WORD_RE.findall(text.lower().replace("ё", "е"))
+    return [word for word in words if word not in SEARCH_FILLER_WORDS]
+
+
+def extract_plain_keywords(text: str) -> Optional[str]:
+    """
+    Если запрос - это просто ключевые слова ("найди задачи про страховку" -> "страховку"),
+    возвращает их строкой. Для запросов с фильтрами по времени/статусу и длинных описаний - None.
+    """
+    if not text or NON_KEYWORD_RE.search(text.lower()):
+        return None
+    terms = search_terms(text)
+    if not terms or len(terms) > MAX_KEYWORD_WORDS:
+        return None
+    return " ".join(terms)
@@ -0,0 +1,46 @@
+# src/utils/stage_timer.py
+
+import logging
+import time
+from typing import Awaitable, Dict, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class StageTimer:
+    """
+    Замеряет длительность стадий пайплайна обработки сообщения.
+
+    Стадии могут выполняться параллельно, поэтому в лог пишется и сумма стадий,
+    и реальное время от начала до конца (критический путь).
+    """
+
+    def __init__(self, pipeline_name: str):
+        self.pipeline_name = pipeline_name
+        self.started_at = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    async def measure(self, stage_name: str, awaitable: Awaitable[T]) -> T:
+        """Выполняет awaitable и записывает его длительность под именем stage_name."""
+        stage_started_at = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self.stages[stage_name] = time.perf_counter() - stage_started_at
+
+    def record(self, stage_name: str, seconds: float) -> None:
+        """Записывает длительность стадии, замеренной снаружи."""
+        self.stages[stage_name] = seconds
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    def log_summary(self, level: int = logging.INFO) -> None:
+        stages_text = ", ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in self.stages.items())
+        logger.log(
+            level,
+            f"{self.pipeline_name} timings: {stages_text}; "
+            f"wall={self.elapsed() * 1000:.0f}ms, sum of stages={sum(self.stages.values()) * 1000:.0f}ms"
+        )
@@ -0,0 +1,109 @@
+# src/utils/task_vector_index.py
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Tuple
+
+import numpy as np
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def cosine_top_k(
+    matrix: np.ndarray,
+    query: np.ndarray,
+    limit: int,
+    min_score: float = 0.0
+) -> List[Tuple[int, float]]:
+    """
+    Top-k строк matrix по косинусной близости к query (оба L2-нормированы, поэтому это просто dot).
+
+    Returns:
+        Список (номер строки, score) по убыванию score.
+    """
+    if matrix.shape[0] == 0 or limit <= 0:
+        return []
+    scores = matrix @ query
+    if limit < scores.shape[0]:
+        candidates = np.argpartition(-scores, limit - 1)[:limit]
+    else:
+        candidates = np.arange(scores.shape[0])
+    ordered = candidates[np.argsort(-scores[candidates], kind="stable")]
+    return [(int(row), float(scores[row])) for row in ordered if scores[row] >= min_score]
+
+
+class TaskVectorIndex:
+    """
+    Векторы активных задач в памяти процесса: на пользователя одна матрица float32
+    (задач x размерность) и массив task_id. Источник истины - tasks.embedding в БД,
+    запись пользователя сбрасывается при любом изменении его задач (crud вызывает invalidate).
+    """
+
+    def __init__(self, max_users: int = 1000):
+        self.max_users = max_users
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.searches = 0
+        self.search_seconds = 0.0
+
+    def get(self, user_telegram_id: int, embedder_name: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(user_telegram_id)
+        if entry is None or entry["embedder"] != embedder_name:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(user_telegram_id)
+        self.hits += 1
+        return entry
+
+    def put(self, user_telegram_id: int, embedder_name: str, task_ids: List[int], vectors: List[List[float]], dim: int) -> Dict[str, Any]:
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), dim)
+        entry = {
+            "embedder": embedder_name,
+            "ids": np.asarray(task_ids, dtype=np.int64),
+            "matrix": matrix,
+        }
+        self._entries[user_telegram_id] = entry
+        self._entries.move_to_end(user_telegram_id)
+        while len(self._entries) > self.max_users:
+            self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, user_telegram_id: int) -> None:
+        if self._entries.pop(user_telegram_id, None) is not None:
+            self.invalidations += 1
+
+    def search(
+        self,
+        entry: Dict[str, Any],
+        query_vector: np.ndarray,
+        limit: int,
+        min_score: float = 0.0
+    ) -> List[Tuple[int, float]]:
+        """Возвращает (task_id, score) по убыванию близости."""
+        started_at = time.perf_counter()
+        rows = cosine_top_k(entry["matrix"], query_vector.astype(np.float32), limit, min_score)
+        self.searches += 1
+        self.search_seconds += time.perf_counter() - started_at
+        return [(int(entry["ids"][row]), score) for row, score in rows]
+
+    def get_stats(self) -> Dict[str, Any]:
+        vectors = sum(entry["matrix"].shape[0] for entry in self._entries.values())
+        memory = sum(entry["matrix"].nbytes + entry["ids"].nbytes for entry in self._entries.values())
+        return {
+            "users": len(self._entries),
+            "vectors": vectors,
+            "memory_bytes": memory,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "searches": self.searches,
+            "avg_search_ms": round(self.search_seconds / self.searches * 1000, 3) if self.searches else 0.0,
+        }
+
+
+task_vector_index = TaskVectorIndex(max_users=settings.task_vector_index_max_users)
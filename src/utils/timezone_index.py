@@ -0,0 +1,477 @@
+# src/utils/timezone_index.py
+
+import logging
+import re
+from typing import Optional, Dict, Any, List, Set
+
+import pytz
+
+logger = logging.getLogger(__name__)
+
+# Русские названия городов и стран -> IANA (именительный падеж, формы строятся автоматически)
+RUSSIAN_GAZETTEER: Dict[str, str] = {
+    # Россия
+    "москва": "Europe/Moscow",
+    "санкт-петербург": "Europe/Moscow",
+    "петербург": "Europe/Moscow",
+    "питер": "Europe/Moscow",
+    "спб": "Europe/Moscow",
+    "нижний новгород": "Europe/Moscow",
+    "казань": "Europe/Moscow",
+    "ростов-на-дону": "Europe/Moscow",
+    "краснодар": "Europe/Moscow",
+    "сочи": "Europe/Moscow",
+    "воронеж": "Europe/Moscow",
+    "ярославль": "Europe/Moscow",
+    "тула": "Europe/Moscow",
+    "тверь": "Europe/Moscow",
+    "мурманск": "Europe/Moscow",
+    "архангельск": "Europe/Moscow",
+    "севастополь": "Europe/Simferopol",
+    "симферополь": "Europe/Simferopol",
+    "крым": "Europe/Simferopol",
+    "калининград": "Europe/Kaliningrad",
+    "киров": "Europe/Kirov",
+    "волгоград": "Europe/Volgograd",
+    "астрахань": "Europe/Astrakhan",
+    "саратов": "Europe/Saratov",
+    "ульяновск": "Europe/Ulyanovsk",
+    "самара": "Europe/Samara",
+    "ижевск": "Europe/Samara",
+    "тольятти": "Europe/Samara",
+    "екатеринбург": "Asia/Yekaterinburg",
+    "екб": "Asia/Yekaterinburg",
+    "челябинск": "Asia/Yekaterinburg",
+    "пермь": "Asia/Yekaterinburg",
+    "уфа": "Asia/Yekaterinburg",
+    "тюмень": "Asia/Yekaterinburg",
+    "оренбург": "Asia/Yekaterinburg",
+    "сургут": "Asia/Yekaterinburg",
+    "омск": "Asia/Omsk",
+    "новосибирск": "Asia/Novosibirsk",
+    "барнаул": "Asia/Barnaul",
+    "томск": "Asia/Tomsk",
+    "новокузнецк": "Asia/Novokuznetsk",
+    "кемерово": "Asia/Novokuznetsk",
+    "красноярск": "Asia/Krasnoyarsk",
+    "норильск": "Asia/Krasnoyarsk",
+    "иркутск": "Asia/Irkutsk",
+    "улан-удэ": "Asia/Irkutsk",
+    "чита": "Asia/Chita",
+    "якутск": "Asia/Yakutsk",
+    "благовещенск": "Asia/Yakutsk",
+    "владивосток": "Asia/Vladivostok",
+    "хабаровск": "Asia/Vladivostok",
+    "магадан": "Asia/Magadan",
+    "южно-сахалинск": "Asia/Sakhalin",
+    "сахалин": "Asia/Sakhalin",
+    "камчатка": "Asia/Kamchatka",
+    "петропавловск-камчатский": "Asia/Kamchatka",
+    "анадырь": "Asia/Anadyr",
+    # СНГ
+    "минск": "Europe/Minsk",
+    "беларусь": "Europe/Minsk",
+    "белоруссия": "Europe/Minsk",
+    "киев": "Europe/Kyiv",
+    "украина": "Europe/Kyiv",
+    "одесса": "Europe/Kyiv",
+    "харьков": "Europe/Kyiv",
+    "львов": "Europe/Kyiv",
+    "кишинев": "Europe/Chisinau",
+    "молдова": "Europe/Chisinau",
+    "астана": "Asia/Almaty",
+    "алматы": "Asia/Almaty",
+    "алма-ата": "Asia/Almaty",
+    "казахстан": "Asia/Almaty",
+    "ташкент": "Asia/Tashkent",
+    "самарканд": "Asia/Samarkand",
+    "узбекистан": "Asia/Tashkent",
+    "бишкек": "Asia/Bishkek",
+    "киргизия": "Asia/Bishkek",
+    "кыргызстан": "Asia/Bishkek",
+    "душанбе": "Asia/Dushanbe",
+    "таджикистан": "Asia/Dushanbe",
+    "ашхабад": "Asia/Ashgabat",
+    "туркменистан": "Asia/Ashgabat",
+    "баку": "Asia/Baku",
+    "азербайджан": "Asia/Baku",
+    "ереван": "Asia/Yerevan",
+    "армения": "Asia/Yerevan",
+    "тбилиси": "Asia/Tbilisi",
+    "батуми": "Asia/Tbilisi",
+    "грузия": "Asia/Tbilisi",
+    "рига": "Europe/Riga",
+    "латвия": "Europe/Riga",
+    "вильнюс": "Europe/Vilnius",
+    "литва": "Europe/Vilnius",
+    "таллин": "Europe/Tallinn",
+    "эстония": "Europe/Tallinn",
+    # Европа
+    "лондон": "Europe/London",
+    "великобритания": "Europe/London",
+    "англия": "Europe/London",
+    "дублин": "Europe/Dublin",
+    "ирландия": "Europe/Dublin",
+    "париж": "Europe/Paris",
+    "франция": "Europe/Paris",
+    "берлин": "Europe/Berlin",
+    "мюнхен": "Europe/Berlin",
+    "германия": "Europe/Berlin",
+    "вена": "Europe/Vienna",
+    "австрия": "Europe/Vienna",
+    "цюрих": "Europe/Zurich",
+    "женева": "Europe/Zurich",
+    "швейцария": "Europe/Zurich",
+    "рим": "Europe/Rome",
+    "милан": "Europe/Rome",
+    "италия": "Europe/Rome",
+    "мадрид": "Europe/Madrid",
+    "барселона": "Europe/Madrid",
+    "испания": "Europe/Madrid",
+    "лиссабон": "Europe/Lisbon",
+    "португалия": "Europe/Lisbon",
+    "амстердам": "Europe/Amsterdam",
+    "нидерланды": "Europe/Amsterdam",
+    "голландия": "Europe/Amsterdam",
+    "брюссель": "Europe/Brussels",
+    "бельгия": "Europe/Brussels",
+    "прага": "Europe/Prague",
+    "чехия": "Europe/Prague",
+    "варшава": "Europe/Warsaw",
+    "польша": "Europe/Warsaw",
+    "будапешт": "Europe/Budapest",
+    "венгрия": "Europe/Budapest",
+    "белград": "Europe/Belgrade",
+    "сербия": "Europe/Belgrade",
+    "черногория": "Europe/Podgorica",
+    "будва": "Europe/Podgorica",
+    "софия": "Europe/Sofia",
+    "болгария": "Europe/Sofia",
+    "бухарест": "Europe/Bucharest",
+    "румыния": "Europe/Bucharest",
+    "афины": "Europe/Athens",
+    "греция": "Europe/Athens",
+    "кипр": "Asia/Nicosia",
+    "лимассол": "Asia/Nicosia",
+    "хельсинки": "Europe/Helsinki",
+    "финляндия": "Europe/Helsinki",
+    "стокгольм": "Europe/Stockholm",
+    "швеция": "Europe/Stockholm",
+    "осло": "Europe/Oslo",
+    "норвегия": "Europe/Oslo",
+    "копенгаген": "Europe/Copenhagen",
+    "дания": "Europe/Copenhagen",
+    "стамбул": "Europe/Istanbul",
+    "анталья": "Europe/Istanbul",
+    "турция": "Europe/Istanbul",
+    # Азия и Ближний Восток
+    "дубай": "Asia/Dubai",
+    "оаэ": "Asia/Dubai",
+    "эмираты": "Asia/Dubai",
+    "тель-авив": "Asia/Jerusalem",
+    "иерусалим": "Asia/Jerusalem",
+    "израиль": "Asia/Jerusalem",
+    "тегеран": "Asia/Tehran",
+    "иран": "Asia/Tehran",
+    "дели": "Asia/Kolkata",
+    "мумбаи": "Asia/Kolkata",
+    "индия": "Asia/Kolkata",
+    "гоа": "Asia/Kolkata",
+    "катманду": "Asia/Kathmandu",
+    "непал": "Asia/Kathmandu",
+    "бангкок": "Asia/Bangkok",
+    "пхукет": "Asia/Bangkok",
+    "таиланд": "Asia/Bangkok",
+    "тайланд": "Asia/Bangkok",
+    "бали": "Asia/Makassar",
+    "джакарта": "Asia/Jakarta",
+    "ханой": "Asia/Ho_Chi_Minh",
+    "хошимин": "Asia/Ho_Chi_Minh",
+    "нячанг": "Asia/Ho_Chi_Minh",
+    "вьетнам": "Asia/Ho_Chi_Minh",
+    "сингапур": "Asia/Singapore",
+    "куала-лумпур": "Asia/Kuala_Lumpur",
+    "малайзия": "Asia/Kuala_Lumpur",
+    "пекин": "Asia/Shanghai",
+    "шанхай": "Asia/Shanghai",
+    "китай": "Asia/Shanghai",
+    "гонконг": "Asia/Hong_Kong",
+    "тайбэй": "Asia/Taipei",
+    "сеул": "Asia/Seoul",
+    "корея": "Asia/Seoul",
+    "токио": "Asia/Tokyo",
+    "япония": "Asia/Tokyo",
+    "улан-батор": "Asia/Ulaanbaatar",
+    "монголия": "Asia/Ulaanbaatar",
+    # Америка, Африка, Океания
+    "нью-йорк": "America/New_York",
+    "вашингтон": "America/New_York",
+    "бостон": "America/New_York",
+    "майами": "America/New_York",
+    "чикаго": "America/Chicago",
+    "денвер": "America/Denver",
+    "лос-анджелес": "America/Los_Angeles",
+    "сан-франциско": "America/Los_Angeles",
+    "сиэтл": "America/Los_Angeles",
+    "торонто": "America/Toronto",
+    "монреаль": "America/Toronto",
+    "ванкувер": "America/Vancouver",
+    "мехико": "America/Mexico_City",
+    "канкун": "America/Cancun",
+    "буэнос-айрес": "America/Argentina/Buenos_Aires",
+    "аргентина": "America/Argentina/Buenos_Aires",
+    "сан-паулу": "America/Sao_Paulo",
+    "рио-де-жанейро": "America/Sao_Paulo",
+    "каир": "Africa/Cairo",
+    "египет": "Africa/Cairo",
+    "хургада": "Africa/Cairo",
+    "шарм-эль-шейх": "Africa/Cairo",
+    "сидней": "Australia/Sydney",
+    "мельбурн": "Australia/Melbourne",
+    "окленд": "Pacific/Auckland",
+    "новая зеландия": "Pacific/Auckland",
+}
+
+# Аббревиатуры (без склонения)
+ABBREVIATIONS: Dict[str, str] = {
+    "utc": "UTC",
+    "gmt": "UTC",
+    "мск": "Europe/Moscow",
+    "msk": "Europe/Moscow",
+    "cet": "Europe/Paris",
+    "eet": "Europe/Helsinki",
+    "est": "America/New_York",
+    "edt": "America/New_York",
+    "cst": "America/Chicago",
+    "mst": "America/Denver",
+    "pst": "America/Los_Angeles",
+    "pdt": "America/Los_Angeles",
+    "jst": "Asia/Tokyo",
+    "ist": "Asia/Kolkata",
+}
+
+# Нецелые смещения, для которых нет зоны Etc/GMT
+FRACTIONAL_OFFSETS: Dict[int, str] = {  # смещение в минутах -> зона
+    -210: "America/St_Johns",
+    210: "Asia/Tehran",
+    270: "Asia/Kabul",
+    330: "Asia/Kolkata",
+    345: "Asia/Kathmandu",
+    390: "Asia/Yangon",
+    570: "Australia/Darwin",
+    630: "Australia/Lord_Howe",
+}
+
+# Служебные слова, которые отбрасываются при сохранении выученных фраз
+FILLER_WORDS = {
+    "я", "в", "во", "на", "из", "сейчас", "теперь", "живу", "нахожусь", "переехал", "переехала",
+    "переехали", "прилетел", "прилетела", "прилетели", "мой", "моя", "город", "часовой", "пояс",
+    "часовая", "зона", "таймзона", "таймзону", "timezone", "смени", "поменяй", "установи", "поставь",
+    "измени", "по", "времени", "время", "i", "am", "in", "live", "my", "is", "set", "to", "the",
+}
+
+TRANSLIT_TABLE = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ж": "zh", "з": "z", "и": "i",
+    "й": "y", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o", "п": "p", "р": "r", "с": "s",
+    "т": "t", "у": "u", "ф": "f", "х": "kh", "ц": "ts", "ч": "ch", "ш": "sh", "щ": "shch",
+    "ъ": "", "ы": "y", "ь": "", "э": "e", "ю": "yu", "я": "ya",
+}
+
+WORD_RE = re.compile(r"[a-zа-я0-9]+(?:[-'][a-zа-я0-9]+)*")
+OFFSET_RE = re.compile(
+    r"(?:^|\b)(utc|gmt|мск|msk)?\s*([+\-−])\s*(\d{1,2})(?:[:.]?(\d{2}))?(?:\b|$)"
+)
+
+MAX_NGRAM = 3
+MAX_LEARNED_ENTRIES = 10000
+
+# Счетчики обращений к индексу
+timezone_index_stats: Dict[str, int] = {"hits": 0, "offset_hits": 0, "learned_hits": 0, "misses": 0, "learned": 0}
+
+_index: Dict[str, str] = {}
+_learned: Dict[str, str] = {}
+
+
+def _normalize(text: str) -> str:
+    text = text.lower().replace("ё", "е").replace("_", " ")
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def transliterate(text: str) -> str:
+    """Транслитерация кириллицы в латиницу (Берлин -> berlin)."""
+    return "".join(TRANSLIT_TABLE.get(char, char) for char in text)
+
+
+def _inflect(word: str) -> List[str]:
+    """Примерные падежные формы русского слова (Москва -> Москве, Москвы, Москву...)."""
+    forms = [word]
+    if not re.search(r"[а-я]$", word):
+        return forms
+    if word.endswith("а"):
+        forms += [word[:-1] + ending for ending in ("е", "ы", "и", "у", "ой")]
+    elif word.endswith("я"):
+        forms += [word[:-1] + ending for ending in ("е", "и", "ю", "ей")]
+    elif word.endswith("ь"):
+        forms += [word[:-1] + ending for ending in ("и", "е", "ю", "ем", "я")]
+    elif word.endswith("й"):
+        forms += [word[:-1] + ending for ending in ("е", "я", "ю", "ем")]
+    elif word[-1] not in "аеёиоуыэюя":
+        forms += [word + ending for ending in ("е", "а", "у", "ом")]
+    return forms
+
+
+def _name_forms(name: str) -> List[str]:
+    """Формы многословного названия: склоняется только последнее слово."""
+    parts = name.split(" ")
+    return [" ".join(parts[:-1] + [form]) for form in _inflect(parts[-1])]
+
+
+def _build_index() -> None:
+    # Сначала основные зоны, чтобы устаревшие алиасы их не перезаписывали
+    common = set(pytz.common_timezones)
+    ordered_zones = list(pytz.common_timezones) + [z for z in pytz.all_timezones if z not in common]
+    for zone in ordered_zones:
+        _index.setdefault(_normalize(zone), zone)
+        if "/" in zone and not zone.startswith("Etc/"):
+            _index.setdefault(_normalize(zone.rsplit("/", 1)[1]), zone)
+
+    # Страны с единственной таймзоной (английские названия из pytz)
+    for country_code, zones in pytz.country_timezones.items():
+        if len(zones) == 1 and country_code.upper() in pytz.country_names:
+            _index.setdefault(_normalize(pytz.country_names[country_code.upper()]), zones[0])
+
+    for name, zone in ABBREVIATIONS.items():
+        _index[name] = zone
+
+    for name, zone in RUSSIAN_GAZETTEER.items():
+        for form in _name_forms(name):
+            _index.setdefault(form, zone)
+
+    logger.debug(f"Timezone index built: {len(_index)} entries")
+
+
+def _ensure_index() -> None:
+    if not _index:
+        _build_index()
+
+
+def parse_utc_offset(text: str) -> Optional[str]:
+    """
+    Разбирает смещение вида "UTC+3", "GMT-5", "+05:30", "мск+2".
+
+    Returns:
+        IANA зону (Etc/GMT-3 для UTC+3) или None.
+    """
+    normalized = _normalize(text)
+    match = OFFSET_RE.search(normalized)
+    if not match:
+        return None
+    prefix, sign, hours_str, minutes_str = match.groups()
+    # Голое "+3" принимаем только если текст целиком состоит из смещения
+    if not prefix and normalized.strip() != match.group(0).strip():
+        return None
+
+    hours = int(hours_str)
+    minutes = int(minutes_str) if minutes_str else 0
+    if hours > 14 or minutes >= 60:
+        return None
+    offset_minutes = (hours * 60 + minutes) * (-1 if sign in "-−" else 1)
+    if prefix in ("мск", "msk"):
+        offset_minutes += 3 * 60
+
+    if offset_minutes % 60:
+        return FRACTIONAL_OFFSETS.get(offset_minutes)
+    offset_hours = offset_minutes // 60
+    if offset_hours == 0:
+        return "UTC"
+    if not -12 <= offset_hours <= 14:
+        return None
+    # В зонах Etc/GMT знак инвертирован: UTC+3 == Etc/GMT-3
+    return f"Etc/GMT{'-' if offset_hours > 0 else '+'}{abs(offset_hours)}"
+
+
+def _phrase_key(text: str) -> str:
+    words = [word for word in WORD_RE.findall(_normalize(text)) if word not in FILLER_WORDS]
+    return " ".join(words)
+
+
+def resolve_timezone_locally(text: str) -> Optional[str]:
+    """
+    Определяет IANA таймзону по тексту без обращения к LLM.
+
+    Ищет в тексте смещение от UTC, названия зон, городов и стран (рус./англ., с транслитерацией),
+    а также фразы, выученные из ответов LLM.
+
+    Returns:
+        Имя зоны IANA или None, если текст не распознан однозначно.
+    """
+    if not text or text.isspace():
+        return None
+    _ensure_index()
+
+    normalized = _normalize(text)
+
+    # Полное имя зоны ("Europe/Moscow")
+    if normalized in _index and "/" in normalized:
+        timezone_index_stats["hits"] += 1
+        return _index[normalized]
+
+    learned_zone = _learned.get(_phrase_key(text))
+    if learned_zone:
+        timezone_index_stats["learned_hits"] += 1
+        return learned_zone
+
+    offset_zone = parse_utc_offset(text)
+    if offset_zone:
+        timezone_index_stats["offset_hits"] += 1
+        return offset_zone
+
+    words = WORD_RE.findall(normalized)
+    found: Set[str] = set()
+    covered: Set[int] = set()
+    # Сначала длинные n-граммы ("нижний новгород" раньше "новгород")
+    for size in range(min(MAX_NGRAM, len(words)), 0, -1):
+        for start in range(len(words) - size + 1):
+            positions = set(range(start, start + size))
+            if positions & covered:
+                continue
+            phrase = " ".join(words[start:start + size])
+            if size == 1 and (len(phrase) < 3 and phrase not in _index or phrase in FILLER_WORDS):
+                continue
+            zone = _index.get(phrase)
+            if zone is None and re.search(r"[а-я]", phrase):
+                zone = _index.get(transliterate(phrase))
+            if zone:
+                found.add(zone)
+                covered |= positions
+
+    if len(found) == 1:
+        timezone_index_stats["hits"] += 1
+        return found.pop()
+
+    if len(found) > 1:
+        logger.debug(f"Ambiguous timezone text '{text}': {found}")
+    timezone_index_stats["misses"] += 1
+    return None
+
+
+def learn_timezone(text: str, timezone: str) -> None:
+    """Запоминает фразу, которую разрешила LLM, чтобы следующий такой запрос обработать локально."""
+    key = _phrase_key(text)
+    if not key or len(_learned) >= MAX_LEARNED_ENTRIES:
+        return
+    try:
+        pytz.timezone(timezone)
+    except pytz.UnknownTimeZoneError:
+        return
+    if _learned.get(key) != timezone:
+        _learned[key] = timezone
+        timezone_index_stats["learned"] += 1
+        logger.info(f"Timezone index learned '{key}' -> '{timezone}'")
+
+
+def get_timezone_index_stats() -> Dict[str, Any]:
+    stats: Dict[str, Any] = dict(timezone_index_stats)
+    stats["index_size"] = len(_index)
+    stats["learned_size"] = len(_learned)
+    return stats
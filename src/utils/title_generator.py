@@ -0,0 +1,190 @@
+# src/utils/title_generator.py
+
+import logging
+import re
+from typing import List, Optional
+
+from src.utils.date_parser import (
+    RELATIVE_RE,
+    DAY_WORD_RE,
+    DATE_NUMERIC_RE,
+    DATE_TEXT_RE,
+    TIME_COLON_RE,
+    TIME_DOT_RE,
+    TIME_HOUR_RE,
+)
+
+logger = logging.getLogger(__name__)
+
+# --- Локальный генератор заголовков задач (вместо запроса к LLM на каждую задачу) ---
+
+DEFAULT_TITLE = "Напоминание"
+
+_WEEKDAY = r"(?:понедельник\w*|вторник\w*|сред[аеуы]|сред(?:ам)?|четверг\w*|пятниц\w*|суббот\w*|воскресень\w*)"
+_PERIOD = (r"(?:день|дня|дней|недел\w*|месяц\w*|год\w*|утро|вечер|час\w*|минут\w*|будн\w*|выходн\w*|"
+           + _WEEKDAY + r")")
+
+# Выражения времени и повторения: в заголовок не попадают (они показываются отдельной строкой)
+TIME_SPAN_RES = [
+    RELATIVE_RE,
+    DAY_WORD_RE,
+    DATE_NUMERIC_RE,
+    DATE_TEXT_RE,
+    TIME_COLON_RE,
+    TIME_DOT_RE,
+    TIME_HOUR_RE,
+    re.compile(r"\b(?:(?:в|во|на|к|ко|до|по)\s+)?(?:следующ\w*\s+|эт\w+\s+|ближайш\w*\s+)?" + _WEEKDAY + r"\b"),
+    re.compile(r"\b(?:(?:в|на|до|к)\s+)?(?:следующ\w*|эт\w+|ближайш\w*)\s+(?:недел\w*|месяц\w*|год\w*)\b"),
+    re.compile(r"\b(?:утром|днем|вечером|ночью|с\s+утра|до\s+обеда|после\s+обеда)\b"),
+    re.compile(r"\bкажд\w*(?:\s+(?:\d+|втор\w+|трет\w+))?\s+" + _PERIOD + r"\b"),
+    re.compile(r"\b(?:ежедневно|еженедельно|ежемесячно|ежегодно)\b"),
+    re.compile(r"\bпо\s+(?:будням|выходным|утрам|вечерам|" + _WEEKDAY + r")\b"),
+    re.compile(r"\bраз\s+в\s+" + _PERIOD + r"\b"),
+    re.compile(r"\b\d{1,2}(?:-?го)?\s+числа(?:\s+кажд\w+\s+месяц\w*)?\b"),
+]
+
+# Слова-обращения к боту и модальность: смысла задачи не несут
+STOP_WORDS = {
+    "напомни", "напомнить", "напоминай", "напоминание", "напоминалку", "мне", "нам", "пожалуйста",
+    "плиз", "нужно", "надо", "необходимо", "хочу", "хотел", "хотела", "бы", "же", "ли", "срочно",
+    "обязательно", "я", "чтобы", "что", "добавь", "добавить", "создай", "поставь", "задачу", "задача",
+    "забудь", "забыть", "давай",
+}
+
+# Слова, на которых заголовок не должен заканчиваться ("Забрать посылку на")
+DANGLING_WORDS = {
+    "в", "во", "на", "к", "ко", "с", "со", "и", "или", "а", "но", "по", "для", "за", "из", "от", "до",
+    "у", "о", "об", "про", "при", "без", "через", "над", "под", "не", "как", "где", "когда", "чтобы",
+}
+
+# Существительные и числительные с окончанием инфинитива (кроме слов на -ость)
+NOT_VERBS = {
+    "мать", "часть", "власть", "сеть", "путь", "суть", "ртуть", "нефть", "память", "кровать", "скатерть",
+    "пять", "шесть", "десять", "двадцать", "тридцать",
+}
+
+# Частые повелительные формы -> инфинитив ("купи хлеб" -> "Купить хлеб")
+IMPERATIVE_TO_INFINITIVE = {
+    "купи": "купить", "позвони": "позвонить", "сходи": "сходить", "забери": "забрать",
+    "сделай": "сделать", "напиши": "написать", "отправь": "отправить", "оплати": "оплатить",
+    "закажи": "заказать", "проверь": "проверить", "подготовь": "подготовить", "запиши": "записать",
+    "возьми": "взять", "найди": "найти", "прочитай": "прочитать", "посмотри": "посмотреть",
+    "приготовь": "приготовить", "убери": "убрать", "помой": "помыть", "вынеси": "вынести",
+    "отнеси": "отнести", "принеси": "принести", "поздравь": "поздравить", "зайди": "зайти",
+    "продли": "продлить", "передай": "передать", "постирай": "постирать", "полей": "полить",
+}
+
+# Инфинитивы на -ти - закрытый класс (идти, найти, принести), а не любое слово на -ти ("сети", "новости")
+INFINITIVE_RE = re.compile(r"^[а-яё-]{2,}(?:ть|ться|чь|чься|(?:йти|идти|нести|везти|вести|расти|мести|пасти)(?:сь)?)$")
+_EDGE_PUNCTUATION = "\"'«»()[]{}<>.,;:!?—–-…"
+_SENTENCE_END_RE = re.compile(r"[.!?…]$")
+
+# Счетчики (сколько заголовков сделано без LLM)
+title_generator_stats = {
+    "calls": 0,       # Всего заголовков
+    "verb_object": 0, # Найден глагол: "глагол + дополнение"
+    "noun_phrase": 0, # Глагола нет: первые значимые слова
+    "fallback": 0,    # Значимых слов не осталось
+}
+
+
+def _normalize(text: str) -> str:
+    # Длина строки не меняется: позиции совпадений совпадают с позициями в исходном тексте
+    return text.lower().replace("ё", "е")
+
+
+def _strip_time_expressions(text: str) -> str:
+    """Заменяет выражения времени и повторения пробелами (регистр исходного текста сохраняется)."""
+    normalized = _normalize(text)
+    chars = list(text)
+    for pattern in TIME_SPAN_RES:
+        for match in pattern.finditer(normalized):
+            for index in range(match.start(), match.end()):
+                chars[index] = " "
+    return "".join(chars)
+
+
+def _is_verb(word: str) -> bool:
+    if word in IMPERATIVE_TO_INFINITIVE:
+        return True
+    return word not in NOT_VERBS and not word.endswith("ость") and bool(INFINITIVE_RE.match(word))
+
+
+def starts_with_verb(text: str) -> bool:
+    """Начинается ли фраза с глагола после обращений к боту ("купить хлеб", "не забыть позвонить маме")."""
+    for raw_word in text.split():
+        word = _normalize(raw_word.strip(_EDGE_PUNCTUATION))
+        if not word or word in STOP_WORDS or word == "не":
+            continue
+        return _is_verb(word)
+    return False
+
+
+def _fit(words: List[str], max_length: int) -> str:
+    """Первые слова, помещающиеся в max_length, без висящих предлогов и союзов в конце."""
+    fitted: List[str] = []
+    for word in words:
+        candidate = " ".join(fitted + [word])
+        if len(candidate) > max_length:
+            break
+        fitted.append(word)
+    while fitted and fitted[-1].strip(_EDGE_PUNCTUATION).lower() in DANGLING_WORDS:
+        fitted.pop()
+    if not fitted and words:
+        # Первое слово длиннее лимита - обрезаем его
+        return words[0][:max_length - 1] + "…"
+    return " ".join(fitted).strip(_EDGE_PUNCTUATION + " ")
+
+
+def truncate_title(title: str, max_length: int = 21) -> str:
+    """Обрезает готовый заголовок (например, от LLM) по границе слова до max_length символов."""
+    title = title.strip()
+    if len(title) <= max_length:
+        return title
+    return _fit(title.split(), max_length)
+
+
+def generate_title_locally(description: Optional[str], max_length: int = 21) -> str:
+    """
+    Короткий заголовок задачи без LLM: убирает обращения к боту и выражения времени,
+    ставит вперед глагол с дополнением ("маме позвонить завтра" -> "Позвонить маме")
+    и обрезает по границе слова до max_length символов.
+    """
+    title_generator_stats["calls"] += 1
+    text = _strip_time_expressions(description or "")
+
+    words: List[str] = []
+    for raw_word in text.split():
+        word = raw_word.strip(_EDGE_PUNCTUATION)
+        if not word or _normalize(word) in STOP_WORDS:
+            continue
+        # "не забыть", "не забудь" - частица "не" относится к убранному слову
+        if _normalize(word) == "не" and words == []:
+            continue
+        # Запятая внутри перечисления сохраняется ("Купить молоко, хлеб")
+        words.append(word + "," if raw_word.endswith(",") else word)
+        if _SENTENCE_END_RE.search(raw_word) and len(words) > 1:
+            # Заголовок - из первого предложения
+            break
+    if not words:
+        title_generator_stats["fallback"] += 1
+        return DEFAULT_TITLE
+
+    verb_index = next((index for index, word in enumerate(words) if _is_verb(_normalize(word.rstrip(",")))), None)
+    if verb_index is not None:
+        title_generator_stats["verb_object"] += 1
+        verb = words[verb_index].rstrip(",")
+        verb = IMPERATIVE_TO_INFINITIVE.get(_normalize(verb), verb)
+        # Глагол, затем дополнение после него, затем слова перед ним ("маме позвонить" -> "позвонить маме")
+        ordered = [verb] + words[verb_index + 1:] + words[:verb_index]
+    else:
+        title_generator_stats["noun_phrase"] += 1
+        ordered = words
+
+    title = _fit(ordered, max_length) or DEFAULT_TITLE
+    return title[:1].upper() + title[1:]
+
+
+def get_title_generator_stats() -> dict:
+    """Статистика локального генератора заголовков (для /metrics)."""
+    return dict(title_generator_stats)
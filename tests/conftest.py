@@ -0,0 +1,19 @@
+# tests/conftest.py
+import os
+
+# Обязательные настройки (src/config.py) для импорта модулей бота без .env;
+# сеть и БД в тестах не используются
+for name, value in {
+    "POSTGRES_DB": "test",
+    "POSTGRES_USER": "test",
+    "POSTGRES_PASSWORD": "test",
+    "POSTGRES_HOST": "localhost",
+    "POSTGRES_PORT": "5432",
+    "TELEGRAM_BOT_TOKEN": "test",
+    "GOOGLE_API_KEY": "test",
+    "LOG_LEVEL": "WARNING",
+    # Офлайн-бэкенд LLM без задержек (см. src/llm/backends.py)
+    "LLM_BACKEND": "fake",
+    "LLM_FAKE_LATENCY_MS": "0",
+}.items():
+    os.environ.setdefault(name, value)
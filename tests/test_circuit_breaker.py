@@ -0,0 +1,83 @@
+# tests/test_circuit_breaker.py
+import pytest
+
+from src.llm import circuit_breaker
+from src.llm.circuit_breaker import CircuitBreaker, STATE_CLOSED, STATE_OPEN, STATE_HALF_OPEN
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Управляемые часы вместо time.monotonic."""
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", lambda: now[0])
+    return now
+
+
+def _breaker(**kwargs):
+    params = {"window_size": 10, "min_calls": 4, "failure_rate_threshold": 0.5,
+              "slow_call_seconds": 5.0, "slow_call_rate_threshold": 0.5, "open_seconds": 30.0,
+              "half_open_max_calls": 1}
+    params.update(kwargs)
+    return CircuitBreaker(**params)
+
+
+def test_stays_closed_below_min_calls(clock):
+    breaker = _breaker()
+    for _ in range(3):
+        breaker.record(success=False, latency=0.1)
+    assert breaker.state == STATE_CLOSED
+    assert breaker.allow_request()
+
+
+def test_opens_on_failure_rate(clock):
+    breaker = _breaker()
+    for success in (True, False, True, False):
+        breaker.record(success=success, latency=0.1)
+    assert breaker.state == STATE_OPEN
+    assert breaker.is_open
+    assert not breaker.allow_request()
+    assert breaker.get_stats()["rejected"] == 1
+
+
+def test_opens_on_slow_calls(clock):
+    breaker = _breaker()
+    for latency in (0.1, 6.0, 0.1, 7.0):
+        breaker.record(success=True, latency=latency)
+    assert breaker.state == STATE_OPEN
+
+
+def test_half_open_probe_success_closes(clock):
+    breaker = _breaker()
+    for _ in range(4):
+        breaker.record(success=False, latency=0.1)
+    clock[0] += 31
+    assert not breaker.is_open
+    assert breaker.state == STATE_HALF_OPEN
+    # Пропускается только half_open_max_calls пробных запросов
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.record(success=True, latency=0.1)
+    assert breaker.state == STATE_CLOSED
+    assert breaker.allow_request()
+
+
+@pytest.mark.parametrize("success, latency", [(False, 0.1), (True, 6.0)])
+def test_half_open_probe_failure_reopens(clock, success, latency):
+    breaker = _breaker()
+    for _ in range(4):
+        breaker.record(success=False, latency=0.1)
+    clock[0] += 31
+    assert breaker.allow_request()
+    breaker.record(success=success, latency=latency)
+    assert breaker.state == STATE_OPEN
+    assert breaker.get_stats()["opened"] == 2
+
+
+def test_abandoned_probe_frees_slot(clock):
+    breaker = _breaker()
+    for _ in range(4):
+        breaker.record(success=False, latency=0.1)
+    clock[0] += 31
+    assert breaker.allow_request()
+    breaker.abandon()
+    assert breaker.allow_request()
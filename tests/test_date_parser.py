@@ -0,0 +1,66 @@
+# tests/test_date_parser.py
+import pendulum
+import pytest
+
+from src.utils.date_parser import parse_time_expression_locally
+
+TZ = "Europe/Moscow"
+WEDNESDAY = pendulum.datetime(2026, 10, 14, 10, 0, tz=TZ)
+FRIDAY_AFTERNOON = pendulum.datetime(2026, 10, 16, 15, 0, tz=TZ)
+
+
+def _parse(text, now):
+    return parse_time_expression_locally(text, TZ, now=now)
+
+
+@pytest.mark.parametrize("text, now, expected", [
+    ("завтра в 15:00", WEDNESDAY, "2026-10-15 15:00:00"),
+    ("через 3 часа", WEDNESDAY, "2026-10-14 13:00:00"),
+    ("через полчаса", WEDNESDAY, "2026-10-14 10:30:00"),
+    ("в пятницу вечером", WEDNESDAY, "2026-10-16 18:00:00"),
+    ("послезавтра утром", WEDNESDAY, "2026-10-16 09:00:00"),
+    ("в 9 утра", WEDNESDAY, "2026-10-15 09:00:00"),
+    ("завтра в 7 вечера", WEDNESDAY, "2026-10-15 19:00:00"),
+    ("15 марта", WEDNESDAY, "2027-03-15 12:00:00"),
+    # "в пятницу", сказанное в пятницу: сегодня, если время еще впереди, иначе через неделю
+    ("в пятницу вечером", FRIDAY_AFTERNOON, "2026-10-16 18:00:00"),
+    ("в пятницу в 10", FRIDAY_AFTERNOON, "2026-10-23 10:00:00"),
+    # Ранний час с явной частью суток - без двусмысленности
+    ("в 5 вечера", FRIDAY_AFTERNOON, "2026-10-16 17:00:00"),
+    ("в 7 утра", WEDNESDAY, "2026-10-15 07:00:00"),
+    ("завтра в 6 вечером", WEDNESDAY, "2026-10-15 18:00:00"),
+])
+def test_confident_expressions(text, now, expected):
+    result = _parse(text, now)
+    assert result is not None
+    assert result["confidence"] >= 0.9
+    assert result["datetime"].in_timezone(TZ).to_datetime_string() == expected
+
+
+@pytest.mark.parametrize("text", [
+    # Повторение - не разовое время, его разбирает recurrence
+    "каждый понедельник в 9",
+    "каждую среду",
+    "по понедельникам в 9",
+    "ежедневно в 8",
+    "позвонить маме",
+    "купить молоко",
+])
+def test_not_parsed(text):
+    assert _parse(text, WEDNESDAY) is None
+
+
+@pytest.mark.parametrize("text", [
+    "в следующую пятницу",
+    "купить молоко завтра в 15:00",
+    # "в 5" без "утра"/"вечера": 05:00 или 17:00 - решает LLM
+    "в 5",
+    "завтра в 7",
+])
+def test_low_confidence_goes_to_llm(text):
+    assert _parse(text, WEDNESDAY)["confidence"] < 0.9
+
+
+def test_recurring_phrase_allowed_for_first_occurrence():
+    result = parse_time_expression_locally("каждый понедельник в 9", TZ, now=WEDNESDAY, allow_recurring=True)
+    assert result["datetime"].in_timezone(TZ).to_datetime_string() == "2026-10-19 09:00:00"
@@ -0,0 +1,47 @@
+# tests/test_degraded_mode.py
+import asyncio
+
+import pytest
+
+from src.config import settings
+from src.llm import gemini_client
+from src.llm.circuit_breaker import LLMUnavailableError
+
+
+@pytest.fixture
+def breaker_opens_on(monkeypatch):
+    """Предохранитель размыкается посреди цепочки add_task: указанный промпт уже не отправляется."""
+    monkeypatch.setattr(settings, "add_task_extraction_mode", "chain")
+    monkeypatch.setattr(settings, "speculative_add_task_parsing", False)
+    monkeypatch.setattr(settings, "optimistic_task_creation", False)
+    original_generate_text = gemini_client._generate_text
+
+    def configure(rejected_prompt):
+        async def generate_text(prompt_name, prompt, *args, **kwargs):
+            if prompt_name == rejected_prompt:
+                raise LLMUnavailableError(f"LLM circuit breaker is open, prompt '{prompt_name}' was not sent")
+            if prompt_name == "recurring_detection":
+                # Нетиповой паттерн: RRULE для него строит уже LLM
+                return '{"is_recurring": true, "pattern": "раз в полгода"}'
+            return await original_generate_text(prompt_name, prompt, *args, **kwargs)
+
+        monkeypatch.setattr(gemini_client, "_generate_text", generate_text)
+
+    return configure
+
+
+@pytest.mark.parametrize("rejected_prompt", ["recurring_detection", "rrule"])
+def test_breaker_during_recurrence_switches_to_degraded_mode(breaker_opens_on, rejected_prompt):
+    breaker_opens_on(rejected_prompt)
+    result = asyncio.run(gemini_client.process_user_input("раз в полгода менять фильтр для воды"))
+    assert result["status"] == "success"
+    assert result["intent"] == "add_task"
+    # Задача не сохраняется молча как разовая: ее обрабатывает деградированный режим
+    assert result["params"]["degraded"] is True
+    assert result["params"]["description"] == "раз в полгода менять фильтр для воды"
+
+
+def test_recurrence_helpers_propagate_breaker_rejection(breaker_opens_on):
+    breaker_opens_on("recurring_detection")
+    with pytest.raises(LLMUnavailableError):
+        asyncio.run(gemini_client.detect_recurring_pattern("раз в полгода менять фильтр"))
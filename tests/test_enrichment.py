@@ -0,0 +1,56 @@
+# tests/test_enrichment.py
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from src.llm import gemini_client
+from src.scheduler import enrichment
+from src.scheduler.enrichment import EnrichmentQueue
+
+
+@pytest.fixture
+def title_job(monkeypatch):
+    """Задание апгрейда заголовка без БД и Telegram: сохраненные заголовки попадают в saved."""
+    saved = []
+
+    async def apply_task_enrichment(session, task_id, expected_description, title, expected_title):
+        saved.append(title)
+        return SimpleNamespace(task_id=task_id, title=title)
+
+    async def get_user_by_telegram_id(session, telegram_id):
+        return None
+
+    @asynccontextmanager
+    async def session_pool():
+        yield None
+
+    monkeypatch.setattr(enrichment, "apply_task_enrichment", apply_task_enrichment)
+    monkeypatch.setattr(enrichment, "get_user_by_telegram_id", get_user_by_telegram_id)
+
+    def run(llm_title, local_title):
+        async def generate_title_with_llm(description):
+            return llm_title
+
+        monkeypatch.setattr(gemini_client, "generate_title_with_llm", generate_title_with_llm)
+        queue = EnrichmentQueue()
+        queue.session_pool = session_pool
+        job = {"task_id": 1, "user_telegram_id": 10, "description": "описание", "local_title": local_title,
+               "chat_id": 1, "message_id": None}
+        asyncio.run(queue._process_title_job(job))
+        return saved, queue.stats
+
+    return run
+
+
+def test_llm_title_capped_before_saving(title_job):
+    saved, stats = title_job('"Позвонить в страховую компанию насчет полиса"', "Позвонить")
+    assert saved == ["Позвонить в страховую"]
+    assert stats["title_upgrades"] == 1
+
+
+def test_title_equal_to_local_after_cap_is_skipped(title_job):
+    saved, stats = title_job("Позвонить в страховую компанию", "Позвонить в страховую")
+    assert saved == []
+    assert stats["title_upgrades_skipped"] == 1
@@ -0,0 +1,89 @@
+# tests/test_hedging.py
+import asyncio
+
+import pytest
+
+from src.llm.hedging import RequestHedger, MIN_SAMPLES
+
+
+def _slow_then_fast(calls, first_delay=1.0):
+    """Фабрика запросов: первый вызов медленный, следующие - быстрые."""
+    async def request():
+        attempt = len(calls)
+        calls.append("started")
+        try:
+            await asyncio.sleep(first_delay if attempt == 0 else 0.01)
+        except asyncio.CancelledError:
+            calls[attempt] = "cancelled"
+            raise
+        return f"answer-{attempt}"
+    return request
+
+
+def test_fast_response_is_not_hedged():
+    hedger = RequestHedger(initial_delay=0.2, max_rate=1.0)
+    calls = []
+    result = asyncio.run(hedger.run("intent", _slow_then_fast(calls, first_delay=0.01)))
+    assert result == "answer-0"
+    assert calls == ["started"]
+    assert hedger.get_stats()["intent"]["hedged"] == 0
+
+
+def test_hedge_wins_and_primary_is_cancelled():
+    async def scenario():
+        hedger = RequestHedger(initial_delay=0.05, max_rate=1.0)
+        calls = []
+        result = await hedger.run("intent", _slow_then_fast(calls))
+        await asyncio.sleep(0)
+        return hedger, calls, result
+
+    hedger, calls, result = asyncio.run(scenario())
+    assert result == "answer-1"
+    assert calls == ["cancelled", "started"]
+    stats = hedger.get_stats()["intent"]
+    assert stats["hedged"] == 1
+    assert stats["hedge_wins"] == 1
+    assert stats["hedge_rate"] == 1.0
+
+
+def test_hedge_rate_cap():
+    hedger = RequestHedger(initial_delay=0.05, max_rate=0.1)
+    calls = []
+    result = asyncio.run(hedger.run("intent", _slow_then_fast(calls, first_delay=0.1)))
+    assert result == "answer-0"
+    assert calls == ["started"]
+    assert hedger.get_stats()["intent"]["capped"] == 1
+
+
+def test_no_hedge_without_quota():
+    hedger = RequestHedger(initial_delay=0.05, max_rate=1.0)
+    calls = []
+    result = asyncio.run(hedger.run("intent", _slow_then_fast(calls, first_delay=0.1),
+                                    reserve_quota=lambda: False))
+    assert result == "answer-0"
+    assert hedger.get_stats()["intent"]["capped"] == 1
+
+
+def test_error_raised_when_both_attempts_fail():
+    async def failing():
+        await asyncio.sleep(0.1)
+        raise RuntimeError("provider error")
+
+    hedger = RequestHedger(initial_delay=0.05, max_rate=1.0)
+    with pytest.raises(RuntimeError):
+        asyncio.run(hedger.run("intent", failing))
+
+
+def test_threshold_adapts_to_latency_quantile():
+    async def fast():
+        return "ok"
+
+    async def scenario(hedger):
+        for _ in range(MIN_SAMPLES):
+            await hedger.run("intent", fast)
+
+    hedger = RequestHedger(initial_delay=2.0, min_delay=0.3, max_rate=1.0)
+    assert hedger.threshold("intent") == 2.0
+    asyncio.run(scenario(hedger))
+    # Быстрые ответы опускают порог до min_delay
+    assert hedger.threshold("intent") == 0.3
@@ -0,0 +1,60 @@
+# tests/test_intent_classifier.py
+import pytest
+
+from src.utils.intent_classifier import classify_intent_locally, looks_like_task_list
+
+LOCAL_THRESHOLD = 0.85  # settings.local_intent_min_confidence по умолчанию
+
+
+@pytest.mark.parametrize("text, is_reply, expected_intent", [
+    ("готово", True, "complete_task"),
+    ("сделано", True, "complete_task"),
+    ("мой часовой пояс Москва", False, "update_timezone"),
+    ("я в Барселоне", False, "update_timezone"),
+    ("я сейчас в Токио", False, "update_timezone"),
+    ("завтра в 15", True, "reschedule_task"),
+    ("перенеси на завтра", True, "reschedule_task"),
+    ("покажи задачи на завтра", False, "find_tasks"),
+    ("найди задачу про страховку", False, "find_tasks"),
+    ("купить молоко", False, "add_task"),
+])
+def test_confident_intents(text, is_reply, expected_intent):
+    result = classify_intent_locally(text, is_reply=is_reply)
+    assert result is not None
+    assert result["intent"] == expected_intent
+    assert result["confidence"] >= LOCAL_THRESHOLD
+
+
+@pytest.mark.parametrize("text, is_reply", [
+    # Планы на день недели - не смена часового пояса
+    ("я в пятницу иду к врачу", False),
+    ("я во вторник занят", False),
+    ("я в субботу на дачу, напомни взять ключи", False),
+    ("я в 9 буду дома", False),
+    # Без реплая "готово" не к чему отнести
+    ("готово", False),
+    ("ок", False),
+])
+def test_no_local_decision(text, is_reply):
+    assert classify_intent_locally(text, is_reply=is_reply) is None
+
+
+@pytest.mark.parametrize("text", ["ок", "ok", "окей"])
+def test_bare_ok_is_not_confident(text):
+    result = classify_intent_locally(text, is_reply=True)
+    assert result["intent"] == "complete_task"
+    assert result["confidence"] < LOCAL_THRESHOLD
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("завтра: купить хлеб, забрать посылку, позвонить в банк в 11", True),
+    ("купить хлеб и позвонить маме", True),
+    ("1. купить хлеб\n2. позвонить маме", True),
+    ("- купить хлеб\n- забрать посылку", True),
+    ("купить хлеб", False),
+    # Перечисление покупок - одна задача
+    ("купить молоко, хлеб и яйца", False),
+    ("позвонить маме, она просила", False),
+])
+def test_looks_like_task_list(text, expected):
+    assert looks_like_task_list(text) is expected
@@ -0,0 +1,40 @@
+# tests/test_json_stream.py
+import pytest
+
+from src.llm.json_stream import JSONObjectScanner
+
+
+def _feed_chunks(chunks):
+    scanner = JSONObjectScanner()
+    for index, chunk in enumerate(chunks):
+        result = scanner.feed(chunk)
+        if result is not None:
+            return result, index
+    return None, None
+
+
+@pytest.mark.parametrize("chunks, expected, completed_at", [
+    (['{"intent": "add_task"}'], '{"intent": "add_task"}', 0),
+    (['{"inte', 'nt": "add', '_task"}', " лишний хвост"], '{"intent": "add_task"}', 2),
+    (["```json\n", '{"a": 1}', "\n```"], '{"a": 1}', 1),
+    # Скобки и кавычки внутри строк не сбивают счет
+    (['{"text": "скобка } и \\" кавычка {"}'], '{"text": "скобка } и \\" кавычка {"}', 0),
+    (['{"outer": {"inner": [1, 2]}', "}"], '{"outer": {"inner": [1, 2]}}', 1),
+    # Фигурные скобки в пояснении до ответа - не JSON
+    (['Ответ {в скобках}: {"a": 1}'], '{"a": 1}', 0),
+])
+def test_first_complete_object(chunks, expected, completed_at):
+    assert _feed_chunks(chunks) == (expected, completed_at)
+
+
+def test_incomplete_object():
+    scanner = JSONObjectScanner()
+    assert scanner.feed('{"intent": "add') is None
+    assert not scanner.done
+
+
+def test_result_kept_after_completion():
+    scanner = JSONObjectScanner()
+    scanner.feed('{"a": 1}')
+    assert scanner.done
+    assert scanner.feed('{"b": 2}') == '{"a": 1}'
@@ -0,0 +1,63 @@
+# tests/test_llm_cache.py
+import asyncio
+
+import pytest
+
+from src.llm import cache
+from src.llm.cache import LLMResponseCache, make_cache_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_entry_expires_after_ttl(clock):
+    llm_cache = LLMResponseCache()
+    llm_cache.set("key", "value", ttl_seconds=60)
+    clock[0] += 59
+    assert llm_cache.get("key") == "value"
+    clock[0] += 2
+    assert llm_cache.get("key") is None
+    assert llm_cache.stats["expired"] == 1
+
+
+def test_lru_evicts_least_recently_used(clock):
+    llm_cache = LLMResponseCache(max_entries=2)
+    llm_cache.set("a", "1", ttl_seconds=60)
+    llm_cache.set("b", "2", ttl_seconds=60)
+    assert llm_cache.get("a") == "1"  # "a" становится свежей записью
+    llm_cache.set("c", "3", ttl_seconds=60)
+    assert llm_cache.get("b") is None
+    assert llm_cache.get("a") == "1"
+    assert llm_cache.get("c") == "3"
+    assert llm_cache.stats["evictions"] == 1
+
+
+def test_hit_rate_stats(clock):
+    async def scenario(llm_cache):
+        llm_cache.put("key", "intent", "value", ttl_seconds=60)
+        return [await llm_cache.aget("key"), await llm_cache.aget("missing")]
+
+    llm_cache = LLMResponseCache()
+    assert asyncio.run(scenario(llm_cache)) == ["value", None]
+    stats = llm_cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"], stats["size"]) == (1, 1, 0.5, 1)
+
+
+@pytest.mark.parametrize("first, second, casefold, same", [
+    ({"text": "Купить  молоко "}, {"text": "купить молоко"}, True, True),
+    ({"text": "Купить молоко"}, {"text": "купить молоко"}, False, False),
+    ({"text": "купить", "now": "2026-10-14 10:00"}, {"now": "2026-10-14 10:00", "text": "купить"}, True, True),
+    ({"text": "купить", "now": "2026-10-14 10:00"}, {"text": "купить", "now": "2026-10-14 10:01"}, True, False),
+])
+def test_cache_key_normalization(first, second, casefold, same):
+    first_key = make_cache_key("intent", first, casefold)
+    second_key = make_cache_key("intent", second, casefold)
+    assert (first_key == second_key) is same
+
+
+def test_cache_key_depends_on_prompt():
+    assert make_cache_key("intent", {"text": "купить"}) != make_cache_key("title", {"text": "купить"})
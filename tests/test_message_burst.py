@@ -0,0 +1,78 @@
+# tests/test_message_burst.py
+import asyncio
+
+from src.utils.message_burst import MessageBurstCoalescer
+
+
+def test_messages_within_window_coalesced():
+    async def scenario():
+        coalescer = MessageBurstCoalescer(window=0.05, max_wait=1.0)
+        burst = coalescer.join(1, 10, "купить хлеб")
+        assert burst is not None
+        waiting = asyncio.ensure_future(coalescer.wait(burst))
+        await asyncio.sleep(0.01)
+        assert coalescer.join(1, 10, "и молоко") is None
+        await asyncio.sleep(0.01)
+        assert coalescer.join(1, 10, "и позвонить маме") is None
+        return coalescer, await waiting
+
+    coalescer, messages = asyncio.run(scenario())
+    assert messages == ["купить хлеб", "и молоко", "и позвонить маме"]
+    stats = coalescer.get_stats()
+    assert (stats["bursts"], stats["coalesced"], stats["max_burst_size"], stats["open_bursts"]) == (1, 2, 3, 0)
+
+
+def test_message_after_window_opens_new_burst():
+    async def scenario():
+        coalescer = MessageBurstCoalescer(window=0.02, max_wait=1.0)
+        first = coalescer.join(1, 10, "купить хлеб")
+        first_messages = await coalescer.wait(first)
+        second = coalescer.join(1, 10, "позвонить маме")
+        return first_messages, second
+
+    first_messages, second = asyncio.run(scenario())
+    assert first_messages == ["купить хлеб"]
+    assert second is not None
+
+
+def test_bursts_keyed_by_chat_and_sender():
+    async def scenario():
+        coalescer = MessageBurstCoalescer(window=0.05, max_wait=1.0)
+        bursts = [
+            coalescer.join(1, 10, "a"),
+            coalescer.join(1, 20, "b"),  # Другой участник того же группового чата
+            coalescer.join(2, 10, "c"),  # Тот же пользователь в другом чате
+        ]
+        assert all(burst is not None for burst in bursts)
+        return await asyncio.gather(*(coalescer.wait(burst) for burst in bursts))
+
+    assert asyncio.run(scenario()) == [["a"], ["b"], ["c"]]
+
+
+def test_burst_limited_by_max_messages():
+    async def scenario():
+        coalescer = MessageBurstCoalescer(window=0.05, max_wait=1.0, max_messages=2)
+        first = coalescer.join(1, 10, "a")
+        assert coalescer.join(1, 10, "b") is None
+        # Серия заполнена - третье сообщение открывает новую
+        second = coalescer.join(1, 10, "c")
+        assert second is not None
+        return await asyncio.gather(coalescer.wait(first), coalescer.wait(second))
+
+    assert asyncio.run(scenario()) == [["a", "b"], ["c"]]
+
+
+def test_burst_closed_by_max_wait():
+    async def scenario():
+        coalescer = MessageBurstCoalescer(window=0.05, max_wait=0.08)
+        burst = coalescer.join(1, 10, 0)
+        waiting = asyncio.ensure_future(coalescer.wait(burst))
+        for index in range(1, 10):
+            await asyncio.sleep(0.02)
+            if waiting.done():
+                break
+            coalescer.join(1, 10, index)
+        return await waiting
+
+    messages = asyncio.run(scenario())
+    assert 2 <= len(messages) < 10
@@ -0,0 +1,93 @@
+# tests/test_micro_batcher.py
+import asyncio
+
+from src.llm.micro_batcher import MicroBatcher
+
+
+async def _submit_all(batcher, items):
+    return await asyncio.gather(*(batcher.submit(item) for item in items))
+
+
+def test_items_in_window_sent_as_one_batch():
+    batches = []
+
+    async def process_batch(items):
+        batches.append(list(items))
+        return [item.upper() for item in items]
+
+    async def process_single(item):
+        raise AssertionError("single request is not expected")
+
+    batcher = MicroBatcher("intent", process_batch, process_single, max_batch_size=8, max_wait=0.01)
+    assert asyncio.run(_submit_all(batcher, ["a", "b", "c"])) == ["A", "B", "C"]
+    assert batches == [["a", "b", "c"]]
+    stats = batcher.get_stats()
+    assert (stats["batches"], stats["batched_items"], stats["avg_batch_size"]) == (1, 3, 3.0)
+
+
+def test_full_batch_flushes_without_waiting():
+    batches = []
+
+    async def process_batch(items):
+        batches.append(list(items))
+        return list(items)
+
+    async def process_single(item):
+        return item
+
+    batcher = MicroBatcher("intent", process_batch, process_single, max_batch_size=2, max_wait=10.0)
+    result = asyncio.run(asyncio.wait_for(_submit_all(batcher, ["a", "b", "c", "d"]), timeout=1.0))
+    assert result == ["a", "b", "c", "d"]
+    assert batches == [["a", "b"], ["c", "d"]]
+
+
+def test_single_item_uses_single_request():
+    async def process_batch(items):
+        raise AssertionError("batch request is not expected")
+
+    async def process_single(item):
+        return f"single-{item}"
+
+    batcher = MicroBatcher("intent", process_batch, process_single, max_wait=0.01)
+    assert asyncio.run(batcher.submit("a")) == "single-a"
+    assert batcher.stats["singles"] == 1
+
+
+def test_unusable_batch_falls_back_to_single_requests():
+    singles = []
+
+    async def process_batch(items):
+        return ["only one result"]  # Длина ответа не совпадает с пакетом
+
+    async def process_single(item):
+        singles.append(item)
+        return f"single-{item}"
+
+    batcher = MicroBatcher("intent", process_batch, process_single, max_wait=0.01)
+    assert asyncio.run(_submit_all(batcher, ["a", "b"])) == ["single-a", "single-b"]
+    assert sorted(singles) == ["a", "b"]
+    assert (batcher.stats["fallback_batches"], batcher.stats["fallback_items"]) == (1, 2)
+
+
+def test_failed_batch_falls_back_to_single_requests():
+    async def process_batch(items):
+        raise RuntimeError("provider error")
+
+    async def process_single(item):
+        return f"single-{item}"
+
+    batcher = MicroBatcher("intent", process_batch, process_single, max_wait=0.01)
+    assert asyncio.run(_submit_all(batcher, ["a", "b"])) == ["single-a", "single-b"]
+    assert batcher.stats["fallback_batches"] == 1
+
+
+def test_missing_items_retried_individually():
+    async def process_batch(items):
+        return ["A", None]
+
+    async def process_single(item):
+        return f"single-{item}"
+
+    batcher = MicroBatcher("intent", process_batch, process_single, max_wait=0.01)
+    assert asyncio.run(_submit_all(batcher, ["a", "b"])) == ["A", "single-b"]
+    assert (batcher.stats["batched_items"], batcher.stats["fallback_items"]) == (1, 1)
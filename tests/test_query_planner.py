@@ -0,0 +1,45 @@
+# tests/test_query_planner.py
+import pendulum
+import pytest
+
+from src.utils.query_planner import plan_task_query
+
+TZ = "Europe/Moscow"
+WEDNESDAY = pendulum.datetime(2026, 10, 14, 10, 0, tz=TZ)
+
+
+def _local(value):
+    return value.in_timezone(TZ).to_datetime_string() if value else None
+
+
+@pytest.mark.parametrize("text, label, start, end, status", [
+    ("задачи на завтра", "Задачи на завтра", "2026-10-15 00:00:00", "2026-10-15 23:59:59", "pending"),
+    ("что у меня на завтра?", "Задачи на завтра", "2026-10-15 00:00:00", "2026-10-15 23:59:59", "pending"),
+    ("что на этой неделе", "Задачи на этой неделе", "2026-10-12 00:00:00", "2026-10-18 23:59:59", "pending"),
+    ("на следующей неделе", "Задачи на следующей неделе", "2026-10-19 00:00:00", "2026-10-25 23:59:59", "pending"),
+    ("задачи на пятницу", "Задачи на пятницу", "2026-10-16 00:00:00", "2026-10-16 23:59:59", "pending"),
+    ("выполненные сегодня", "Выполненные задачи за сегодня", "2026-10-14 00:00:00", "2026-10-14 23:59:59", "done"),
+    ("просроченные", "Просроченные задачи", None, "2026-10-14 10:00:00", "pending"),
+    ("активные задачи", "Все активные задачи", None, None, "pending"),
+])
+def test_planned_queries(text, label, start, end, status):
+    plan = plan_task_query(text, TZ, now=WEDNESDAY)
+    assert plan is not None
+    assert plan["label"] == label
+    assert (_local(plan["start_date"]), _local(plan["end_date"])) == (start, end)
+    assert plan["status"] == status
+
+
+def test_recurring_filter():
+    plan = plan_task_query("повторяющиеся задачи", TZ, now=WEDNESDAY)
+    assert plan["only_recurring"] is True
+
+
+@pytest.mark.parametrize("text", [
+    # Содержательные слова - семантический запрос для LLM
+    "оплатить счета на завтра",
+    "задачи про маму",
+    "",
+])
+def test_left_to_llm(text):
+    assert plan_task_query(text, TZ, now=WEDNESDAY) is None
@@ -0,0 +1,46 @@
+# tests/test_recurrence.py
+import pytest
+
+from src.utils.recurrence import detect_recurrence_locally
+
+
+@pytest.mark.parametrize("text, expected_rrule", [
+    ("каждые 3 дня", "FREQ=DAILY;INTERVAL=3"),
+    ("15 числа каждого месяца", "FREQ=MONTHLY;BYMONTHDAY=15"),
+    ("каждый будний день", "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR"),
+    ("каждый понедельник в 9", "FREQ=WEEKLY;BYDAY=MO"),
+    ("ежедневно пить воду", "FREQ=DAILY"),
+    ("по понедельникам спортзал", "FREQ=WEEKLY;BYDAY=MO"),
+    ("раз в неделю", "FREQ=WEEKLY"),
+    ("раз в 2 недели", "FREQ=WEEKLY;INTERVAL=2"),
+    ("по выходным", "FREQ=WEEKLY;BYDAY=SA,SU"),
+    ("каждую пятницу и субботу", "FREQ=WEEKLY;BYDAY=FR,SA"),
+    ("каждое второе воскресенье месяца", "FREQ=MONTHLY;BYDAY=2SU"),
+    ("каждый последний день месяца", "FREQ=MONTHLY;BYMONTHDAY=-1"),
+    ("каждый день кроме выходных", "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR"),
+    ("каждый день кроме субботы", "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR,SU"),
+    ("каждый день кроме будней", "FREQ=WEEKLY;BYDAY=SA,SU"),
+])
+def test_compiled_locally(text, expected_rrule):
+    result = detect_recurrence_locally(text)
+    assert result["is_recurring"] is True
+    assert result["rrule"] == expected_rrule
+
+
+@pytest.mark.parametrize("text", [
+    "купить молоко",
+    "позвонить маме в пятницу",
+    # Разовое смещение, а не повторение
+    "через неделю позвонить",
+    "через день позвонить маме",
+])
+def test_not_recurring(text):
+    assert detect_recurrence_locally(text) == {"is_recurring": False, "pattern": None, "rrule": None}
+
+
+@pytest.mark.parametrize("text", [
+    "раз в полгода",
+    "каждую неделю кроме праздников",
+])
+def test_deferred_to_llm(text):
+    assert detect_recurrence_locally(text) is None
@@ -0,0 +1,164 @@
+# tests/test_request_scheduler.py
+import asyncio
+
+from src.llm.request_scheduler import (
+    LLMRequestScheduler,
+    TokenBucket,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_BACKGROUND,
+    llm_request_context,
+)
+
+
+async def _run_in_order(scheduler, submissions):
+    """Занимает единственный слот, ставит запросы в очередь и возвращает порядок их выполнения."""
+    order = []
+    gate = asyncio.Event()
+
+    async def blocker():
+        await gate.wait()
+
+    async def request(label):
+        order.append(label)
+
+    first = asyncio.ensure_future(scheduler.run(blocker, user_id="blocker"))
+    await asyncio.sleep(0)
+    queued = []
+    for label, priority, user_id in submissions:
+        queued.append(asyncio.ensure_future(
+            scheduler.run(lambda label=label: request(label), priority=priority, user_id=user_id)
+        ))
+        await asyncio.sleep(0)
+    gate.set()
+    await asyncio.gather(first, *queued)
+    return order
+
+
+def test_interactive_lane_served_before_background():
+    scheduler = LLMRequestScheduler(max_concurrency=1)
+    order = asyncio.run(_run_in_order(scheduler, [
+        ("title", PRIORITY_BACKGROUND, 1),
+        ("intent", PRIORITY_INTERACTIVE, 2),
+    ]))
+    assert order == ["intent", "title"]
+
+
+def test_users_served_round_robin_within_priority():
+    scheduler = LLMRequestScheduler(max_concurrency=1)
+    order = asyncio.run(_run_in_order(scheduler, [
+        ("a1", PRIORITY_INTERACTIVE, "a"),
+        ("a2", PRIORITY_INTERACTIVE, "a"),
+        ("a3", PRIORITY_INTERACTIVE, "a"),
+        ("b1", PRIORITY_INTERACTIVE, "b"),
+    ]))
+    assert order == ["a1", "b1", "a2", "a3"]
+
+
+def test_priority_override_from_context():
+    async def scenario():
+        scheduler = LLMRequestScheduler(max_concurrency=1)
+        gate = asyncio.Event()
+        order = []
+
+        async def request(label):
+            order.append(label)
+
+        first = asyncio.ensure_future(scheduler.run(gate.wait))
+        await asyncio.sleep(0)
+        normal = asyncio.ensure_future(scheduler.run(lambda: request("normal")))
+        await asyncio.sleep(0)
+        with llm_request_context(priority=PRIORITY_BACKGROUND):
+            background = asyncio.ensure_future(scheduler.run(lambda: request("background"),
+                                                             priority=PRIORITY_INTERACTIVE))
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(first, normal, background)
+        return order
+
+    assert asyncio.run(scenario()) == ["normal", "background"]
+
+
+def test_rpm_limit_delays_next_request():
+    async def scenario():
+        scheduler = LLMRequestScheduler(max_concurrency=4, requests_per_minute=1)
+
+        async def request():
+            return "ok"
+
+        assert await scheduler.run(request) == "ok"
+        # Квота на минуту исчерпана: второй запрос ждет в очереди
+        second = asyncio.ensure_future(scheduler.run(request))
+        done, _ = await asyncio.wait({second}, timeout=0.1)
+        assert not done
+        assert scheduler.get_stats()["queue_depth_normal"] == 1
+        second.cancel()
+        await asyncio.gather(second, return_exceptions=True)
+        return scheduler.get_stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["completed"] == 1
+    assert stats["cancelled"] == 1
+    assert stats["queue_depth_normal"] == 0
+
+
+def test_tpm_limit_delays_large_request():
+    async def scenario():
+        scheduler = LLMRequestScheduler(max_concurrency=4, tokens_per_minute=1000)
+
+        async def request():
+            return "ok"
+
+        assert await scheduler.run(request, estimated_tokens=800) == "ok"
+        # Осталось 200 токенов из 1000 в минуту - следующему запросу на 800 нужно подождать
+        second = asyncio.ensure_future(scheduler.run(request, estimated_tokens=800))
+        done, _ = await asyncio.wait({second}, timeout=0.1)
+        second.cancel()
+        await asyncio.gather(second, return_exceptions=True)
+        return done
+
+    assert not asyncio.run(scenario())
+
+
+def test_tpm_quota_reservation():
+    async def scenario():
+        scheduler = LLMRequestScheduler(tokens_per_minute=1000)
+        first = scheduler.try_reserve_quota(600)
+        second = scheduler.try_reserve_quota(600)
+        return first, second, scheduler.stats["extra_reserved"]
+
+    assert asyncio.run(scenario()) == (True, False, 1)
+
+
+def test_token_bucket():
+    bucket = TokenBucket(60)
+    assert bucket.delay_for(60) == 0.0
+    bucket.consume(60)
+    # 60 в минуту - одна единица в секунду
+    assert 0.9 < bucket.delay_for(1) <= 1.0
+    bucket.drain()
+    assert bucket.delay_for(1) > 0.9
+
+    unlimited = TokenBucket(0)
+    unlimited.consume(10 ** 6)
+    assert unlimited.delay_for(10 ** 6) == 0.0
+
+
+def test_quota_error_drains_rpm_bucket():
+    class ResourceExhausted(Exception):
+        pass
+
+    async def scenario():
+        scheduler = LLMRequestScheduler(requests_per_minute=100)
+
+        async def failing():
+            raise ResourceExhausted("429 quota exceeded")
+
+        try:
+            await scheduler.run(failing)
+        except ResourceExhausted:
+            pass
+        return scheduler
+
+    scheduler = asyncio.run(scenario())
+    assert scheduler.stats["quota_errors"] == 1
+    assert scheduler.rpm_bucket.delay_for(1) > 0
@@ -0,0 +1,51 @@
+# tests/test_timezone_index.py
+import pytest
+
+from src.utils.timezone_index import resolve_timezone_locally, parse_utc_offset, learn_timezone
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Москва", "Europe/Moscow"),
+    ("в Москве", "Europe/Moscow"),
+    ("Moscow", "Europe/Moscow"),
+    ("Europe/Moscow", "Europe/Moscow"),
+    ("Нижний Новгород", "Europe/Moscow"),
+    ("Нью-Йорк", "America/New_York"),
+    ("лондон", "Europe/London"),
+    ("Токио", "Asia/Tokyo"),
+    ("живу в Барселоне", "Europe/Madrid"),
+    ("я сейчас в Берлине", "Europe/Berlin"),
+    ("UTC+3", "Etc/GMT-3"),
+    ("фывапролд", None),
+    ("утро", None),
+    ("", None),
+])
+def test_resolve_timezone_locally(text, expected):
+    assert resolve_timezone_locally(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("UTC+3", "Etc/GMT-3"),
+    ("GMT-5", "Etc/GMT+5"),
+    ("+3", "Etc/GMT-3"),
+    ("+05:30", "Asia/Kolkata"),
+    ("мск+2", "Etc/GMT-5"),
+    ("UTC+0", "UTC"),
+    ("UTC+15", None),
+    # Голое смещение внутри фразы - не таймзона
+    ("купить +3 пачки", None),
+    ("Москва", None),
+])
+def test_parse_utc_offset(text, expected):
+    assert parse_utc_offset(text) == expected
+
+
+def test_learned_phrase_resolved_locally():
+    assert resolve_timezone_locally("у бабушки на даче") is None
+    learn_timezone("у бабушки на даче", "Asia/Yekaterinburg")
+    assert resolve_timezone_locally("у бабушки на даче") == "Asia/Yekaterinburg"
+
+
+def test_invalid_zone_is_not_learned():
+    learn_timezone("где-то далеко", "Mars/Olympus")
+    assert resolve_timezone_locally("где-то далеко") is None
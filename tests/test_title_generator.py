@@ -0,0 +1,54 @@
+# tests/test_title_generator.py
+import pytest
+
+from src.utils.title_generator import generate_title_locally, starts_with_verb, truncate_title, DEFAULT_TITLE
+
+
+@pytest.mark.parametrize("description, expected", [
+    ("купить молоко завтра в 15:00", "Купить молоко"),
+    ("маме позвонить завтра", "Позвонить маме"),
+    ("купи хлеб", "Купить хлеб"),
+    ("напомни мне пожалуйста забрать посылку на почте в пятницу", "Забрать посылку"),
+    ("не забыть оплатить интернет", "Оплатить интернет"),
+    ("каждый понедельник в 9 спортзал", "Спортзал"),
+    ("Купить молоко, хлеб и яйца", "Купить молоко, хлеб"),
+    ("Сделать ДЗ. Потом погулять", "Сделать ДЗ"),
+    ("часть работы доделать", "Доделать часть работы"),
+    # Не помещается в 21 символ - обрезка по границе слова
+    ("Подготовить презентацию для квартального отчета", "Подготовить"),
+    ("напомни завтра", DEFAULT_TITLE),
+    ("", DEFAULT_TITLE),
+    (None, DEFAULT_TITLE),
+])
+def test_generate_title_locally(description, expected):
+    assert generate_title_locally(description) == expected
+
+
+@pytest.mark.parametrize("description", [
+    "напомни мне пожалуйста забрать посылку на почте в пятницу",
+    "Подготовить презентацию для квартального отчета",
+    "Длинноесловокотороенепомещаетсявзаголовок",
+])
+def test_title_fits_limit(description):
+    assert len(generate_title_locally(description)) <= 21
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("купить хлеб", True),
+    ("не забыть позвонить маме", True),
+    ("напомни купи хлеб", True),
+    ("молоко", False),
+    ("новости посмотреть", False),
+])
+def test_starts_with_verb(text, expected):
+    assert starts_with_verb(text) is expected
+
+
+@pytest.mark.parametrize("title, expected", [
+    ("Купить хлеб", "Купить хлеб"),
+    ("Позвонить в страховую компанию насчет полиса", "Позвонить в страховую"),
+    ("Забрать посылку на почте", "Забрать посылку"),
+    ("Длинноесловокотороенепомещается", "Длинноесловокотороен…"),
+])
+def test_truncate_title(title, expected):
+    assert truncate_title(title) == expected